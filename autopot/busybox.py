@@ -0,0 +1,104 @@
+# python
+"""
+autopot/busybox.py
+The BusyBox multi-call binary: `busybox APPLET ARGS` and `/bin/busybox
+APPLET ARGS` run the applet like its own command, unknown applets get
+BusyBox's error and a few applets print their usage when called bare (what
+loaders probe to learn which downloaders exist). The applet list and version
+come from the scenario's host profile.
+"""
+import posixpath
+from typing import List, NamedTuple, Optional
+
+from .host_profile import HostProfile
+
+# applet -> (usage line, description) printed when it is run without arguments
+_USAGE = {
+    "wget": (
+        "wget [-c|--continue] [--spider] [-q|--quiet] [-O|--output-document FILE]\n"
+        "\t[--header 'header: value'] [-Y|--proxy on/off] [-P DIR]\n"
+        "\t[-S|--server-response] [-U|--user-agent AGENT] [-T SEC] URL...",
+        "Retrieve files via HTTP or FTP\n\n"
+        "\t--spider\tOnly check URL existence: $? is 0 if exists\n"
+        "\t-c\t\tContinue retrieval of aborted transfer\n"
+        "\t-q\t\tQuiet\n"
+        "\t-P DIR\t\tSave to DIR (default .)\n"
+        "\t-S    \t\tShow server response\n"
+        "\t-T SEC\t\tNetwork read timeout is SEC seconds\n"
+        "\t-O FILE\t\tSave to FILE ('-' for stdout)\n"
+        "\t-U STR\t\tUse STR for User-Agent header\n"
+        "\t-Y on/off\tUse proxy",
+    ),
+    "tftp": (
+        "tftp [OPTIONS] HOST [PORT]",
+        "Transfer a file from/to tftp server\n\n"
+        "\t-l FILE\tLocal FILE\n"
+        "\t-r FILE\tRemote FILE\n"
+        "\t-g\tGet file\n"
+        "\t-p\tPut file\n"
+        "\t-b SIZE\tTransfer blocks of SIZE octets",
+    ),
+    "ftpget": (
+        "ftpget [OPTIONS] HOST [LOCAL_FILE] REMOTE_FILE",
+        "Download a file via FTP\n\n"
+        "\t-c\tContinue previous transfer\n"
+        "\t-v\tVerbose\n"
+        "\t-u USER\tUsername\n"
+        "\t-p PASS\tPassword\n"
+        "\t-P NUM\tPort",
+    ),
+    "nc": (
+        "nc [-iN] [-wN] [-l] [-p PORT] [-f FILE|IPADDR PORT] [-e PROG]",
+        "Open a pipe to IP:PORT or FILE\n\n"
+        "\t-l\tListen mode, for inbound connects\n"
+        "\t-p PORT\tLocal port\n"
+        "\t-w SEC\tConnect timeout\n"
+        "\t-i SEC\tDelay interval for lines sent\n"
+        "\t-f FILE\tUse file (ala /dev/ttyS0) instead of network\n"
+        "\t-e PROG\tRun PROG after connect",
+    ),
+}
+
+
+class Applet(NamedTuple):
+    """
+    How a busybox invocation is answered: with output right away, or by
+    running argv (the applet and its arguments) as a command.
+    """
+
+    output: Optional[str]
+    argv: List[str]
+    # the applet name is not one of the host's (loaders probe with a token)
+    unknown: bool = False
+
+
+def is_busybox(cmd: str) -> bool:
+    return posixpath.basename(cmd) == "busybox"
+
+
+def banner(profile: HostProfile) -> str:
+    return f"BusyBox v{profile.busybox_version} ({profile.busybox_build}) multi-call binary."
+
+
+def applet_list(profile: HostProfile) -> str:
+    return "\n".join(sorted(profile.applets))
+
+
+def resolve(profile: HostProfile, argv: List[str]) -> Applet:
+    """
+    Answer `busybox APPLET ...` (argv[0] is the busybox path): `--list`,
+    unknown applets and bare downloaders are answered here, anything else
+    is the applet's own command line.
+    """
+    applet, args = posixpath.basename(argv[1]), argv[2:]
+    if applet in ("--list", "--list-full"):
+        return Applet(applet_list(profile), [])
+    if applet == "--help":
+        # the canned busybox.txt
+        return Applet(None, ["busybox"])
+    if applet.startswith("-") or applet not in profile.applets:
+        return Applet(f"{applet}: applet not found", [], unknown=True)
+    if not args and applet in _USAGE:
+        usage, description = _USAGE[applet]
+        return Applet(f"{banner(profile)}\n\nUsage: {usage}\n\n{description}", [])
+    return Applet(None, [applet] + args)
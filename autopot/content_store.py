@@ -0,0 +1,253 @@
+# python
+"""
+autopot/content_store.py
+Materialized contents of scenario files: generated once, then served to every
+session from memory or a content-addressed store on disk.
+"""
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+from .llm.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+_INDEX_NAME = "index.jsonl"
+
+
+def node_content_key(scenario_id: str, rel_path: Sequence[str], node: Mapping[str, Any]) -> str:
+    """
+    Identity of a file's content: its scenario, path and the metadata the
+    content has to agree with. Editing a node's size or summary in fs.json
+    therefore yields new content.
+    """
+    material = json.dumps(
+        [
+            scenario_id or "default",
+            "/".join(rel_path),
+            node.get("size"),
+            node.get("content_summary") or "",
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ContentStore:
+    """
+    Map content keys to file contents, shared by all sessions.
+
+    Blobs are stored content-addressed under `root/<aa>/<sha256>` so identical
+    contents are kept once, and an append-only `index.jsonl` maps keys to
+    digests so contents survive restarts. Blobs read or written recently stay
+    in an LRU bounded by max_memory_bytes. Without a root the store is
+    memory-only (and entries can be evicted for good).
+
+    get_or_create coalesces concurrent generation for the same key, so a file
+    is generated once even when many sessions cat it at the same time.
+    """
+
+    def __init__(
+        self,
+        root: Optional[pathlib.Path] = None,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+    ):
+        self.root = pathlib.Path(root) if root else None
+        self.max_memory_bytes = max(0, int(max_memory_bytes))
+        self._digests: Dict[str, str] = {}
+        self._memory: "collections.OrderedDict[str, str]" = collections.OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        # serializes blob and index writes, which run on worker threads
+        self._disk_lock = threading.Lock()
+        self._generating = SingleFlight()
+        self.counters: Dict[str, int] = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        if self.root:
+            self._load_index()
+
+    def _load_index(self) -> None:
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            index = self.root / _INDEX_NAME
+            if not index.exists():
+                return
+            with open(index, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._digests[entry["key"]] = entry["digest"]
+                    except Exception:
+                        continue
+        except Exception:
+            logger.exception("Failed to load content index in %s", self.root)
+
+    def _blob_path(self, digest: str) -> pathlib.Path:
+        return self.root / digest[:2] / digest
+
+    def _remember(self, digest: str, content: str) -> None:
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        size = len(content.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        self._memory[digest] = content
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+            self.counters["evictions"] += 1
+
+    def _memory_lookup(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        (content, digest) from memory; content is None when the key is
+        unknown (digest None) or only on disk.
+        """
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is None:
+                return None, None
+            content = self._memory.get(digest)
+            if content is not None:
+                self._memory.move_to_end(digest)
+            return content, digest
+
+    def _read_blob(self, digest: str) -> Optional[str]:
+        try:
+            content = self._blob_path(digest).read_text(encoding="utf-8")
+        except Exception:
+            logger.warning("Content blob %s is missing", digest)
+            return None
+        with self._lock:
+            self._remember(digest, content)
+        return content
+
+    def _lookup(self, key: str) -> Tuple[Optional[str], str]:
+        """
+        (content, tier) with tier "memory", "disk" or "" for a miss.
+        """
+        content, digest = self._memory_lookup(key)
+        if content is not None:
+            return content, "memory"
+        if digest is None or not self.root:
+            return None, ""
+        content = self._read_blob(digest)
+        return (content, "disk") if content is not None else (None, "")
+
+    async def _alookup(self, key: str) -> Tuple[Optional[str], str]:
+        """
+        _lookup for the event loop: blobs are read on a worker thread.
+        """
+        content, digest = self._memory_lookup(key)
+        if content is not None:
+            return content, "memory"
+        if digest is None or not self.root:
+            return None, ""
+        content = await asyncio.to_thread(self._read_blob, digest)
+        return (content, "disk") if content is not None else (None, "")
+
+    def _counted(self, content: Optional[str], tier: str) -> Optional[str]:
+        with self._lock:
+            if content is None:
+                self.counters["misses"] += 1
+            else:
+                self.counters["hits"] += 1
+                self.counters[f"{tier}_hits"] += 1
+        return content
+
+    def get(self, key: str) -> Optional[str]:
+        return self._counted(*self._lookup(key))
+
+    async def aget(self, key: str) -> Optional[str]:
+        """
+        get() for the event loop: disk reads run on a worker thread.
+        """
+        return self._counted(*await self._alookup(key))
+
+    def _store_memory(self, key: str, digest: str, content: str) -> None:
+        with self._lock:
+            self._digests[key] = digest
+            self._remember(digest, content)
+            self.counters["stores"] += 1
+
+    def _store_disk(self, key: str, digest: str, content: str) -> None:
+        with self._disk_lock:
+            try:
+                path = self._blob_path(digest)
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_suffix(".tmp")
+                    tmp.write_text(content, encoding="utf-8")
+                    os.replace(tmp, path)
+                with open(self.root / _INDEX_NAME, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "digest": digest}) + "\n")
+            except Exception:
+                logger.exception("Failed to persist content blob %s", digest)
+
+    def put(self, key: str, content: str) -> str:
+        """
+        Store content under key and return its digest.
+        """
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        # on disk before readers can find the digest
+        if self.root:
+            self._store_disk(key, digest, content)
+        self._store_memory(key, digest, content)
+        return digest
+
+    async def aput(self, key: str, content: str) -> str:
+        """
+        put() for the event loop: the blob and index writes run on a worker
+        thread.
+        """
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if self.root:
+            await asyncio.to_thread(self._store_disk, key, digest, content)
+        self._store_memory(key, digest, content)
+        return digest
+
+    async def get_or_create(
+        self, key: str, generate: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        Return the stored content for key, generating and storing it first if
+        needed. A generator returning None stores nothing (and the next call
+        tries again).
+        """
+        content = await self.aget(key)
+        if content is not None:
+            return content
+
+        async def create() -> Optional[str]:
+            # another caller may have finished between our miss and now
+            stored, _ = await self._alookup(key)
+            if stored is not None:
+                return stored
+            generated = await generate()
+            if generated is not None:
+                await self.aput(key, generated)
+            return generated
+
+        content, _ = await self._generating.do(key, create)
+        return content
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["keys"] = len(self._digests)
+            stats["memory_bytes"] = self._memory_bytes
+        return stats
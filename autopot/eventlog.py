@@ -0,0 +1,210 @@
+# python
+"""
+autopot/eventlog.py
+Batched JSONL event writer: records are queued in memory and written by a
+background task in groups through one long-lived file handle per path.
+"""
+import asyncio
+import atexit
+import collections
+import datetime
+import json
+import logging
+import pathlib
+import threading
+from typing import Any, Deque, Dict, IO, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_MAX_QUEUE = 10_000
+_WRITE_BUFFER = 1 << 16
+
+_settings: Dict[str, Any] = {
+    "max_batch": DEFAULT_MAX_BATCH,
+    "flush_interval": DEFAULT_FLUSH_INTERVAL,
+    "max_queue": DEFAULT_MAX_QUEUE,
+}
+_writers: Dict[Tuple[str, int], "EventLogWriter"] = {}
+_registry_lock = threading.Lock()
+
+
+class EventLogWriter:
+    """
+    Append pre-serialized JSONL lines to one file from a single loop.
+
+    write() only enqueues; a background task flushes once max_batch lines are
+    pending or flush_interval seconds after the first pending line, whichever
+    comes first. When max_queue lines are already pending new lines are
+    dropped and counted, and an `eventlog.dropped` record is written with the
+    next batch so the gap is visible in the log itself. Pending lines are
+    flushed when the task is cancelled (e.g. at loop shutdown).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        self.path = pathlib.Path(path)
+        self.max_batch = max(1, int(max_batch))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.max_queue = max(1, int(max_queue))
+        self._pending: Deque[str] = collections.deque()
+        self._file: Optional[IO[str]] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._unreported_drops = 0
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "written": 0,
+            "batches": 0,
+            "dropped": 0,
+            "max_pending": 0,
+        }
+
+    def write(self, line: str) -> bool:
+        """
+        Queue one line (including its trailing newline). Returns False if it
+        was dropped because the queue is full.
+        """
+        if len(self._pending) >= self.max_queue:
+            self.counters["dropped"] += 1
+            self._unreported_drops += 1
+            return False
+        self._pending.append(line)
+        if len(self._pending) > self.counters["max_pending"]:
+            self.counters["max_pending"] = len(self._pending)
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return True
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await self._has_pending.wait()
+                if not self._batch_full.is_set():
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                self.flush()
+        except asyncio.CancelledError:
+            self.flush()
+            self.close()
+            raise
+
+    def flush(self) -> None:
+        """Write every pending line now."""
+        with self._lock:
+            self._has_pending.clear()
+            self._batch_full.clear()
+            if not self._pending and not self._unreported_drops:
+                return
+            lines = list(self._pending)
+            self._pending.clear()
+            if self._unreported_drops:
+                lines.append(_dropped_record(self._unreported_drops, self.counters["dropped"]))
+                self._unreported_drops = 0
+            try:
+                if self._file is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8", buffering=_WRITE_BUFFER)
+                self._file.write("".join(lines))
+                self._file.flush()
+            except Exception:
+                logger.exception("Failed to write %d events to %s", len(lines), self.path)
+                return
+            self.counters["written"] += len(lines)
+            self.counters["batches"] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self.counters)
+        stats["pending"] = len(self._pending)
+        return stats
+
+
+def _dropped_record(dropped: int, total: int) -> str:
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    rec = {
+        "ts": now.isoformat().replace("+00:00", "Z"),
+        "event": "eventlog.dropped",
+        "phase": "log",
+        "version": "0.1",
+        "payload": {"dropped": dropped, "total_dropped": total},
+    }
+    return json.dumps(rec) + "\n"
+
+
+def configure(
+    max_batch: Optional[int] = None,
+    flush_interval: Optional[float] = None,
+    max_queue: Optional[int] = None,
+) -> None:
+    """Set the batching parameters used by writers created after this call."""
+    if max_batch is not None:
+        _settings["max_batch"] = max_batch
+    if flush_interval is not None:
+        _settings["flush_interval"] = flush_interval
+    if max_queue is not None:
+        _settings["max_queue"] = max_queue
+
+
+def get_writer(path: str) -> EventLogWriter:
+    """
+    Return the writer for path on the running loop, creating it on first use.
+    Writers are per loop because their background task and events are.
+    """
+    loop = asyncio.get_running_loop()
+    key = (str(path), id(loop))
+    writer = _writers.get(key)
+    if writer is None or writer._loop is not loop:
+        with _registry_lock:
+            writer = EventLogWriter(path, **_settings)
+            writer._loop = loop
+            _writers[key] = writer
+            # forget writers whose loop has gone away
+            for stale in [
+                k for k, w in _writers.items() if w._loop is None or w._loop.is_closed()
+            ]:
+                stale_writer = _writers.pop(stale)
+                stale_writer.flush()
+                stale_writer.close()
+    return writer
+
+
+async def flush(path: Optional[str] = None) -> None:
+    """Flush the running loop's writer for path (or all of them)."""
+    loop = asyncio.get_running_loop()
+    target = pathlib.Path(path) if path is not None else None
+    for writer in list(_writers.values()):
+        if writer._loop is loop and (target is None or writer.path == target):
+            writer.flush()
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {str(w.path): w.stats() for w in list(_writers.values())}
+
+
+@atexit.register
+def _flush_all() -> None:
+    for writer in list(_writers.values()):
+        writer.flush()
+        writer.close()
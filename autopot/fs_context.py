@@ -0,0 +1,246 @@
+# python
+"""
+autopot/fs_context.py
+Select the parts of a scenario filesystem that are relevant to one command so
+the simulate prompt does not grow with the size of fs.json.
+
+select_fs_delta() complements a tree from select_fs_context(): it returns only
+what that tree does not already show for one command.
+"""
+import collections
+import json
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .fs_snapshot import FileSystemSnapshot
+
+# Rough prompt-size estimate; good enough to keep the context under budget.
+BYTES_PER_TOKEN = 4
+DEFAULT_CONTEXT_BUDGET_TOKENS = 2048
+_MEMO_SIZE = 256
+# worst case for replacing `"entries": N` with `"children": [...], "omitted_entries": N`
+_EXPAND_OVERHEAD = len('"children": [], "omitted_entries": 1000000')
+
+RelPath = Tuple[str, ...]
+
+_memo: "collections.OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = collections.OrderedDict()
+
+
+def _cost(obj: Dict[str, Any]) -> int:
+    # +2 accounts for the ", " separator between siblings
+    return len(json.dumps(obj)) + 2
+
+
+def _stub(node: Dict[str, Any], detailed: bool) -> Dict[str, Any]:
+    """
+    Shallow copy of a node. Directories are collapsed to an entry count until
+    expanded; siblings outside the focus keep only name/type/size.
+    """
+    out: Dict[str, Any] = {"type": node.get("type"), "name": node.get("name")}
+    if node.get("type") == "dir":
+        out["entries"] = len(node.get("children") or [])
+        return out
+    if "size" in node:
+        out["size"] = node["size"]
+    if detailed and node.get("content_summary"):
+        out["content_summary"] = node["content_summary"]
+    return out
+
+
+def _expand(
+    snapshot: FileSystemSnapshot,
+    rel: RelPath,
+    out: Dict[str, Any],
+    nodes: Dict[RelPath, Dict[str, Any]],
+    detailed: bool,
+    remaining: int,
+    keep: Sequence[str] = (),
+) -> int:
+    """
+    Replace a collapsed directory stub with stubs for its children, spending at
+    most `remaining` bytes. Children named in `keep` are always included.
+    Returns the number of bytes used.
+    """
+    if "children" in out:
+        return 0
+    children = list(snapshot.list_dir(rel) or [])
+    used = _EXPAND_OVERHEAD
+    listed: List[Dict[str, Any]] = []
+    included = set()
+    # focus entries first so they survive truncation, then siblings in order
+    ordered = [c for c in children if c.get("name") in keep] + [
+        c for c in children if c.get("name") not in keep
+    ]
+    for child in ordered:
+        name = child.get("name")
+        if not name or name in included:
+            continue
+        stub = _stub(child, detailed or name in keep)
+        cost = _cost(stub)
+        if name not in keep and used + cost > remaining:
+            break
+        listed.append(stub)
+        included.add(name)
+        nodes[rel + (name,)] = stub
+        used += cost
+    order = {child.get("name"): i for i, child in enumerate(children)}
+    listed.sort(key=lambda stub: order.get(stub["name"], 0))
+    del out["entries"]
+    out["children"] = listed
+    omitted = len(children) - len(listed)
+    if omitted:
+        out["omitted_entries"] = omitted
+    return used
+
+
+def select_fs_context(
+    snapshot: FileSystemSnapshot,
+    focus: Sequence[RelPath],
+    budget_tokens: int = DEFAULT_CONTEXT_BUDGET_TOKENS,
+) -> Dict[str, Any]:
+    """
+    Return a filesystem tree for the simulate prompt that fits in budget_tokens.
+
+    Small trees are returned whole. Otherwise the result contains the path from
+    the root to every focus path (the cwd and any path arguments), a shallow
+    listing of the siblings along those paths, and the focus subtrees expanded
+    breadth-first until the budget is spent. Collapsed directories carry an
+    `entries` count and truncated listings an `omitted_entries` count.
+    """
+    budget = max(1, int(budget_tokens)) * BYTES_PER_TOKEN
+    if snapshot.serialized_size <= budget:
+        return snapshot.root
+
+    # most specific paths first so the cwd listing cannot crowd out arguments
+    focus = tuple(sorted(dict.fromkeys(tuple(f) for f in focus), key=len, reverse=True)) or ((),)
+    memo_key = (snapshot.fingerprint, focus, budget)
+    cached = _memo.get(memo_key)
+    if cached is not None:
+        _memo.move_to_end(memo_key)
+        return cached
+
+    root_node = snapshot.get_node(()) or {"type": "dir", "name": "", "children": []}
+    root = _stub(root_node, True)
+    nodes: Dict[RelPath, Dict[str, Any]] = {(): root}
+    used = _cost(root)
+
+    # Phase 1: the spine from the root to each focus path, with siblings.
+    for path in focus:
+        for depth in range(len(path) + 1):
+            rel = path[:depth]
+            out = nodes.get(rel)
+            if out is None or out.get("type") != "dir":
+                break
+            keep = path[depth : depth + 1]
+            final = depth == len(path)
+            # siblings above the focus may only take half of what is left so
+            # the levels below still fit
+            allowance = budget - used if final else (budget - used) // 2
+            used += _expand(snapshot, rel, out, nodes, final, allowance, keep)
+
+    # Phase 2: breadth-first expansion below the focus paths.
+    queue = collections.deque(focus)
+    while queue and used < budget:
+        rel = queue.popleft()
+        out = nodes.get(rel)
+        if out is None or out.get("type") != "dir":
+            continue
+        used += _expand(snapshot, rel, out, nodes, True, budget - used)
+        for child in out.get("children", []):
+            if child.get("type") == "dir":
+                queue.append(rel + (child["name"],))
+
+    return _remember(memo_key, root)
+
+
+def _remember(key: Tuple[Any, ...], value: Dict[str, Any]) -> Dict[str, Any]:
+    _memo[key] = value
+    while len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+    return value
+
+
+def _covers(tree: Dict[str, Any], view: Any, rel: RelPath) -> bool:
+    """
+    Whether tree (a select_fs_context result) shows rel as view has it: a
+    file with its details, or a directory with its full listing.
+    """
+    node: Optional[Dict[str, Any]] = tree
+    for name in rel:
+        children = node.get("children") if node else None
+        if children is None:
+            return False
+        node = next((c for c in children if c.get("name") == name), None)
+    if node is None:
+        return False
+    if node.get("type") == "dir":
+        return "children" in node and not node.get("omitted_entries")
+    actual = view.get_node(rel) or {}
+    return bool(node.get("content_summary")) or not actual.get("content_summary")
+
+
+def select_fs_delta(
+    view: Any,
+    base: Dict[str, Any],
+    focus: Sequence[RelPath],
+    changed: Sequence[RelPath] = (),
+    budget_tokens: Optional[int] = DEFAULT_CONTEXT_BUDGET_TOKENS,
+    root_path: str = "",
+) -> Optional[Dict[str, Any]]:
+    """
+    What a command needs from view (a snapshot or a session overlay) that
+    base, the budgeted tree in the prompt prefix, lacks: focus paths base
+    shows collapsed, truncated or not at all, and the paths changed in the
+    session (null once removed).
+
+    Returns {absolute path: subtree}, focus paths first and most specific
+    first, or None when there is nothing to add. Each subtree is expanded
+    breadth-first within an equal share of what is left of the budget;
+    without a budget the subtrees are complete.
+    """
+    need: Dict[RelPath, None] = {}
+    # the root is what base was budgeted for, so it is never worth repeating
+    for rel in sorted((tuple(f) for f in focus), key=len, reverse=True):
+        while rel and view.get_node(rel) is None:
+            rel = rel[:-1]
+        if rel and not _covers(base, view, rel):
+            need[rel] = None
+    for rel in reversed(changed):
+        need.setdefault(tuple(rel), None)
+    if not need:
+        return None
+
+    paths = tuple(need)
+    budget = (
+        max(1, int(budget_tokens)) * BYTES_PER_TOKEN if budget_tokens else sys.maxsize
+    )
+    memo_key = ("delta", view.fingerprint, paths, budget, root_path)
+    cached = _memo.get(memo_key)
+    if cached is not None:
+        _memo.move_to_end(memo_key)
+        return cached
+
+    delta: Dict[str, Any] = {}
+    used = 2
+    for i, path in enumerate(paths):
+        key = "/".join((root_path,) + path)
+        node = view.get_node(path)
+        out = _stub(node, True) if node is not None else None
+        spent = len(json.dumps(key)) + 2 + _cost(out or {})
+        if used + spent > budget:
+            break
+        share = (budget - used) // (len(paths) - i)
+        nodes: Dict[RelPath, Dict[str, Any]] = {path: out} if out else {}
+        queue = collections.deque(nodes)
+        while queue and spent < share:
+            rel = queue.popleft()
+            current = nodes[rel]
+            if current.get("type") != "dir":
+                continue
+            spent += _expand(view, rel, current, nodes, True, share - spent)
+            for child in current.get("children", []):
+                if child.get("type") == "dir":
+                    queue.append(rel + (child["name"],))
+        delta[key] = out
+        used += spent
+    return _remember(memo_key, delta) if delta else None
@@ -0,0 +1,83 @@
+# python
+"""
+autopot/fs_glob.py
+Pathname expansion of glob words against a filesystem snapshot or session
+overlay, following bash defaults (no nullglob, dotfiles need a literal dot,
+and a pattern starting with a dot also matches `.` and `..`).
+"""
+import fnmatch
+from typing import Any, List, Optional, Sequence, Tuple
+
+from .fs_snapshot import BASE_FS_PATH_PARTS, has_glob_magic
+
+RelPath = Tuple[str, ...]
+
+
+def _unescape(component: str) -> str:
+    # shellwords brackets quoted magic characters as single-char classes
+    for ch in "*?[":
+        component = component.replace(f"[{ch}]", ch)
+    return component
+
+
+def expand_pattern(
+    fs: Any,
+    cwd: RelPath,
+    pattern: str,
+    base_parts: Sequence[str] = BASE_FS_PATH_PARTS,
+) -> Optional[List[str]]:
+    """
+    Expand one glob word relative to cwd (a snapshot-relative path).
+
+    Returns the sorted matches spelled the way the word was (relative words
+    give relative paths), or None when nothing matches or the pattern leaves
+    the scenario tree, in which case the shell keeps the word unchanged.
+    """
+    dir_only = pattern.endswith("/")
+    components = [c for c in pattern.split("/") if c]
+    if pattern.startswith("/"):
+        head = components[: len(base_parts)]
+        if any(has_glob_magic(c) for c in head) or tuple(head) != tuple(base_parts):
+            return None
+        components = components[len(base_parts) :]
+        start: List[Tuple[List[str], RelPath]] = [(list(base_parts), ())]
+        prefix = "/"
+    else:
+        start = [([], cwd)]
+        prefix = ""
+
+    candidates = start
+    for idx, comp in enumerate(components):
+        need_dir = dir_only or idx < len(components) - 1
+        nxt: List[Tuple[List[str], RelPath]] = []
+        for shown, rel in candidates:
+            if comp == ".":
+                nxt.append((shown + [comp], rel))
+            elif comp == "..":
+                if not rel:
+                    return None
+                nxt.append((shown + [comp], rel[:-1]))
+            elif not has_glob_magic(comp):
+                name = _unescape(comp)
+                node = fs.get_node(rel + (name,))
+                if node is not None and (not need_dir or node.get("type") == "dir"):
+                    nxt.append((shown + [name], rel + (name,)))
+            else:
+                if comp.startswith("."):
+                    # every directory lists . and .., which `.*` matches
+                    for special in (".", ".."):
+                        if not fnmatch.fnmatchcase(special, comp):
+                            continue
+                        if special == ".." and not rel and idx < len(components) - 1:
+                            continue
+                        parent = rel if special == "." else rel[:-1]
+                        nxt.append((shown + [special], parent))
+                for name, node in fs.match_children(rel, comp):
+                    if not need_dir or node.get("type") == "dir":
+                        nxt.append((shown + [name], rel + (name,)))
+        candidates = nxt
+        if not candidates:
+            return None
+    suffix = "/" if dir_only else ""
+    # sort before adding the suffix: `./` comes before `../`, as in bash
+    return [name + suffix for name in sorted(prefix + "/".join(shown) for shown, _ in candidates)]
@@ -0,0 +1,251 @@
+# python
+"""
+autopot/fs_ls.py
+GNU-style `ls` rendering over a filesystem snapshot or session overlay.
+Formatted directory listings are memoized per (filesystem fingerprint,
+directory, flags), so repeated listings of the shared scenario are a lookup.
+"""
+import collections
+import math
+from typing import Any, FrozenSet, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .fs_walk import BLOCK_SIZE, disk_usage, human_size, iter_ls_recursive
+
+DEFAULT_DIR_PERMS = "drwxr-xr-x"
+DEFAULT_FILE_PERMS = "-rw-r--r--"
+DEFAULT_OWNER = "user"
+DEFAULT_GROUP = "user"
+DEFAULT_UID = 1000
+DEFAULT_TIMESTAMP = "Jan 01 00:00"
+TERMINAL_WIDTH = 80
+
+# short options understood by the renderer; anything else is rejected like ls does
+LS_FLAGS = frozenset("1aACdFhlnprRStU")
+_LONG_FLAGS = {
+    "all": "a",
+    "almost-all": "A",
+    "directory": "d",
+    "classify": "F",
+    "human-readable": "h",
+    "numeric-uid-gid": "n",
+    "recursive": "R",
+    "reverse": "r",
+}
+_MEMO_SIZE = 1024
+
+RelPath = Tuple[str, ...]
+Node = Mapping[str, Any]
+
+_memo: "collections.OrderedDict[Tuple[str, RelPath, FrozenSet[str]], List[str]]" = (
+    collections.OrderedDict()
+)
+
+
+class LsUsageError(ValueError):
+    """
+    Invalid ls option; str(exc) is the message ls prints.
+    """
+
+
+def default_perms(node: Node) -> str:
+    return DEFAULT_DIR_PERMS if node.get("type") == "dir" else DEFAULT_FILE_PERMS
+
+
+def parse_ls_args(args: Sequence[str]) -> Tuple[FrozenSet[str], List[str]]:
+    """
+    Return (flags, operands); raises LsUsageError for unknown options.
+    """
+    flags = set()
+    operands: List[str] = []
+    only_operands = False
+    for arg in args:
+        if only_operands or arg == "-" or not arg.startswith("-"):
+            operands.append(arg)
+        elif arg == "--":
+            only_operands = True
+        elif arg.startswith("--"):
+            name = arg[2:]
+            if name not in _LONG_FLAGS:
+                raise LsUsageError(
+                    f"ls: unrecognized option '{arg}'\nTry 'ls --help' for more information."
+                )
+            flags.add(_LONG_FLAGS[name])
+        else:
+            for letter in arg[1:]:
+                if letter not in LS_FLAGS:
+                    raise LsUsageError(
+                        f"ls: invalid option -- '{letter}'\nTry 'ls --help' for more information."
+                    )
+                flags.add(letter)
+    # -n implies the long format
+    if "n" in flags:
+        flags.add("l")
+    return frozenset(flags), operands
+
+
+def _links(node: Node) -> int:
+    if node.get("type") != "dir":
+        return 1
+    return 2 + sum(1 for c in node.get("children") or () if c.get("type") == "dir")
+
+
+def _classify(node: Node, perms: str) -> str:
+    if node.get("type") == "dir":
+        return "/"
+    return "*" if "x" in perms[1:] else ""
+
+
+def _sort(entries: List[Tuple[str, Node]], flags: FrozenSet[str]) -> List[Tuple[str, Node]]:
+    if "U" not in flags:
+        entries = sorted(entries, key=lambda e: e[0])
+        if "S" in flags:
+            entries.sort(key=lambda e: e[1].get("size", 0) or 0, reverse=True)
+        # without mtimes in fs.json, -t keeps name order
+    if "r" in flags:
+        entries.reverse()
+    return entries
+
+
+def _columns(names: List[str], width: int = TERMINAL_WIDTH) -> List[str]:
+    """
+    Lay out names column-major like `ls -C`, two spaces between columns.
+    """
+    if not names:
+        return []
+    n = len(names)
+    for cols in range(min(n, max(1, width // 3)), 0, -1):
+        rows = math.ceil(n / cols)
+        cols = math.ceil(n / rows)
+        widths = [max(len(name) for name in names[c * rows : (c + 1) * rows]) for c in range(cols)]
+        if sum(widths) + 2 * (cols - 1) <= width or cols == 1:
+            break
+    lines = []
+    for r in range(rows):
+        cells = [
+            names[c * rows + r].ljust(widths[c]) for c in range(cols) if c * rows + r < n
+        ]
+        lines.append("  ".join(cells).rstrip())
+    return lines
+
+
+def format_entries(entries: Sequence[Tuple[str, Node]], flags: FrozenSet[str]) -> List[str]:
+    """
+    Render already sorted (name, node) pairs in the layout chosen by flags.
+    """
+    classify = "F" in flags or "p" in flags
+    perms_of = [e[1].get("perms") or default_perms(e[1]) for e in entries]
+
+    def shown(idx: int) -> str:
+        name, node = entries[idx]
+        if not classify:
+            return name
+        suffix = _classify(node, perms_of[idx])
+        return name + (suffix if "F" in flags or suffix == "/" else "")
+
+    if "l" not in flags:
+        names = [shown(i) for i in range(len(entries))]
+        return names if "1" in flags else _columns(names)
+
+    if "n" in flags:
+        owner = group = str(DEFAULT_UID)
+    else:
+        owner, group = DEFAULT_OWNER, DEFAULT_GROUP
+    rows = []
+    for idx, (name, node) in enumerate(entries):
+        size = node.get("size", 0) or 0
+        if node.get("type") == "dir" and "size" not in node:
+            size = BLOCK_SIZE
+        rows.append(
+            (
+                perms_of[idx],
+                str(_links(node)),
+                node.get("owner") or owner,
+                node.get("group") or group,
+                human_size(size) if "h" in flags else str(size),
+                node.get("mtime") or DEFAULT_TIMESTAMP,
+                shown(idx),
+            )
+        )
+    widths = [max(len(row[col]) for row in rows) for col in range(5)] if rows else [0] * 5
+    return [
+        f"{p} {l:>{widths[1]}} {o:<{widths[2]}} {g:<{widths[3]}} {s:>{widths[4]}} {t} {n}"
+        for p, l, o, g, s, t, n in rows
+    ]
+
+
+def _total(entries: Sequence[Tuple[str, Node]], flags: FrozenSet[str]) -> str:
+    used = sum(disk_usage(node) for _, node in entries)
+    return f"total {human_size(used) if 'h' in flags else used // 1024}"
+
+
+def directory_lines(fs: Any, rel: RelPath, flags: FrozenSet[str]) -> List[str]:
+    """
+    Formatted contents of one directory (with the `total` line in long
+    format), memoized per filesystem fingerprint.
+    """
+    key = (fs.fingerprint, rel, flags)
+    cached = _memo.get(key)
+    if cached is not None:
+        _memo.move_to_end(key)
+        return cached
+    node = fs.get_node(rel) or {"type": "dir"}
+    entries: List[Tuple[str, Node]] = []
+    for child in fs.list_dir(rel) or ():
+        name = child.get("name")
+        if not name or (name.startswith(".") and not flags & {"a", "A"}):
+            continue
+        entries.append((name, child))
+    if "a" in flags:
+        parent = fs.get_node(rel[:-1]) if rel else node
+        entries += [(".", node), ("..", parent or node)]
+    entries = _sort(entries, flags)
+    lines = format_entries(entries, flags)
+    if "l" in flags:
+        lines = [_total(entries, flags)] + lines
+    _memo[key] = lines
+    while len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+    return lines
+
+
+def iter_ls(
+    fs: Any, targets: Sequence[Tuple[str, Optional[RelPath]]], flags: FrozenSet[str]
+) -> Iterator[str]:
+    """
+    Render `ls` for resolved operands: errors first, then file operands as
+    one group, then each directory (with a `name:` header when there is more
+    than one operand or -R).
+    """
+    missing: List[str] = []
+    files: List[Tuple[str, Node]] = []
+    dirs: List[Tuple[str, RelPath]] = []
+    for display, rel in targets:
+        node = fs.get_node(rel) if rel is not None else None
+        if node is None:
+            missing.append(display)
+        elif node.get("type") == "dir" and "d" not in flags:
+            dirs.append((display, rel))
+        else:
+            files.append((display, node))
+    for display in missing:
+        yield f"ls: cannot access '{display}': No such file or directory"
+    if files:
+        yield from format_entries(_sort(files, flags), flags)
+    headers = "R" in flags or len(targets) > 1
+    if "U" not in flags:
+        dirs.sort(key=lambda d: d[0])
+    if "r" in flags:
+        dirs.reverse()
+    for idx, (display, rel) in enumerate(dirs):
+        if files or idx:
+            yield ""
+        if "R" in flags:
+
+            def render(path: RelPath, children: List[Node]) -> List[str]:
+                return directory_lines(fs, path, flags)
+
+            yield from iter_ls_recursive(fs, rel, display, render, show_hidden=bool(flags & {"a", "A"}))
+            continue
+        if headers:
+            yield f"{display}:"
+        yield from directory_lines(fs, rel, flags)
@@ -0,0 +1,245 @@
+# python
+"""
+autopot/fs_overlay.py
+Per-session copy-on-write view over a shared FileSystemSnapshot, so commands
+like mkdir/rm/chmod/touch change what later ls/cd/cat see in that session.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .fs_snapshot import FileSystemSnapshot, glob_accepts
+
+RelPath = Tuple[str, ...]
+
+_MISSING = object()
+# content_summary derived from file content written in the session
+_SUMMARY_CHARS = 200
+
+
+class FileSystemOverlay:
+    """
+    Read-through view of a snapshot plus this session's changes.
+
+    Only changed paths are stored: `_changes` maps a path to its new node, or
+    to None once it was removed. Directories created here are opaque, i.e.
+    they never show snapshot entries that used to live at the same path.
+    `_dirty` remembers, per directory, which children have changes somewhere
+    below them. An overlay without changes reads straight from the snapshot.
+
+    Exposes the read API of FileSystemSnapshot (get_node, list_dir, root,
+    fingerprint, serialized_size) so it can be used wherever one is expected.
+    """
+
+    def __init__(self, base: FileSystemSnapshot):
+        self.base = base
+        self._changes: Dict[RelPath, Optional[Dict[str, Any]]] = {}
+        self._opaque: Set[RelPath] = set()
+        self._dirty: Dict[RelPath, Dict[str, None]] = {}
+        self.version = 0
+        self._derived_version = -1
+        self._root: Optional[Dict[str, Any]] = None
+        self._fingerprint: Optional[str] = None
+        self._serialized_size: Optional[int] = None
+
+    @property
+    def changed(self) -> bool:
+        return bool(self._changes)
+
+    @property
+    def changed_paths(self) -> Tuple[RelPath, ...]:
+        """
+        Paths written or removed in this session.
+        """
+        return tuple(self._changes)
+
+    # -- reads --------------------------------------------------------------
+
+    def _lookup(self, rel: RelPath) -> Optional[Dict[str, Any]]:
+        opaque = False
+        for depth in range(len(rel) + 1):
+            prefix = rel[:depth]
+            node = self._changes.get(prefix, _MISSING)
+            if node is _MISSING:
+                if opaque:
+                    return None
+                continue
+            if node is None:
+                return None
+            if depth == len(rel):
+                return node
+            if node.get("type") != "dir":
+                return None
+            if prefix in self._opaque:
+                opaque = True
+        return self.base.get_node(rel)
+
+    def _children(self, rel: RelPath) -> List[Dict[str, Any]]:
+        entries: Dict[str, Dict[str, Any]] = {}
+        if rel not in self._opaque:
+            for child in self.base.list_dir(rel) or []:
+                name = child.get("name")
+                if name:
+                    entries[name] = child
+        for name in self._dirty.get(rel, ()):
+            node = self.get_node(rel + (name,))
+            if node is None:
+                entries.pop(name, None)
+            else:
+                entries[name] = node
+        return list(entries.values())
+
+    def get_node(self, rel_path: RelPath) -> Optional[Dict[str, Any]]:
+        if not self._changes:
+            return self.base.get_node(rel_path)
+        node = self._lookup(rel_path)
+        if (
+            node is not None
+            and node.get("type") == "dir"
+            and (rel_path in self._dirty or rel_path in self._changes)
+        ):
+            node = dict(node)
+            node["children"] = self._children(rel_path)
+        return node
+
+    def list_dir(self, rel_path: RelPath) -> Optional[List[Dict[str, Any]]]:
+        if not self._changes:
+            return self.base.list_dir(rel_path)
+        node = self.get_node(rel_path)
+        if not node or node.get("type") != "dir":
+            return None
+        return list(node.get("children", []))
+
+    def match_children(self, rel_path: RelPath, pattern: str) -> List[Tuple[str, Dict[str, Any]]]:
+        if not self._changes:
+            return self.base.match_children(rel_path, pattern)
+        matches = {
+            child["name"]: child
+            for child in self.list_dir(rel_path) or ()
+            if child.get("name") and glob_accepts(child["name"], pattern)
+        }
+        return sorted(matches.items())
+
+    def _refresh_derived(self) -> None:
+        if self._derived_version != self.version:
+            self._root = None
+            self._fingerprint = None
+            self._serialized_size = None
+            self._derived_version = self.version
+
+    def _materialize(self, rel: RelPath) -> Dict[str, Any]:
+        node = self.get_node(rel) or {"type": "dir", "name": "", "children": []}
+        out = {k: v for k, v in node.items() if k not in ("children", "content")}
+        if "content" in node and not out.get("content_summary"):
+            out["content_summary"] = node["content"][:_SUMMARY_CHARS]
+        if node.get("type") == "dir":
+            dirty = self._dirty.get(rel, {})
+            out["children"] = [
+                self._materialize(rel + (child["name"],)) if child.get("name") in dirty else child
+                for child in node.get("children", [])
+            ]
+        return out
+
+    @property
+    def root(self) -> Dict[str, Any]:
+        """
+        The tree as this session sees it. Untouched subtrees are the
+        snapshot's own dicts; only the changed spine is rebuilt.
+        """
+        if not self._changes:
+            return self.base.root
+        self._refresh_derived()
+        if self._root is None:
+            self._root = self._materialize(())
+        return self._root
+
+    @property
+    def fingerprint(self) -> str:
+        if not self._changes:
+            return self.base.fingerprint
+        self._refresh_derived()
+        if self._fingerprint is None:
+            changes = [[list(rel), node] for rel, node in sorted(self._changes.items())]
+            material = json.dumps(
+                [self.base.fingerprint, changes, sorted(self._opaque)],
+                sort_keys=True,
+                separators=(",", ":"),
+            )
+            self._fingerprint = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        return self._fingerprint
+
+    @property
+    def serialized_size(self) -> int:
+        if not self._changes:
+            return self.base.serialized_size
+        self._refresh_derived()
+        if self._serialized_size is None:
+            self._serialized_size = len(json.dumps(self.root))
+        return self._serialized_size
+
+    # -- writes -------------------------------------------------------------
+
+    def _set(self, rel: RelPath, node: Optional[Dict[str, Any]]) -> None:
+        self._changes[rel] = node
+        for depth in range(len(rel)):
+            self._dirty.setdefault(rel[:depth], {})[rel[depth]] = None
+        self.version += 1
+
+    def _prune(self, rel: RelPath) -> None:
+        """
+        Forget every change strictly below rel.
+        """
+        n = len(rel)
+        for table in (self._changes, self._dirty):
+            for key in [k for k in table if len(k) > n and k[:n] == rel]:
+                del table[key]
+        self._opaque = {k for k in self._opaque if not (len(k) > n and k[:n] == rel)}
+        self._dirty.pop(rel, None)
+
+    def mkdir(self, rel: RelPath, **fields: Any) -> Dict[str, Any]:
+        node: Dict[str, Any] = {"type": "dir", "name": rel[-1], "children": []}
+        node.update(fields)
+        self._prune(rel)
+        self._opaque.add(rel)
+        self._set(rel, node)
+        return node
+
+    def write_file(
+        self, rel: RelPath, content: Optional[str] = "", append: bool = False, **fields: Any
+    ) -> Dict[str, Any]:
+        """
+        Create or overwrite a regular file, keeping the metadata (e.g. perms)
+        of a file being overwritten. content=None records a file whose bytes
+        are unknown (e.g. a simulated download); pass its size in fields.
+        """
+        current = self.get_node(rel)
+        node: Dict[str, Any] = {"type": "file", "name": rel[-1]}
+        if current is not None and current.get("type") == "file":
+            node.update({k: v for k, v in current.items() if k not in ("content", "content_summary")})
+            if append and content is not None:
+                content = current.get("content", "") + content
+        if content is not None:
+            node["content"] = content
+            node["size"] = len(content.encode("utf-8"))
+        node.update(fields)
+        self._set(rel, node)
+        return node
+
+    def update(self, rel: RelPath, **fields: Any) -> Optional[Dict[str, Any]]:
+        """
+        Change metadata (size, perms, ...) of an existing node.
+        """
+        current = self._lookup(rel)
+        if current is None:
+            return None
+        node = {k: v for k, v in current.items() if k != "children"}
+        node.update(fields)
+        if node.get("type") == "dir":
+            node.setdefault("children", [])
+        self._set(rel, node)
+        return node
+
+    def remove(self, rel: RelPath) -> None:
+        self._prune(rel)
+        self._opaque.discard(rel)
+        self._set(rel, None)
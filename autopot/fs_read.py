@@ -0,0 +1,277 @@
+# python
+"""
+autopot/fs_read.py
+File-reading commands (cat, head, tail, wc) rendered from file contents, so
+they agree byte for byte with what `cat` shows for the same file. Contents
+arrive as chunks and are consumed incrementally: head stops early, tail
+and wc keep only what they report.
+"""
+import collections
+import itertools
+import re
+from typing import Deque, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_COUNT = 10
+_WC_FLAGS = {"l": "lines", "w": "words", "m": "chars", "c": "bytes"}
+_WC_LONG = {"lines": "l", "words": "w", "chars": "m", "bytes": "c"}
+# wc prints its counts in this order whatever order the flags came in
+_WC_ORDER = "lwmc"
+
+
+class UnsupportedOption(ValueError):
+    """
+    Raised for options the native renderers do not implement (tail -f, ...);
+    the command should be simulated instead.
+    """
+
+
+class ReadSpec(NamedTuple):
+    """
+    Parsed head/tail arguments. count < 0 with head means "all but the last
+    |count|"; from_start with tail means "starting at item count".
+    """
+
+    count: int
+    use_bytes: bool
+    from_start: bool
+    headers: Optional[bool]
+    operands: List[str]
+
+
+def _count(value: str, allow_plus: bool) -> Tuple[int, bool]:
+    m = re.fullmatch(r"([+-]?)(\d+)", value)
+    if not m or (m.group(1) == "+" and not allow_plus):
+        raise UnsupportedOption(f"invalid count {value!r}")
+    return (-int(m.group(2)) if m.group(1) == "-" else int(m.group(2))), m.group(1) == "+"
+
+
+def parse_head_tail(cmd: str, args: Sequence[str]) -> ReadSpec:
+    """
+    Parse head/tail arguments: -n N, -c N (attached or not), --lines=N,
+    --bytes=N, the obsolete -N form, -q and -v.
+    """
+    is_tail = cmd == "tail"
+    count, use_bytes, from_start = DEFAULT_COUNT, False, False
+    headers: Optional[bool] = None
+    operands: List[str] = []
+    only_operands = False
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if only_operands or arg == "-" or not arg.startswith("-"):
+            operands.append(arg)
+            continue
+        if arg == "--":
+            only_operands = True
+            continue
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            if name in ("lines", "bytes") and value:
+                count, from_start = _count(value, is_tail)
+                use_bytes = name == "bytes"
+            elif name in ("quiet", "silent"):
+                headers = False
+            elif name == "verbose":
+                headers = True
+            else:
+                raise UnsupportedOption(arg)
+            continue
+        if arg[1:].isdigit():
+            count, use_bytes, from_start = int(arg[1:]), False, False
+            continue
+        letters = arg[1:]
+        while letters:
+            letter, letters = letters[0], letters[1:]
+            if letter in ("n", "c"):
+                value = letters
+                if not value:
+                    if i >= len(args):
+                        raise UnsupportedOption(f"option requires an argument -- '{letter}'")
+                    value = args[i]
+                    i += 1
+                count, from_start = _count(value, is_tail)
+                use_bytes = letter == "c"
+                letters = ""
+            elif letter == "q":
+                headers = False
+            elif letter == "v":
+                headers = True
+            else:
+                raise UnsupportedOption(f"-{letter}")
+    if is_tail and count < 0:
+        count = -count
+    return ReadSpec(count, use_bytes, from_start, headers, operands)
+
+
+def iter_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Lines (with their newline) of content given as chunks.
+    """
+    pending = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parts = (pending + chunk).split("\n")
+        pending = parts.pop()
+        for part in parts:
+            yield part + "\n"
+    if pending:
+        yield pending
+
+
+def _iter_bytes(chunks: Iterable[str]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield chunk.encode("utf-8")
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="ignore")
+
+
+def read_all(chunks: Iterable[str], limit: Optional[int] = None) -> str:
+    """
+    The content, or (when limit is given) its first chunks up to a little
+    more than limit characters.
+    """
+    out: List[str] = []
+    size = 0
+    for chunk in chunks:
+        out.append(chunk)
+        size += len(chunk)
+        if limit is not None and size > limit:
+            break
+    return "".join(out)
+
+
+def read_head(chunks: Iterable[str], spec: ReadSpec, limit: Optional[int] = None) -> str:
+    if spec.use_bytes:
+        if spec.count >= 0:
+            taken = bytearray()
+            for data in _iter_bytes(chunks):
+                taken += data[: spec.count - len(taken)]
+                if len(taken) >= spec.count:
+                    break
+            return _decode(bytes(taken))
+        # everything but the last |count| bytes: hold them back until the end
+        held = bytearray()
+        out = bytearray()
+        for data in _iter_bytes(chunks):
+            held += data
+            if len(held) > -spec.count:
+                cut = len(held) + spec.count
+                out += held[:cut]
+                del held[:cut]
+            if limit is not None and len(out) > limit:
+                break
+        return _decode(bytes(out))
+    if spec.count >= 0:
+        return "".join(itertools.islice(iter_lines(chunks), spec.count))
+    held_lines: Deque[str] = collections.deque()
+    lines: List[str] = []
+    size = 0
+    for line in iter_lines(chunks):
+        held_lines.append(line)
+        if len(held_lines) > -spec.count:
+            lines.append(held_lines.popleft())
+            size += len(lines[-1])
+            if limit is not None and size > limit:
+                break
+    return "".join(lines)
+
+
+def read_tail(chunks: Iterable[str], spec: ReadSpec, limit: Optional[int] = None) -> str:
+    if spec.use_bytes:
+        if spec.from_start:
+            skip = max(0, spec.count - 1)
+            out = bytearray()
+            for data in _iter_bytes(chunks):
+                if skip:
+                    dropped = min(skip, len(data))
+                    data, skip = data[dropped:], skip - dropped
+                out += data
+                if limit is not None and len(out) > limit:
+                    break
+            return _decode(bytes(out))
+        last = bytearray()
+        for data in _iter_bytes(chunks):
+            last += data
+            if len(last) > spec.count:
+                del last[: len(last) - spec.count]
+        return _decode(bytes(last))
+    if spec.from_start:
+        lines = itertools.islice(iter_lines(chunks), max(0, spec.count - 1), None)
+        return read_all(lines, limit)
+    if not spec.count:
+        return ""
+    return "".join(collections.deque(iter_lines(chunks), maxlen=spec.count))
+
+
+def parse_wc_args(args: Sequence[str]) -> Tuple[str, List[str]]:
+    """
+    Return (counts, operands) where counts is a subset of "lwmc" in output
+    order; raises UnsupportedOption for anything else (-L, --files0-from).
+    """
+    chosen = set()
+    operands: List[str] = []
+    only_operands = False
+    for arg in args:
+        if only_operands or arg == "-" or not arg.startswith("-"):
+            operands.append(arg)
+        elif arg == "--":
+            only_operands = True
+        elif arg.startswith("--"):
+            if arg[2:] not in _WC_LONG:
+                raise UnsupportedOption(arg)
+            chosen.add(_WC_LONG[arg[2:]])
+        else:
+            for letter in arg[1:]:
+                if letter not in _WC_FLAGS:
+                    raise UnsupportedOption(f"-{letter}")
+                chosen.add(letter)
+    counts = "".join(c for c in _WC_ORDER if c in chosen) or "lwc"
+    return counts, operands
+
+
+def wc_counts(chunks: Iterable[str], counts: str) -> Tuple[List[int], int]:
+    """
+    (values in `counts` order, size in bytes) for content given as chunks.
+    """
+    lines = words = chars = nbytes = 0
+    in_word = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        lines += chunk.count("\n")
+        words += len(chunk.split())
+        # a word split across two chunks was counted twice
+        if in_word and not chunk[0].isspace():
+            words -= 1
+        in_word = not chunk[-1].isspace()
+        chars += len(chunk)
+        nbytes += _byte_len(chunk)
+    values = {"l": lines, "w": words, "m": chars, "c": nbytes}
+    return [values[c] for c in counts], nbytes
+
+
+def _byte_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def format_wc(rows: Sequence[Tuple[List[int], int, str]], counts: str) -> List[str]:
+    """
+    Render wc rows (values, size in bytes, name) plus a total line for
+    several files. Like GNU wc, columns are as wide as the combined size of
+    the files, except that a single count of a single file is unpadded.
+    """
+    if not rows:
+        return []
+    if len(rows) == 1 and len(counts) == 1:
+        width = 1
+    else:
+        width = len(str(sum(size for _, size, _ in rows)))
+    lines = [" ".join(f"{v:>{width}}" for v in values) + f" {name}" for values, _, name in rows]
+    if len(rows) > 1:
+        totals = [sum(values[i] for values, _, _ in rows) for i in range(len(counts))]
+        lines.append(" ".join(f"{v:>{width}}" for v in totals) + " total")
+    return lines
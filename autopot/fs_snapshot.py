@@ -1,36 +1,223 @@
 """Filesystem snapshot helpers for scenarios/fs.json."""
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Tuple
+import array
+import bisect
+import fnmatch
+import hashlib
+import json
+import operator
+import pathlib
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 BASE_FS_PATH_PARTS: Tuple[str, ...] = ("home", "user")
 ROOT_FS_PATH = "/" + "/".join(BASE_FS_PATH_PARTS)
 
 
+_name_of = operator.itemgetter("name")
+_GLOB_MAGIC = "*?["
+# sorts after every name that starts with a given prefix
+_PREFIX_END = "\U0010ffff"
+
+
+def has_glob_magic(pattern: str) -> bool:
+    return any(ch in pattern for ch in _GLOB_MAGIC)
+
+
+def glob_prefix(pattern: str) -> str:
+    """
+    Literal leading part of an fnmatch pattern.
+    """
+    for i, ch in enumerate(pattern):
+        if ch in _GLOB_MAGIC:
+            return pattern[:i]
+    return pattern
+
+
+def glob_accepts(name: str, pattern: str) -> bool:
+    """
+    fnmatch with the shell's hidden-file rule: a leading dot must be matched
+    by a literal dot in the pattern.
+    """
+    if name.startswith(".") and not pattern.startswith("."):
+        return False
+    return fnmatch.fnmatchcase(name, pattern)
+
+
 class FileSystemSnapshot:
     """
     In-memory representation of a scenario fs.json tree and fast lookups.
+
+    Nodes are numbered breadth-first with each directory's named children
+    stored as one contiguous id range, sorted by name, so the index is a few
+    parallel arrays (interned names, first child id, child count, node) rather
+    than a dict of per-path node copies. Path lookups bisect each level's
+    range. get_node returns the node from the parsed tree itself, which is
+    shared and must be treated as read-only.
     """
 
     def __init__(self, root: Mapping[str, Any]):
         self.root: Mapping[str, Any] = dict(root)
-        self._index: Dict[Tuple[str, ...], Dict[str, Any]] = {}
-        self._build_index(self.root, ())
-
-    def _build_index(self, node: Mapping[str, Any], rel_path: Tuple[str, ...]) -> None:
-        self._index[rel_path] = dict(node)
-        if node.get("type") == "dir":
-            for child in node.get("children", []):
-                name = child.get("name")
-                if not name:
-                    continue
-                self._build_index(child, rel_path + (name,))
-
-    def get_node(self, rel_path: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
-        return self._index.get(rel_path)
-
-    def list_dir(self, rel_path: Tuple[str, ...]) -> Optional[Iterable[Dict[str, Any]]]:
+        self._names: List[str] = []
+        self._first_child = array.array("q")
+        self._child_count = array.array("q")
+        self._nodes: List[Mapping[str, Any]] = []
+        self._fingerprint: Optional[str] = None
+        self._serialized_size: Optional[int] = None
+        self._build_index(self.root)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Stable hash of the tree contents, computed once per snapshot.
+        """
+        if self._fingerprint is None:
+            canonical = json.dumps(self.root, sort_keys=True, separators=(",", ":"))
+            self._fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return self._fingerprint
+
+    @property
+    def serialized_size(self) -> int:
+        """
+        Length of json.dumps(root), i.e. what the whole tree costs in a prompt.
+        """
+        if self._serialized_size is None:
+            self._serialized_size = len(json.dumps(self.root))
+        return self._serialized_size
+
+    def _build_index(self, root: Mapping[str, Any]) -> None:
+        names, nodes = self._names, self._nodes
+        first, count = self._first_child, self._child_count
+        intern = sys.intern
+        names.append(intern(root.get("name") or ""))
+        nodes.append(root)
+        i = 0
+        while i < len(nodes):
+            node = nodes[i]
+            children = node.get("children") if node.get("type") == "dir" else None
+            if not children:
+                first.append(0)
+                count.append(0)
+                i += 1
+                continue
+            named = [c for c in children if c.get("name")]
+            # stable sort: of duplicate names the last one wins, as bisect_right finds it
+            named.sort(key=_name_of)
+            first.append(len(nodes))
+            count.append(len(named))
+            names.extend([intern(c["name"]) for c in named])
+            nodes.extend(named)
+            i += 1
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _node_id(self, rel_path: Sequence[str]) -> Optional[int]:
+        names, first, count = self._names, self._first_child, self._child_count
+        node_id = 0
+        for name in rel_path:
+            lo = first[node_id]
+            hi = lo + count[node_id]
+            j = bisect.bisect_right(names, name, lo, hi) - 1
+            if j < lo or names[j] != name:
+                return None
+            node_id = j
+        return node_id
+
+    def _child_range(self, rel_path: Sequence[str], prefix: str = "") -> Tuple[int, int]:
+        node_id = self._node_id(rel_path)
+        if node_id is None:
+            return 0, 0
+        lo = self._first_child[node_id]
+        hi = lo + self._child_count[node_id]
+        if prefix:
+            lo = bisect.bisect_left(self._names, prefix, lo, hi)
+            hi = bisect.bisect_left(self._names, prefix + _PREFIX_END, lo, hi)
+        return lo, hi
+
+    def match_children(
+        self, rel_path: Tuple[str, ...], pattern: str
+    ) -> List[Tuple[str, Mapping[str, Any]]]:
+        """
+        (name, node) for the children of rel_path matching a glob pattern,
+        sorted by name. Only the id range sharing the pattern's literal prefix
+        is scanned.
+        """
+        lo, hi = self._child_range(rel_path, glob_prefix(pattern))
+        names, nodes = self._names, self._nodes
+        out: List[Tuple[str, Mapping[str, Any]]] = []
+        for j in range(lo, hi):
+            name = names[j]
+            if j + 1 < hi and names[j + 1] == name:
+                continue  # duplicate name: the last one is the visible node
+            if glob_accepts(name, pattern):
+                out.append((name, nodes[j]))
+        return out
+
+    def get_node(self, rel_path: Tuple[str, ...]) -> Optional[Mapping[str, Any]]:
+        node_id = self._node_id(rel_path)
+        return None if node_id is None else self._nodes[node_id]
+
+    def list_dir(self, rel_path: Tuple[str, ...]) -> Optional[Iterable[Mapping[str, Any]]]:
         node = self.get_node(rel_path)
         if not node or node.get("type") != "dir":
             return None
         return list(node.get("children", []))
+
+
+class SnapshotRegistry:
+    """
+    Process-wide cache of parsed fs.json snapshots, one entry per file.
+
+    A file is parsed and indexed once and re-read only when its mtime or size
+    changes, so every session on a scenario shares the same snapshot object.
+    Shared snapshots must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Tuple[int, int], FileSystemSnapshot]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, path: pathlib.Path) -> Optional[FileSystemSnapshot]:
+        """
+        Return the snapshot for `path`, or None if it does not exist. JSON and
+        IO errors propagate to the caller.
+        """
+        path = pathlib.Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key = str(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+            snapshot = FileSystemSnapshot(json.loads(path.read_text(encoding="utf-8")))
+            # a touched but unchanged file keeps the snapshot sessions already hold
+            if entry is not None and entry[1].fingerprint == snapshot.fingerprint:
+                snapshot = entry[1]
+            self._entries[key] = (stamp, snapshot)
+            self.loads += 1
+            return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_registry = SnapshotRegistry()
+
+
+def load_snapshot(path: pathlib.Path) -> Optional[FileSystemSnapshot]:
+    """
+    Shared snapshot for an fs.json path from the process-wide registry.
+    """
+    return _registry.get(path)
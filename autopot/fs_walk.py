@@ -0,0 +1,289 @@
+# python
+"""
+autopot/fs_walk.py
+Traversal commands (find, tree, du, ls -R) rendered natively from a
+filesystem snapshot or session overlay. Every renderer is a generator of
+output lines so callers can stop once they have enough output.
+"""
+import fnmatch
+import math
+import re
+from typing import Any, Callable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+RelPath = Tuple[str, ...]
+Node = Mapping[str, Any]
+
+BLOCK_SIZE = 4096
+# find -size unit suffixes; no suffix means 512-byte blocks
+_SIZE_UNITS = {"c": 1, "w": 2, "b": 512, "k": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+class UnsupportedExpression(ValueError):
+    """
+    Raised for find expressions the native engine does not implement; the
+    command should be simulated instead.
+    """
+
+
+def join_display(display: str, name: str) -> str:
+    return display + name if display.endswith("/") else f"{display}/{name}"
+
+
+def _is_dir(node: Node) -> bool:
+    return node.get("type") == "dir"
+
+
+def walk(
+    fs: Any, rel: RelPath, node: Node, max_depth: Optional[int] = None, depth: int = 0
+) -> Iterator[Tuple[RelPath, Node, int]]:
+    """
+    Pre-order walk yielding (path, node, depth) in directory order.
+    """
+    yield rel, node, depth
+    if not _is_dir(node) or (max_depth is not None and depth >= max_depth):
+        return
+    for child in fs.list_dir(rel) or ():
+        name = child.get("name")
+        if name:
+            yield from walk(fs, rel + (name,), child, max_depth, depth + 1)
+
+
+def _sorted_children(fs: Any, rel: RelPath, show_hidden: bool) -> List[Node]:
+    children = [
+        c for c in fs.list_dir(rel) or () if c.get("name") and (show_hidden or not c["name"].startswith("."))
+    ]
+    return sorted(children, key=lambda c: c["name"])
+
+
+# -- find -------------------------------------------------------------------
+
+
+def _size_test(spec: str) -> Callable[[Node], bool]:
+    m = re.fullmatch(r"([+-]?)(\d+)([cwbkMG]?)", spec)
+    if not m:
+        raise UnsupportedExpression(f"invalid -size {spec!r}")
+    sign, amount, unit = m.group(1), int(m.group(2)), _SIZE_UNITS[m.group(3) or "b"]
+
+    def test(node: Node) -> bool:
+        # like find, sizes are rounded up to whole units before comparing
+        used = math.ceil((node.get("size", 0) or 0) / unit)
+        if sign == "+":
+            return used > amount
+        if sign == "-":
+            return used < amount
+        return used == amount
+
+    return test
+
+
+def parse_find(args: Sequence[str]) -> Tuple[List[str], List[Callable[[Node, str], bool]], Optional[int], int]:
+    """
+    Split find arguments into (start paths, tests, maxdepth, mindepth).
+    Supports -name, -iname, -type f|d, -size, -maxdepth, -mindepth and -print;
+    anything else raises UnsupportedExpression.
+    """
+    starts: List[str] = []
+    i = 0
+    while i < len(args) and not args[i].startswith("-") and args[i] not in ("!", "(", ")"):
+        starts.append(args[i])
+        i += 1
+    tests: List[Callable[[Node, str], bool]] = []
+    max_depth: Optional[int] = None
+    min_depth = 0
+    while i < len(args):
+        opt = args[i]
+        if opt == "-print":
+            i += 1
+            continue
+        if i + 1 >= len(args):
+            raise UnsupportedExpression(f"missing argument to {opt}")
+        value = args[i + 1]
+        if opt == "-name":
+            tests.append(lambda node, name, p=value: fnmatch.fnmatchcase(name, p))
+        elif opt == "-iname":
+            tests.append(lambda node, name, p=value.lower(): fnmatch.fnmatchcase(name.lower(), p))
+        elif opt == "-type":
+            if value not in ("f", "d"):
+                raise UnsupportedExpression(f"unsupported -type {value!r}")
+            kind = "dir" if value == "d" else "file"
+            tests.append(lambda node, name, k=kind: node.get("type") == k)
+        elif opt == "-size":
+            size_ok = _size_test(value)
+            tests.append(lambda node, name, t=size_ok: not _is_dir(node) and t(node))
+        elif opt in ("-maxdepth", "-mindepth"):
+            if not value.isdigit():
+                raise UnsupportedExpression(f"invalid {opt} {value!r}")
+            if opt == "-maxdepth":
+                max_depth = int(value)
+            else:
+                min_depth = int(value)
+        else:
+            raise UnsupportedExpression(f"unsupported find predicate {opt!r}")
+        i += 2
+    return starts or ["."], tests, max_depth, min_depth
+
+
+def iter_find(
+    fs: Any,
+    rel: RelPath,
+    display: str,
+    tests: Sequence[Callable[[Node, str], bool]] = (),
+    max_depth: Optional[int] = None,
+    min_depth: int = 0,
+) -> Iterator[str]:
+    node = fs.get_node(rel)
+    if node is None:
+        yield f"find: '{display}': No such file or directory"
+        return
+    prefix = len(rel)
+    for path, entry, depth in walk(fs, rel, node, max_depth):
+        if depth < min_depth:
+            continue
+        name = path[-1] if depth else display.rstrip("/").rsplit("/", 1)[-1] or display
+        if all(test(entry, name) for test in tests):
+            yield display if not depth else join_display(display, "/".join(path[prefix:]))
+
+
+# -- tree -------------------------------------------------------------------
+
+
+def iter_tree(
+    fs: Any,
+    rel: RelPath,
+    display: str,
+    show_hidden: bool = False,
+    dirs_only: bool = False,
+    max_level: Optional[int] = None,
+) -> Iterator[str]:
+    node = fs.get_node(rel)
+    if node is None or not _is_dir(node):
+        suffix = "[error opening dir]" if node is None else ""
+        yield f"{display} {suffix}".rstrip()
+        yield ""
+        yield "0 directories" if dirs_only else "0 directories, 0 files"
+        return
+    counts = [0, 0]
+    yield display
+
+    def branch(path: RelPath, indent: str, level: int) -> Iterator[str]:
+        children = _sorted_children(fs, path, show_hidden)
+        if dirs_only:
+            children = [c for c in children if _is_dir(c)]
+        for idx, child in enumerate(children):
+            last = idx == len(children) - 1
+            yield f"{indent}{'└── ' if last else '├── '}{child['name']}"
+            if _is_dir(child):
+                counts[0] += 1
+                if max_level is None or level < max_level:
+                    yield from branch(path + (child["name"],), indent + ("    " if last else "│   "), level + 1)
+            else:
+                counts[1] += 1
+
+    yield from branch(rel, "", 1)
+    yield ""
+    dirs = f"{counts[0]} director{'y' if counts[0] == 1 else 'ies'}"
+    files = f"{counts[1]} file{'' if counts[1] == 1 else 's'}"
+    yield dirs if dirs_only else f"{dirs}, {files}"
+
+
+# -- du ---------------------------------------------------------------------
+
+
+def disk_usage(node: Node) -> int:
+    """
+    Bytes allocated for one node: whole blocks, one block per directory.
+    """
+    if _is_dir(node):
+        return BLOCK_SIZE
+    size = node.get("size", 0) or 0
+    return math.ceil(size / BLOCK_SIZE) * BLOCK_SIZE
+
+
+def human_size(nbytes: int) -> str:
+    """
+    du -h style: powers of 1024, rounded up, one decimal below 10.
+    """
+    value = float(nbytes)
+    for unit in ("", "K", "M", "G", "T"):
+        if value < 1024 or unit == "T":
+            break
+        value /= 1024
+    if not unit:
+        return str(int(value))
+    if value < 10:
+        tenths = math.ceil(value * 10) / 10
+        if tenths < 10:
+            return f"{tenths:.1f}{unit}"
+    return f"{math.ceil(value)}{unit}"
+
+
+def iter_du(
+    fs: Any,
+    rel: RelPath,
+    display: str,
+    summarize: bool = False,
+    human: bool = False,
+    all_files: bool = False,
+    max_depth: Optional[int] = None,
+) -> Iterator[str]:
+    node = fs.get_node(rel)
+    if node is None:
+        yield f"du: cannot access '{display}': No such file or directory"
+        return
+
+    def fmt(nbytes: int) -> str:
+        return human_size(nbytes) if human else str(math.ceil(nbytes / 1024))
+
+    def visit(path: RelPath, entry: Node, shown: str, depth: int) -> Iterator[Tuple[int, str]]:
+        # yields (total, line) pairs; the last one is this entry's own total
+        total = disk_usage(entry)
+        if _is_dir(entry):
+            for child in fs.list_dir(path) or ():
+                name = child.get("name")
+                if not name:
+                    continue
+                child_total = 0
+                for child_total, line in visit(path + (name,), child, join_display(shown, name), depth + 1):
+                    if line:
+                        yield 0, line
+                total += child_total
+        visible = not summarize and (max_depth is None or depth <= max_depth)
+        if depth and visible and (all_files or _is_dir(entry)):
+            yield total, f"{fmt(total)}\t{shown}"
+        else:
+            yield total, ""
+
+    total = 0
+    for total, line in visit(rel, node, display, 0):
+        if line:
+            yield line
+    yield f"{fmt(total)}\t{display}"
+
+
+# -- ls -R ------------------------------------------------------------------
+
+
+def iter_ls_recursive(
+    fs: Any,
+    rel: RelPath,
+    display: str,
+    render: Callable[[RelPath, List[Node]], List[str]],
+    show_hidden: bool = False,
+) -> Iterator[str]:
+    """
+    `ls -R`: a "path:" header and the rendered listing per directory,
+    breadth of each directory before its subdirectories like GNU ls.
+    """
+    first = True
+    stack: List[Tuple[RelPath, str]] = [(rel, display)]
+    while stack:
+        path, shown = stack.pop()
+        children = _sorted_children(fs, path, show_hidden)
+        if not first:
+            yield ""
+        first = False
+        yield f"{shown}:"
+        yield from render(path, children)
+        subdirs = [c for c in children if _is_dir(c) and c["name"] not in (".", "..")]
+        for child in reversed(subdirs):
+            stack.append((path + (child["name"],), join_display(shown, child["name"])))
@@ -0,0 +1,149 @@
+# python
+"""
+autopot/handlers/__init__.py
+Registry of command handlers: coroutines `run(session, argv) -> str` that
+answer a command natively. Handler modules in this package (and entry points
+in the `autopot.handlers` group) are discovered once, and their command
+names and aliases map straight to the handler in a dict.
+
+A handler module defines `run` and optionally `COMMANDS`, the names it
+answers to (default: the module name; empty to ship it unregistered).
+"""
+import importlib
+import importlib.metadata
+import logging
+import pkgutil
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+HandlerFn = Callable[[Any, List[str]], Awaitable[str]]
+ENTRY_POINT_GROUP = "autopot.handlers"
+
+
+class Handler:
+    """
+    A registered handler and its call statistics.
+    """
+
+    __slots__ = ("name", "run", "commands", "calls", "errors", "total_ms", "max_ms")
+
+    def __init__(self, name: str, run: HandlerFn, commands: Iterable[str]):
+        self.name = name
+        self.run = run
+        self.commands = tuple(commands)
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+
+class HandlerRegistry:
+    """
+    Map command names to handlers. A scenario can remap or disable commands
+    with a `handlers` table in its config.json, e.g.
+    `{"handlers": {"whoami": null, "me": "whoami"}}`: a command mapped to
+    null is left to txtcmds and the LLM, any other value names a handler.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Handler] = {}
+        self._commands: Dict[str, Handler] = {}
+        self._lock = threading.Lock()
+        self.discovered = False
+
+    def register(
+        self, name: str, run: HandlerFn, commands: Optional[Iterable[str]] = None
+    ) -> Handler:
+        """
+        Register run under name for commands (default: just name); a later
+        registration of a command replaces the earlier one.
+        """
+        handler = Handler(name, run, (name,) if commands is None else commands)
+        self._handlers[name] = handler
+        for command in handler.commands:
+            self._commands[command] = handler
+        return handler
+
+    def _register_module(self, name: str, module: Any) -> None:
+        run = getattr(module, "run", None)
+        if run is None:
+            logger.warning("Handler module %s has no run()", name)
+            return
+        self.register(name, run, getattr(module, "COMMANDS", (name,)))
+
+    def discover(self, entry_points: bool = True) -> None:
+        """
+        Import every module of this package, then entry points in the
+        autopot.handlers group (whose names are the commands they answer,
+        so installed plugins override built-ins). Import errors are logged.
+        """
+        with self._lock:
+            if self.discovered:
+                return
+            for info in pkgutil.iter_modules(__path__):
+                try:
+                    module = importlib.import_module(f"{__name__}.{info.name}")
+                except Exception:
+                    logger.exception("Failed to import handler module %s", info.name)
+                    continue
+                self._register_module(info.name, module)
+            if entry_points:
+                for ep in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP):
+                    try:
+                        target = ep.load()
+                    except Exception:
+                        logger.exception("Failed to load handler entry point %s", ep.name)
+                        continue
+                    if callable(target):
+                        self.register(ep.name, target)
+                    else:
+                        self._register_module(ep.name, target)
+            self.discovered = True
+
+    def resolve(
+        self, command: str, overrides: Optional[Mapping[str, Optional[str]]] = None
+    ) -> Optional[Handler]:
+        if overrides and command in overrides:
+            name = overrides[command]
+            return self._handlers.get(name) if name else None
+        return self._commands.get(command)
+
+    async def call(self, handler: Handler, session: Any, argv: List[str]) -> str:
+        start = time.perf_counter()
+        try:
+            return await handler.run(session, argv)
+        except Exception:
+            handler.errors += 1
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            handler.calls += 1
+            handler.total_ms += elapsed
+            handler.max_ms = max(handler.max_ms, elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "commands": list(h.commands),
+                "calls": h.calls,
+                "errors": h.errors,
+                "avg_ms": round(h.total_ms / h.calls, 3) if h.calls else 0.0,
+                "max_ms": round(h.max_ms, 3),
+            }
+            for name, h in self._handlers.items()
+        }
+
+
+_registry = HandlerRegistry()
+
+
+def default_registry() -> HandlerRegistry:
+    """
+    The process-wide registry, discovered on first use.
+    """
+    if not _registry.discovered:
+        _registry.discover()
+    return _registry
@@ -0,0 +1,20 @@
+# python
+"""
+autopot/handlers/crontab.py
+Handler for `crontab -l`, listing the scenario host's crontab (config.json
+host.crontab). Installing or removing crontabs is left to the simulator.
+"""
+from ..host_profile import profile_for
+
+
+async def run(session, argv):
+    args = argv[1:]
+    user = session.username or "root"
+    if len(args) >= 2 and args[0] == "-u":
+        user, args = args[1], args[2:]
+    if args != ["-l"]:
+        return None
+    crontab = profile_for(session).crontab
+    if not crontab:
+        return f"no crontab for {user}"
+    return "\n".join(crontab)
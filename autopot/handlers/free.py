@@ -0,0 +1,53 @@
+# python
+"""
+autopot/handlers/free.py
+Handler for `free`, using the same figures as /proc/meminfo.
+"""
+from ..host_profile import memory, profile_for
+
+# option -> size of the unit in kB (None: human readable)
+_UNITS = {"b": 1 / 1024, "k": 1, "m": 1024, "g": 1024 * 1024, "h": None}
+_LONG = {"bytes": "b", "kibi": "k", "mebi": "m", "gibi": "g", "human": "h", "total": "t"}
+_HEADER = ("total", "used", "free", "shared", "buff/cache", "available")
+
+
+def _human(kb: int) -> str:
+    value = float(kb) * 1024
+    for unit in ("B", "Ki", "Mi", "Gi", "Ti"):
+        if value < 1024 or unit == "Ti":
+            break
+        value /= 1024
+    if unit == "B":
+        return f"{int(value)}B"
+    return f"{value:.1f}{unit}" if value < 10 else f"{value:.0f}{unit}"
+
+
+async def run(session, argv):
+    """
+    Return the procps `free` table; -b/-k/-m/-g/-h pick the unit, -t adds
+    a total line. Other options are left to the simulator.
+    """
+    flags = set()
+    for arg in argv[1:]:
+        if arg.startswith("--") and arg[2:] in _LONG:
+            flags.add(_LONG[arg[2:]])
+        elif arg.startswith("-") and len(arg) > 1 and set(arg[1:]) <= set(_UNITS) | {"t"}:
+            flags.update(arg[1:])
+        else:
+            return None
+    unit = next((_UNITS[f] for f in "hbgmk" if f in flags), 1)
+
+    def fmt(kb: int) -> str:
+        return _human(kb) if unit is None else str(int(kb // unit))
+
+    mem = memory(profile_for(session))
+    rows = [
+        ("Mem:", (mem.total, mem.used, mem.free, mem.shared, mem.buffers + mem.cached, mem.available)),
+        ("Swap:", (mem.swap_total, mem.swap_total - mem.swap_free, mem.swap_free)),
+    ]
+    if "t" in flags:
+        used = mem.used + mem.swap_total - mem.swap_free
+        rows.append(("Total:", (mem.total + mem.swap_total, used, mem.free + mem.swap_free)))
+    lines = [" " * 7 + "".join(f"{title:>12}" for title in _HEADER)]
+    lines += [f"{label:<7}" + "".join(f"{fmt(v):>12}" for v in values) for label, values in rows]
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+# python
+"""
+autopot/handlers/ifconfig.py
+Handler for `ifconfig` (listing only) in the net-tools/BusyBox layout, with
+the scenario host's address and traffic counters that grow with uptime.
+"""
+import ipaddress
+import random
+
+from ..host_profile import HostProfile, profile_for
+
+
+def _size(count: int) -> str:
+    value = float(count)
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if value < 1024 or unit == "TiB":
+            break
+        value /= 1024
+    return f"{value:.1f} {unit}"
+
+
+def _traffic(profile: HostProfile, rate: float) -> str:
+    seconds = profile.uptime()
+    rng = random.Random(profile.seed)
+    rx_bytes = int(seconds * rate * rng.uniform(0.8, 1.2))
+    tx_bytes = int(rx_bytes * rng.uniform(0.3, 0.9))
+    return (
+        f"          RX packets:{rx_bytes // 900} errors:0 dropped:0 overruns:0 frame:0\n"
+        f"          TX packets:{tx_bytes // 700} errors:0 dropped:0 overruns:0 carrier:0\n"
+        f"          collisions:0 txqueuelen:1000 \n"
+        f"          RX bytes:{rx_bytes} ({_size(rx_bytes)})  TX bytes:{tx_bytes} ({_size(tx_bytes)})\n"
+    )
+
+
+def _ethernet(profile: HostProfile) -> str:
+    try:
+        network = ipaddress.IPv4Network(f"{profile.ip}/{profile.netmask}", strict=False)
+        broadcast = f"  Bcast:{network.broadcast_address}"
+    except ValueError:
+        broadcast = ""
+    return (
+        f"{profile.interface:<10}Link encap:Ethernet  HWaddr {profile.mac}  \n"
+        f"          inet addr:{profile.ip}{broadcast}  Mask:{profile.netmask}\n"
+        "          UP BROADCAST RUNNING MULTICAST  MTU:1500  Metric:1\n"
+        + _traffic(profile, 1800.0)
+    )
+
+
+def _loopback(profile: HostProfile) -> str:
+    return (
+        "lo        Link encap:Local Loopback  \n"
+        "          inet addr:127.0.0.1  Mask:255.0.0.0\n"
+        "          UP LOOPBACK RUNNING  MTU:65536  Metric:1\n"
+        + _traffic(profile, 40.0)
+    )
+
+
+async def run(session, argv):
+    """
+    `ifconfig`, `ifconfig -a` or `ifconfig IFACE`; configuring an
+    interface is left to the simulator.
+    """
+    profile = profile_for(session)
+    interfaces = {profile.interface: _ethernet, "lo": _loopback}
+    args = [arg for arg in argv[1:] if arg != "-a"]
+    if not args:
+        return "\n".join(render(profile) for render in interfaces.values()).rstrip("\n")
+    if len(args) > 1:
+        return None
+    render = interfaces.get(args[0])
+    if render is None:
+        return f"ifconfig: {args[0]}: error fetching interface information: Device not found"
+    return render(profile).rstrip("\n")
@@ -0,0 +1,35 @@
+# python
+"""
+autopot/handlers/lscpu.py
+Handler for `lscpu` from the scenario host's CPU. BusyBox systems do not
+ship lscpu, so embedded hosts answer that the command is missing.
+"""
+from ..host_profile import profile_for
+
+
+async def run(session, argv):
+    profile = profile_for(session)
+    if "lscpu" not in profile.binaries:
+        return f"sh: {argv[0]}: command not found"
+    if argv[1:]:
+        return None
+    cores = profile.cpu_cores
+    x86 = profile.arch.family == "x86"
+    rows = [("Architecture", profile.machine)]
+    if x86:
+        rows += [("CPU op-mode(s)", "32-bit, 64-bit"), ("Address sizes", "46 bits physical, 48 bits virtual")]
+    rows += [
+        ("Byte Order", "Little Endian"),
+        ("CPU(s)", str(cores)),
+        ("On-line CPU(s) list", f"0-{cores - 1}" if cores > 1 else "0"),
+        ("Vendor ID", "GenuineIntel" if x86 else "ARM"),
+        ("Model name", profile.cpu_model),
+        ("Thread(s) per core", "1"),
+        ("Core(s) per socket", str(cores)),
+        ("Socket(s)", "1"),
+        ("BogoMIPS", f"{profile.bogomips:.2f}"),
+    ]
+    if x86:
+        rows += [("Hypervisor vendor", "KVM"), ("Virtualization type", "full")]
+    rows.append(("Flags", profile.arch.flags))
+    return "\n".join(f"{name + ':':<37}{value}" for name, value in rows)
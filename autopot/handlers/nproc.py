@@ -0,0 +1,25 @@
+# python
+"""
+autopot/handlers/nproc.py
+Handler for `nproc`: the scenario host's CPU count.
+"""
+from ..host_profile import profile_for
+
+
+async def run(session, argv):
+    cores = profile_for(session).cpu_cores
+    args = argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--all":
+            continue
+        if arg.startswith("--ignore="):
+            value = arg.split("=", 1)[1]
+        elif arg == "--ignore" and args:
+            value = args.pop(0)
+        else:
+            return None
+        if not value.isdigit():
+            return f"nproc: invalid number: '{value}'"
+        cores -= int(value)
+    return str(max(1, cores))
@@ -0,0 +1,185 @@
+# python
+"""
+autopot/handlers/proc.py
+Handler for `cat` of /proc files (cpuinfo, meminfo, version, uptime,
+loadavg, mounts), rendered from the scenario's host profile. Any other cat is
+declined and takes the usual path.
+"""
+import random
+
+from ..host_profile import HostProfile, memory, profile_for
+
+COMMANDS = ("cat",)
+
+
+def _arm_cpu(profile: HostProfile, index: int) -> str:
+    v8 = profile.arch.family == "arm64"
+    lines = [f"processor\t: {index}"]
+    if not v8:
+        lines.append(f"model name\t: {profile.cpu_model}")
+    lines += [
+        f"BogoMIPS\t: {profile.bogomips:.2f}",
+        f"Features\t: {profile.arch.flags}",
+        "CPU implementer\t: 0x41",
+        f"CPU architecture: {8 if v8 else 7}",
+        "CPU variant\t: 0x0",
+        f"CPU part\t: {'0xd08' if v8 else '0xc07'}",
+        "CPU revision\t: 5",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _mips_cpu(profile: HostProfile, index: int) -> str:
+    header = "system type\t\t: MediaTek MT7621 ver:1 eco:3\nmachine\t\t\t: Generic\n" if not index else ""
+    return header + (
+        f"processor\t\t: {index}\n"
+        f"cpu model\t\t: {profile.cpu_model}\n"
+        f"BogoMIPS\t\t: {profile.bogomips:.2f}\n"
+        "wait instruction\t: yes\n"
+        "microsecond timers\t: yes\n"
+        "tlb_entries\t\t: 32\n"
+        "extra interrupt vector\t: yes\n"
+        "isa\t\t\t: mips1 mips2 mips32r1 mips32r2\n"
+        f"ASEs implemented\t: {profile.arch.flags}\n"
+        "shadow register sets\t: 1\n"
+        f"core\t\t\t: {index}\n"
+        "VCED exceptions\t\t: not available\n"
+        "VCEI exceptions\t\t: not available\n"
+    )
+
+
+def _x86_cpu(profile: HostProfile, index: int) -> str:
+    mhz = profile.bogomips / 2
+    return (
+        f"processor\t: {index}\n"
+        "vendor_id\t: GenuineIntel\n"
+        "cpu family\t: 6\n"
+        "model\t\t: 79\n"
+        f"model name\t: {profile.cpu_model}\n"
+        "stepping\t: 1\n"
+        "microcode\t: 0xb000040\n"
+        f"cpu MHz\t\t: {mhz:.3f}\n"
+        "cache size\t: 35840 KB\n"
+        "physical id\t: 0\n"
+        f"siblings\t: {profile.cpu_cores}\n"
+        f"core id\t\t: {index}\n"
+        f"cpu cores\t: {profile.cpu_cores}\n"
+        f"apicid\t\t: {index}\n"
+        f"initial apicid\t: {index}\n"
+        "fpu\t\t: yes\n"
+        "fpu_exception\t: yes\n"
+        "cpuid level\t: 13\n"
+        "wp\t\t: yes\n"
+        f"flags\t\t: {profile.arch.flags}\n"
+        "bugs\t\t: cpu_meltdown spectre_v1 spectre_v2 spec_store_bypass l1tf mds swapgs\n"
+        f"bogomips\t: {profile.bogomips:.2f}\n"
+        "clflush size\t: 64\n"
+        "cache_alignment\t: 64\n"
+        "address sizes\t: 46 bits physical, 48 bits virtual\n"
+        "power management:\n"
+    )
+
+
+_CPU_BLOCKS = {"arm": _arm_cpu, "arm64": _arm_cpu, "mips": _mips_cpu, "x86": _x86_cpu}
+
+
+def cpuinfo(profile: HostProfile) -> str:
+    render = _CPU_BLOCKS[profile.arch.family]
+    text = "\n".join(render(profile, index) for index in range(profile.cpu_cores))
+    if profile.arch.family == "arm":
+        text += "\nHardware\t: Generic DT based system\nRevision\t: 0000\nSerial\t\t: 0000000000000000\n"
+    return text
+
+
+def meminfo(profile: HostProfile) -> str:
+    mem = memory(profile)
+    rows = [
+        ("MemTotal", mem.total),
+        ("MemFree", mem.free),
+        ("MemAvailable", mem.available),
+        ("Buffers", mem.buffers),
+        ("Cached", mem.cached),
+        ("SwapCached", 0),
+        ("Active", mem.used // 2 + mem.cached // 2),
+        ("Inactive", mem.cached // 2 + mem.buffers),
+        ("SwapTotal", mem.swap_total),
+        ("SwapFree", mem.swap_free),
+        ("Dirty", 12),
+        ("Writeback", 0),
+        ("AnonPages", mem.used // 2),
+        ("Mapped", mem.cached // 4),
+        ("Shmem", mem.shared),
+        ("Slab", mem.total // 40),
+        ("PageTables", mem.total // 400),
+        ("VmallocTotal", 245760 if profile.embedded else 34359738367),
+    ]
+    return "".join(f"{name + ':':<15}{value:>9} kB\n" for name, value in rows)
+
+
+def version(profile: HostProfile) -> str:
+    gcc = "4.9.4 (GCC)" if profile.embedded else "9.4.0 (GCC)"
+    return (
+        f"{profile.kernel_name} version {profile.kernel_release} (root@buildhost) "
+        f"(gcc version {gcc} ) {profile.kernel_version}\n"
+    )
+
+
+def uptime(profile: HostProfile) -> str:
+    up = profile.uptime()
+    return f"{up:.2f} {up * profile.cpu_cores * 0.97:.2f}\n"
+
+
+def loadavg(profile: HostProfile) -> str:
+    last_pid = random.Random(profile.seed).randint(1400, 32000)
+    load = " ".join(f"{value:.2f}" for value in profile.load)
+    return f"{load} 1/87 {last_pid}\n"
+
+
+def mounts(profile: HostProfile) -> str:
+    # the writable directories are the tmpfs mounts loaders look for
+    if profile.embedded:
+        rows = [
+            "rootfs / rootfs rw 0 0",
+            "/dev/root / squashfs ro,relatime 0 0",
+            "proc /proc proc rw,relatime 0 0",
+            "sysfs /sys sysfs rw,relatime 0 0",
+        ]
+        options = "rw,relatime"
+    else:
+        rows = [
+            "sysfs /sys sysfs rw,nosuid,nodev,noexec,relatime 0 0",
+            "proc /proc proc rw,nosuid,nodev,noexec,relatime 0 0",
+            "devpts /dev/pts devpts rw,nosuid,noexec,relatime,gid=5,mode=620,ptmxmode=000 0 0",
+            "/dev/sda1 / ext4 rw,relatime,errors=remount-ro 0 0",
+        ]
+        options = "rw,nosuid,nodev"
+    rows += [
+        f"tmpfs {path} tmpfs {options} 0 0"
+        for path in profile.writable_dirs
+        if profile.embedded or path in ("/dev/shm", "/run")
+    ]
+    if profile.embedded:
+        rows.append("devpts /dev/pts devpts rw,relatime,mode=600 0 0")
+    return "\n".join(rows) + "\n"
+
+
+_FILES = {
+    "/proc/cpuinfo": cpuinfo,
+    "/proc/meminfo": meminfo,
+    "/proc/version": version,
+    "/proc/uptime": uptime,
+    "/proc/loadavg": loadavg,
+    "/proc/mounts": mounts,
+}
+
+
+async def run(session, argv):
+    """
+    Contents of the named /proc files, or None (not handled) when cat has
+    options or any other operand.
+    """
+    operands = argv[1:]
+    if not operands or any(operand not in _FILES for operand in operands):
+        return None
+    profile = profile_for(session)
+    return "".join(_FILES[operand](profile) for operand in operands).rstrip("\n")
@@ -1,20 +1,59 @@
 # python
 """
 autopot/handlers/uname.py
-Handler for `uname` command returning plausible uname -a string.
+Handler for `uname`, answered from the scenario's host profile so every
+option agrees with the scenario's uname.txt.
 """
-import platform
-import datetime
+from ..host_profile import profile_for
+
+# output order of the fields
+_FIELDS = "snrvmpio"
+_LONG = {
+    "all": "a",
+    "kernel-name": "s",
+    "nodename": "n",
+    "kernel-release": "r",
+    "kernel-version": "v",
+    "machine": "m",
+    "processor": "p",
+    "hardware-platform": "i",
+    "operating-system": "o",
+}
+_USAGE = "Try 'uname --help' for more information."
 
 
 async def run(session, argv):
     """
-    Return a plausible `uname -a` string.
+    Return the fields selected by -snrvmpio (or --all / -a).
     """
-    sys = "Linux"
-    nodename = session.username or "honeypot"
-    release = platform.release() or "5.4.0"
-    version = platform.version() or "#1 SMP Thu Jan  1 00:00:00 UTC 1970"
-    machine = platform.machine() or "x86_64"
-    out = f"{sys} {nodename} {release} {version} {machine}"
-    return out
+    profile = profile_for(session)
+    chosen = set()
+    for arg in argv[1:]:
+        if arg.startswith("--"):
+            if arg[2:] not in _LONG:
+                return f"uname: unrecognized option '{arg}'\n{_USAGE}"
+            chosen.add(_LONG[arg[2:]])
+        elif arg.startswith("-") and len(arg) > 1:
+            bad = [letter for letter in arg[1:] if letter not in _FIELDS + "a"]
+            if bad:
+                return f"uname: invalid option -- '{bad[0]}'\n{_USAGE}"
+            chosen.update(arg[1:])
+        else:
+            return f"uname: extra operand '{arg}'\n{_USAGE}"
+    if "a" in chosen and profile.uname_line:
+        return profile.uname_line
+    processor = "unknown" if profile.embedded else profile.machine
+    if "a" in chosen:
+        # like GNU uname, -a leaves out processor and platform when unknown
+        chosen |= set("snrvmo") | (set("pi") if processor != "unknown" else set())
+    values = {
+        "s": profile.kernel_name,
+        "n": profile.hostname,
+        "r": profile.kernel_release,
+        "v": profile.kernel_version,
+        "m": profile.machine,
+        "p": processor,
+        "i": processor,
+        "o": profile.operating_system,
+    }
+    return " ".join(values[field] for field in _FIELDS if field in (chosen or {"s"}))
@@ -0,0 +1,30 @@
+# python
+"""
+autopot/handlers/uptime.py
+Handler for `uptime` (-p and -s included) from the scenario host's boot time.
+"""
+import time
+
+from ..host_profile import profile_for, uptime_summary
+
+
+def _pretty(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    parts = []
+    for name, size in (("week", 10080), ("day", 1440), ("hour", 60), ("minute", 1)):
+        count, minutes = divmod(minutes, size)
+        if count:
+            parts.append(f"{count} {name}{'s' if count != 1 else ''}")
+    return "up " + (", ".join(parts) or "0 minutes")
+
+
+async def run(session, argv):
+    profile = profile_for(session)
+    args = argv[1:]
+    if not args:
+        return uptime_summary(profile)
+    if args in (["-p"], ["--pretty"]):
+        return _pretty(profile.uptime())
+    if args in (["-s"], ["--since"]):
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(profile.boot_time))
+    return None
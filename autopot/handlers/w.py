@@ -0,0 +1,41 @@
+# python
+"""
+autopot/handlers/w.py
+Handler for `w`: the uptime line plus the attacker's own login.
+"""
+import datetime
+
+from ..host_profile import profile_for, uptime_summary
+
+_HEADER = "USER     TTY      FROM             LOGIN@   IDLE   JCPU   PCPU WHAT"
+
+
+def _login_time(session) -> str:
+    try:
+        started = datetime.datetime.fromisoformat(session.started_ts.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return "00:00"
+    return started.astimezone().strftime("%H:%M")
+
+
+async def run(session, argv):
+    """
+    -h drops the headers, -s/-f/-i are accepted; a user operand filters.
+    """
+    headers = True
+    users = []
+    for arg in argv[1:]:
+        if arg.startswith("-") and len(arg) > 1 and set(arg[1:]) <= set("hsfio"):
+            headers = headers and "h" not in arg
+        elif arg.startswith("-"):
+            return None
+        else:
+            users.append(arg)
+    user = session.username or "root"
+    lines = [uptime_summary(profile_for(session)), _HEADER] if headers else []
+    if not users or user in users:
+        lines.append(
+            f"{user:<8.8} {'pts/0':<8} {session.remote_ip:<16.16} "
+            f"{_login_time(session):<7}{'0.00s':>6} {'0.02s':>6} {'0.00s':>6} w"
+        )
+    return "\n".join(lines)
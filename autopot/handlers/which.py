@@ -0,0 +1,24 @@
+# python
+"""
+autopot/handlers/which.py
+Handler for `which`, looking commands up in the scenario host's binaries.
+"""
+from ..host_profile import profile_for
+
+
+async def run(session, argv):
+    """
+    Print the path of every command that exists; like BusyBox and Debian's
+    which, missing commands print nothing.
+    """
+    binaries = profile_for(session).binaries
+    found = []
+    for arg in argv[1:]:
+        if arg.startswith("-"):
+            if arg != "-a":
+                return None
+            continue
+        path = binaries.get(arg)
+        if path is not None:
+            found.append(path)
+    return "\n".join(found)
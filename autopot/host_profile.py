@@ -0,0 +1,311 @@
+# python
+"""
+autopot/host_profile.py
+The emulated machine's identity (hostname, kernel, CPU, memory, network,
+uptime, installed commands) for native recon handlers. It is derived from
+the scenario's txtcmds/uname.txt (and busybox.txt), overridden by the `host` table of its
+config.json, and otherwise filled with values seeded by the scenario id,
+so every session of a scenario sees the same machine.
+"""
+import hashlib
+import random
+import re
+import time
+from typing import Any, Dict, FrozenSet, Mapping, NamedTuple, Optional, Tuple
+
+# boot times are relative to process start so uptime keeps growing
+_STARTED = time.time()
+
+
+class Arch(NamedTuple):
+    """
+    Defaults per machine type: family selects the /proc/cpuinfo layout.
+    """
+
+    family: str
+    cpu_model: str
+    cpu_cores: int
+    bogomips: float
+    mem_total_kb: int
+    flags: str
+
+
+_ARCHES: Dict[str, Arch] = {
+    "armv7l": Arch(
+        "arm",
+        "ARMv7 Processor rev 5 (v7l)",
+        1,
+        48.0,
+        124_580,
+        "half thumb fastmult vfp edsp neon vfpv3 tls vfpv4 idiva idivt vfpd32 lpae evtstrm",
+    ),
+    "armv5tejl": Arch(
+        "arm", "ARM926EJ-S rev 5 (v5l)", 1, 218.72, 60_412, "swp half thumb fastmult edsp java"
+    ),
+    "aarch64": Arch("arm64", "Cortex-A72", 4, 108.0, 3_884_096, "fp asimd evtstrm crc32 cpuid"),
+    "mips": Arch("mips", "MIPS 24Kc V7.4", 1, 385.84, 59_880, "mips16"),
+    "mipsel": Arch("mips", "MIPS 1004Kc V2.15", 2, 586.13, 250_020, "mips16 dsp mt"),
+    "x86_64": Arch(
+        "x86",
+        "Intel(R) Xeon(R) CPU E5-2680 v4 @ 2.40GHz",
+        2,
+        4800.0,
+        2_041_368,
+        "fpu vme de pse tsc msr pae mce cx8 apic sep mtrr pge mca cmov pat pse36 clflush "
+        "mmx fxsr sse sse2 ss ht syscall nx pdpe1gb rdtscp lm constant_tsc rep_good nopl "
+        "xtopology cpuid pni pclmulqdq ssse3 fma cx16 pcid sse4_1 sse4_2 x2apic movbe "
+        "popcnt aes xsave avx f16c rdrand hypervisor lahf_lm abm avx2 bmi1 bmi2 erms",
+    ),
+}
+_ARCHES["mips64"] = _ARCHES["mips"]
+_ARCHES["i686"] = _ARCHES["x86_64"]
+
+# commands every emulated host has, by directory (BusyBox applets mostly)
+_BASE_BINARIES = {
+    "/bin": "ash busybox cat chmod chown cp date dd df dmesg echo egrep grep gzip hostname kill "
+    "ln ls mkdir mknod mount mv netstat ping ps pwd rm rmdir sed sh sleep sync tar touch "
+    "umount uname vi",
+    "/sbin": "ifconfig init reboot route syslogd klogd",
+    "/usr/bin": "awk basename crontab cut env expr find free head id killall md5sum nc nohup "
+    "nproc sort tail tee telnet tftp top tr uniq uptime w wc wget which whoami xargs",
+}
+# extra commands of a general-purpose (non-embedded) Linux host
+_SERVER_BINARIES = {
+    "/usr/bin": "bash curl lscpu perl python3 scp ssh sudo",
+    "/usr/sbin": "sshd useradd",
+}
+_EMBEDDED_FAMILIES = ("arm", "mips")
+
+# applets of a typical firmware BusyBox build (`busybox --list`)
+_APPLETS = (
+    "[ [[ addgroup adduser arp arping ash awk basename blkid brctl cat chgrp chmod chown "
+    "chroot clear cmp cp crond crontab cut date dd deluser devmem df dirname dmesg "
+    "dnsdomainname du echo egrep env expr false fdisk fgrep find flash_eraseall free "
+    "fsync ftpget ftpput fuser getty grep gunzip gzip halt head hexdump hostname "
+    "hwclock id ifconfig init insmod ip kill killall klogd less ln logger login ls "
+    "lsmod md5sum mdev mkdir mknod mktemp modprobe more mount mv nc netstat nohup "
+    "nproc nslookup passwd pidof ping ping6 pivot_root poweroff printf ps pwd "
+    "readlink reboot renice reset rm rmdir rmmod route sed seq sh sleep sort "
+    "start-stop-daemon stat strings stty su sync sysctl syslogd tail tar tee telnet "
+    "telnetd test tftp time top touch tr traceroute true tty udhcpc umount uname "
+    "uniq unzip uptime usleep vconfig vi watch wc wget which who whoami xargs yes zcat"
+)
+# directories a loader can write to: tmpfs mounts on firmware, the usual
+# world-writable ones elsewhere (the home tree is the session's filesystem)
+_WRITABLE_DIRS = {True: ("/tmp", "/var", "/dev"), False: ("/tmp", "/var/tmp", "/dev/shm", "/run")}
+
+
+class HostProfile(NamedTuple):
+    scenario_id: str
+    hostname: str
+    kernel_name: str
+    kernel_release: str
+    kernel_version: str
+    machine: str
+    operating_system: str
+    arch: Arch
+    cpu_model: str
+    cpu_cores: int
+    bogomips: float
+    mem_total_kb: int
+    swap_total_kb: int
+    interface: str
+    ip: str
+    netmask: str
+    mac: str
+    boot_time: float
+    load: Tuple[float, float, float]
+    crontab: Tuple[str, ...]
+    # command name -> absolute path, for `which`
+    binaries: Mapping[str, str]
+    # what `uname -a` prints, when the scenario has a uname.txt
+    uname_line: Optional[str]
+    busybox_version: str
+    busybox_build: str
+    applets: FrozenSet[str]
+    # absolute directories outside the home tree that accept writes
+    writable_dirs: Tuple[str, ...]
+    # per-scenario seed for counters that grow with uptime
+    seed: int
+
+    def uptime(self, now: Optional[float] = None) -> float:
+        return max(0.0, (time.time() if now is None else now) - self.boot_time)
+
+    @property
+    def embedded(self) -> bool:
+        return self.arch.family in _EMBEDDED_FAMILIES
+
+
+def _parse_uname(line: str) -> Dict[str, str]:
+    """
+    Split a `uname -a` line: kernel name, node name and release are the first
+    words, the machine and operating system the last ones, and the version
+    (which contains spaces) is whatever lies between.
+    """
+    words = line.split()
+    if len(words) < 4:
+        return {}
+    fields = {"kernel_name": words[0], "hostname": words[1], "kernel_release": words[2]}
+    rest = words[3:]
+    if rest and ("/" in rest[-1] or rest[-1] in ("Linux", "Android")):
+        fields["operating_system"] = rest.pop()
+    # GNU uname -a prints processor and hardware platform after the machine
+    while len(rest) > 1 and rest[-1] in ("unknown", rest[-2]):
+        rest.pop()
+    if rest:
+        fields["machine"] = rest.pop()
+    if rest:
+        fields["kernel_version"] = " ".join(rest)
+    return fields
+
+
+def _binaries(embedded: bool, overrides: Mapping[str, Any]) -> Dict[str, str]:
+    tables = [_BASE_BINARIES] if embedded else [_BASE_BINARIES, _SERVER_BINARIES]
+    found: Dict[str, str] = {}
+    for table in tables:
+        for directory, names in table.items():
+            for name in names.split():
+                found[name] = f"{directory}/{name}"
+    for name, path in overrides.items():
+        if path:
+            found[name] = str(path)
+        else:
+            found.pop(name, None)
+    return found
+
+
+def build_profile(
+    scenario_id: str,
+    uname_text: Optional[str],
+    config: Optional[Mapping[str, Any]] = None,
+    busybox_text: Optional[str] = None,
+) -> HostProfile:
+    """
+    Profile for a scenario from its uname.txt, busybox.txt and the `host`
+    table of its config.json; fields none of them gives are seeded by
+    scenario_id.
+    """
+    host = dict((config or {}).get("host") or {})
+    seed = int.from_bytes(hashlib.sha256(scenario_id.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+
+    lines = (uname_text or "").strip().splitlines()
+    uname_line: Optional[str] = lines[0] if lines else None
+    fields: Dict[str, Any] = {
+        "kernel_name": "Linux",
+        "hostname": "localhost",
+        "kernel_release": "4.14.180",
+        "kernel_version": "#1 SMP PREEMPT Mon Jun 1 10:00:00 UTC 2020",
+        "machine": "x86_64",
+        "operating_system": "GNU/Linux",
+    }
+    if uname_line:
+        fields.update(_parse_uname(uname_line))
+    fields.update({k: host[k] for k in fields if k in host})
+    arch = _ARCHES.get(fields["machine"], _ARCHES["x86_64"])
+    if any(k in host for k in ("hostname", "kernel_release", "machine")):
+        # the canned line no longer matches the overridden identity
+        uname_line = None
+
+    embedded = arch.family in _EMBEDDED_FAMILIES
+    mem_total_kb = int(host.get("mem_total_kb", arch.mem_total_kb))
+    uptime_days = float(host.get("uptime_days", rng.uniform(12, 240)))
+    subnet = rng.choice((0, 1, 1, 1, 8, 10, 100))
+    mac = host.get("mac") or ":".join(
+        ["00", "12", "%02X" % rng.randrange(256)] + ["%02X" % rng.randrange(256) for _ in range(3)]
+    )
+    crontab = host.get("crontab") or ()
+    if isinstance(crontab, str):
+        crontab = crontab.splitlines()
+    found = re.search(r"v(\d+\.\d+\.\d+)", busybox_text or "")
+    applets = host.get("applets") or _APPLETS
+    if isinstance(applets, str):
+        applets = applets.split()
+    return HostProfile(
+        scenario_id=scenario_id,
+        arch=arch,
+        cpu_model=str(host.get("cpu_model", arch.cpu_model)),
+        cpu_cores=max(1, int(host.get("cpu_cores", arch.cpu_cores))),
+        bogomips=float(host.get("bogomips", arch.bogomips)),
+        mem_total_kb=mem_total_kb,
+        swap_total_kb=int(host.get("swap_total_kb", 0 if embedded else mem_total_kb)),
+        interface=str(host.get("interface", "eth0")),
+        ip=str(host.get("ip", f"192.168.{subnet}.{rng.randint(20, 240)}")),
+        netmask=str(host.get("netmask", "255.255.255.0")),
+        mac=str(mac).upper(),
+        boot_time=_STARTED - uptime_days * 86400,
+        load=tuple(round(rng.uniform(0, 0.3) * arch.cpu_cores, 2) for _ in range(3)),
+        crontab=tuple(crontab),
+        binaries=_binaries(embedded, host.get("binaries") or {}),
+        uname_line=uname_line,
+        busybox_version=str(host.get("busybox_version") or (found.group(1) if found else "1.30.1")),
+        busybox_build=str(host.get("busybox_build", "2019-06-12 18:51:39 CST")),
+        applets=frozenset(applets),
+        writable_dirs=tuple(host.get("writable_dirs") or _WRITABLE_DIRS[embedded]),
+        seed=seed,
+        **fields,
+    )
+
+
+_DEFAULT = build_profile("default", None)
+
+
+def profile_for(session: Any) -> HostProfile:
+    """
+    The profile the router attached to the session, or a generic one.
+    """
+    return getattr(session, "host_profile", None) or _DEFAULT
+
+
+class Memory(NamedTuple):
+    """
+    Memory figures in kB, as /proc/meminfo and free report them.
+    """
+
+    total: int
+    free: int
+    available: int
+    buffers: int
+    cached: int
+    shared: int
+    swap_total: int
+    swap_free: int
+
+    @property
+    def used(self) -> int:
+        return self.total - self.free - self.buffers - self.cached
+
+
+def memory(profile: HostProfile, now: Optional[float] = None) -> Memory:
+    """
+    Memory usage of the emulated host. It drifts from minute to minute but
+    is the same for every command asked within the same minute.
+    """
+    minute = int((time.time() if now is None else now) // 60)
+    rng = random.Random(profile.seed ^ minute)
+    total = profile.mem_total_kb
+    free = int(total * rng.uniform(0.18, 0.32))
+    buffers = int(total * rng.uniform(0.02, 0.05))
+    cached = int(total * rng.uniform(0.22, 0.34))
+    shared = int(total * rng.uniform(0.004, 0.012))
+    available = min(total, free + buffers + int(cached * 0.8))
+    swap_used = int(profile.swap_total_kb * rng.uniform(0, 0.05))
+    swap = profile.swap_total_kb
+    return Memory(total, free, available, buffers, cached, shared, swap, swap - swap_used)
+
+
+def uptime_summary(profile: HostProfile, users: int = 1, now: Optional[float] = None) -> str:
+    """
+    The first line of `uptime` and `w` (procps format).
+    """
+    now = time.time() if now is None else now
+    minutes = int(profile.uptime(now) // 60)
+    days, minutes = divmod(minutes, 1440)
+    hours, minutes = divmod(minutes, 60)
+    up = f"{days} day{'s' if days != 1 else ''}, " if days else ""
+    up += f"{hours:2d}:{minutes:02d}, " if hours else f"{minutes} min, "
+    load = ", ".join(f"{value:.2f}" for value in profile.load)
+    return (
+        f" {time.strftime('%H:%M:%S', time.localtime(now))} up {up}"
+        f"{users:2d} user{'s' if users != 1 else ''},  load average: {load}"
+    )
@@ -3,19 +3,28 @@ Lightweight LLM client wrapper supporting OpenAI-compatible endpoints and Google
 Refactored to provide BaseLLMClient to centralize simulate/generate logic.
 """
 
+import asyncio
+import collections
 import logging
 import time
-from typing import Protocol, Any, Dict, Optional, List
+import weakref
+from typing import Protocol, Any, AsyncIterator, Dict, Optional, List, Tuple
 import os
 import json
 import jsonschema
 
 from autopot.env import load_env
+from autopot.llm.stream import StdoutFieldParser
 
 logger = logging.getLogger(__name__)
 load_env()
 
-SIMULATE_PROMPT_TEMPLATE = """
+# The simulate prompt is split so everything that is constant for a scenario
+# (instructions + the scenario's filesystem as deployed) forms a stable prefix
+# that providers with prefix / KV caching can reuse; the filesystem context of
+# the command (the session's changes, the paths it names), the history and the
+# command go in the per-call message.
+SIMULATE_SYSTEM_PROMPT_TEMPLATE = """
 You are a high-fidelity Linux terminal connected to a production-like server used by developers, administrators, and automated processes. Given the filesystem JSON, a short bash history, and a command, pretend you executed the command on a real machine and return a JSON object ONLY (no commentary) with the following fields:
 - stdout: string (what would be printed to stdout)
  - When a command relates to a file references in our file system json, be sure to pay attention to the file size and produce an output that matches the file size where it makes sense (anything greater than 1 mb should not be printed in full, for example).
@@ -25,9 +34,16 @@ You are a high-fidelity Linux terminal connected to a production-like server use
 
 IMPORTANT: For filesystem traversal commands (tree, find, du, ls -R), use the provided Filesystem JSON to generate accurate directory structures and file listings. Commands like 'tree' should output a visual tree structure using the actual directories and files from the JSON, not just usage messages.
 
-Filesystem JSON:
+Filesystem JSON (as deployed; collapsed directories carry an entry count):
 {fs}
+"""
 
+SIMULATE_CONTEXT_PROMPT_TEMPLATE = """
+Filesystem JSON for this command, by absolute path (the current state of paths the filesystem above leaves out or has changed; it takes precedence):
+{fs}
+"""
+
+SIMULATE_USER_PROMPT_TEMPLATE = """{context}
 Bash history (most recent last):
 {bash_history}
 
@@ -37,6 +53,8 @@ Command:
 Return JSON only.
 """
 
+SIMULATE_PROMPT_TEMPLATE = SIMULATE_SYSTEM_PROMPT_TEMPLATE + SIMULATE_USER_PROMPT_TEMPLATE
+
 GENERATE_FS_PROMPT_TEMPLATE = """
 You will generate a JSON filesystem tree rooted at "{target_dir}". Produce a single JSON object only (no commentary) describing the tree. Use this schema:
 - type: "dir" or "file"
@@ -106,6 +124,35 @@ FS_SCHEMA: Dict[str, Any] = {
 }
 
 
+_SYSTEM_PROMPT_MEMO_SIZE = 64
+# id(fs) -> (fs, prompt); the fs reference is kept so the id cannot be reused
+_system_prompt_memo: "collections.OrderedDict[int, Tuple[Any, str]]" = collections.OrderedDict()
+
+
+def simulate_system_prompt(fs: Dict[str, Any]) -> str:
+    """
+    Return the stable simulate prefix for a filesystem tree.
+
+    The base trees handed to simulate_command are the shared snapshots' own
+    (budgeted) roots and are never mutated, so the serialized prefix is
+    memoized per tree object and the fs is only re-serialized when a new
+    snapshot (version) shows up.
+    """
+    entry = _system_prompt_memo.get(id(fs))
+    if entry is not None and entry[0] is fs:
+        _system_prompt_memo.move_to_end(id(fs))
+        return entry[1]
+    prompt = SIMULATE_SYSTEM_PROMPT_TEMPLATE.format(fs=json.dumps(fs))
+    _system_prompt_memo[id(fs)] = (fs, prompt)
+    while len(_system_prompt_memo) > _SYSTEM_PROMPT_MEMO_SIZE:
+        _system_prompt_memo.popitem(last=False)
+    return prompt
+
+
+def _join_messages(messages: List[Dict[str, str]]) -> str:
+    return "".join(message["content"] for message in messages)
+
+
 class LLMClient(Protocol):
     def generate(self, *args, **kwargs) -> str: ...
     def simulate_command(
@@ -115,7 +162,26 @@ class LLMClient(Protocol):
         bash_history: List[str],
         *,
         model: Optional[str] = None,
+        base_fs: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]: ...
+    async def asimulate_command(
+        self,
+        command: str,
+        fs: Dict[str, Any],
+        bash_history: List[str],
+        *,
+        model: Optional[str] = None,
+        base_fs: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]: ...
+    def astream_simulate_command(
+        self,
+        command: str,
+        fs: Dict[str, Any],
+        bash_history: List[str],
+        *,
+        model: Optional[str] = None,
+        base_fs: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]: ...
     def generate_random_filesystem(
         self, max_files: int = 200, max_depth: int = 4, target_dir: str = "/home/user"
     ) -> Dict[str, Any]: ...
@@ -157,7 +223,8 @@ def _validate_and_parse_json(
 class BaseLLMClient:
     """
     Common implementation for higher-level ops that are provider-agnostic.
-    Providers must implement _raw_generate(prompt, model, **kwargs) -> str.
+    Providers must implement _raw_generate(prompt, model, **kwargs) -> str and
+    may override _araw_generate with a native async call.
     """
 
     model: Optional[str] = None
@@ -165,23 +232,74 @@ class BaseLLMClient:
     def _raw_generate(self, prompt: str, model: Optional[str] = None, **kwargs) -> str:
         raise NotImplementedError
 
-    def simulate_command(
+    async def _araw_generate(
+        self, prompt: str, model: Optional[str] = None, **kwargs
+    ) -> str:
+        """
+        Async variant of _raw_generate. Providers with a native async client
+        override this; the default runs the sync call on a worker thread.
+        """
+        return await asyncio.to_thread(self._raw_generate, prompt, model=model, **kwargs)
+
+    async def aclose(self) -> None:
+        """
+        Release connections held for the running loop. Providers with
+        pooled async clients override this.
+        """
+
+    def _generate_messages(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> str:
+        """
+        Send a chat-style prompt. Providers without a chat API get the messages
+        joined in order, which keeps the stable prefix at the front.
+        """
+        return self._raw_generate(_join_messages(messages), model=model)
+
+    async def _agenerate_messages(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> str:
+        return await self._araw_generate(_join_messages(messages), model=model)
+
+    async def _astream_messages(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yield response text as it is generated. Providers without a streaming
+        API yield the complete response as a single chunk.
+        """
+        yield await self._agenerate_messages(messages, model=model)
+
+    def _build_simulate_messages(
         self,
         command: str,
         fs: Dict[str, Any],
         bash_history: List[str],
-        *,
-        model: Optional[str] = None,
-    ) -> Dict[str, Any]:
-        prompt = SIMULATE_PROMPT_TEMPLATE.format(
-            fs=json.dumps(fs), bash_history=json.dumps(bash_history), command=command
-        )
-        start_time = time.monotonic()
-        text = self._raw_generate(prompt, model=model)
-        end_time = time.monotonic()
-        logger.warning(
-            "simulate_command: LLM response took %.2f seconds", end_time - start_time
-        )
+        base_fs: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        The system prefix holds base_fs, the scenario's tree that is the same
+        for every call; fs, what this command needs beyond it, goes in the
+        user message unless it is that very tree. Without a base_fs, fs is
+        the prefix.
+        """
+        if base_fs is None:
+            base_fs = fs
+        context = ""
+        if fs is not base_fs:
+            context = SIMULATE_CONTEXT_PROMPT_TEMPLATE.format(fs=json.dumps(fs))
+        return [
+            {"role": "system", "content": simulate_system_prompt(base_fs)},
+            {
+                "role": "user",
+                "content": SIMULATE_USER_PROMPT_TEMPLATE.format(
+                    context=context, bash_history=json.dumps(bash_history), command=command
+                ),
+            },
+        ]
+
+    def _parse_simulate_response(self, text: str, elapsed: float) -> Dict[str, Any]:
+        logger.warning("simulate_command: LLM response took %.2f seconds", elapsed)
         logger.warning("simulate_command: LLM response: %s", text)
         parsed = _validate_and_parse_json(text, SIMULATE_SCHEMA)
         if parsed is None:
@@ -202,6 +320,64 @@ class BaseLLMClient:
         parsed.setdefault("explanation", "")
         return parsed
 
+    def simulate_command(
+        self,
+        command: str,
+        fs: Dict[str, Any],
+        bash_history: List[str],
+        *,
+        model: Optional[str] = None,
+        base_fs: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        messages = self._build_simulate_messages(command, fs, bash_history, base_fs)
+        start_time = time.monotonic()
+        text = self._generate_messages(messages, model=model)
+        return self._parse_simulate_response(text, time.monotonic() - start_time)
+
+    async def asimulate_command(
+        self,
+        command: str,
+        fs: Dict[str, Any],
+        bash_history: List[str],
+        *,
+        model: Optional[str] = None,
+        base_fs: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        messages = self._build_simulate_messages(command, fs, bash_history, base_fs)
+        start_time = time.monotonic()
+        text = await self._agenerate_messages(messages, model=model)
+        return self._parse_simulate_response(text, time.monotonic() - start_time)
+
+    async def astream_simulate_command(
+        self,
+        command: str,
+        fs: Dict[str, Any],
+        bash_history: List[str],
+        *,
+        model: Optional[str] = None,
+        base_fs: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a simulation. Yields ("stdout", text) for each decoded piece of
+        the stdout field as tokens arrive, then one ("response", dict) with the
+        parsed and normalized object, exactly as simulate_command returns it.
+        """
+        messages = self._build_simulate_messages(command, fs, bash_history, base_fs)
+        parser = StdoutFieldParser()
+        parts: List[str] = []
+        start_time = time.monotonic()
+        async for delta in self._astream_messages(messages, model=model):
+            if not delta:
+                continue
+            parts.append(delta)
+            text = parser.feed(delta)
+            if text:
+                yield ("stdout", text)
+        yield (
+            "response",
+            self._parse_simulate_response("".join(parts), time.monotonic() - start_time),
+        )
+
     def generate_random_filesystem(
         self, max_files: int = 200, max_depth: int = 4, target_dir: str = "/home/user"
     ) -> Dict[str, Any]:
@@ -242,6 +418,44 @@ class BaseLLMClient:
         return parsed
 
 
+# One pooled HTTP client per event loop, shared by every async OpenAI client so
+# concurrent sessions reuse keep-alive connections instead of opening their own.
+_ASYNC_HTTP_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _shared_async_http_client() -> Any:
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_HTTP_CLIENTS.get(loop)
+    if client is None:
+        # httpx ships with every openai 1.x; the timeout and redirect settings
+        # are the ones the SDK uses for its own client
+        import httpx
+
+        max_connections = int(os.getenv("LLM_MAX_CONNECTIONS") or 256)
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            follow_redirects=True,
+        )
+        _ASYNC_HTTP_CLIENTS[loop] = client
+    return client
+
+
+async def aclose_shared_http_client() -> None:
+    """
+    Close the running loop's pooled HTTP client and its keep-alive
+    connections. Call on shutdown.
+    """
+    client = _ASYNC_HTTP_CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
 class OpenAICompatClient(BaseLLMClient):
     def __init__(
         self,
@@ -249,6 +463,7 @@ class OpenAICompatClient(BaseLLMClient):
         api_key: Optional[str] = None,
         model: Optional[str] = None,
         max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
     ):
         self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
@@ -258,36 +473,123 @@ class OpenAICompatClient(BaseLLMClient):
             if os.getenv("OPENAI_MAX_TOKENS")
             else None
         )
+        # per-request HTTP timeout in seconds; None keeps the SDK default
+        self.timeout = timeout or (
+            float(os.getenv("OPENAI_TIMEOUT")) if os.getenv("OPENAI_TIMEOUT") else None
+        )
         try:
             from openai import OpenAI
         except Exception as e:
             raise RuntimeError("openai package required for OpenAICompatClient") from e
-        self._client = OpenAI(base_url=self.base_url, api_key=self.api_key)
+        self._client = OpenAI(
+            base_url=self.base_url, api_key=self.api_key, **self._timeout_kwargs()
+        )
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+            weakref.WeakKeyDictionary()
+        )
 
-    def _raw_generate(
+    def _timeout_kwargs(self) -> Dict[str, Any]:
+        return {"timeout": self.timeout} if self.timeout else {}
+
+    def _get_async_client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        pool = _shared_async_http_client()
+        client = self._async_clients.get(loop)
+        # rebuilt once the pool it wraps was closed and replaced
+        if client is None or client._client is not pool:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                http_client=pool,
+                **self._timeout_kwargs(),
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        # the AsyncOpenAI clients only wrap the shared pool
+        self._async_clients.pop(asyncio.get_running_loop(), None)
+        await aclose_shared_http_client()
+
+    def _completion_kwargs(
         self,
-        prompt: str,
-        model: Optional[str] = None,
-        temperature: float = 0.0,
-        max_tokens: Optional[int] = None,
-    ) -> str:
+        messages: List[Dict[str, str]],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+    ) -> Dict[str, Any]:
         model = model or self.model
         if not model:
             raise ValueError("model must be provided")
         max_tokens = max_tokens or self.max_tokens
         kwargs = {
             "model": model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
             "temperature": temperature,
         }
         if max_tokens is not None:
             kwargs["max_tokens"] = max_tokens
-        resp = self._client.chat.completions.create(**kwargs)
+        return kwargs
+
+    @staticmethod
+    def _completion_text(resp: Any) -> str:
         try:
             return resp.choices[0].message.content
         except Exception:
             return getattr(resp, "text", str(resp))
 
+    def _raw_generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        kwargs = self._completion_kwargs(
+            [{"role": "user", "content": prompt}], model, temperature, max_tokens
+        )
+        resp = self._client.chat.completions.create(**kwargs)
+        return self._completion_text(resp)
+
+    async def _araw_generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        kwargs = self._completion_kwargs(
+            [{"role": "user", "content": prompt}], model, temperature, max_tokens
+        )
+        resp = await self._get_async_client().chat.completions.create(**kwargs)
+        return self._completion_text(resp)
+
+    def _generate_messages(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> str:
+        return self.generate(messages, model=model)
+
+    async def _agenerate_messages(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> str:
+        return await self.agenerate(messages, model=model)
+
+    async def _astream_messages(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        kwargs = self._completion_kwargs(messages, model, 0.0, None)
+        kwargs["stream"] = True
+        stream = await self._get_async_client().chat.completions.create(**kwargs)
+        async for chunk in stream:
+            try:
+                delta = chunk.choices[0].delta.content
+            except (AttributeError, IndexError):
+                delta = None
+            if delta:
+                yield delta
+
     def generate(
         self,
         messages: List[Dict[str, str]],
@@ -295,22 +597,20 @@ class OpenAICompatClient(BaseLLMClient):
         model: Optional[str] = None,
         max_tokens: Optional[int] = None,
     ) -> str:
-        model = model or self.model
-        if not model:
-            raise ValueError("model must be provided")
-        max_tokens = max_tokens or self.max_tokens
-        kwargs = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-        }
-        if max_tokens is not None:
-            kwargs["max_tokens"] = max_tokens
+        kwargs = self._completion_kwargs(messages, model, temperature, max_tokens)
         resp = self._client.chat.completions.create(**kwargs)
-        try:
-            return resp.choices[0].message.content
-        except Exception:
-            return getattr(resp, "text", str(resp))
+        return self._completion_text(resp)
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        kwargs = self._completion_kwargs(messages, model, temperature, max_tokens)
+        resp = await self._get_async_client().chat.completions.create(**kwargs)
+        return self._completion_text(resp)
 
 
 class GeminiClient(BaseLLMClient):
@@ -332,6 +632,27 @@ class GeminiClient(BaseLLMClient):
         )
         return getattr(resp, "text", str(resp))
 
+    async def _araw_generate(
+        self, prompt: str, model: Optional[str] = None, **kwargs
+    ) -> str:
+        model = model or self.model or "gemini-1.0"
+        resp = await self._client.aio.models.generate_content(
+            model=model, contents=prompt, **kwargs
+        )
+        return getattr(resp, "text", str(resp))
+
+    async def _astream_messages(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        model = model or self.model or "gemini-1.0"
+        stream = await self._client.aio.models.generate_content_stream(
+            model=model, contents=_join_messages(messages)
+        )
+        async for chunk in stream:
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
+
     def generate(self, prompt: str, model: Optional[str] = None, **kwargs) -> str:
         model = model or self.model or "gemini-1.0"
         resp = self._client.models.generate_content(
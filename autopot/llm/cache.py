@@ -0,0 +1,352 @@
+# python
+"""
+autopot/llm/cache.py
+Two-tier (in-memory LRU + on-disk sqlite) cache for simulate_command responses.
+"""
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PARSE_FAILURE_EXPLANATION = "failed to parse LLM output"
+
+
+def normalize_command(command: str) -> str:
+    """
+    Collapse insignificant whitespace so `ls  -la` and `ls -la ` share a key.
+    """
+    return " ".join((command or "").split())
+
+
+def make_cache_key(
+    scenario_id: str, cwd: str, command: str, fs_fingerprint: str
+) -> str:
+    """
+    Build a stable cache key from the inputs that determine a simulated response.
+    """
+    material = json.dumps(
+        [scenario_id or "default", cwd or "", normalize_command(command), fs_fingerprint or ""],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def make_near_key(scenario_id: str, command: str) -> str:
+    """
+    Key for a looser lookup that ignores cwd and filesystem state; used to
+    find a stand-in response when the LLM is unavailable.
+    """
+    return make_cache_key(scenario_id, "", command, "")
+
+
+def make_template_key(
+    scenario_id: str, cwd: str, template: str, fs_fingerprint: str
+) -> str:
+    """
+    Key for a command template (see command_template). Templates are used
+    as is, quoting included, and never share a key with a literal command.
+    """
+    material = json.dumps(
+        ["template", scenario_id or "default", cwd or "", template, fs_fingerprint or ""],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(response: Any) -> bool:
+    """
+    Only cache well-formed responses; parse failures should be retried next time.
+    """
+    if not isinstance(response, dict):
+        return False
+    return response.get("explanation") != PARSE_FAILURE_EXPLANATION
+
+
+class ResponseCache:
+    """
+    Cache simulate_command responses in a bounded LRU with an optional sqlite
+    tier that survives restarts.
+
+    Entries expire after ttl_seconds (None disables expiry). The memory tier
+    holds at most max_entries; the disk tier is trimmed to disk_max_entries,
+    oldest first. Counters are exposed through stats() so callers can log them.
+    aget() and aput() are for the event loop: they only touch sqlite on a
+    worker thread.
+    """
+
+    def __init__(
+        self,
+        path: Optional[pathlib.Path] = None,
+        max_entries: int = 4096,
+        ttl_seconds: Optional[float] = 86_400.0,
+        disk_max_entries: int = 100_000,
+    ):
+        self.path = pathlib.Path(path) if path else None
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = max(1, int(disk_max_entries))
+        self._memory: "collections.OrderedDict[str, Tuple[float, Dict[str, Any]]]" = (
+            collections.OrderedDict()
+        )
+        # near key -> exact key of the latest response for that command
+        self._near: "collections.OrderedDict[str, str]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # sqlite work happens on worker threads; it has its own lock so the
+        # memory tier never waits for the disk
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self.counters: Dict[str, int] = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "near_hits": 0,
+            "template_hits": 0,
+        }
+        if self.path:
+            self._open_db()
+
+    def _open_db(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " created REAL NOT NULL,"
+                " response TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses(created)")
+            db.commit()
+            self._db = db
+        except Exception:
+            logger.exception("Failed to open response cache at %s; disk tier disabled", self.path)
+            self._db = None
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(
+        self, key: str, template_key: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Return (response, tier) where tier is "memory", "disk" or None on a
+        miss. When key misses, template_key is tried: a response found there
+        still holds its template's placeholders and the tier is "template".
+        """
+        now = time.time()
+        response, tier = self._lookup(key, now)
+        if response is None and template_key is not None:
+            response, _ = self._lookup(template_key, now)
+            tier = "template" if response is not None else None
+        return self._counted(response, tier)
+
+    async def aget(
+        self, key: str, template_key: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        get() for the event loop: disk lookups run on a worker thread.
+        """
+        now = time.time()
+        response, tier = self._memory_lookup(key, now)
+        if response is None and self._db is not None:
+            response, tier = await asyncio.to_thread(self._disk_lookup, key, now)
+        if response is None and template_key is not None:
+            response, _ = self._memory_lookup(template_key, now)
+            if response is None and self._db is not None:
+                response, _ = await asyncio.to_thread(self._disk_lookup, template_key, now)
+            tier = "template" if response is not None else None
+        return self._counted(response, tier)
+
+    def _counted(
+        self, response: Optional[Dict[str, Any]], tier: Optional[str]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        with self._lock:
+            if response is None:
+                self.counters["misses"] += 1
+                return (None, None)
+            self.counters["hits"] += 1
+            self.counters[f"{tier}_hits"] += 1
+        return (dict(response), tier)
+
+    def _lookup(
+        self, key: str, now: float
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        response, tier = self._memory_lookup(key, now)
+        if response is None and self._db is not None:
+            return self._disk_lookup(key, now)
+        return (response, tier)
+
+    def _memory_lookup(
+        self, key: str, now: float
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return (None, None)
+            created, response = entry
+            if not self._expired(created, now):
+                self._memory.move_to_end(key)
+                return (response, "memory")
+            del self._memory[key]
+            self.counters["expired"] += 1
+        return (None, None)
+
+    def _disk_lookup(
+        self, key: str, now: float
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        with self._db_lock:
+            if self._db is None:
+                return (None, None)
+            try:
+                row = self._db.execute(
+                    "SELECT created, response FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._expired(row[0], now):
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            except Exception:
+                logger.exception("Response cache disk lookup failed")
+                row = None
+        if row is None:
+            return (None, None)
+        created, payload = row
+        with self._lock:
+            if self._expired(created, now):
+                self.counters["expired"] += 1
+                return (None, None)
+            try:
+                response = json.loads(payload)
+            except Exception:
+                response = None
+            if not isinstance(response, dict):
+                return (None, None)
+            self._remember(key, created, response)
+        return (response, "disk")
+
+    def get_near(self, near_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the most recent in-memory response stored under near_key, if
+        any. Does not touch the hit/miss counters or LRU order.
+        """
+        now = time.time()
+        with self._lock:
+            key = self._near.get(near_key)
+            entry = self._memory.get(key) if key is not None else None
+            if entry is None:
+                self._near.pop(near_key, None)
+                return None
+            created, response = entry
+            if self._expired(created, now):
+                return None
+            self.counters["near_hits"] += 1
+            return dict(response)
+
+    def put(
+        self, key: str, response: Dict[str, Any], near_key: Optional[str] = None
+    ) -> bool:
+        """
+        Store a response in both tiers. Returns False if it was not cacheable.
+        """
+        created = self._store_memory(key, response, near_key)
+        if created is None:
+            return False
+        if self._db is not None:
+            self._store_disk(key, created, response)
+        return True
+
+    async def aput(
+        self, key: str, response: Dict[str, Any], near_key: Optional[str] = None
+    ) -> bool:
+        """
+        put() for the event loop: the disk write runs on a worker thread.
+        """
+        created = self._store_memory(key, response, near_key)
+        if created is None:
+            return False
+        if self._db is not None:
+            await asyncio.to_thread(self._store_disk, key, created, response)
+        return True
+
+    def _store_memory(
+        self, key: str, response: Dict[str, Any], near_key: Optional[str]
+    ) -> Optional[float]:
+        if not is_cacheable(response):
+            return None
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, dict(response))
+            if near_key is not None:
+                self._near[near_key] = key
+                self._near.move_to_end(near_key)
+                while len(self._near) > self.max_entries:
+                    self._near.popitem(last=False)
+            self.counters["stores"] += 1
+        return created
+
+    def _store_disk(self, key: str, created: float, response: Dict[str, Any]) -> None:
+        payload = json.dumps(response, ensure_ascii=False)
+        with self._db_lock:
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, created, response) VALUES (?, ?, ?)",
+                    (key, created, payload),
+                )
+                self._disk_writes += 1
+                # trimming scans the index, so only do it every so often
+                if self._disk_writes % 256 == 0:
+                    self._trim_disk(created)
+                self._db.commit()
+            except Exception:
+                logger.exception("Response cache disk store failed")
+
+    def _remember(self, key: str, created: float, response: Dict[str, Any]) -> None:
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _trim_disk(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+            )
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = f"{(stats['hits'] / lookups * 100) if lookups else 0:.1f}%"
+        return stats
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                try:
+                    self._trim_disk(time.time())
+                    self._db.commit()
+                    self._db.close()
+                except Exception:
+                    pass
+                self._db = None
@@ -0,0 +1,231 @@
+# python
+"""
+autopot/llm/command_template.py
+Command templates for the response cache. Bot commands differ in details
+that do not change what their simulated output looks like: the C2 address
+and URL, hex payloads, random file names, quoting and spacing. A template
+replaces those tokens with typed placeholders (<URL1>, <IP1>, <HEX1>,
+<NAME1>, and <FILE1> for a downloader's output file) and renders the words
+canonically, so such commands share one cached response. The response is
+stored with the same placeholders and filled in with the new command's
+values on a hit.
+"""
+import functools
+import posixpath
+import re
+import shlex
+import urllib.parse
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from ..shellwords import Op, tokenize
+
+# looks like a placeholder; lines or responses already containing one are
+# not templated, so filling in can never replace real text
+_PLACEHOLDER = re.compile(r"<[A-Z]+\d+>")
+_VOLATILE = re.compile(
+    r"(?P<URL>\b(?:https?|ftp|tftp)://[^\s'\"<>]+)"
+    r"|(?P<HEX>(?:\\x[0-9a-fA-F]{2}){4,}|(?<![0-9A-Za-z])(?:0x)?[0-9a-fA-F]{16,}(?![0-9A-Za-z]))"
+    r"|(?P<IP>(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?::\d{1,5})?(?![\d.]))"
+    r"|(?P<NAME>(?<![0-9A-Za-z])[0-9A-Za-z]{6,}(?![0-9A-Za-z]))"
+)
+# mixed letters and digits that are not random
+_STABLE_NAMES = frozenset(
+    "aarch64 mips64 mips64el ppc64le x86_64 sha1sum sha256 sha256sum sha512 sha512sum "
+    "base64 i386 i686 armv7l armv6l".split()
+)
+_SEPARATORS = frozenset((";", "&", "&&", "||", "|", "\n", "("))
+_REDIRECTS = frozenset((">", ">>", "<", ">&", "&>"))
+# shortest URL file name bound on its own; shorter ones match too much text
+_MIN_FILE = 3
+# commands whose output is the content of the files they name: their
+# operands are never random names, `cat passwd1` and `cat passwd2` differ
+_READERS = frozenset(
+    "cat head tail more less strings hexdump od xxd grep egrep fgrep wc md5sum sha1sum "
+    "sha256sum base64 file stat".split()
+)
+# downloader -> options whose value is the output file
+_OUTPUT_OPTIONS = {
+    "wget": ("-O", "--output-document"),
+    "curl": ("-o", "--output"),
+}
+# where a bound value may stand in a response: values bound from the command
+# line wherever they appear as a whole word, a URL's host as a whole host
+# name, a file name only on its own rather than as a path component
+_CONTEXTS = {
+    "HOST": (r"(?<![\w.-])", r"(?![\w-]|\.\w)"),
+    "FILE": (r"(?<![\w./-])", r"(?![\w/-]|\.\w)"),
+}
+_WORD = (r"(?<![\w-])", r"(?![\w-])")
+
+
+def _random_name(text: str) -> bool:
+    # a word with a number before or after it (admin01, passwd123) is not
+    # random; letters and digits interleaved (k8s7d3x1) are
+    if re.fullmatch(r"[A-Za-z]+\d+|\d+[A-Za-z]+", text):
+        return False
+    digits = sum(ch.isdigit() for ch in text)
+    return digits >= 2 and len(text) - digits >= 2 and text.lower() not in _STABLE_NAMES
+
+
+def _command_name(argv: List[str]) -> str:
+    if not argv:
+        return ""
+    name = posixpath.basename(argv[0])
+    if name == "busybox" and len(argv) > 1:
+        # `busybox wget ...` runs the applet
+        return posixpath.basename(argv[1])
+    return name
+
+
+def _kind(placeholder: str) -> str:
+    return placeholder.strip("<>").rstrip("0123456789")
+
+
+class Template(NamedTuple):
+    text: str
+    # (placeholder, value in the command), in order of first appearance;
+    # the host and file name of each URL are bound as HOSTn and FILEn, a
+    # downloader's output file as FILEn
+    bindings: Tuple[Tuple[str, str], ...]
+
+    def fill(self, text: str) -> str:
+        values = dict(self.bindings)
+        return _PLACEHOLDER.sub(lambda m: values.get(m.group(0), m.group(0)), text)
+
+    def abstract(self, text: str) -> Optional[str]:
+        """
+        text with this command's values replaced by their placeholders, or
+        None when it already contains placeholder-like strings.
+        """
+        if _PLACEHOLDER.search(text):
+            return None
+        if not self.bindings:
+            return text
+        placeholders: Dict[str, str] = {}
+        for placeholder, value in self.bindings:
+            placeholders.setdefault(value, placeholder)
+        # longest first, so a URL is replaced before the host inside it; each
+        # value only where it stands in the role it had in the command, so a
+        # URL's file name `bin` leaves /usr/bin/wget alone
+        alternatives = []
+        for value in sorted(placeholders, key=len, reverse=True):
+            before, after = _CONTEXTS.get(_kind(placeholders[value]), _WORD)
+            alternatives.append(f"{before}{re.escape(value)}{after}")
+        pattern = re.compile("|".join(alternatives))
+        return pattern.sub(lambda m: placeholders[m.group(0)], text)
+
+
+@functools.lru_cache(maxsize=4096)
+def template_command(line: str) -> Optional[Template]:
+    """
+    The template of a command line, split with the router's shell
+    tokenizer. None when the line cannot be tokenized, uses variables or
+    command substitution (their values are not visible here) or already
+    contains placeholder-like text. The host and file name of a URL and
+    a downloader's output file are bound for the response only.
+    """
+    if "$" in line or "`" in line or _PLACEHOLDER.search(line):
+        return None
+    try:
+        tokens = tokenize(line)
+    except ValueError:
+        return None
+
+    placeholders: Dict[Tuple[str, str], str] = {}
+    bindings: List[Tuple[str, str]] = []
+
+    def bind(kind: str, value: str) -> str:
+        if (kind, value) not in placeholders:
+            count = sum(1 for k, _ in placeholders if k == kind) + 1
+            placeholders[(kind, value)] = f"<{kind}{count}>"
+            bindings.append((placeholders[(kind, value)], value))
+        return placeholders[(kind, value)]
+
+    def replace(m: "re.Match[str]", names: bool) -> str:
+        kind, value = m.lastgroup, m.group(0)
+        if kind == "NAME" and not (names and _random_name(value)):
+            return value
+        placeholder = bind(kind, value)
+        if kind == "URL":
+            parts = urllib.parse.urlsplit(value)
+            if parts.hostname:
+                bind("HOST", parts.hostname)
+            name = posixpath.basename(parts.path)
+            if len(name) >= _MIN_FILE:
+                bind("FILE", name)
+        return placeholder
+
+    def output_file(command: str, previous: str, word: str) -> Optional[str]:
+        """
+        The downloader output file word names: the value of `-O FILE`,
+        `-OFILE` or `--output-document=FILE`, not stdout (`-`).
+        """
+        value: Optional[str] = None
+        for option in _OUTPUT_OPTIONS.get(command, ()):
+            joined = option + "=" if option.startswith("--") else option
+            if previous == option:
+                value = word
+            elif word.startswith(joined) and len(word) > len(joined):
+                value = word[len(joined) :]
+        return value if value and value != "-" and len(value) >= _MIN_FILE else None
+
+    parts: List[str] = []
+    # words of the current simple command, redirect targets left out
+    argv: List[str] = []
+    target_next = False
+    for token, _, _ in tokens:
+        if isinstance(token, Op):
+            parts.append(token.text if token.fd is None else f"{token.fd}{token.text}")
+            if token.text in _SEPARATORS:
+                argv = []
+            elif token.text in _REDIRECTS:
+                target_next = True
+            continue
+        word = token.text
+        command = _command_name(argv)
+        output = None if target_next or not argv else output_file(command, argv[-1], word)
+        if output is not None:
+            # a downloader's output file: its name does not change what the
+            # download prints beyond the name itself
+            text = word[: len(word) - len(output)] + bind("FILE", output)
+        else:
+            # a command name is only random when it is a path: `python3`
+            # stays literal, `./k8s7d3x1` does not; operands of commands
+            # printing file contents are never random
+            if target_next:
+                names = True
+            elif not argv:
+                names = "/" in word
+            else:
+                names = command not in _READERS
+            text = _VOLATILE.sub(lambda m: replace(m, names), word)
+        # unquoted wildcards stay bare so `ls *` and `ls '*'` differ
+        parts.append(text if token.pattern is not None else shlex.quote(text))
+        if target_next:
+            target_next = False
+        else:
+            argv.append(word)
+    return Template(" ".join(parts), tuple(bindings))
+
+
+def abstract_response(template: Template, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The response as stored under the template's key, or None when its
+    output cannot be templated.
+    """
+    templated = dict(response)
+    for field in ("stdout", "stderr"):
+        if isinstance(response.get(field), str):
+            text = template.abstract(response[field])
+            if text is None:
+                return None
+            templated[field] = text
+    return templated
+
+
+def fill_response(template: Template, response: Dict[str, Any]) -> Dict[str, Any]:
+    filled = dict(response)
+    for field in ("stdout", "stderr"):
+        if isinstance(response.get(field), str):
+            filled[field] = template.fill(response[field])
+    return filled
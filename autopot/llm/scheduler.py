@@ -0,0 +1,131 @@
+# python
+"""
+autopot/llm/scheduler.py
+Process-wide admission control for LLM calls: a concurrency cap, a bounded
+FIFO wait queue and a per-request queue deadline.
+"""
+import asyncio
+import collections
+import contextlib
+import time
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is not admitted. `reason` is "queue_full" when the
+    wait queue was already at capacity and "deadline" when the request waited
+    longer than its queue deadline.
+    """
+
+    def __init__(self, reason: str, waited_ms: float = 0.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.waited_ms = waited_ms
+
+
+class LLMScheduler:
+    """
+    Admit at most max_concurrency LLM calls at once. Further requests wait in
+    FIFO order; once max_queue requests are waiting, new ones are rejected
+    immediately so a scanning burst degrades instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queue: int = 256,
+        queue_timeout: Optional[float] = 10.0,
+    ):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque["asyncio.Future[None]"] = collections.deque()
+        self.counters: Dict[str, Any] = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_queue_full": 0,
+            "rejected_deadline": 0,
+            "max_queue_depth": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[float]:
+        """
+        Hold an LLM slot for the duration of the block. Yields the time spent
+        queueing in milliseconds. Raises AdmissionRejected if not admitted.
+        """
+        waited_ms = await self._acquire(self.queue_timeout if timeout is None else timeout)
+        try:
+            yield waited_ms
+        finally:
+            self._release()
+
+    async def _acquire(self, timeout: Optional[float]) -> float:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.counters["admitted"] += 1
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            self.counters["rejected_queue_full"] += 1
+            raise AdmissionRejected("queue_full")
+
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.counters["queued"] += 1
+        self.counters["max_queue_depth"] = max(
+            self.counters["max_queue_depth"], len(self._waiters)
+        )
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # the slot was handed over just as we gave up; pass it on
+                self._release()
+            else:
+                future.cancel()
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            waited_ms = (time.monotonic() - start) * 1000
+            self.counters["rejected_deadline"] += 1
+            raise AdmissionRejected("deadline", waited_ms) from None
+        waited_ms = (time.monotonic() - start) * 1000
+        self.counters["admitted"] += 1
+        self.counters["wait_ms_total"] += waited_ms
+        self.counters["wait_ms_max"] = max(self.counters["wait_ms_max"], waited_ms)
+        return waited_ms
+
+    def _release(self) -> None:
+        # hand the slot straight to the oldest live waiter, keeping _active as is
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.counters)
+        stats["active"] = self._active
+        stats["queue_depth"] = len(self._waiters)
+        queued = stats["queued"]
+        stats["wait_ms_avg"] = round(stats["wait_ms_total"] / queued, 1) if queued else 0.0
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 1)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 1)
+        return stats
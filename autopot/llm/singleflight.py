@@ -0,0 +1,77 @@
+# python
+"""
+autopot/llm/singleflight.py
+Coalesce concurrent identical simulate requests into one in-flight call.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time. Callers that arrive while a call
+    for the same key is in flight await the same future instead of starting
+    their own, and all of them receive its result (or exception).
+
+    Counters: `calls` is every do() invocation, `executed` the calls that
+    actually ran, `collapsed` the ones served by another caller's call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self._waiters: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {"calls": 0, "executed": 0, "collapsed": 0}
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Return (result, shared) where shared is True when the result came from
+        a call started by another caller.
+
+        The call runs in its own task and every caller awaits it through
+        asyncio.shield, so a session that disconnects mid-call does not cancel
+        the result for the others. It is cancelled only when every caller
+        waiting on it has been cancelled.
+        """
+        self.counters["calls"] += 1
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.counters["collapsed"] += 1
+        else:
+            self.counters["executed"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done: self._finished(key, done))
+        self._waiters[key] += 1
+        try:
+            return (await asyncio.shield(task), shared)
+        except asyncio.CancelledError:
+            # the last interested caller is gone: stop paying for the call
+            if self._inflight.get(key) is task and self._waiters[key] == 1:
+                task.cancel()
+                del self._inflight[key]
+                del self._waiters[key]
+            raise
+        finally:
+            if key in self._waiters and self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _finished(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            # mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self.counters)
+        stats["inflight"] = self.inflight
+        return stats
@@ -0,0 +1,135 @@
+# python
+"""
+autopot/llm/stream.py
+Incremental extraction of the `stdout` string from a streamed SIMULATE_SCHEMA
+JSON object, so output can be forwarded before the object is complete.
+"""
+from typing import List, Optional
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class StdoutFieldParser:
+    """
+    Feed raw model text chunks; get back the decoded characters of the
+    top-level "stdout" value as they arrive.
+
+    The scanner tracks string/escape state and object depth so a "stdout"
+    mentioned inside another value (or text outside the object, such as a
+    markdown fence) is ignored. Escapes split across chunks are held back
+    until complete.
+    """
+
+    def __init__(self, field: str = "stdout"):
+        self.field = field
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_key: Optional[str] = None
+        self._awaiting_value = False
+        self._in_value = False
+        self._pending = ""
+        self._high_surrogate: Optional[int] = None
+
+    def feed(self, chunk: str) -> str:
+        if self.done or not chunk:
+            return ""
+        out: List[str] = []
+        text = self._pending + chunk
+        self._pending = ""
+        i = 0
+        n = len(text)
+        while i < n:
+            ch = text[i]
+            if self._in_value:
+                if ch == "\\":
+                    if i + 1 >= n:
+                        self._pending = text[i:]
+                        break
+                    esc = text[i + 1]
+                    if esc == "u":
+                        if i + 6 > n:
+                            self._pending = text[i:]
+                            break
+                        try:
+                            code = int(text[i + 2 : i + 6], 16)
+                        except ValueError:
+                            code = 0xFFFD
+                        out.append(self._decode_codepoint(code))
+                        i += 6
+                        continue
+                    out.append(_SIMPLE_ESCAPES.get(esc, esc))
+                    i += 2
+                    continue
+                if ch == '"':
+                    self._in_value = False
+                    self.done = True
+                    break
+                out.append(ch)
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._string.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._string.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._awaiting_value:
+                        self._last_key = "".join(self._string)
+                    else:
+                        self._last_key = None
+                        self._awaiting_value = False
+                    self._string = []
+                else:
+                    self._string.append(ch)
+                i += 1
+                continue
+
+            if ch == '"':
+                if self._awaiting_value and self._depth == 1 and self._last_key == self.field:
+                    self._in_value = True
+                    self._awaiting_value = False
+                else:
+                    self._in_string = True
+            elif ch == ":":
+                self._awaiting_value = self._depth == 1 and self._last_key is not None
+            elif ch in "{[":
+                self._depth += 1
+                self._awaiting_value = False
+            elif ch in "}]":
+                self._depth -= 1
+            elif ch == ",":
+                self._last_key = None
+                self._awaiting_value = False
+            elif not ch.isspace() and self._depth == 1:
+                # a non-string value (number, literal) ends the pending key
+                self._awaiting_value = False
+            i += 1
+        return "".join(out)
+
+    def _decode_codepoint(self, code: int) -> str:
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            high, self._high_surrogate = self._high_surrogate, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        self._high_surrogate = None
+        if 0xD800 <= code <= 0xDFFF:
+            return "�"
+        return chr(code)
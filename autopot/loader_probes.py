@@ -0,0 +1,290 @@
+# python
+"""
+autopot/loader_probes.py
+Fast path for Mirai-style loaders on BusyBox hosts. A loader breaks out of
+the vendor CLI (enable, system, shell, sh), checks for BusyBox with a random
+applet name, finds a writable mount, tests it with an echo/cat/rm marker
+file, reads the ELF header of /bin/echo to pick a binary, drops it with
+`echo -ne` or a downloader and runs it. Each step is classified by patterns
+compiled at import into a forward-only stage machine and answered from a
+small per-session state holding the files written outside the home tree.
+"""
+import posixpath
+import re
+import struct
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from .host_profile import HostProfile
+
+STAGES = ("login", "shell", "probe", "recon", "drop", "exec")
+
+# (stage a command line signals, pattern it fully matches); first match wins
+_SIGNALS = tuple(
+    (stage, re.compile(pattern))
+    for stage, pattern in (
+        ("shell", r"enable|system|shell|linuxshell|sh"),
+        ("recon", r"ps|uname(?: .*)?|cat /proc/\S+|cat /bin/\S+|wget|tftp|ftpget"),
+        ("drop", r"(?:cp|chmod) \S+ \S+|echo -n?en? .*|(?:wget|tftp|ftpget) .+"),
+        ("exec", r"\./\S+(?: .*)?"),
+    )
+)
+# current stage -> signalled stage -> next stage; loaders only move forward
+_TRANSITIONS: Dict[str, Dict[str, str]] = {
+    stage: {signal: max(stage, signal, key=STAGES.index) for signal in STAGES}
+    for stage in STAGES
+}
+# vendor CLI commands loaders try before asking for a shell
+_CLI_ESCAPES = ("enable", "system", "shell", "linuxshell")
+
+# ELF class, data encoding and e_machine per machine type, for the header of
+# the host's binaries (what loaders read with `cat /bin/echo`)
+_ELF = {
+    "arm": (1, 1, 0x28, 0x05000002),
+    "arm64": (2, 1, 0xB7, 0),
+    "mips": (1, 2, 0x08, 0x70001007),
+    "x86": (2, 1, 0x3E, 0),
+}
+
+
+class Reply(NamedTuple):
+    output: str
+    # the new working directory after a cd into scratch space
+    cwd: Optional[str] = None
+
+
+class LoaderState:
+    """
+    Per-session loader progress: the stage reached, the token it uses to
+    find the end of each reply, and the scratch files it wrote under the
+    host's writable directories (path -> content).
+    """
+
+    def __init__(self, profile: HostProfile):
+        self.profile = profile
+        self.stage = "login"
+        self.token: Optional[str] = None
+        self.files: Dict[str, str] = {}
+        self.executable: Set[str] = set()
+
+    def advance(self, signal: str) -> Optional[str]:
+        """
+        Move to the stage a command signals; returns the new stage, or None
+        when the loader stays where it is.
+        """
+        nxt = _TRANSITIONS[self.stage][signal]
+        if nxt == self.stage:
+            return None
+        self.stage = nxt
+        return nxt
+
+    def observe(self, argv: List[str]) -> Optional[str]:
+        line = " ".join(argv)
+        for signal, pattern in _SIGNALS:
+            if pattern.fullmatch(line):
+                return self.advance(signal)
+        return None
+
+    def saw_token(self, token: str) -> Optional[str]:
+        self.token = token
+        return self.advance("probe")
+
+    def scratch_path(self, cwd: str, target: str) -> Optional[str]:
+        """
+        Absolute path of target when it lies in a writable directory outside
+        the home tree, else None.
+        """
+        path = posixpath.normpath(posixpath.join(cwd, target))
+        if any(path == d or path.startswith(d + "/") for d in self.profile.writable_dirs):
+            return path
+        return None
+
+    def is_dir(self, path: str) -> bool:
+        return path in self.profile.writable_dirs or any(
+            name.startswith(path + "/") for name in self.files
+        )
+
+    def write(self, path: str, text: str, append: bool) -> Optional[str]:
+        if self.is_dir(path):
+            return f"-sh: can't create {path}: Is a directory"
+        self.files[path] = (self.files.get(path, "") if append else "") + text
+        return None
+
+    def read(self, path: str) -> Optional[str]:
+        if path in self.files:
+            return self.files[path]
+        if path in self.profile.binaries.values():
+            return elf_image(self.profile)
+        return None
+
+
+def elf_image(profile: HostProfile) -> str:
+    """
+    The start of one of the host's binaries: an ELF header for its machine
+    type, as a latin-1 string.
+    """
+    cls, data, machine, flags = _ELF[profile.arch.family]
+    if profile.arch.family == "mips" and profile.machine.endswith("el"):
+        data = 1
+    if profile.machine == "i686":
+        cls, machine = 1, 0x03
+    order = "<" if data == 1 else ">"
+    ident = b"\x7fELF" + bytes((cls, data, 1, 0)) + bytes(8)
+    if cls == 1:
+        fields = struct.pack(
+            order + "HHIIIIIHHHHHH", 2, machine, 1, 0x10074, 52, 0x5C20, flags, 52, 32, 5, 40, 20, 19
+        )
+    else:
+        fields = struct.pack(
+            order + "HHIQQQIHHHHHH", 2, machine, 1, 0x401020, 64, 0x5C20, flags, 64, 56, 5, 64, 20, 19
+        )
+    return (ident + fields).decode("latin-1")
+
+
+def _operands(args: List[str]) -> List[str]:
+    return [arg for arg in args if not arg.startswith("-") or arg == "-"]
+
+
+def _cat(state: LoaderState, cwd: str, args: List[str]) -> Optional[Reply]:
+    if len(_operands(args)) != len(args) or not args:
+        return None
+    out: List[str] = []
+    for operand in args:
+        path = state.scratch_path(cwd, operand)
+        content = state.read(path) if path else state.read(operand)
+        if content is None:
+            if path is None:
+                return None
+            content = f"cat: can't open '{operand}': No such file or directory\n"
+        out.append(content)
+    return Reply("".join(out))
+
+
+def _rm(state: LoaderState, cwd: str, args: List[str]) -> Optional[Reply]:
+    force = any(arg.startswith("-") and "f" in arg for arg in args)
+    paths = [(operand, state.scratch_path(cwd, operand)) for operand in _operands(args)]
+    if not paths or any(path is None for _, path in paths):
+        return None
+    errors = []
+    for operand, path in paths:
+        if path in state.files:
+            del state.files[path]
+            state.executable.discard(path)
+        elif not force:
+            errors.append(f"rm: can't remove '{operand}': No such file or directory")
+    return Reply("\n".join(errors))
+
+
+def _cp(state: LoaderState, cwd: str, args: List[str]) -> Optional[Reply]:
+    operands = _operands(args)
+    if len(operands) != 2:
+        return None
+    source, target = operands
+    dest = state.scratch_path(cwd, target)
+    if dest is None:
+        return None
+    content = state.read(state.scratch_path(cwd, source) or source)
+    if content is None:
+        return Reply(f"cp: can't stat '{source}': No such file or directory")
+    if state.is_dir(dest):
+        dest = posixpath.join(dest, posixpath.basename(source))
+    state.files[dest] = content
+    return Reply("")
+
+
+def _chmod(state: LoaderState, cwd: str, args: List[str]) -> Optional[Reply]:
+    operands = _operands(args)
+    if len(operands) < 2:
+        return None
+    mode, targets = operands[0], operands[1:]
+    if re.fullmatch(r"[0-7]{1,4}", mode):
+        executable = bool(int(mode, 8) & 0o111)
+    elif re.fullmatch(r"[ugoa]*[+=-][rwx]+", mode):
+        executable = "x" in mode and "-" not in mode
+    else:
+        return None
+    paths = [(operand, state.scratch_path(cwd, operand)) for operand in targets]
+    if any(path is None for _, path in paths):
+        return None
+    errors = []
+    for operand, path in paths:
+        if path not in state.files:
+            errors.append(f"chmod: {operand}: No such file or directory")
+        elif executable:
+            state.executable.add(path)
+        else:
+            state.executable.discard(path)
+    return Reply("\n".join(errors))
+
+
+def _touch(state: LoaderState, cwd: str, args: List[str]) -> Optional[Reply]:
+    paths = [state.scratch_path(cwd, operand) for operand in _operands(args)]
+    if not paths or None in paths:
+        return None
+    for path in paths:
+        state.files.setdefault(path, "")
+    return Reply("")
+
+
+def _cd(state: LoaderState, cwd: str, args: List[str]) -> Optional[Reply]:
+    if len(args) != 1:
+        return None
+    path = state.scratch_path(cwd, args[0])
+    if path is None:
+        return None
+    if not state.is_dir(path):
+        return Reply(f"-sh: cd: can't cd to {args[0]}")
+    return Reply("", cwd=path)
+
+
+def _ls(state: LoaderState, cwd: str, args: List[str]) -> Optional[Reply]:
+    # only plain listings of tmpfs scratch dirs; /dev is full of device
+    # nodes the state does not model, so it is simulated like other options
+    if len(args) > 1 or any(arg.startswith("-") for arg in args):
+        return None
+    path = state.scratch_path(cwd, args[0] if args else ".")
+    if path is None or path == "/dev" or path.startswith("/dev/"):
+        return None
+    if path in state.files:
+        return Reply(args[0])
+    if not state.is_dir(path):
+        return Reply(f"ls: {args[0] if args else path}: No such file or directory")
+    prefix = path + "/"
+    names = {name[len(prefix) :].split("/")[0] for name in state.files if name.startswith(prefix)}
+    return Reply("  ".join(sorted(names)))
+
+
+_COMMANDS: Dict[str, Callable[[LoaderState, str, List[str]], Optional[Reply]]] = {
+    "cat": _cat,
+    "rm": _rm,
+    "cp": _cp,
+    "chmod": _chmod,
+    "touch": _touch,
+    "cd": _cd,
+    "ls": _ls,
+}
+
+
+def answer(state: LoaderState, cwd: str, argv: List[str]) -> Optional[Reply]:
+    """
+    Reply to a loader step run in cwd, or None when the command does not
+    touch scratch space and takes the usual path.
+    """
+    cmd, args = argv[0], argv[1:]
+    if cmd in _CLI_ESCAPES and not args:
+        return Reply(f"-sh: {cmd}: not found")
+    if cmd == "sh" and not args:
+        return Reply("")
+    handler = _COMMANDS.get(cmd)
+    if handler is not None:
+        return handler(state, cwd, args)
+    if "/" in cmd:
+        path = state.scratch_path(cwd, cmd)
+        if path is None:
+            return None
+        if path not in state.files:
+            return Reply(f"-sh: {cmd}: not found")
+        if path not in state.executable:
+            return Reply(f"-sh: {cmd}: Permission denied")
+        # the dropped bot daemonizes and prints nothing
+        return Reply("")
+    return None
@@ -4,10 +4,14 @@ autopot/router.py
 Simple command router that dispatches to handlers or returns canned txtcmds.
 """
 import logging
+import re
 import shlex
+import urllib.parse
 import pathlib
 import asyncio
-from typing import Tuple, List, Optional, Dict, Any
+import contextlib
+import time
+from typing import Tuple, List, Optional, Dict, Any, AsyncIterator, Iterable
 from .session import Session
 from .scenario import ScenarioManager
 from .fs_snapshot import (
@@ -15,34 +19,196 @@ from .fs_snapshot import (
     BASE_FS_PATH_PARTS,
     ROOT_FS_PATH,
 )
+from .fs_glob import expand_pattern
+from .fs_overlay import FileSystemOverlay
+from .fs_ls import LsUsageError, default_perms, iter_ls, parse_ls_args
+from .fs_walk import UnsupportedExpression, iter_du, iter_find, iter_tree, parse_find
+from .handlers import HandlerRegistry, default_registry
+from .host_profile import HostProfile
+from .fs_context import DEFAULT_CONTEXT_BUDGET_TOKENS, select_fs_context, select_fs_delta
+from .fs_read import (
+    ReadSpec,
+    UnsupportedOption,
+    format_wc,
+    parse_head_tail,
+    parse_wc_args,
+    read_all,
+    read_head,
+    read_tail,
+    wc_counts,
+)
+from .content_gen import generate as generate_content
+from .content_store import ContentStore, node_content_key
 from .llm import LLMClient
+from .llm.cache import ResponseCache, make_cache_key, make_near_key, make_template_key
+from .llm.command_template import Template, abstract_response, fill_response, template_command
+from .llm.scheduler import AdmissionRejected, LLMScheduler
+from .llm.singleflight import SingleFlight
+from .busybox import is_busybox, resolve as resolve_applet
+from .loader_probes import LoaderState, answer as answer_loader
+from .shell_parse import Command, Pipeline, Redirect, Step, UnsupportedSyntax, is_simple, parse_line
+from .shellwords import Word, expand_params, split_words, strip_comment
+from .text_filters import Filter, parse_filter
 
 logger = logging.getLogger(__name__)
 
 TXT_CMD_MAP = {
     "pwd": "pwd.txt",
-    "ls": "ls.txt",
     "df": "df.txt",
     "ps": "ps.txt",
     "busybox": "busybox.txt",
-    # "tree": "tree.txt",  # Disabled to test LLM generation
-    # uname is handled by a real handler for `uname -a`
+    # ls, tree, find and du are rendered from the snapshot (see fs_ls, fs_walk);
+    # paths outside the tree are simulated
+    # uname, free, w, ... are native handlers built on the scenario's uname.txt
     # cat /etc/passwd -> etc_passwd.txt
 }
 
+# synchronous builtins answered from the session's filesystem: command -> Router method
+_BUILTINS = {
+    "pwd": "_handle_pwd",
+    "cd": "_handle_cd",
+    "ls": "_handle_ls",
+    "mkdir": "_handle_mkdir",
+    "rmdir": "_handle_rmdir",
+    "rm": "_handle_rm",
+    "touch": "_handle_touch",
+    "chmod": "_handle_chmod",
+    "echo": "_handle_echo",
+    "find": "_handle_find",
+    "tree": "_handle_tree",
+    "du": "_handle_du",
+}
+
+_PERM_CLASSES = {"u": (0,), "g": (3,), "o": (6,), "a": (0, 3, 6)}
+
+# commands answered from file contents by _handle_read
+_READ_COMMANDS = ("cat", "head", "tail", "wc")
+
+# longest compound line run segment by segment; longer ones are simulated whole
+_MAX_SEGMENTS = 32
+# redirection destinations besides files
+_STDOUT, _STDERR, _DEVNULL = "stdout", "stderr", "null"
+_ECHO_ESCAPES = {"a": "\a", "b": "\b", "e": "\x1b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v", "\\": "\\"}
+
+
+def _echo_escape(m: "re.Match[str]") -> str:
+    code = m.group(1)
+    if code[0] == "0":
+        return chr(int(code[1:] or "0", 8))
+    if code[0] == "x" and len(code) > 1:
+        return chr(int(code[1:], 16))
+    return _ECHO_ESCAPES.get(code, m.group(0))
 
-DEFAULT_DIR_PERMS = "drwxr-xr-x"
-DEFAULT_FILE_PERMS = "-rw-r--r--"
-DEFAULT_OWNER = "user"
-DEFAULT_GROUP = "user"
-DEFAULT_TIMESTAMP = "Jan 01 00:00"
 
+def echo_text(args: List[str]) -> str:
+    """
+    What the echo builtin prints, trailing newline included: leading -n,
+    -e and -E options (and combinations) are honoured, \\c stops output.
+    """
+    newline, escapes = True, False
+    while args and re.fullmatch(r"-[neE]+", args[0]):
+        newline = newline and "n" not in args[0]
+        for letter in args[0][1:]:
+            escapes = (escapes or letter == "e") and letter != "E"
+        args = args[1:]
+    text = " ".join(args)
+    if escapes:
+        cut = re.search(r"\\c", text)
+        if cut:
+            text, newline = text[: cut.start()], False
+        text = re.sub(r"\\(0[0-7]{0,3}|x[0-9a-fA-F]{1,2}|.)", _echo_escape, text)
+    return text + ("\n" if newline else "")
 
-def _format_ls_entry(node: dict, name: str) -> str:
-    perms = DEFAULT_DIR_PERMS if node.get("type") == "dir" else DEFAULT_FILE_PERMS
-    links = 2 if node.get("type") == "dir" else 1
-    size = node.get("size", 0) or 0
-    return f"{perms} {links:>3} {DEFAULT_OWNER} {DEFAULT_GROUP} {size:>8} {DEFAULT_TIMESTAMP} {name}"
+
+def _exit_status(cmd: str, output: str) -> int:
+    """
+    Best guess at a command's exit status from its output: 127 for an
+    unknown command, 1 when it printed an error line, 0 otherwise.
+    """
+    if f"{cmd}: command not found" in output or f"{cmd}: not found" in output:
+        return 127
+    return 1 if any(_is_error_line(cmd, line) for line in output.splitlines()) else 0
+
+
+def _is_error_line(cmd: str, line: str) -> bool:
+    if not cmd:
+        return False
+    return line.startswith((f"{cmd}: ", "bash: ", "sh: ", "-sh: ")) or line.rstrip("\n").endswith(
+        ": applet not found"
+    )
+
+
+def _split_streams(cmd: str, output: str) -> Tuple[str, str]:
+    """
+    Separate error lines (what the command would print on stderr) from
+    the rest of its output.
+    """
+    out: List[str] = []
+    err: List[str] = []
+    for line in output.splitlines(keepends=True):
+        (err if _is_error_line(cmd, line) else out).append(line)
+    return "".join(out), "".join(err)
+
+
+def _apply_mode(perms: str, mode: str) -> Optional[str]:
+    """
+    Apply a chmod mode (octal like 755 or symbolic like u+x,go-w) to an
+    ls-style permission string. Returns None for modes chmod would reject.
+    """
+    if re.fullmatch(r"[0-7]{1,4}", mode):
+        bits = int(mode, 8) & 0o777
+        return perms[0] + "".join(
+            "rwx"[i % 3] if bits & (0o400 >> i) else "-" for i in range(9)
+        )
+    slots = list(perms[1:])
+    for clause in mode.split(","):
+        m = re.fullmatch(r"([ugoa]*)([-+=])([rwxX]*)", clause)
+        if not m:
+            return None
+        who, op, what = m.groups()
+        what = what.replace("X", "x")
+        for cls in who or "a":
+            for base in _PERM_CLASSES[cls]:
+                for offset, letter in enumerate("rwx"):
+                    if op == "=":
+                        slots[base + offset] = letter if letter in what else "-"
+                    elif letter in what:
+                        slots[base + offset] = letter if op == "+" else "-"
+    return perms[0] + "".join(slots)
+
+
+def _split_options(args: List[str]) -> Tuple[set, List[str]]:
+    """
+    Separate `-rf`/`--force` style options from operands; `--` ends options.
+    Short options are returned as single letters, long ones without dashes.
+    """
+    opts: set = set()
+    operands: List[str] = []
+    only_operands = False
+    for arg in args:
+        if only_operands or arg == "-" or not arg.startswith("-"):
+            operands.append(arg)
+        elif arg == "--":
+            only_operands = True
+        elif arg.startswith("--"):
+            opts.add(arg[2:])
+        else:
+            opts.update(arg[1:])
+    return opts, operands
+
+
+def new_ensemble_stats() -> Dict[str, Any]:
+    return {
+        "total_commands": 0,
+        "primary_wins": 0,
+        "secondary_wins": 0,
+        "both_failed": 0,
+        "primary_calls": 0,
+        "secondary_calls": 0,
+        "primary_latency_ms_total": 0.0,
+        "secondary_latency_ms_total": 0.0,
+        "last_logged": 0,  # Track when we last logged stats
+    }
 
 
 class Router:
@@ -54,6 +220,18 @@ class Router:
         llm_client: Optional[LLMClient] = None,
         ensemble_mode: bool = False,
         llm_client_secondary: Optional[LLMClient] = None,
+        response_cache: Optional[ResponseCache] = None,
+        fs_context_budget: Optional[int] = DEFAULT_CONTEXT_BUDGET_TOKENS,
+        stream_llm: bool = False,
+        ensemble_policy: str = "best",
+        ensemble_min_score: int = 12,
+        ensemble_log_late: bool = False,
+        ensemble_stats: Optional[Dict[str, Any]] = None,
+        singleflight: Optional[SingleFlight] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        llm_timeout: Optional[float] = None,
+        content_store: Optional[ContentStore] = None,
+        handlers: Optional[HandlerRegistry] = None,
     ):
         # Keep txtcmds_dir param for backward compatibility but prefer scenario assets.
         self.txtcmds_dir = pathlib.Path(txtcmds_dir) if txtcmds_dir else None
@@ -62,15 +240,38 @@ class Router:
         self.llm_client = llm_client
         self.ensemble_mode = ensemble_mode
         self.llm_client_secondary = llm_client_secondary
-        
-        # Ensemble statistics tracking
-        self.ensemble_stats = {
-            "total_commands": 0,
-            "primary_wins": 0,
-            "secondary_wins": 0,
-            "both_failed": 0,
-            "last_logged": 0,  # Track when we last logged stats
-        }
+        # Native command handlers (autopot/handlers); shared by every session.
+        self.handlers = handlers if handlers is not None else default_registry()
+        # Shared across sessions by the server; None disables response caching.
+        self.response_cache = response_cache
+        # Identical simulate requests in flight at the same time share one call;
+        # the server passes one instance so this works across sessions.
+        self.singleflight = singleflight if singleflight is not None else SingleFlight()
+        # Process-wide admission control for LLM calls; None admits everything.
+        self.scheduler = scheduler
+        # Seconds a simulated command may take (queueing included) before the
+        # fallback output is served; scenarios override it with `llm_timeout`
+        # in config.json. None waits indefinitely.
+        self.llm_timeout = llm_timeout
+        # Materialized file contents shared across sessions; None leaves
+        # reads of scenario files to the LLM every time.
+        self.content_store = content_store
+        # Token budget for the filesystem JSON in simulate prompts; None sends the whole tree.
+        self.fs_context_budget = fs_context_budget
+        # Forward simulated stdout to the client while the model is still generating.
+        self.stream_llm = stream_llm
+
+        # "best" waits for both models and picks the higher score; "race" returns
+        # the first response scoring at least ensemble_min_score.
+        self.ensemble_policy = ensemble_policy
+        self.ensemble_min_score = ensemble_min_score
+        # In race mode the slower call is cancelled; opt in to let it finish in
+        # the background (a full call's cost) and log it as llm.ensemble.late.
+        self.ensemble_log_late = ensemble_log_late
+        self._background_tasks: set = set()
+
+        # Ensemble statistics tracking (pass a shared dict to aggregate across sessions)
+        self.ensemble_stats = ensemble_stats if ensemble_stats is not None else new_ensemble_stats()
 
     async def dispatch(self, session: Session, line: str) -> Tuple[str, bool]:
         """
@@ -78,81 +279,417 @@ class Router:
         Do NOT execute any subprocesses. All outputs are from handlers or
         static files under txtcmds_dir.
         """
-        line = (line or "").strip()
+        line = strip_comment((line or "").strip())
 
         if not line:
             return ("", False)
 
+        steps = self._parse_compound(line)
+        if steps is not None:
+            return await self._run_compound(session, line, steps)
+
+        argv = self._expand_argv(session, line)
+        cmd = argv[0] if argv else line.split()[0]
+        result = await self._dispatch_local(session, line, argv) if argv is not None else None
+        if result is None:
+            result = await self._dispatch_llm(session, self._llm_line(line, argv), cmd)
+            self._record_download(session, argv or [], result[0])
+        session.last_status = _exit_status(cmd, result[0])
+        return result
+
+    async def dispatch_stream(
+        self, session: Session, line: str
+    ) -> AsyncIterator[Tuple[str, bool]]:
+        """
+        Like dispatch, but yield (chunk, truncated_so_far) pieces. When
+        streaming is enabled, LLM output is forwarded as the model generates
+        it; every other path yields its complete output once.
+        """
+        line = strip_comment((line or "").strip())
+        if not line:
+            yield ("", False)
+            return
+
+        steps = self._parse_compound(line)
+        if steps is not None:
+            yield await self._run_compound(session, line, steps)
+            return
+
+        argv = self._expand_argv(session, line)
+        cmd = argv[0] if argv else line.split()[0]
+        local = await self._dispatch_local(session, line, argv) if argv is not None else None
+        if local is not None:
+            session.last_status = _exit_status(cmd, local[0])
+            yield local
+            return
+        line = self._llm_line(line, argv)
+        if self._can_stream():
+            pieces: List[str] = []
+            async for piece in self._stream_with_llm(session, line, cmd):
+                pieces.append(piece[0])
+                yield piece
+            output = "".join(pieces)
+            self._record_download(session, argv or [], output)
+            session.last_status = _exit_status(cmd, output)
+            return
+        result = await self._dispatch_llm(session, line, cmd)
+        self._record_download(session, argv or [], result[0])
+        session.last_status = _exit_status(cmd, result[0])
+        yield result
+
+    def _parse_compound(self, line: str) -> Optional[List[Step]]:
+        """
+        The steps of a line that needs the interpreter (several commands, a
+        pipe or a redirection). None for a simple command and for syntax the
+        interpreter does not handle, which take the single-command path.
+        """
+        try:
+            steps = parse_line(line)
+        except UnsupportedSyntax:
+            return None
+        if not steps or is_simple(steps):
+            return None
+        if sum(len(step.pipeline.commands) for step in steps) > _MAX_SEGMENTS:
+            return None
+        return steps
+
+    async def _run_compound(self, session: Session, line: str, steps: List[Step]) -> Tuple[str, bool]:
+        """
+        Run a compound line step by step like sh: `a && b` runs b only if a
+        succeeded, `a || b` only if it failed, and `&` runs in the
+        foreground. Every command is resolved on its own (local paths first,
+        then the LLM), so each simulated segment is cached independently.
+        """
+        output: List[str] = []
+        segments: List[Dict[str, Any]] = []
+        status = 0
+        truncated = False
+        for step in steps:
+            if (step.connector == "&&" and status != 0) or (step.connector == "||" and status == 0):
+                continue
+            out, err, status, cut = await self._run_pipeline(session, step.pipeline, segments)
+            session.last_status = status
+            output.append(err + out)
+            truncated = truncated or cut
+        text = "".join(output)
+        if text.endswith("\n"):
+            text = text[:-1]
+        await session.log(
+            "command.segments", "shell", command=line, segments=segments, status=status
+        )
+        truncated = truncated or len(text.encode()) > self.max_output
+        return (text[: self.max_output], truncated)
+
+    async def _run_pipeline(
+        self, session: Session, pipeline: Pipeline, segments: List[Dict[str, Any]]
+    ) -> Tuple[str, str, int, bool]:
+        """
+        Run one pipeline and return (stdout, stderr, status, truncated).
+        Stages after the first must be native text filters; otherwise the
+        whole pipeline is simulated as one command.
+        """
+        stages: List[Tuple[Command, List[str], Optional[Filter]]] = []
+        for index, command in enumerate(pipeline.commands):
+            argv = self._expand_words(session, command.words)
+            redirects = self._expand_redirects(session, command.redirects)
+            if argv is None or redirects is None:
+                return await self._simulate_pipeline(session, pipeline, segments)
+            command = command._replace(redirects=redirects)
+            stage_filter: Optional[Filter] = None
+            if argv and (index or any(r.op == "<" for r in command.redirects)):
+                try:
+                    stage_filter = parse_filter(argv)
+                except UnsupportedOption:
+                    if index:
+                        return await self._simulate_pipeline(session, pipeline, segments)
+            stages.append((command, argv, stage_filter))
+
+        stdout = ""
+        stderr: List[str] = []
+        status = 0
+        truncated = False
+        for command, argv, stage_filter in stages:
+            inputs = [r for r in command.redirects if r.op == "<"]
+            if stage_filter is not None:
+                source = "filter"
+                data, error = stdout, None
+                if inputs:
+                    data, error = await self._read_redirect(session, inputs[-1].target.text)
+                if error is not None:
+                    out, err, status = "", error + "\n", 1
+                else:
+                    out, status = await asyncio.to_thread(stage_filter, data)
+                    err = ""
+            elif not argv:
+                # redirections alone (`>file`) only create their targets
+                out, err, status, source = "", "", 0, "local"
+            else:
+                out, cut, source = await self._run_command(session, command.text, argv)
+                truncated = truncated or cut
+                # errors of `busybox APPLET` carry the applet's name
+                name = argv[1] if is_busybox(argv[0]) and len(argv) > 1 else argv[0]
+                status = _exit_status(name, out)
+                out, err = _split_streams(name, out)
+            out, err, failed = self._apply_redirects(session, command.redirects, out, err)
+            if failed:
+                status = 1
+            stderr.append(err)
+            stdout = out
+            segments.append({"command": command.text, "source": source, "status": status})
+        return stdout, "".join(stderr), status, truncated
+
+    async def _simulate_pipeline(
+        self, session: Session, pipeline: Pipeline, segments: List[Dict[str, Any]]
+    ) -> Tuple[str, str, int, bool]:
+        words = pipeline.commands[0].words
+        cmd = words[0].text if words else ""
+        out, truncated = await self._dispatch_llm(session, pipeline.text, cmd)
+        if out and not out.endswith("\n"):
+            out += "\n"
+        status = _exit_status(cmd, out)
+        segments.append({"command": pipeline.text, "source": "llm", "status": status})
+        return out, "", status, truncated
+
+    async def _run_command(
+        self, session: Session, text: str, argv: List[str]
+    ) -> Tuple[str, bool, str]:
+        """
+        Output (newline-terminated when non-empty), truncated flag and source
+        ("local" or "llm") of one command of a compound line.
+        """
+        if is_busybox(argv[0]) and argv[1:2] == ["echo"]:
+            argv = argv[1:]
+        if argv[0] == "echo":
+            loader = self._loader(session)
+            if loader is not None:
+                await self._log_loader_stage(session, loader.observe(argv), argv)
+            # exact output, so `echo -n` and `echo ""` survive redirection
+            return (echo_text(argv[1:]), False, "local")
+        local = await self._dispatch_local(session, text, argv)
+        if local is not None:
+            out, truncated = local
+            source = "local"
+        else:
+            out, truncated = await self._dispatch_llm(
+                session, self._llm_line(text, argv), argv[0]
+            )
+            self._record_download(session, argv, out)
+            source = "llm"
+        if out and not out.endswith("\n"):
+            out += "\n"
+        return (out, truncated, source)
+
+    def _apply_redirects(
+        self, session: Session, redirects: List[Redirect], out: str, err: str
+    ) -> Tuple[str, str, bool]:
+        """
+        Route a command's stdout and stderr through its output redirections
+        (`>`, `>>`, `2>`, `2>&1`, `&>`). Returns what is left on (stdout,
+        stderr) and whether writing a target failed.
+        """
+        dest: Dict[int, Any] = {1: _STDOUT, 2: _STDERR}
+        files: Dict[Tuple[str, bool], List[str]] = {}
+        for redirect in redirects:
+            target = redirect.target.text
+            if redirect.op == "<":
+                continue
+            if redirect.op == ">&" and target in ("1", "2", "-"):
+                if redirect.fd in dest:
+                    dest[redirect.fd] = _DEVNULL if target == "-" else dest[int(target)]
+                continue
+            sink = (target, redirect.op == ">>")
+            files.setdefault(sink, [])
+            if redirect.op == "&>" or (redirect.op == ">&" and redirect.fd == 1):
+                dest[1] = dest[2] = sink
+            elif redirect.fd in dest:
+                dest[redirect.fd] = sink
+        streams: Dict[str, List[str]] = {_STDOUT: [], _STDERR: [], _DEVNULL: []}
+        for fd, text in ((1, out), (2, err)):
+            if isinstance(dest[fd], tuple):
+                files[dest[fd]].append(text)
+            else:
+                streams[dest[fd]].append(text)
+        errors = []
+        for (target, append), parts in files.items():
+            error = self._write_redirect(session, target, "".join(parts), append)
+            if error is not None:
+                errors.append(error + "\n")
+        return (
+            "".join(streams[_STDOUT]),
+            "".join(errors) + "".join(streams[_STDERR]),
+            bool(errors),
+        )
+
+    def _write_redirect(
+        self, session: Session, target: str, text: str, append: bool
+    ) -> Optional[str]:
+        """
+        Write redirected output into the session's filesystem, or a loader's
+        scratch files; output for /dev/null or other paths outside the tree
+        is discarded. Returns the shell's
+        error message when the target cannot be written.
+        """
+        if target == "/dev/null":
+            return None
+        loader = self._loader(session)
+        scratch = loader.scratch_path(session.cwd, target) if loader else None
+        if scratch is not None:
+            return loader.write(scratch, text, append)
+        fs = self._get_fs(session)
+        rel = self._rel_target(session, target) if fs else None
+        if rel is None:
+            return None
+        node = fs.get_node(rel)
+        parent = fs.get_node(rel[:-1]) if rel else None
+        if node is not None and node.get("type") == "dir":
+            return f"bash: {target}: Is a directory"
+        if node is None and (not parent or parent.get("type") != "dir"):
+            return f"bash: {target}: No such file or directory"
+        fs.write_file(rel, text, append=append)
+        return None
+
+    async def _read_redirect(self, session: Session, target: str) -> Tuple[str, Optional[str]]:
+        """
+        Content for `< file` (up to max_output) and the shell's error
+        message when the file cannot be read.
+        """
+        loader = self._loader(session)
+        scratch = loader.scratch_path(session.cwd, target) if loader else None
+        if scratch is not None:
+            content = loader.read(scratch)
+            if content is None:
+                return "", f"-sh: can't open '{target}': No such file or directory"
+            return content[: self.max_output], None
+        fs = self._get_fs(session)
+        rel = self._rel_target(session, target) if fs else None
+        node = fs.get_node(rel) if rel is not None else None
+        if node is None:
+            return "", f"bash: {target}: No such file or directory"
+        if node.get("type") == "dir":
+            return "", f"bash: {target}: Is a directory"
+        chunks = await self._file_chunks(session, fs, rel, node)
+        if chunks is None:
+            return "", None
+        return await asyncio.to_thread(read_all, chunks, self.max_output), None
+
+    def _split(self, line: str) -> List[str]:
         try:
-            argv: List[str] = shlex.split(line)
+            return shlex.split(line)
         except Exception:
             # fallback naive split if shlex fails
-            argv = line.split()
+            return line.split()
+
+    def _expand_argv(self, session: Session, line: str) -> Optional[List[str]]:
+        """
+        Split a line into words, expand parameters and expand unquoted
+        wildcards against the session's filesystem, like the shell would
+        before running a command. Words that match nothing (or point outside
+        the tree) stay as typed. None when the line refers to a parameter the
+        session has no value for, so it is simulated as typed.
+        """
+        try:
+            words = split_words(line)
+        except ValueError:
+            return line.split()
+        return self._expand_words(session, words)
+
+    def _llm_line(self, line: str, argv: Optional[List[str]]) -> str:
+        """
+        The command line to simulate: with the words the shell expanded, so
+        the model sees the files a glob matched rather than the pattern.
+        """
+        if argv and argv != self._split(line):
+            return shlex.join(argv)
+        return line
+
+    def _expand_words(self, session: Session, words: List[Word]) -> Optional[List[str]]:
+        if any(word.params for word in words):
+            values = self._shell_params(session)
+            expanded = [expand_params(word, values) for word in words]
+            if None in expanded:
+                return None
+            words = expanded
+        if not any(word.pattern for word in words):
+            return [word.text for word in words]
+        fs = self._get_fs(session)
+        cwd = self._rel_target(session, "")
+        argv: List[str] = []
+        for word in words:
+            matches = (
+                expand_pattern(fs, cwd, word.pattern)
+                if fs and cwd is not None and word.pattern
+                else None
+            )
+            argv.extend(matches or [word.text])
+        return argv
 
+    async def _dispatch_local(
+        self, session: Session, line: str, argv: List[str]
+    ) -> Optional[Tuple[str, bool]]:
+        """
+        Resolve a command from handlers, builtins or canned txtcmds.
+        Returns None when the command has to be simulated.
+        """
         cmd = argv[0] if argv else ""
-        if cmd == "id":
-            try:
-                from .handlers.id import run as id_run
+        if is_busybox(cmd) and len(argv) > 1:
+            applet = resolve_applet(self._host_profile(session), argv)
+            loader = self._loader(session)
+            if applet.unknown and loader is not None:
+                await self._log_loader_stage(session, loader.saw_token(argv[1]), argv)
+            if applet.output is not None:
+                return (applet.output, False)
+            # the applet runs like its own command
+            argv = applet.argv
+            cmd = argv[0]
 
-                out = await id_run(session, argv)
-            except Exception:
-                out = "uid=0(root) gid=0(root) groups=0(root)"
-            truncated = len(out.encode()) > self.max_output
-            return (out[: self.max_output], truncated)
-        if cmd == "whoami":
-            try:
-                from .handlers.whoami import run as whoami_run
+        loader = self._loader(session)
+        if loader is not None and argv:
+            await self._log_loader_stage(session, loader.observe(argv), argv)
+            reply = answer_loader(loader, session.cwd, argv)
+            if reply is not None:
+                if reply.cwd is not None:
+                    session.cwd = reply.cwd
+                truncated = len(reply.output.encode()) > self.max_output
+                return (reply.output[: self.max_output], truncated)
 
-                out = await whoami_run(session, argv)
-            except Exception:
-                out = session.username or "guest"
-            truncated = len(out.encode()) > self.max_output
-            return (out[: self.max_output], truncated)
-        if cmd == "history":
-            try:
-                from .handlers.history import run as history_run
+        # `/bin/cat` reads files like cat when that is where the host keeps it
+        name = cmd.rsplit("/", 1)[-1]
+        if name in _READ_COMMANDS and self._host_profile(session).binaries.get(name) == cmd:
+            argv = [name] + argv[1:]
+            cmd = name
 
-                out = await history_run(session, argv)
+        handler = self.handlers.resolve(cmd, self._handler_overrides(session))
+        if handler is not None:
+            self._host_profile(session)
+            try:
+                out = await self.handlers.call(handler, session, argv)
             except Exception:
-                out = "\n".join(session.history)
-            truncated = len(out.encode()) > self.max_output
-            return (out[: self.max_output], truncated)
-        # Special-case: uname -a -> handler
-        # if cmd == "uname":
-        #     # delegate to handler which returns a plausible string
-        #     try:
-        #         from .handlers.uname import run as uname_run
-        #         out = await uname_run(session, argv)
-        #     except Exception:
-        #         out = "Linux unknown 0.0.0 unknown x86_64"
-        #     truncated = len(out.encode()) > self.max_output
-        #     return (out[: self.max_output], truncated)
+                logger.exception("Handler %s failed for %s", handler.name, cmd)
+                out = None
+            if out is not None:
+                truncated = len(out.encode()) > self.max_output
+                return (out[: self.max_output], truncated)
 
         # Special-case: cat /etc/passwd
         if cmd == "cat" and len(argv) >= 2 and argv[1] in ("/etc/passwd", "etc/passwd"):
             # prefer scenario-specific etc_passwd.txt (includes scenarios/default)
-            p = None
-            try:
-                p = self.scenario_mgr.get_txtcmd_path(session, "etc_passwd")
-            except Exception:
-                p = None
-            if p:
-                return await self._read_txt_file(p)
+            canned = self._txtcmd_output(session, "etc_passwd")
             # no legacy top-level fallback anymore: return empty result
-            return ("", False)
+            return canned if canned is not None else ("", False)
 
         # Special-case: cat /etc/shadow
         if cmd == "cat" and len(argv) >= 2 and argv[1] in ("/etc/shadow", "etc/shadow"):
             # prefer scenario-specific etc_shadow.txt (includes scenarios/default)
-            p = None
-            try:
-                p = self.scenario_mgr.get_txtcmd_path(session, "etc_shadow")
-            except Exception:
-                p = None
-            if p:
-                return await self._read_txt_file(p)
+            canned = self._txtcmd_output(session, "etc_shadow")
             # no legacy top-level fallback anymore: return empty result
-            return ("", False)
+            return canned if canned is not None else ("", False)
+
+        if cmd in _READ_COMMANDS:
+            read = await self._handle_read(session, argv)
+            if read is not None:
+                out, _ = read
+                truncated = len(out.encode()) > self.max_output
+                return (out[: self.max_output], truncated)
 
         builtin = self._handle_builtin(session, argv)
         if builtin is not None:
@@ -163,28 +700,94 @@ class Router:
         # static mapping (with scenario overrides)
         if cmd in TXT_CMD_MAP:
             mapped = TXT_CMD_MAP[cmd]
-            name = mapped.rsplit(".", 1)[0]
-            p = None
-            try:
-                p = self.scenario_mgr.get_txtcmd_path(session, name)
-            except Exception:
-                p = None
-            if p:
-                return await self._read_txt_file(p)
+            canned = self._txtcmd_output(session, mapped.rsplit(".", 1)[0])
+            if canned is not None:
+                return canned
             # no legacy top-level fallback anymore: command not found
             return (f"sh: {cmd}: command not found", False)
 
         # try scenario-specific txtcmd for command
-        p = None
+        return self._txtcmd_output(session, cmd)
+
+    def _host_profile(self, session: Session) -> HostProfile:
+        if session.host_profile is None:
+            session.host_profile = self.scenario_mgr.load_host_profile(session)
+        return session.host_profile
+
+    def _expand_redirects(
+        self, session: Session, redirects: List[Redirect]
+    ) -> Optional[List[Redirect]]:
+        """
+        Redirections with parameters in their targets expanded; None like
+        _expand_words.
+        """
+        if not any(r.target.params for r in redirects):
+            return redirects
+        values = self._shell_params(session)
+        expanded: List[Redirect] = []
+        for redirect in redirects:
+            target = expand_params(redirect.target, values)
+            if target is None:
+                return None
+            expanded.append(redirect._replace(target=target))
+        return expanded
+
+    def _shell_params(self, session: Session) -> Dict[str, str]:
+        """
+        The parameters a login shell on the emulated host has set.
+        """
+        profile = self._host_profile(session)
+        shell = profile.binaries.get("bash") or "/bin/sh"
+        if profile.embedded:
+            path = "/bin:/sbin:/usr/bin:/usr/sbin"
+        else:
+            path = "/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin"
+        return {
+            "HOME": ROOT_FS_PATH,
+            "SHELL": shell,
+            "PATH": path,
+            "USER": session.username or "root",
+            "PWD": session.cwd,
+            "?": str(session.last_status),
+            "0": "-" + shell.rsplit("/", 1)[-1],
+        }
+
+    def _loader(self, session: Session) -> Optional[LoaderState]:
+        """
+        The session's loader state on BusyBox firmware hosts (embedded
+        profiles); None elsewhere, where the fast path is off.
+        """
+        if session.loader is None:
+            profile = self._host_profile(session)
+            if not profile.embedded:
+                return None
+            session.loader = LoaderState(profile)
+        return session.loader
+
+    async def _log_loader_stage(
+        self, session: Session, stage: Optional[str], argv: List[str]
+    ) -> None:
+        if stage is not None:
+            await session.log(
+                "loader.stage",
+                "shell",
+                stage=stage,
+                token=session.loader.token,
+                command=" ".join(argv),
+            )
+
+    def _handler_overrides(self, session: Session) -> Optional[Dict[str, Optional[str]]]:
         try:
-            p = self.scenario_mgr.get_txtcmd_path(session, cmd)
+            overrides = self.scenario_mgr.load_config(session).get("handlers")
         except Exception:
-            p = None
-        if p:
-            return await self._read_txt_file(p)
+            return None
+        return overrides if isinstance(overrides, dict) else None
 
-        # Ensemble mode: query both models and pick best response
+    async def _dispatch_llm(self, session: Session, line: str, cmd: str) -> Tuple[str, bool]:
+        # Ensemble mode: query both models and pick best (or first good) response
         if self.ensemble_mode and self.llm_client and self.llm_client_secondary:
+            if self.ensemble_policy == "race":
+                return await self._simulate_with_race(session, line, cmd)
             return await self._simulate_with_ensemble(session, line, cmd)
         
         # Single LLM mode
@@ -194,28 +797,247 @@ class Router:
         # No legacy top-level txtcmds fallback: return command not found.
         return (f"sh: {cmd}: command not found", False)
 
-    async def _read_txt_file(self, path: pathlib.Path) -> Tuple[str, bool]:
+    def _txtcmd_output(self, session: Session, name: str) -> Optional[Tuple[str, bool]]:
+        """
+        Canned output for name from the scenario's txtcmds (or the default
+        scenario's), truncated to max_output; None when there is none.
+        """
         try:
-            text = path.read_text(encoding="utf-8")
-        except FileNotFoundError:
-            return ("", False)
+            canned = self.scenario_mgr.get_txtcmd(session, name)
         except Exception:
-            return ("", False)
-        truncated = len(text.encode()) > self.max_output
-        return (text[: self.max_output], truncated)
+            canned = None
+        if canned is None:
+            return None
+        return (canned.text[: self.max_output], canned.nbytes > self.max_output)
+
+    def _simulation_cache_key(self, session: Session, line: str) -> str:
+        snapshot = self._get_fs(session)
+        fingerprint = snapshot.fingerprint if snapshot else ""
+        return make_cache_key(session.scenario_id, session.cwd, line, fingerprint)
+
+    def _template_cache_key(self, session: Session, template: Template) -> str:
+        snapshot = self._get_fs(session)
+        fingerprint = snapshot.fingerprint if snapshot else ""
+        return make_template_key(session.scenario_id, session.cwd, template.text, fingerprint)
+
+    async def _cached_simulation(
+        self, session: Session, line: str, key: str
+    ) -> Optional[Tuple[str, bool]]:
+        """
+        Return the formatted output for a cached response, logging hit/miss
+        counters. A command cached only under its template (same command,
+        other C2 address or file names) gets that response with its own
+        values filled in.
+        """
+        if not self.response_cache:
+            return None
+        template = template_command(line)
+        # a template without placeholders only differs from the line in quoting
+        templated = template is not None and bool(template.bindings)
+        template_key = self._template_cache_key(session, template) if templated else None
+        response, tier = await self.response_cache.aget(key, template_key)
+        if tier == "template":
+            response = fill_response(template, response)
+        output = self._format_simulated_output(response) if response else None
+        await session.log(
+            "llm.cache",
+            "llm",
+            command=line,
+            hit=response is not None,
+            tier=tier,
+            output=output,
+            **self.response_cache.stats(),
+        )
+        if output is None:
+            return None
+        truncated = len(output.encode()) > self.max_output
+        return (output[: self.max_output], truncated)
+
+    async def _log_coalesced(self, session: Session, line: str) -> None:
+        await session.log(
+            "llm.singleflight", "llm", command=line, **self.singleflight.stats()
+        )
+
+    async def _store_simulation(
+        self, session: Session, line: str, key: str, response: Dict[str, Any]
+    ) -> None:
+        if not self.response_cache:
+            return
+        try:
+            await self.response_cache.aput(
+                key, response, near_key=make_near_key(session.scenario_id, line)
+            )
+            template = template_command(line)
+            if template is None or not template.bindings:
+                return
+            templated = abstract_response(template, response)
+            if templated is not None:
+                await self.response_cache.aput(
+                    self._template_cache_key(session, template), templated
+                )
+        except Exception:
+            logger.exception("Failed to store simulated response in cache")
+
+    async def _call_simulate(
+        self,
+        client: LLMClient,
+        line: str,
+        fs: Dict[str, Any],
+        history: List[str],
+        base_fs: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Await the client's native async simulate when it has one; clients that
+        only expose the sync API run on a worker thread.
+        """
+        async with self._llm_slot():
+            asimulate = getattr(client, "asimulate_command", None)
+            if asimulate is not None:
+                return await asimulate(line, fs, history, base_fs=base_fs)
+            return await asyncio.to_thread(
+                client.simulate_command, line, fs, history, base_fs=base_fs
+            )
+
+    def _llm_timeout(self, session: Session) -> Optional[float]:
+        try:
+            value = self.scenario_mgr.load_config(session).get("llm_timeout", self.llm_timeout)
+        except Exception:
+            value = self.llm_timeout
+        try:
+            return float(value) if value else None
+        except (TypeError, ValueError):
+            return self.llm_timeout
+
+    async def _timed_out(
+        self, session: Session, line: str, cmd: str, timeout: Optional[float]
+    ) -> Tuple[str, bool]:
+        await session.log("llm.timeout", "llm", command=line, timeout_seconds=timeout)
+        return await self._degraded_output(session, line, cmd, "timeout")
+
+    async def _iter_with_deadline(
+        self, stream: AsyncIterator[Any], deadline: Optional[float]
+    ) -> AsyncIterator[Any]:
+        """
+        Re-yield items from stream, raising asyncio.TimeoutError once the
+        loop clock passes deadline.
+        """
+        loop = asyncio.get_running_loop()
+        iterator = stream.__aiter__()
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    item = await asyncio.wait_for(iterator.__anext__(), remaining)
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _stream_in_slot(
+        self, stream: AsyncIterator[Any], deadline: Optional[float]
+    ) -> AsyncIterator[Any]:
+        """
+        Re-yield items from a model stream that a separate task reads under
+        an LLM slot. Items are queued without bound, so the slot is freed as
+        soon as generation ends rather than when a slow client has taken the
+        last piece. Errors of the stream (the deadline's TimeoutError, an
+        AdmissionRejected) are raised after the items before them.
+        """
+        queue: "asyncio.Queue[Tuple[bool, Any]]" = asyncio.Queue()
+
+        async def produce() -> None:
+            try:
+                async with self._llm_slot():
+                    async for item in self._iter_with_deadline(stream, deadline):
+                        queue.put_nowait((False, item))
+            except Exception as exc:
+                queue.put_nowait((True, exc))
+            else:
+                queue.put_nowait((True, None))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                finished, value = await queue.get()
+                if finished:
+                    if value is not None:
+                        raise value
+                    return
+                yield value
+        finally:
+            # the client went away mid-stream: stop generating
+            producer.cancel()
+
+    def _llm_slot(self):
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.slot()
+
+    async def _degraded_output(
+        self, session: Session, line: str, cmd: str, reason: str
+    ) -> Tuple[str, bool]:
+        """
+        Answer without the LLM when it is saturated: a canned txtcmd for the
+        command's basename (`/bin/ps` -> ps.txt), the cached response for the
+        same command from any cwd, or a plausible command-not-found.
+        """
+        strategy = "not_found"
+        output = f"sh: {cmd}: command not found"
+        truncated = False
+        canned = self._txtcmd_output(session, cmd.rsplit("/", 1)[-1])
+        if canned is not None:
+            strategy = "txtcmd"
+            output, truncated = canned
+        elif self.response_cache:
+            near = self.response_cache.get_near(make_near_key(session.scenario_id, line))
+            if near is not None:
+                strategy = "near_cache"
+                output = self._format_simulated_output(near)
+                truncated = len(output.encode()) > self.max_output
+                output = output[: self.max_output]
+        await session.log(
+            "llm.degraded",
+            "llm",
+            command=line,
+            reason=reason,
+            strategy=strategy,
+            output=output,
+            **(self.scheduler.stats() if self.scheduler else {}),
+        )
+        return (output, truncated)
 
     async def _simulate_with_llm(
         self, session: Session, line: str, cmd: str
     ) -> Tuple[str, bool]:
-        fs = self._get_fs_for_simulation(session)
+        cache_key = self._simulation_cache_key(session, line)
+        cached = await self._cached_simulation(session, line, cache_key)
+        if cached is not None:
+            return cached
+
+        fs = self._get_fs_for_simulation(session, line)
+        base_fs = self._get_base_fs_for_simulation(session)
         history = list(session.history)
+        timeout = self._llm_timeout(session)
 
         try:
-            response = await asyncio.to_thread(
-                self.llm_client.simulate_command, line, fs, history
+            response, shared = await asyncio.wait_for(
+                self.singleflight.do(
+                    cache_key,
+                    lambda: self._call_simulate(self.llm_client, line, fs, history, base_fs),
+                ),
+                timeout,
             )
         except asyncio.CancelledError:
             raise
+        except asyncio.TimeoutError:
+            return await self._timed_out(session, line, cmd, timeout)
+        except AdmissionRejected as exc:
+            return await self._degraded_output(session, line, cmd, exc.reason)
         except Exception:
             logger.exception("LLM simulate_command failed for %s", cmd)
             await session.log(
@@ -236,6 +1058,9 @@ class Router:
             )
             return (f"sh: {cmd}: command not found", False)
         
+        if shared:
+            await self._log_coalesced(session, line)
+        await self._store_simulation(session, line, cache_key, response)
         output = self._format_simulated_output(response)
         truncated = len(output.encode()) > self.max_output
         await session.log(
@@ -248,6 +1073,126 @@ class Router:
         )
         return (output[: self.max_output], truncated)
 
+    def _can_stream(self) -> bool:
+        if not self.stream_llm or not self.llm_client:
+            return False
+        if self.ensemble_mode and self.llm_client_secondary:
+            return False
+        return hasattr(self.llm_client, "astream_simulate_command")
+
+    async def _stream_with_llm(
+        self, session: Session, line: str, cmd: str
+    ) -> AsyncIterator[Tuple[str, bool]]:
+        """
+        Stream stdout pieces from the model, then stderr once the full object
+        has been parsed. Output is cut at max_output characters like dispatch.
+        """
+        cache_key = self._simulation_cache_key(session, line)
+        cached = await self._cached_simulation(session, line, cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        fs = self._get_fs_for_simulation(session, line)
+        base_fs = self._get_base_fs_for_simulation(session)
+        history = list(session.history)
+        timeout = self._llm_timeout(session)
+        deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+        emitted: List[str] = []
+        emitted_chars = 0
+        total_bytes = 0
+        response: Any = None
+
+        def clip(text: str) -> Tuple[str, bool]:
+            nonlocal emitted_chars, total_bytes
+            total_bytes += len(text.encode())
+            room = max(0, self.max_output - emitted_chars)
+            piece = text[:room]
+            emitted_chars += len(piece)
+            emitted.append(piece)
+            return (piece, total_bytes > self.max_output)
+
+        try:
+            async for kind, value in self._stream_in_slot(
+                self.llm_client.astream_simulate_command(line, fs, history, base_fs=base_fs),
+                deadline,
+            ):
+                if kind == "stdout":
+                    piece = clip(value)
+                    if piece[0]:
+                        yield piece
+                elif kind == "response":
+                    response = value
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            if emitted_chars:
+                # the client already has partial output; just stop there
+                await session.log(
+                    "llm.timeout",
+                    "llm",
+                    command=line,
+                    timeout_seconds=timeout,
+                    streamed=True,
+                    output="".join(emitted),
+                )
+            else:
+                yield await self._timed_out(session, line, cmd, timeout)
+            return
+        except AdmissionRejected as exc:
+            yield await self._degraded_output(session, line, cmd, exc.reason)
+            return
+        except Exception:
+            logger.exception("LLM streaming simulate_command failed for %s", cmd)
+            await session.log(
+                "llm.simulate_command",
+                "llm",
+                command=line,
+                streamed=True,
+                error="simulate_command raised an exception",
+            )
+            if not emitted_chars:
+                yield (f"sh: {cmd}: command not found", False)
+            return
+
+        if not isinstance(response, dict):
+            await session.log(
+                "llm.simulate_command",
+                "llm",
+                command=line,
+                streamed=True,
+                raw_response=str(response),
+            )
+            if not emitted_chars:
+                yield (f"sh: {cmd}: command not found", False)
+            return
+
+        streamed_stdout = "".join(emitted)
+        if streamed_stdout:
+            rest = response.get("stderr", "")
+            if rest:
+                rest = "\n" + rest
+        else:
+            # nothing came through the stdout field (e.g. a parse fallback)
+            rest = self._format_simulated_output(response)
+        if rest:
+            piece = clip(rest)
+            if piece[0]:
+                yield piece
+        truncated = total_bytes > self.max_output
+        await self._store_simulation(session, line, cache_key, response)
+        await session.log(
+            "llm.simulate_command",
+            "llm",
+            command=line,
+            response=response,
+            output="".join(emitted),
+            truncated=truncated,
+            streamed=True,
+        )
+        if not emitted_chars:
+            yield ("", truncated)
+
     def _format_simulated_output(self, response: Dict[str, Any]) -> str:
         stdout = response.get("stdout", "")
         stderr = response.get("stderr", "")
@@ -294,13 +1239,32 @@ class Router:
         """
         Query both LLM clients in parallel, score responses, pick the best one.
         """
-        fs = self._get_fs_for_simulation(session)
+        cache_key = self._simulation_cache_key(session, line)
+        cached = await self._cached_simulation(session, line, cache_key)
+        if cached is not None:
+            return cached
+
+        fs = self._get_fs_for_simulation(session, line)
+        base_fs = self._get_base_fs_for_simulation(session)
         history = list(session.history)
+        timeout = self._llm_timeout(session)
         
         # Query both models in parallel
         results = await asyncio.gather(
-            self._query_single_llm(self.llm_client, "primary", line, fs, history, cmd),
-            self._query_single_llm(self.llm_client_secondary, "secondary", line, fs, history, cmd),
+            self._query_single_llm(
+                self.llm_client, "primary", line, fs, history, cmd, cache_key, timeout, base_fs
+            ),
+            self._query_single_llm(
+                self.llm_client_secondary,
+                "secondary",
+                line,
+                fs,
+                history,
+                cmd,
+                cache_key,
+                timeout,
+                base_fs,
+            ),
             return_exceptions=True,
         )
         
@@ -324,6 +1288,11 @@ class Router:
             winner = "secondary"
             response = secondary_result["response"]
         else:
+            rejected = self._rejection_reason(primary_result, secondary_result)
+            if rejected == "timeout":
+                return await self._timed_out(session, line, cmd, timeout)
+            if rejected:
+                return await self._degraded_output(session, line, cmd, rejected)
             # Both failed, return command not found
             self._update_ensemble_stats("none")
             await self._log_ensemble_stats_if_needed(session)
@@ -339,6 +1308,7 @@ class Router:
         
         # Update statistics
         self._update_ensemble_stats(winner)
+        await self._store_simulation(session, line, cache_key, response)
         
         output = self._format_simulated_output(response)
         truncated = len(output.encode()) > self.max_output
@@ -370,28 +1340,216 @@ class Router:
         fs: Dict[str, Any],
         history: List[str],
         cmd: str,
+        key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        base_fs: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
-        Query a single LLM client and return structured result.
+        Query a single LLM client and return structured result. Calls with the
+        same key (per client) are coalesced while in flight; a call running
+        past timeout seconds is reported as rejected with reason "timeout".
         """
         if not client:
-            return {"valid": False, "response": None, "error": "no client"}
+            return {"valid": False, "response": None, "error": "no client", "latency_ms": 0.0}
         
+        start = time.monotonic()
+        shared = False
         try:
-            response = await asyncio.to_thread(
-                client.simulate_command, line, fs, history
-            )
+            if key is None:
+                call = self._call_simulate(client, line, fs, history, base_fs)
+            else:
+                call = self.singleflight.do(
+                    f"{client_name}:{key}",
+                    lambda: self._call_simulate(client, line, fs, history, base_fs),
+                )
+            response = await asyncio.wait_for(call, timeout)
+            if key is not None:
+                response, shared = response
         except asyncio.CancelledError:
             raise
+        except asyncio.TimeoutError:
+            logger.warning("LLM %s timed out after %ss for %s", client_name, timeout, cmd)
+            return {
+                "valid": False,
+                "response": None,
+                "error": "timeout",
+                "rejected": "timeout",
+                "latency_ms": self._record_latency(client_name, start),
+            }
+        except AdmissionRejected as exc:
+            return {
+                "valid": False,
+                "response": None,
+                "error": f"admission rejected: {exc.reason}",
+                "rejected": exc.reason,
+                "latency_ms": round((time.monotonic() - start) * 1000, 1),
+            }
         except Exception as e:
             logger.exception("LLM %s simulate_command failed for %s", client_name, cmd)
-            return {"valid": False, "response": None, "error": str(e)}
+            latency_ms = self._record_latency(client_name, start)
+            return {"valid": False, "response": None, "error": str(e), "latency_ms": latency_ms}
+        latency_ms = self._record_latency(client_name, start)
         
         if not isinstance(response, dict):
             logger.warning("LLM %s returned unexpected response for %s", client_name, cmd)
-            return {"valid": False, "response": None, "error": "invalid response type"}
+            return {
+                "valid": False,
+                "response": None,
+                "error": "invalid response type",
+                "latency_ms": latency_ms,
+            }
         
-        return {"valid": True, "response": response, "error": None}
+        return {
+            "valid": True,
+            "response": response,
+            "error": None,
+            "latency_ms": latency_ms,
+            "shared": shared,
+        }
+
+    def _rejection_reason(self, *results: Any) -> Optional[str]:
+        """
+        The admission reason when every ensemble call was turned away by the
+        scheduler, else None.
+        """
+        reasons = [r.get("rejected") if isinstance(r, dict) else None for r in results]
+        if reasons and all(reasons):
+            return reasons[0]
+        return None
+
+    def _record_latency(self, client_name: str, start: float) -> float:
+        latency_ms = (time.monotonic() - start) * 1000
+        self.ensemble_stats[f"{client_name}_calls"] += 1
+        self.ensemble_stats[f"{client_name}_latency_ms_total"] += latency_ms
+        return round(latency_ms, 1)
+
+    async def _simulate_with_race(
+        self, session: Session, line: str, cmd: str
+    ) -> Tuple[str, bool]:
+        """
+        Hedged ensemble: query both models and return the first response that
+        scores at least ensemble_min_score, so latency is that of the faster
+        good model. If neither qualifies, fall back to the best-scoring one.
+        """
+        cache_key = self._simulation_cache_key(session, line)
+        cached = await self._cached_simulation(session, line, cache_key)
+        if cached is not None:
+            return cached
+
+        fs = self._get_fs_for_simulation(session, line)
+        base_fs = self._get_base_fs_for_simulation(session)
+        history = list(session.history)
+        timeout = self._llm_timeout(session)
+        tasks = {
+            asyncio.ensure_future(
+                self._query_single_llm(
+                    client, name, line, fs, history, cmd, cache_key, timeout, base_fs
+                )
+            ): name
+            for client, name in (
+                (self.llm_client, "primary"),
+                (self.llm_client_secondary, "secondary"),
+            )
+        }
+        pending = set(tasks)
+        results: Dict[str, Dict[str, Any]] = {}
+        scores: Dict[str, int] = {}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = tasks[task]
+                    if task.exception() is not None:
+                        result = {"valid": False, "response": None, "error": str(task.exception())}
+                    else:
+                        result = task.result()
+                    results[name] = result
+                    scores[name] = self._score_response(result["response"], result["valid"])
+                    if winner is None and scores[name] >= self.ensemble_min_score:
+                        winner = name
+        finally:
+            for task in pending:
+                if self.ensemble_log_late and winner is not None:
+                    self._detach_late(session, line, tasks[task], task)
+                else:
+                    task.cancel()
+
+        if winner is None:
+            # neither cleared the bar: take the better of what came back
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0] != "primary"))
+            if ranked and ranked[0][1] > 0:
+                winner = ranked[0][0]
+
+        if winner is None:
+            rejected = self._rejection_reason(*results.values())
+            if rejected == "timeout":
+                return await self._timed_out(session, line, cmd, timeout)
+            if rejected:
+                return await self._degraded_output(session, line, cmd, rejected)
+            self._update_ensemble_stats("none")
+            await self._log_ensemble_stats_if_needed(session)
+            await session.log(
+                "llm.ensemble",
+                "llm",
+                command=line,
+                policy="race",
+                primary_score=scores.get("primary"),
+                secondary_score=scores.get("secondary"),
+                winner="none",
+            )
+            return (f"sh: {cmd}: command not found", False)
+
+        response = results[winner]["response"]
+        self._update_ensemble_stats(winner)
+        await self._store_simulation(session, line, cache_key, response)
+        output = self._format_simulated_output(response)
+        truncated = len(output.encode()) > self.max_output
+        await session.log(
+            "llm.ensemble",
+            "llm",
+            command=line,
+            policy="race",
+            primary_score=scores.get("primary"),
+            secondary_score=scores.get("secondary"),
+            winner=winner,
+            winner_latency_ms=results[winner].get("latency_ms"),
+            output=output,
+            truncated=truncated,
+        )
+        await self._log_ensemble_stats_if_needed(session)
+        return (output[: self.max_output], truncated)
+
+    def _detach_late(
+        self, session: Session, line: str, client_name: str, task: "asyncio.Future"
+    ) -> None:
+        """
+        Let a losing race call finish without blocking the session and record
+        its response for later comparison.
+        """
+
+        async def _finish() -> None:
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                return
+            except Exception as exc:
+                result = {"valid": False, "response": None, "error": str(exc)}
+            await session.log(
+                "llm.ensemble.late",
+                "llm",
+                command=line,
+                model=client_name,
+                score=self._score_response(result.get("response"), result.get("valid", False)),
+                latency_ms=result.get("latency_ms"),
+                response=result.get("response"),
+            )
+
+        late = asyncio.ensure_future(_finish())
+        self._background_tasks.add(late)
+        late.add_done_callback(self._background_tasks.discard)
 
     def _update_ensemble_stats(self, winner: str) -> None:
         """Update ensemble statistics counters."""
@@ -420,6 +1578,13 @@ class Router:
             secondary_pct = (secondary_wins / total * 100) if total > 0 else 0
             failed_pct = (both_failed / total * 100) if total > 0 else 0
             
+            # Average latency per model over every call, won or lost
+            latency = {}
+            for name in ("primary", "secondary"):
+                calls = self.ensemble_stats[f"{name}_calls"]
+                total_ms = self.ensemble_stats[f"{name}_latency_ms_total"]
+                latency[f"{name}_avg_latency_ms"] = round(total_ms / calls, 1) if calls else None
+
             # Log summary
             await session.log(
                 "llm.ensemble.summary",
@@ -431,6 +1596,8 @@ class Router:
                 primary_win_rate=f"{primary_pct:.1f}%",
                 secondary_win_rate=f"{secondary_pct:.1f}%",
                 failure_rate=f"{failed_pct:.1f}%",
+                policy=self.ensemble_policy,
+                **latency,
             )
             
             # Also log to console for visibility
@@ -442,20 +1609,17 @@ class Router:
             self.ensemble_stats["last_logged"] = total
 
     def _handle_builtin(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
-        if not argv:
+        method = _BUILTINS.get(argv[0]) if argv else None
+        if method is None:
             return None
-        cmd = argv[0]
-        if cmd == "pwd":
-            return (session.cwd, False)
-        if cmd == "cd":
-            return self._handle_cd(session, argv)
-        if cmd == "ls":
-            return self._handle_ls(session, argv)
-        return None
+        return getattr(self, method)(session, argv)
+
+    def _handle_pwd(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        return (session.cwd, False)
 
     def _handle_cd(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
         dest = argv[1] if len(argv) > 1 else ROOT_FS_PATH
-        snapshot = self._get_fs_snapshot(session)
+        snapshot = self._get_fs(session)
         if not snapshot:
             return None
         parts = self._resolve_target_parts(session, dest)
@@ -471,58 +1635,621 @@ class Router:
         return ("", False)
 
     def _handle_ls(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
-        snapshot = self._get_fs_snapshot(session)
-        if not snapshot:
+        fs = self._get_fs(session)
+        if not fs:
             return None
-        args = [arg for arg in argv[1:] if arg and not arg.startswith("-")]
-        target = args[0] if args else ""
+        try:
+            flags, operands = parse_ls_args(argv[1:])
+        except LsUsageError as exc:
+            return (str(exc), False)
+        targets = self._resolve_operands(session, operands or ["."])
+        if targets is None:
+            return None
+        return self._collect(iter_ls(fs, targets, flags))
+
+    def _collect(self, lines: Iterable[str]) -> Tuple[str, bool]:
+        """
+        Join lines from a traversal generator, stopping once the output
+        exceeds max_output so huge trees are never rendered in full.
+        """
+        out: List[str] = []
+        size = 0
+        for line in lines:
+            out.append(line)
+            size += len(line.encode()) + 1
+            if size > self.max_output:
+                return ("\n".join(out), True)
+        return ("\n".join(out), False)
+
+    def _handle_find(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        try:
+            starts, tests, max_depth, min_depth = parse_find(argv[1:])
+        except UnsupportedExpression:
+            return None
+        targets = self._resolve_operands(session, starts)
+        if targets is None:
+            return None
+
+        def lines() -> Iterable[str]:
+            for display, rel in targets:
+                yield from iter_find(fs, rel, display, tests, max_depth, min_depth)
+
+        return self._collect(lines())
+
+    def _handle_tree(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        args = argv[1:]
+        max_level: Optional[int] = None
+        if "-L" in args:
+            idx = args.index("-L")
+            if idx + 1 >= len(args) or not args[idx + 1].isdigit():
+                return ("tree: Missing argument to -L option.", False)
+            max_level = int(args[idx + 1]) or None
+            args = args[:idx] + args[idx + 2 :]
+        opts, operands = _split_options(args)
+        if opts - {"a", "d"}:
+            return None
+        targets = self._resolve_operands(session, operands or ["."])
+        if targets is None:
+            return None
+
+        def lines() -> Iterable[str]:
+            for display, rel in targets:
+                yield from iter_tree(
+                    fs, rel, display, show_hidden="a" in opts, dirs_only="d" in opts, max_level=max_level
+                )
+
+        return self._collect(lines())
+
+    def _handle_du(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        max_depth: Optional[int] = None
+        args: List[str] = []
+        for arg in argv[1:]:
+            if arg.startswith("--max-depth="):
+                value = arg.split("=", 1)[1]
+                if not value.isdigit():
+                    return None
+                max_depth = int(value)
+            else:
+                args.append(arg)
+        opts, operands = _split_options(args)
+        if opts - {"s", "h", "a", "c", "summarize", "human-readable", "all"}:
+            return None
+        targets = self._resolve_operands(session, operands or ["."])
+        if targets is None:
+            return None
+
+        def lines() -> Iterable[str]:
+            for display, rel in targets:
+                yield from iter_du(
+                    fs,
+                    rel,
+                    display,
+                    summarize="s" in opts or "summarize" in opts,
+                    human="h" in opts or "human-readable" in opts,
+                    all_files="a" in opts or "all" in opts,
+                    max_depth=max_depth,
+                )
+
+        return self._collect(lines())
+
+    def _rel_target(self, session: Session, target: str) -> Optional[Tuple[str, ...]]:
+        """
+        Snapshot-relative path for a command argument, or None when it lies
+        outside the scenario tree.
+        """
         parts = self._resolve_target_parts(session, target)
         if parts is None:
-            display = target or "."
-            return (f"ls: cannot access '{display}': No such file or directory", False)
-        rel = tuple(parts[len(BASE_FS_PATH_PARTS) :])
-        node = snapshot.get_node(rel)
-        if not node:
-            display = target or "."
-            return (f"ls: cannot access '{display}': No such file or directory", False)
-        if node.get("type") != "dir":
-            display_name = node.get("name") or target or ""
-            return (_format_ls_entry(node, display_name), False)
-
-        children = snapshot.list_dir(rel) or []
+            return None
+        return tuple(parts[len(BASE_FS_PATH_PARTS) :])
+
+    def _resolve_operands(
+        self, session: Session, operands: List[str]
+    ) -> Optional[List[Tuple[str, Tuple[str, ...]]]]:
+        """
+        Pair each operand with its snapshot path; None if any of them falls
+        outside the tree, in which case the command is left to the LLM.
+        """
+        resolved = []
+        for operand in operands:
+            rel = self._rel_target(session, operand)
+            if rel is None:
+                return None
+            resolved.append((operand, rel))
+        return resolved
+
+    def _handle_mkdir(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        opts, operands = _split_options(argv[1:])
+        if not operands:
+            return ("mkdir: missing operand", False)
+        targets = self._resolve_operands(session, operands)
+        if targets is None:
+            return None
+        parents = "p" in opts or "parents" in opts
+        errors: List[str] = []
+        for target, rel in targets:
+            node = fs.get_node(rel)
+            if node is not None:
+                if not parents or node.get("type") != "dir":
+                    errors.append(f"mkdir: cannot create directory '{target}': File exists")
+                continue
+            if not parents:
+                parent = fs.get_node(rel[:-1])
+                if not parent or parent.get("type") != "dir":
+                    errors.append(
+                        f"mkdir: cannot create directory '{target}': No such file or directory"
+                    )
+                    continue
+                fs.mkdir(rel)
+                continue
+            for depth in range(1, len(rel) + 1):
+                existing = fs.get_node(rel[:depth])
+                if existing is None:
+                    fs.mkdir(rel[:depth])
+                elif existing.get("type") != "dir":
+                    errors.append(f"mkdir: cannot create directory '{target}': Not a directory")
+                    break
+        return ("\n".join(errors), False)
+
+    def _handle_rmdir(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        _, operands = _split_options(argv[1:])
+        if not operands:
+            return ("rmdir: missing operand", False)
+        targets = self._resolve_operands(session, operands)
+        if targets is None:
+            return None
+        errors: List[str] = []
+        for target, rel in targets:
+            node = fs.get_node(rel)
+            if node is None:
+                errors.append(f"rmdir: failed to remove '{target}': No such file or directory")
+            elif node.get("type") != "dir":
+                errors.append(f"rmdir: failed to remove '{target}': Not a directory")
+            elif not rel:
+                errors.append(f"rmdir: failed to remove '{target}': Permission denied")
+            elif fs.list_dir(rel):
+                errors.append(f"rmdir: failed to remove '{target}': Directory not empty")
+            else:
+                fs.remove(rel)
+        return ("\n".join(errors), False)
+
+    def _handle_rm(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        opts, operands = _split_options(argv[1:])
+        force = "f" in opts or "force" in opts
+        recursive = bool(opts & {"r", "R", "recursive"})
+        if not operands:
+            return ("" if force else "rm: missing operand", False)
+        targets = self._resolve_operands(session, operands)
+        if targets is None:
+            return None
+        errors: List[str] = []
+        for target, rel in targets:
+            if target.rstrip("/").rsplit("/", 1)[-1] in (".", ".."):
+                errors.append(f"rm: refusing to remove '.' or '..' directory: skipping '{target}'")
+                continue
+            node = fs.get_node(rel)
+            if node is None:
+                if not force:
+                    errors.append(f"rm: cannot remove '{target}': No such file or directory")
+            elif node.get("type") == "dir" and not recursive:
+                errors.append(f"rm: cannot remove '{target}': Is a directory")
+            elif not rel:
+                # the home directory itself lives in /home, which is not writable
+                for child in fs.list_dir(rel) or []:
+                    fs.remove((child["name"],))
+                errors.append(f"rm: cannot remove '{target}': Permission denied")
+            else:
+                fs.remove(rel)
+        return ("\n".join(errors), False)
+
+    def _handle_touch(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        _, operands = _split_options(argv[1:])
+        if not operands:
+            return ("touch: missing file operand", False)
+        targets = self._resolve_operands(session, operands)
+        if targets is None:
+            return None
+        errors: List[str] = []
+        for target, rel in targets:
+            if fs.get_node(rel) is not None:
+                continue
+            parent = fs.get_node(rel[:-1])
+            if not parent or parent.get("type") != "dir":
+                errors.append(f"touch: cannot touch '{target}': No such file or directory")
+                continue
+            fs.write_file(rel, "")
+        return ("\n".join(errors), False)
+
+    def _handle_chmod(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        args = [arg for arg in argv[1:] if arg not in ("-R", "-v", "-f", "--")]
+        if len(args) < 2:
+            missing = "operand" if not args else f"operand after '{args[0]}'"
+            return (f"chmod: missing {missing}", False)
+        mode, operands = args[0], args[1:]
+        targets = self._resolve_operands(session, operands)
+        if targets is None:
+            return None
+        errors: List[str] = []
+        for target, rel in targets:
+            node = fs.get_node(rel)
+            if node is None:
+                errors.append(f"chmod: cannot access '{target}': No such file or directory")
+                continue
+            perms = _apply_mode(node.get("perms") or default_perms(node), mode)
+            if perms is None:
+                return (f"chmod: invalid mode: '{mode}'", False)
+            fs.update(rel, perms=perms)
+        return ("\n".join(errors), False)
+
+    async def _handle_read(
+        self, session: Session, argv: List[str]
+    ) -> Optional[Tuple[str, bool]]:
+        """
+        cat/head/tail/wc of files in the session's tree, answered from their
+        contents. Returns None (simulate) for unsupported options, stdin,
+        operands outside the tree, or a file whose content is not available.
+        """
+        fs = self._get_fs(session)
+        if not fs:
+            return None
+        cmd = argv[0]
+        spec: Optional[ReadSpec] = None
+        try:
+            if cmd == "cat":
+                opts, operands = _split_options(argv[1:])
+                if opts:
+                    return None
+            elif cmd == "wc":
+                counts, operands = parse_wc_args(argv[1:])
+            else:
+                spec = parse_head_tail(cmd, argv[1:])
+                operands = spec.operands
+        except UnsupportedOption:
+            return None
+        if not operands or "-" in operands:
+            return None
+        targets = self._resolve_operands(session, operands)
+        if targets is None:
+            return None
+        # (operand, chunks, error); every file is resolved before any output
+        # so an unavailable one leaves the whole command to the LLM
+        files: List[Tuple[str, Optional[Iterable[str]], Optional[str]]] = []
+        for target, rel in targets:
+            node = fs.get_node(rel)
+            if node is None:
+                files.append((target, None, "No such file or directory"))
+            elif node.get("type") == "dir":
+                files.append((target, None, "Is a directory"))
+            else:
+                chunks = await self._file_chunks(session, fs, rel, node)
+                if chunks is None:
+                    return None
+                files.append((target, chunks, None))
+        # generated contents can be large: read them off the event loop
+        if cmd == "wc":
+            return await asyncio.to_thread(self._render_wc, files, counts)
+        return await asyncio.to_thread(self._render_read, cmd, files, spec)
+
+    def _render_read(
+        self,
+        cmd: str,
+        files: List[Tuple[str, Optional[Iterable[str]], Optional[str]]],
+        spec: Optional[ReadSpec],
+    ) -> Tuple[str, bool]:
+        pieces: List[str] = []
+        size = 0
+        headers = False
+        if spec is not None:
+            headers = spec.headers if spec.headers is not None else len(files) > 1
+        for idx, (target, chunks, error) in enumerate(files):
+            # no need to read past what the client will be shown
+            limit = self.max_output - size
+            if limit < 0:
+                break
+            if cmd == "cat":
+                piece = f"cat: {target}: {error}\n" if error else read_all(chunks, limit)
+            elif error == "No such file or directory":
+                piece = f"{cmd}: cannot open '{target}' for reading: {error}\n"
+            else:
+                separator = "\n" if idx else ""
+                piece = f"{separator}==> {target} <==\n" if headers else ""
+                if error:
+                    piece += f"{cmd}: error reading '{target}': {error}\n"
+                elif cmd == "head":
+                    piece += read_head(chunks, spec, limit)
+                else:
+                    piece += read_tail(chunks, spec, limit)
+            pieces.append(piece)
+            size += len(piece)
+        out = "".join(pieces)
+        return (out[:-1] if out.endswith("\n") else out, False)
+
+    def _render_wc(
+        self, files: List[Tuple[str, Optional[Iterable[str]], Optional[str]]], counts: str
+    ) -> Tuple[str, bool]:
         lines: List[str] = []
-        lines.append(_format_ls_entry(node, "."))
-        parent_rel = rel[:-1] if rel else rel
-        parent_node = snapshot.get_node(parent_rel) or node
-        lines.append(_format_ls_entry(parent_node, ".."))
-        sorted_children = sorted(children, key=lambda entry: entry.get("name") or "")
-        for child in sorted_children:
-            name = child.get("name") or ""
-            lines.append(_format_ls_entry(child, name))
+        rows: List[Tuple[List[int], int, str]] = []
+        positions: List[int] = []
+        for target, chunks, error in files:
+            if error:
+                lines.append(f"wc: {target}: {error}")
+            if error == "No such file or directory":
+                continue
+            values, size = wc_counts(chunks or (), counts)
+            rows.append((values, size, target))
+            positions.append(len(lines))
+            lines.append("")
+        formatted = format_wc(rows, counts)
+        for idx, position in enumerate(positions):
+            lines[position] = formatted[idx]
+        # the total line, when there is one
+        lines.extend(formatted[len(rows) :])
         return ("\n".join(lines), False)
 
+    async def _file_chunks(
+        self, session: Session, fs: FileSystemOverlay, rel: Tuple[str, ...], node: Dict[str, Any]
+    ) -> Optional[Iterable[str]]:
+        """
+        Content of a regular file as chunks: what this session wrote into it,
+        procedural content for file types with a generator, otherwise the
+        shared content store. None when none of them applies.
+        """
+        if "content" in node:
+            return [node["content"]]
+        if fs.base.get_node(rel) is None:
+            # created by this session without known bytes (a simulated download)
+            return None
+        generated = generate_content(self._host_profile(session), rel, node)
+        if generated is not None:
+            return generated
+        content = await self._file_content(session, fs, rel, node)
+        return None if content is None else [content]
+
+    async def _file_content(
+        self, session: Session, fs: FileSystemOverlay, rel: Tuple[str, ...], node: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        A scenario file's content from the shared store, generated by the LLM
+        on first read. None without a store or when generation fails.
+        """
+        if self.content_store is None or self.llm_client is None:
+            return None
+        path = "/".join((ROOT_FS_PATH,) + rel)
+        line = f"cat {path}"
+
+        async def generate() -> Optional[str]:
+            # prompt from the shared snapshot and no history, so the stored
+            # content does not depend on whichever session read it first
+            snapshot = fs.base
+            base_fs = self._get_base_fs_for_simulation(session)
+            context = select_fs_delta(
+                snapshot, base_fs, [rel[:-1]], (), self.fs_context_budget, ROOT_FS_PATH
+            )
+            if context is None:
+                context = base_fs
+            content: Optional[str] = None
+            try:
+                response = await asyncio.wait_for(
+                    self._call_simulate(self.llm_client, line, context, [], base_fs),
+                    self._llm_timeout(session),
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Could not generate content for %s: %r", path, exc)
+                response = None
+            if (
+                isinstance(response, dict)
+                and not response.get("stderr")
+                and response.get("exit_code", 0) in (0, None)
+            ):
+                content = str(response.get("stdout") or "")
+                if content and not content.endswith("\n"):
+                    content += "\n"
+            await session.log(
+                "fs.content",
+                "llm",
+                path=path,
+                generated=content is not None,
+                **self.content_store.stats(),
+            )
+            return content
+
+        key = node_content_key(session.scenario_id, rel, node)
+        return await self.content_store.get_or_create(key, generate)
+
+    def _handle_echo(self, session: Session, argv: List[str]) -> Optional[Tuple[str, bool]]:
+        text = echo_text(argv[1:])
+        return (text[:-1] if text.endswith("\n") else text, False)
+
+    def _download_target(self, argv: List[str]) -> Optional[str]:
+        """
+        File name a wget/curl command line saves to, or None for stdout.
+        """
+        cmd = argv[0] if argv else ""
+        name: Optional[str] = None
+        url: Optional[str] = None
+        remote_name = cmd == "wget"
+        i = 1
+        while i < len(argv):
+            tok = argv[i]
+            value = argv[i + 1] if i + 1 < len(argv) else None
+            if cmd == "wget" and tok in ("-O", "--output-document"):
+                name, i = value, i + 2
+                continue
+            if cmd == "wget" and tok.startswith("--output-document="):
+                name = tok.split("=", 1)[1]
+            elif cmd == "wget" and tok.startswith("-O"):
+                name = tok[2:]
+            elif cmd == "curl" and tok in ("--output", "-o"):
+                name, i = value, i + 2
+                continue
+            elif cmd == "curl" and tok == "--remote-name":
+                remote_name = True
+            elif cmd == "curl" and tok.startswith("-") and not tok.startswith("--"):
+                letters = tok[1:]
+                remote_name = remote_name or "O" in letters
+                if "o" in letters:
+                    rest = letters[letters.index("o") + 1 :]
+                    if rest:
+                        name = rest
+                    else:
+                        name, i = value, i + 2
+                        continue
+            elif not tok.startswith("-") and url is None:
+                url = tok
+            i += 1
+        if name is None and remote_name and url:
+            path = urllib.parse.urlsplit(url if "://" in url else f"http://{url}").path
+            name = path.rsplit("/", 1)[-1] or "index.html"
+        if not name or name == "-":
+            return None
+        return name
+
+    def _record_download(self, session: Session, argv: List[str], output: str) -> None:
+        """
+        After a simulated wget/curl that reports success, create the
+        downloaded file so later ls/chmod/rm in the session see it. Files
+        saved to a loader's scratch directories go to its loader state.
+        """
+        if len(argv) > 1 and is_busybox(argv[0]):
+            argv = argv[1:]
+        cmd = argv[0] if argv else ""
+        if cmd not in ("wget", "curl"):
+            return
+        # GNU wget reports "'x' saved", BusyBox wget a 100% progress bar
+        if cmd == "wget" and "saved" not in output and "100%" not in output:
+            return
+        if cmd == "curl" and "curl: (" in output:
+            return
+        name = self._download_target(argv)
+        if not name:
+            return
+        loader = self._loader(session)
+        scratch = loader.scratch_path(session.cwd, name) if loader else None
+        if scratch is not None:
+            loader.write(scratch, "", append=False)
+            return
+        fs = self._get_fs(session)
+        rel = self._rel_target(session, name) if fs else None
+        if not rel:
+            return
+        parent = fs.get_node(rel[:-1])
+        if not parent or parent.get("type") != "dir":
+            return
+        m = re.search(r"\[(\d+)(?:/\d+)?\]", output)
+        fs.write_file(rel, None, size=int(m.group(1)) if m else 0)
+
+    def _get_fs(self, session: Session) -> Optional[FileSystemOverlay]:
+        """
+        The session's copy-on-write view over the shared scenario snapshot.
+        """
+        snapshot = self._get_fs_snapshot(session)
+        if snapshot is None:
+            return None
+        overlay = session.fs_overlay
+        if overlay is None or overlay.base is not snapshot:
+            overlay = FileSystemOverlay(snapshot)
+            session.fs_overlay = overlay
+        return overlay
+
     def _get_fs_snapshot(self, session: Session) -> Optional[FileSystemSnapshot]:
         if session.scenario_fs_snapshot:
             return session.scenario_fs_snapshot
-        raw = session.scenario_fs or self.scenario_mgr.load_fs(session)
-        if not raw:
-            return None
-        snapshot = FileSystemSnapshot(raw)
-        session.scenario_fs = raw
+        if session.scenario_fs:
+            snapshot = FileSystemSnapshot(session.scenario_fs)
+        else:
+            # shared with every other session on this scenario
+            snapshot = self.scenario_mgr.load_snapshot(session)
+            if snapshot is None:
+                return None
+            session.scenario_fs = snapshot.root
         session.scenario_fs_snapshot = snapshot
         return snapshot
 
-    def _get_fs_for_simulation(self, session: Session) -> Dict[str, Any]:
+    def _get_base_fs_for_simulation(self, session: Session) -> Optional[Dict[str, Any]]:
+        """
+        The scenario's tree as deployed, cut to the context budget: the same
+        object on every call for a snapshot, so the simulate prompt can keep
+        it in its stable prefix. None without a snapshot.
+        """
+        snapshot = self._get_fs_snapshot(session)
+        if snapshot is None:
+            return None
+        if self.fs_context_budget:
+            return select_fs_context(snapshot, [()], self.fs_context_budget)
+        return snapshot.root
+
+    def _get_fs_for_simulation(self, session: Session, line: str = "") -> Dict[str, Any]:
+        """
+        What the command needs beyond the base tree: the paths it involves
+        and the session's changes (see select_fs_delta), or the base tree
+        itself when that already shows everything.
+        """
+        fs = self._get_fs(session)
+        if fs:
+            base = self._get_base_fs_for_simulation(session)
+            delta = select_fs_delta(
+                fs,
+                base,
+                self._context_focus(session, fs, line),
+                fs.changed_paths,
+                self.fs_context_budget,
+                ROOT_FS_PATH,
+            )
+            return base if delta is None else delta
         fs = session.scenario_fs
         if not fs:
-            raw = self.scenario_mgr.load_fs(session)
-            if raw:
-                fs = raw
-            else:
-                fs = {"type": "dir", "name": BASE_FS_PATH_PARTS[-1], "children": []}
+            fs = {"type": "dir", "name": BASE_FS_PATH_PARTS[-1], "children": []}
             session.scenario_fs = fs
         return fs
 
+    def _context_focus(
+        self, session: Session, snapshot: FileSystemSnapshot, line: str
+    ) -> List[Tuple[str, ...]]:
+        """
+        Snapshot-relative paths a command is likely about: the cwd plus every
+        argument that resolves inside the snapshot (or its nearest existing parent).
+        """
+        try:
+            argv = shlex.split(line)
+        except Exception:
+            argv = line.split()
+        targets = [""] + [arg for arg in argv[1:] if arg and not arg.startswith("-")]
+        focus: List[Tuple[str, ...]] = []
+        for target in targets:
+            parts = self._resolve_target_parts(session, target)
+            if parts is None:
+                continue
+            rel = tuple(parts[len(BASE_FS_PATH_PARTS) :])
+            while rel and snapshot.get_node(rel) is None:
+                rel = rel[:-1]
+            focus.append(rel)
+        return focus
+
     def _resolve_target_parts(self, session: Session, target: str) -> Optional[List[str]]:
         target = (target or "").strip()
         if target.startswith("/"):
@@ -545,7 +2272,8 @@ class Router:
         if len(cwd_parts) < len(BASE_FS_PATH_PARTS) or tuple(
             cwd_parts[: len(BASE_FS_PATH_PARTS)]
         ) != BASE_FS_PATH_PARTS:
-            cwd_parts = list(BASE_FS_PATH_PARTS)
+            # cwd is a loader's scratch directory (see loader_probes)
+            return None
         for entry in target.split("/"):
             if not entry or entry == ".":
                 continue
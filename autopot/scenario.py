@@ -1,7 +1,11 @@
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
 
+from .fs_snapshot import FileSystemSnapshot, SnapshotRegistry, load_snapshot
+from .host_profile import HostProfile, build_profile
+from .txtcmd_catalog import TxtCmd, TxtcmdCatalog, txtcmd_catalog
+
 
 class ScenarioManager:
     """
@@ -10,56 +14,131 @@ class ScenarioManager:
     Layout:
       scenarios/{scenario_id}/txtcmds/{cmd}.txt
       scenarios/{scenario_id}/fs.json
+      scenarios/{scenario_id}/config.json
 
     Public API:
+      get_txtcmd(session, cmdname) -> TxtCmd | None
       get_txtcmd_path(session, cmdname) -> Path | None
       load_fs(session) -> Dict | None
+      load_snapshot(session) -> FileSystemSnapshot | None
+      load_config(session) -> Dict
+      load_host_profile(session) -> HostProfile
     """
 
-    def __init__(self, scenarios_root: Optional[Path] = None):
+    def __init__(
+        self,
+        scenarios_root: Optional[Path] = None,
+        snapshots: Optional[SnapshotRegistry] = None,
+        txtcmds: Optional[TxtcmdCatalog] = None,
+    ):
         self.scenarios_root = Path(scenarios_root or Path("scenarios")).resolve()
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._profiles: Dict[str, HostProfile] = {}
+        # None uses the process-wide registry shared by every session
+        self.snapshots = snapshots
+        # likewise, canned outputs come from the catalog shared per scenarios root
+        self.txtcmds = txtcmds if txtcmds is not None else txtcmd_catalog(self.scenarios_root)
 
     def _scenario_dir(self, scenario_id: str) -> Path:
         return self.scenarios_root / scenario_id
 
-    def get_txtcmd_path(self, session: Any, cmdname: str) -> Optional[Path]:
+    def get_txtcmd(self, session: Any, cmdname: str) -> Optional[TxtCmd]:
         """
-        Return the first matching txtcmd Path for the session's scenario,
-        falling back to the 'default' scenario. Returns None if not found.
+        Return the preloaded txtcmd for the session's scenario, falling back
+        to the 'default' scenario. Returns None if not found.
         """
         if not cmdname:
             return None
-        # candidate paths in order
+        return self.txtcmds.lookup(getattr(session, "scenario_id", None), cmdname)
+
+    def get_txtcmd_path(self, session: Any, cmdname: str) -> Optional[Path]:
+        """
+        Path of the txtcmd get_txtcmd would return, or None.
+        """
+        entry = self.get_txtcmd(session, cmdname)
+        return entry.path if entry else None
+
+    def _fs_candidates(self, session: Any) -> List[Path]:
         candidates = []
         if getattr(session, "scenario_id", None):
-            candidates.append(self._scenario_dir(session.scenario_id) / "txtcmds" / f"{cmdname}.txt")
-        candidates.append(self._scenario_dir("default") / "txtcmds" / f"{cmdname}.txt")
+            candidates.append(self._scenario_dir(session.scenario_id) / "fs.json")
+        candidates.append(self._scenario_dir("default") / "fs.json")
+        return candidates
 
-        for p in candidates:
+    def load_fs(self, session: Any) -> Optional[Dict[str, Any]]:
+        """
+        Load scenarios/{scenario_id}/fs.json if present, otherwise
+        scenarios/default/fs.json. Returns parsed JSON dict or None.
+        """
+        for p in self._fs_candidates(session):
             try:
                 if p.exists():
-                    return p
+                    text = p.read_text(encoding="utf-8")
+                    return json.loads(text)
             except Exception:
-                # be conservative: ignore filesystem errors and continue
+                # ignore JSON/IO errors and try next candidate
                 continue
         return None
 
-    def load_fs(self, session: Any) -> Optional[Dict[str, Any]]:
+    def load_snapshot(self, session: Any) -> Optional[FileSystemSnapshot]:
         """
-        Load scenarios/{scenario_id}/fs.json if present, otherwise
-        scenarios/default/fs.json. Returns parsed JSON dict or None.
+        Like load_fs, but return the shared indexed snapshot for the file.
+        Each fs.json is parsed once per process (and again only after it
+        changes on disk); callers must not mutate the result.
         """
-        candidates = []
-        if getattr(session, "scenario_id", None):
-            candidates.append(self._scenario_dir(session.scenario_id) / "fs.json")
-        candidates.append(self._scenario_dir("default") / "fs.json")
+        for p in self._fs_candidates(session):
+            try:
+                if self.snapshots is not None:
+                    snapshot = self.snapshots.get(p)
+                else:
+                    snapshot = load_snapshot(p)
+                if snapshot is not None:
+                    return snapshot
+            except Exception:
+                # ignore JSON/IO errors and try next candidate
+                continue
+        return None
 
-        for p in candidates:
+    def load_config(self, session: Any) -> Dict[str, Any]:
+        """
+        Return scenario settings (e.g. `llm_timeout`): scenarios/default/config.json
+        overlaid with scenarios/{scenario_id}/config.json. Missing or invalid
+        files contribute nothing. Parsed once per scenario.
+        """
+        scenario_id = getattr(session, "scenario_id", None) or "default"
+        cached = self._configs.get(scenario_id)
+        if cached is not None:
+            return cached
+        config: Dict[str, Any] = {}
+        names = ["default"] if scenario_id == "default" else ["default", scenario_id]
+        for name in names:
+            p = self._scenario_dir(name) / "config.json"
             try:
                 if p.exists():
-                    text = p.read_text(encoding="utf-8")
-                    return json.loads(text)
+                    data = json.loads(p.read_text(encoding="utf-8"))
+                    if isinstance(data, dict):
+                        config.update(data)
             except Exception:
-                # ignore JSON/IO errors and try next candidate
+                # ignore JSON/IO errors like load_fs
                 continue
-        return None
\ No newline at end of file
+        self._configs[scenario_id] = config
+        return config
+
+    def load_host_profile(self, session: Any) -> HostProfile:
+        """
+        The emulated machine for the session's scenario, built from its
+        uname.txt, busybox.txt and config.json once per scenario.
+        """
+        scenario_id = getattr(session, "scenario_id", None) or "default"
+        profile = self._profiles.get(scenario_id)
+        if profile is None:
+            uname = self.get_txtcmd(session, "uname")
+            busybox = self.get_txtcmd(session, "busybox")
+            profile = build_profile(
+                scenario_id,
+                uname.text if uname else None,
+                self.load_config(session),
+                busybox.text if busybox else None,
+            )
+            self._profiles[scenario_id] = profile
+        return profile
@@ -13,11 +13,18 @@ import telnetlib3
 from telnetlib3.telopt import ECHO, WILL
 import binascii
 import logging
+from . import eventlog
 from .session import Session
 from .auth import AuthGate
-from .router import Router
+from .router import Router, new_ensemble_stats
+from .handlers import HandlerRegistry, default_registry
+from .txtcmd_catalog import txtcmd_catalog
 from .env import load_env
-from .llm import create_llm_client, LLMClient
+from .llm import create_llm_client, BaseLLMClient, LLMClient
+from .llm.cache import ResponseCache
+from .content_store import ContentStore
+from .llm.scheduler import LLMScheduler
+from .llm.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +39,32 @@ DEFAULT_CONFIG = {
     },
     "auth": {"max_attempts": 3, "fail_delay_seconds": 2},
     "limits": {"max_output_bytes": 16384, "max_line_length": 4096},
+    # events.jsonl group commit: flush every max_batch records or flush_interval_ms,
+    # dropping (and counting) records once max_queue are pending
+    "eventlog": {"max_batch": 256, "flush_interval_ms": 50, "max_queue": 10000},
+    "llm": {
+        "stream": False,
+        # admission control shared by all sessions
+        "max_concurrency": 16,
+        "max_queue": 256,
+        "queue_timeout_seconds": 10,
+        # per-command deadline for simulated output; scenarios may override
+        # it with `llm_timeout` in their config.json
+        "timeout_seconds": 30,
+    },
+    "llm_cache": {
+        "enabled": True,
+        "path": "logs/llm_cache.sqlite",
+        "max_entries": 4096,
+        "disk_max_entries": 100000,
+        "ttl_seconds": 86400,
+    },
+    # contents of scenario files, generated once and served to every session
+    "content_store": {
+        "enabled": True,
+        "path": "logs/content",
+        "max_memory_bytes": 32 * 1024 * 1024,
+    },
     "version": "0.1",
     "hostname": "autopot",
 }
@@ -39,6 +72,18 @@ DEFAULT_CONFIG = {
 CONFIG = DEFAULT_CONFIG
 
 
+def _relocate_logs(config: dict, logs_dir: str) -> None:
+    """
+    Point every runtime artifact (events, tty recordings, caches) at logs_dir.
+    """
+    root = pathlib.Path(logs_dir)
+    config["paths"]["logs_dir"] = str(root)
+    config["paths"]["tty_dir"] = str(root / "tty")
+    config["paths"]["events_file"] = str(root / "events.jsonl")
+    config["llm_cache"]["path"] = str(root / "llm_cache.sqlite")
+    config["content_store"]["path"] = str(root / "content")
+
+
 def _ensure_dirs():
     pathlib.Path(CONFIG["paths"]["logs_dir"]).mkdir(parents=True, exist_ok=True)
     pathlib.Path(CONFIG["paths"]["tty_dir"]).mkdir(parents=True, exist_ok=True)
@@ -56,6 +101,56 @@ def _normalize_for_terminal(text: str) -> str:
     return normalized.replace("\n", "\r\n")
 
 
+class _TerminalNormalizer:
+    """
+    Incremental _normalize_for_terminal for streamed output. A trailing "\r"
+    is held back until the next chunk shows whether it starts a CRLF pair.
+    """
+
+    def __init__(self):
+        self._pending_cr = False
+
+    def feed(self, text: str) -> str:
+        if not text:
+            return ""
+        if self._pending_cr:
+            self._pending_cr = False
+            text = "\r" + text
+        if text.endswith("\r"):
+            self._pending_cr = True
+            text = text[:-1]
+        return _normalize_for_terminal(text)
+
+    def flush(self) -> str:
+        if self._pending_cr:
+            self._pending_cr = False
+            return "\r\n"
+        return ""
+
+
+class _RecordingWriter:
+    """
+    The connection's writer, recording each write (banner, login and shell
+    prompts, echo, output as normalized for the terminal) in the session's
+    tty recording when it is made, so replays match the wire.
+    """
+
+    def __init__(self, writer, session: Session):
+        self._writer = writer
+        self._session = session
+
+    def write(self, data: str) -> None:
+        self._writer.write(data)
+        self._session.record_tty("out", data)
+
+    def echo(self, data: str) -> None:
+        self._writer.echo(data)
+        self._session.record_tty("out", data)
+
+    def __getattr__(self, name: str):
+        return getattr(self._writer, name)
+
+
 def _strip_backspaces(text: str) -> str:
     """Remove backspace/delete characters so the typed line matches what user sees."""
     if not text:
@@ -118,9 +213,97 @@ def _create_secondary_llm_client() -> Optional[LLMClient]:
     return None
 
 
+def _create_response_cache() -> Optional[ResponseCache]:
+    """Create the process-wide simulate_command response cache from CONFIG."""
+    cache_cfg = CONFIG.get("llm_cache") or {}
+    if os.getenv("LLM_CACHE", "").lower() in ("false", "0", "no"):
+        return None
+    if not cache_cfg.get("enabled", False):
+        return None
+    try:
+        return ResponseCache(
+            path=pathlib.Path(cache_cfg["path"]) if cache_cfg.get("path") else None,
+            max_entries=cache_cfg.get("max_entries", 4096),
+            ttl_seconds=cache_cfg.get("ttl_seconds"),
+            disk_max_entries=cache_cfg.get("disk_max_entries", 100000),
+        )
+    except Exception as exc:
+        logger.warning("Failed to initialize LLM response cache: %s", exc)
+        return None
+
+
+def _create_content_store() -> Optional[ContentStore]:
+    """Create the process-wide store of materialized file contents from CONFIG."""
+    store_cfg = CONFIG.get("content_store") or {}
+    if os.getenv("CONTENT_STORE", "").lower() in ("false", "0", "no"):
+        return None
+    if not store_cfg.get("enabled", False):
+        return None
+    try:
+        return ContentStore(
+            root=pathlib.Path(store_cfg["path"]) if store_cfg.get("path") else None,
+            max_memory_bytes=store_cfg.get("max_memory_bytes", 32 * 1024 * 1024),
+        )
+    except Exception as exc:
+        logger.warning("Failed to initialize content store: %s", exc)
+        return None
+
+
+def _create_llm_scheduler() -> LLMScheduler:
+    """Create the process-wide LLM admission scheduler; env vars override CONFIG."""
+    llm_cfg = CONFIG.get("llm") or {}
+
+    def _setting(env: str, key: str, default: float) -> float:
+        raw = os.getenv(env)
+        if raw:
+            try:
+                return float(raw)
+            except ValueError:
+                logger.warning("Ignoring invalid %s=%r", env, raw)
+        return llm_cfg.get(key, default)
+
+    return LLMScheduler(
+        max_concurrency=int(_setting("LLM_MAX_CONCURRENCY", "max_concurrency", 16)),
+        max_queue=int(_setting("LLM_MAX_QUEUE", "max_queue", 256)),
+        queue_timeout=_setting("LLM_QUEUE_TIMEOUT", "queue_timeout_seconds", 10),
+    )
+
+
+def _llm_timeout() -> Optional[float]:
+    raw = os.getenv("LLM_TIMEOUT")
+    if raw:
+        try:
+            return float(raw) or None
+        except ValueError:
+            logger.warning("Ignoring invalid LLM_TIMEOUT=%r", raw)
+    return (CONFIG.get("llm") or {}).get("timeout_seconds")
+
+
+def _stream_enabled() -> bool:
+    env = os.getenv("LLM_STREAM", "").lower()
+    if env:
+        return env in ("true", "1", "yes")
+    return bool((CONFIG.get("llm") or {}).get("stream", False))
+
+
 LLM_CLIENT = _create_configured_llm_client()
+RESPONSE_CACHE: Optional[ResponseCache] = None
+# Materialized scenario file contents shared by all sessions; created in start_server
+CONTENT_STORE: Optional[ContentStore] = None
+# Coalesces identical simulate requests across all sessions
+SINGLE_FLIGHT = SingleFlight()
+# Native command handlers, discovered once in start_server
+HANDLERS: Optional[HandlerRegistry] = None
+# Caps concurrent LLM calls across all sessions; created in start_server
+LLM_SCHEDULER: Optional[LLMScheduler] = None
 LLM_CLIENT_SECONDARY = None
 ENSEMBLE_MODE = False
+# "best" (wait for both models) or "race" (first response over the score bar wins)
+ENSEMBLE_POLICY = os.getenv("ENSEMBLE_POLICY", "best").lower()
+# race: let the losing call finish and log its response instead of cancelling it
+ENSEMBLE_LOG_LATE = os.getenv("ENSEMBLE_LOG_LATE", "").lower() in ("true", "1", "yes")
+# Shared by every session's Router so win/latency stats cover the whole process
+ENSEMBLE_STATS = new_ensemble_stats()
 
 # Enable ensemble mode if configured
 if os.getenv("ENSEMBLE_MODE", "").lower() in ("true", "1", "yes"):
@@ -135,7 +318,7 @@ if os.getenv("ENSEMBLE_MODE", "").lower() in ("true", "1", "yes"):
 async def shell(reader, writer) -> None:
     peer = writer.get_extra_info("peername") or ("0.0.0.0", 0)
     session_id = str(uuid.uuid4())
-    tty_path = str(pathlib.Path(CONFIG["paths"]["tty_dir"]) / f"{session_id}.log")
+    tty_path = str(pathlib.Path(CONFIG["paths"]["tty_dir"]) / f"{session_id}.cast")
     session = Session(
         session_id=session_id,
         remote_ip=peer[0],
@@ -148,13 +331,13 @@ async def shell(reader, writer) -> None:
         bytes_out=0,
         _events_file=CONFIG["paths"]["events_file"],
     )
+    writer = _RecordingWriter(writer, session)
     try:
         if hasattr(writer, "iac"):
             writer.iac(WILL, ECHO)
     except Exception:  # pragma: no cover
         pass
     await session.log("session.connect", "connect", banner=CONFIG["server"]["banner"])
-    await session.write_tty("out", CONFIG["server"]["banner"])
     try:
         # allow a short window for clients to send initial telnet negotiation
         # frames so the banner doesn't get interleaved with IAC bytes when probed
@@ -200,6 +383,16 @@ async def shell(reader, writer) -> None:
             llm_client=LLM_CLIENT,
             ensemble_mode=ENSEMBLE_MODE,
             llm_client_secondary=LLM_CLIENT_SECONDARY,
+            ensemble_policy=ENSEMBLE_POLICY,
+            ensemble_log_late=ENSEMBLE_LOG_LATE,
+            ensemble_stats=ENSEMBLE_STATS,
+            response_cache=RESPONSE_CACHE,
+            content_store=CONTENT_STORE,
+            handlers=HANDLERS,
+            singleflight=SINGLE_FLIGHT,
+            scheduler=LLM_SCHEDULER,
+            llm_timeout=_llm_timeout(),
+            stream_llm=_stream_enabled(),
         )
 
         prompt = lambda: f"{session.username or 'guest'}@{CONFIG['hostname']}$ "
@@ -210,6 +403,7 @@ async def shell(reader, writer) -> None:
             line = await reader.readline()
             if line is None:
                 break
+            await session.write_tty("in", line)
             raw_line = line.rstrip("\r\n")
             if not raw_line:
                 continue
@@ -217,8 +411,11 @@ async def shell(reader, writer) -> None:
             argv = line.split()
             await session.log("command.input", "shell", raw=raw_line, argv=argv)
             auto_echo = getattr(writer, "will_echo", False)
-            if not auto_echo:
-                normalized_input = _normalize_for_terminal(line)
+            normalized_input = _normalize_for_terminal(line)
+            if auto_echo:
+                # echoed by the telnet server as it was typed
+                await session.write_tty("out", normalized_input + "\r\n")
+            else:
                 try:
                     writer.echo(normalized_input + "\r\n")
                 except Exception:
@@ -226,23 +423,38 @@ async def shell(reader, writer) -> None:
             if not line:
                 continue
             session.record_command(line)
-            await session.write_tty("in", line)
             cmd = argv[0] if argv else ""
             exit_cmd = cmd in ("exit", "logout")
             if exit_cmd:
                 out = ""
                 truncated = False
+                writer.write("\r\n")
             else:
-                out, truncated = await router.dispatch(session, line)
-            await session.write_tty("out", out)
+                # write pieces as they arrive so slow simulations still show
+                # output early; the bytes on the wire match a single write
+                parts: List[str] = []
+                truncated = False
+                normalizer = _TerminalNormalizer()
+                started = False
+                async for chunk, truncated in router.dispatch_stream(session, line):
+                    parts.append(chunk)
+                    text = normalizer.feed(chunk)
+                    if not text:
+                        continue
+                    if not started:
+                        writer.write("\r\n")
+                        started = True
+                    writer.write(text)
+                    await writer.drain()
+                tail = normalizer.flush()
+                if tail and not started:
+                    writer.write("\r\n")
+                writer.write(tail + "\r\n")
+                out = "".join(parts)
+            await writer.drain()
             await session.log(
                 "command.output", "shell", bytes=len(out.encode()), truncated=truncated
             )
-            normalized = _normalize_for_terminal(out)
-            if normalized:
-                writer.write("\r\n")
-            writer.write(normalized + "\r\n")
-            await writer.drain()
             if exit_cmd:
                 break
     except Exception:
@@ -269,11 +481,32 @@ async def shell(reader, writer) -> None:
 
 
 async def start_server(config: Optional[dict] = None):
-    global CONFIG
+    global CONFIG, RESPONSE_CACHE, CONTENT_STORE, LLM_SCHEDULER, HANDLERS
     if config:
         # shallow merge; caller may pass full config
         CONFIG = {**DEFAULT_CONFIG, **config}
     _ensure_dirs()
+    eventlog_cfg = CONFIG.get("eventlog") or {}
+    eventlog.configure(
+        max_batch=eventlog_cfg.get("max_batch"),
+        flush_interval=(
+            eventlog_cfg["flush_interval_ms"] / 1000
+            if eventlog_cfg.get("flush_interval_ms") is not None
+            else None
+        ),
+        max_queue=eventlog_cfg.get("max_queue"),
+    )
+    if LLM_CLIENT and RESPONSE_CACHE is None:
+        RESPONSE_CACHE = _create_response_cache()
+    if LLM_CLIENT and CONTENT_STORE is None:
+        CONTENT_STORE = _create_content_store()
+    if LLM_CLIENT and LLM_SCHEDULER is None:
+        LLM_SCHEDULER = _create_llm_scheduler()
+    # index canned outputs before the first session needs them
+    txtcmd_catalog(pathlib.Path("scenarios")).refresh(force=True)
+    if HANDLERS is None:
+        HANDLERS = default_registry()
+        logger.info("Command handlers: %s", ", ".join(sorted(HANDLERS.stats())))
     host = CONFIG["server"]["host"]
     port = CONFIG["server"]["port"]
     # Create the telnet server. telnetlib3.create_server returns an asyncio.Server-like object.
@@ -308,6 +541,16 @@ async def start_server(config: Optional[dict] = None):
             await server.wait_closed()
         except Exception:
             pass
+        if RESPONSE_CACHE:
+            RESPONSE_CACHE.close()
+        for client in (LLM_CLIENT, LLM_CLIENT_SECONDARY):
+            if isinstance(client, BaseLLMClient):
+                try:
+                    await client.aclose()
+                except Exception as exc:
+                    logger.warning("Could not close LLM client: %r", exc)
+        if HANDLERS:
+            logger.info("Handler stats: %s", HANDLERS.stats())
     return server
 
 
@@ -316,6 +559,9 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=DEFAULT_CONFIG["server"]["port"])
+    parser.add_argument("--logs-dir", default=None)
     args = parser.parse_args()
     DEFAULT_CONFIG["server"]["port"] = args.port
+    if args.logs_dir:
+        _relocate_logs(DEFAULT_CONFIG, args.logs_dir)
     asyncio.run(start_server(DEFAULT_CONFIG))
@@ -4,14 +4,13 @@ autopot/session.py
 Session dataclass and JSONL event logging for the honeypot.
 """
 from dataclasses import dataclass, field
-import asyncio
 import json
 import datetime
 import pathlib
 import uuid
 from typing import Optional, Any, Dict, List
-
-_EVENT_LOCK = asyncio.Lock()
+from . import eventlog
+from .ttyrec import TtyRecorder
 
 def iso_ts():
     """
@@ -38,13 +37,23 @@ class Session:
     cwd: str = "/home/user"
     scenario_fs: Optional[Dict[str, Any]] = field(default=None, repr=False)
     scenario_fs_snapshot: Optional[Any] = field(default=None, repr=False)
+    # copy-on-write changes this session made on top of scenario_fs_snapshot
+    fs_overlay: Optional[Any] = field(default=None, repr=False)
+    # emulated machine identity for native handlers (see host_profile)
+    host_profile: Optional[Any] = field(default=None, repr=False)
+    # Mirai-style loader progress and scratch files (see loader_probes)
+    loader: Optional[Any] = field(default=None, repr=False)
     history: List[str] = field(default_factory=list, repr=False)
-    _tty_lock: asyncio.Lock = field(init=False, repr=False)
+    # exit status of the last command, for `$?`
+    last_status: int = 0
+    _tty: Optional[TtyRecorder] = field(default=None, init=False, repr=False)
 
     def __post_init__(self):
         tty_path = pathlib.Path(self.tty_path)
         ensure_dir(tty_path.parent)
-        self._tty_lock = asyncio.Lock()
+        if self.tty_path:
+            # created now so recorded times are relative to the session start
+            self._tty = TtyRecorder(self.tty_path, title=self.session_id)
 
     async def log(self, event: str, phase: str, **fields: Any) -> None:
         rec = {
@@ -57,16 +66,21 @@ class Session:
             "version": "0.1",
             "payload": fields or {}
         }
-        async with _EVENT_LOCK:
-            ensure_dir(pathlib.Path(self._events_file).parent)
-            with open(self._events_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        # serialized now so later changes to payload objects are not logged
+        eventlog.get_writer(self._events_file).write(
+            json.dumps(rec, ensure_ascii=False) + "\n"
+        )
+
+    def record_tty(self, direction: str, data: str) -> None:
+        """
+        Record terminal traffic ("in" from the client, "out" as sent to it)
+        in the session's asciicast recording, timed now.
+        """
+        if self._tty is not None:
+            self._tty.record(direction, data)
 
     async def write_tty(self, direction: str, data: str) -> None:
-        prefix = "< " if direction == "in" else "> "
-        async with self._tty_lock:
-            with open(self.tty_path, "a", encoding="utf-8", errors="ignore") as f:
-                f.write(f"{prefix}{data}\n")
+        self.record_tty(direction, data)
 
     def set_scenario(self, scenario_id: str) -> None:
         """
@@ -75,6 +89,9 @@ class Session:
         self.scenario_id = scenario_id or "default"
         self.scenario_fs = None
         self.scenario_fs_snapshot = None
+        self.fs_overlay = None
+        self.host_profile = None
+        self.loader = None
 
     def record_command(self, command: str) -> None:
         """
@@ -84,5 +101,8 @@ class Session:
             self.history.append(command)
 
     async def finalize_close(self) -> None:
-        # placeholder for any future cleanup hooks
-        return
+        # make this session's events and recording durable before the
+        # connection goes away
+        if self._tty is not None:
+            self._tty.close()
+        await eventlog.flush(self._events_file)
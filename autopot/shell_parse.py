@@ -0,0 +1,135 @@
+# python
+"""
+autopot/shell_parse.py
+Parse a command line into sequences (`;`, `&`, newline), conditionals
+(`&&`, `||`), pipelines and redirections. Subshells, here-documents and
+command substitution are rejected with UnsupportedSyntax so the caller can
+simulate the line as a whole.
+"""
+from typing import List, NamedTuple, Optional
+
+from .shellwords import Word, tokenize
+
+# default descriptor per redirection operator; -1 is stdout and stderr together
+_REDIRECTS = {"<": 0, ">": 1, ">>": 1, ">&": 1, "&>": -1}
+_SEQUENCE = {";", "&", "\n"}
+
+
+class UnsupportedSyntax(ValueError):
+    """
+    Raised for syntax the interpreter does not handle (or invalid syntax);
+    the line should be simulated as one command instead.
+    """
+
+
+class Redirect(NamedTuple):
+    fd: int
+    op: str
+    target: Word
+
+
+class Command(NamedTuple):
+    words: List[Word]
+    redirects: List[Redirect]
+    # source of the command without its redirections
+    text: str
+
+
+class Pipeline(NamedTuple):
+    commands: List[Command]
+    text: str
+
+
+class Step(NamedTuple):
+    """
+    A pipeline and how it follows the previous step: ";" always runs,
+    "&&" runs after success, "||" after failure.
+    """
+
+    connector: str
+    pipeline: Pipeline
+
+
+def parse_line(line: str) -> List[Step]:
+    if "`" in line or "$(" in line:
+        raise UnsupportedSyntax("command substitution")
+    try:
+        tokens = tokenize(line)
+    except ValueError as exc:
+        raise UnsupportedSyntax(str(exc)) from exc
+
+    steps: List[Step] = []
+    commands: List[Command] = []
+    words: List[Word] = []
+    sources: List[str] = []
+    redirects: List[Redirect] = []
+    connector = ";"
+    pipe_start: Optional[int] = None
+    pipe_end = 0
+
+    def end_command() -> None:
+        # a command may be redirections alone: `>file` creates or truncates file
+        if not words and not redirects:
+            raise UnsupportedSyntax("missing command")
+        commands.append(Command(list(words), list(redirects), " ".join(sources)))
+        words.clear()
+        sources.clear()
+        redirects.clear()
+
+    def end_pipeline(next_connector: str) -> None:
+        nonlocal connector, pipe_start
+        steps.append(Step(connector, Pipeline(list(commands), line[pipe_start:pipe_end])))
+        commands.clear()
+        connector, pipe_start = next_connector, None
+
+    i = 0
+    while i < len(tokens):
+        token, start, end = tokens[i]
+        i += 1
+        if pipe_start is None and (isinstance(token, Word) or token.text in _REDIRECTS):
+            pipe_start = start
+        if isinstance(token, Word):
+            words.append(token)
+            sources.append(line[start:end])
+            pipe_end = end
+            continue
+        op = token.text
+        if op in _REDIRECTS:
+            if i >= len(tokens) or not isinstance(tokens[i][0], Word):
+                raise UnsupportedSyntax(f"missing target for {op}")
+            target, _, pipe_end = tokens[i]
+            i += 1
+            fd = token.fd if token.fd is not None else _REDIRECTS[op]
+            redirects.append(Redirect(fd, op, target))
+        elif op == "|":
+            end_command()
+        elif op in ("&&", "||"):
+            end_command()
+            end_pipeline(op)
+        elif op in _SEQUENCE:
+            if words or redirects:
+                end_command()
+            if commands:
+                end_pipeline(";")
+            elif connector != ";":
+                raise UnsupportedSyntax(f"unexpected {op!r}")
+        else:
+            raise UnsupportedSyntax(f"unsupported operator {op!r}")
+    if words or redirects:
+        end_command()
+    if commands:
+        end_pipeline(";")
+    elif connector != ";":
+        raise UnsupportedSyntax(f"line ends with {connector!r}")
+    return steps
+
+
+def is_simple(steps: List[Step]) -> bool:
+    """
+    True for a single command without pipes or redirections.
+    """
+    return (
+        len(steps) == 1
+        and len(steps[0].pipeline.commands) == 1
+        and not steps[0].pipeline.commands[0].redirects
+    )
@@ -0,0 +1,234 @@
+# python
+"""
+autopot/shellwords.py
+POSIX word splitting (the rules shlex.split applies) that also remembers
+which glob characters were quoted, so only unquoted wildcards are expanded.
+tokenize additionally separates control and redirection operators. An
+unquoted `#` starting a word begins a comment, as in sh. Parameters (`$HOME`,
+`${PATH}`, `$?`) outside single quotes are kept as typed and recorded, so
+the caller can expand them when the command runs (see expand_params).
+"""
+from typing import Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+_GLOB_MAGIC = "*?["
+# characters a backslash escapes inside double quotes
+_DQUOTE_ESCAPES = '\\"$`\n'
+# operators recognised by tokenize, longest first
+_OPERATORS = ("&&", "||", ">>", ">&", "&>", "<<", ";", "&", "|", ">", "<", "(", ")", "\n")
+_OPERATOR_CHARS = frozenset("".join(_OPERATORS))
+# one-character parameter names: `$?`, `$0`, `$$`, ...; "(" stands for `$(`
+_SPECIAL_PARAMS = frozenset("?0123456789$#!@*-(")
+
+
+class Param(NamedTuple):
+    """
+    A parameter reference in a word: its span in Word.text and in
+    Word.pattern, and the parameter name (`?` for `$?`, whatever is between
+    the braces for `${...}`).
+    """
+
+    start: int
+    end: int
+    pattern_start: int
+    pattern_end: int
+    name: str
+
+
+class Word(NamedTuple):
+    """
+    text is the word after quote removal; pattern is the same word as an
+    fnmatch pattern with quoted magic characters bracketed, or None when the
+    word has no unquoted wildcard. params are the word's unexpanded
+    parameter references.
+    """
+
+    text: str
+    pattern: Optional[str]
+    params: Tuple[Param, ...] = ()
+
+
+class Op(NamedTuple):
+    """
+    An unquoted operator. fd is the descriptor written right before a
+    redirection (`2>`), None otherwise.
+    """
+
+    text: str
+    fd: Optional[int] = None
+
+
+Token = Union[Word, Op]
+
+
+def _lex(line: str, operators: bool) -> Iterator[Tuple[Token, int, int]]:
+    """
+    Yield (token, start, end) with source offsets. Raises ValueError on an
+    unterminated quote or trailing escape, like shlex.split.
+    """
+    text: List[str] = []
+    pattern: List[str] = []
+    params: List[Param] = []
+    in_word = False
+    magic = False
+    quoted = False
+    start = 0
+    i = 0
+    n = len(line)
+
+    def literal(ch: str) -> None:
+        text.append(ch)
+        pattern.append(f"[{ch}]" if ch in _GLOB_MAGIC else ch)
+
+    def word() -> Word:
+        return Word("".join(text), "".join(pattern) if magic else None, tuple(params))
+
+    def param(i: int) -> int:
+        """
+        Record the parameter reference at line[i] == "$" and return the index
+        after it, or i when the "$" is literal.
+        """
+        j = i + 1
+        if j < n and line[j] == "{":
+            close = line.find("}", j)
+            end = n if close < 0 else close + 1
+            name = line[j + 1 : close if close >= 0 else n]
+        elif j < n and (line[j].isalpha() or line[j] == "_"):
+            end = j + 1
+            while end < n and (line[end].isalnum() or line[end] == "_"):
+                end += 1
+            name = line[j:end]
+        elif j < n and line[j] in _SPECIAL_PARAMS:
+            end, name = j + 1, line[j]
+        else:
+            return i
+        start, pattern_start = len(text), sum(map(len, pattern))
+        for ch in line[i:end]:
+            literal(ch)
+        params.append(Param(start, len(text), pattern_start, sum(map(len, pattern)), name))
+        return end
+
+    while i < n:
+        ch = line[i]
+        if operators and ch in _OPERATOR_CHARS:
+            op = next(o for o in _OPERATORS if line.startswith(o, i))
+            fd = None
+            if in_word:
+                # `2>file`: an unquoted number glued to a redirection is its fd
+                if op[0] in "<>" and not quoted and "".join(text).isdigit():
+                    fd = int("".join(text))
+                else:
+                    yield word(), start, i
+                text, pattern, params, in_word, magic, quoted = [], [], [], False, False, False
+            yield Op(op, fd), i, i + len(op)
+            i += len(op)
+            continue
+        if ch.isspace():
+            if in_word:
+                yield word(), start, i
+                text, pattern, params, in_word, magic, quoted = [], [], [], False, False, False
+            i += 1
+            continue
+        if not in_word:
+            if ch == "#":
+                # a comment runs to the end of the line
+                end = line.find("\n", i)
+                i = n if end < 0 else end
+                continue
+            in_word, start = True, i
+        if ch == "'":
+            end = line.find("'", i + 1)
+            if end < 0:
+                raise ValueError("No closing quotation")
+            for quoted_ch in line[i + 1 : end]:
+                literal(quoted_ch)
+            quoted = True
+            i = end + 1
+        elif ch == '"':
+            quoted = True
+            i += 1
+            while True:
+                if i >= n:
+                    raise ValueError("No closing quotation")
+                ch = line[i]
+                if ch == '"':
+                    i += 1
+                    break
+                if ch == "\\" and i + 1 < n and line[i + 1] in _DQUOTE_ESCAPES:
+                    literal(line[i + 1])
+                    i += 2
+                    continue
+                end = param(i) if ch == "$" else i
+                if end > i:
+                    i = end
+                    continue
+                literal(ch)
+                i += 1
+        elif ch == "\\":
+            if i + 1 >= n:
+                raise ValueError("No escaped character")
+            literal(line[i + 1])
+            quoted = True
+            i += 2
+        else:
+            end = param(i) if ch == "$" else i
+            if end > i:
+                i = end
+                continue
+            text.append(ch)
+            pattern.append(ch)
+            magic = magic or ch in _GLOB_MAGIC
+            i += 1
+    if in_word:
+        yield word(), start, n
+
+
+def _quote_pattern(value: str) -> str:
+    return "".join(f"[{ch}]" if ch in _GLOB_MAGIC else ch for ch in value)
+
+
+def expand_params(word: Word, values: Mapping[str, str]) -> Optional[Word]:
+    """
+    The word with its parameters replaced by their values, which are not
+    globbed. None when a parameter has no value in values.
+    """
+    text, pattern = word.text, word.pattern
+    for param in reversed(word.params):
+        value = values.get(param.name)
+        if value is None:
+            return None
+        text = text[: param.start] + value + text[param.end :]
+        if pattern is not None:
+            pattern = (
+                pattern[: param.pattern_start]
+                + _quote_pattern(value)
+                + pattern[param.pattern_end :]
+            )
+    return Word(text, pattern)
+
+
+def split_words(line: str) -> List[Word]:
+    """
+    Split a command line into words. Raises ValueError on an unterminated
+    quote or trailing escape, like shlex.split.
+    """
+    return [token for token, _, _ in _lex(line, operators=False)]
+
+
+def tokenize(line: str) -> List[Tuple[Token, int, int]]:
+    """
+    Split a command line into words and operators with their source
+    offsets. Raises ValueError like split_words.
+    """
+    return list(_lex(line, operators=True))
+
+
+def strip_comment(line: str) -> str:
+    """
+    The line without a trailing comment. Lines that do not tokenize are
+    returned unchanged.
+    """
+    try:
+        tokens = tokenize(line)
+    except ValueError:
+        return line
+    return line[: tokens[-1][2]] if tokens else ""
@@ -0,0 +1,337 @@
+# python
+"""
+autopot/text_filters.py
+Text filters that read a pipeline's stdin (grep, wc, head, tail, cat, sort,
+uniq, cut, tr), so `... | grep root | wc -l` is computed from the previous
+stage's output instead of being simulated.
+"""
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .fs_read import (
+    UnsupportedOption,
+    iter_lines,
+    parse_head_tail,
+    parse_wc_args,
+    read_head,
+    read_tail,
+    wc_counts,
+)
+
+# stdin text -> (stdout text, exit status)
+Filter = Callable[[str], Tuple[str, int]]
+
+# GNU wc pads each count to 7 columns when reading stdin
+_WC_STDIN_WIDTH = 7
+_GREP_FLAGS = set("icnvEFwxoqsh")
+_TR_CLASSES = {
+    "[:lower:]": "abcdefghijklmnopqrstuvwxyz",
+    "[:upper:]": "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "[:digit:]": "0123456789",
+    "[:space:]": " \t\n\r\v\f",
+}
+
+
+def _lines(text: str) -> List[str]:
+    return [line.rstrip("\n") for line in iter_lines([text])]
+
+
+def _join(lines: Sequence[str]) -> str:
+    return "".join(line + "\n" for line in lines)
+
+
+def _bre_to_ere(pattern: str) -> str:
+    """
+    Translate a basic regular expression to Python syntax: \\| \\( \\) \\{ \\}
+    \\+ \\? are operators, the bare characters are literals.
+    """
+    out: List[str] = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            out.append(nxt if nxt in "|(){}+?" else ch + nxt)
+            i += 2
+            continue
+        out.append("\\" + ch if ch in "|(){}+?" else ch)
+        i += 1
+    return "".join(out)
+
+
+def _grep(args: Sequence[str]) -> Filter:
+    flags = set()
+    patterns: List[str] = []
+    operands: List[str] = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if arg == "-e" or arg.startswith("-e") and len(arg) > 2:
+            if len(arg) == 2:
+                if i >= len(args):
+                    raise UnsupportedOption("option requires an argument -- 'e'")
+                arg, i = "-e" + args[i], i + 1
+            patterns.append(arg[2:])
+        elif arg.startswith("-") and len(arg) > 1 and not arg.startswith("--"):
+            if not set(arg[1:]) <= _GREP_FLAGS:
+                raise UnsupportedOption(arg)
+            flags.update(arg[1:])
+        elif arg.startswith("--"):
+            raise UnsupportedOption(arg)
+        else:
+            operands.append(arg)
+    if not patterns:
+        if not operands:
+            raise UnsupportedOption("missing pattern")
+        patterns.append(operands.pop(0))
+    if operands:
+        raise UnsupportedOption("file operands")
+
+    sources = []
+    for pattern in patterns:
+        if "F" in flags:
+            source = re.escape(pattern)
+        elif "E" in flags:
+            source = pattern
+        else:
+            source = _bre_to_ere(pattern)
+        if "w" in flags:
+            source = rf"(?<!\w)(?:{source})(?!\w)"
+        if "x" in flags:
+            source = rf"^(?:{source})$"
+        sources.append(source)
+    try:
+        regex = re.compile("|".join(f"(?:{s})" for s in sources), re.I if "i" in flags else 0)
+    except re.error as exc:
+        raise UnsupportedOption(f"pattern: {exc}") from exc
+
+    def run(text: str) -> Tuple[str, int]:
+        selected = []
+        for number, line in enumerate(_lines(text), 1):
+            found = regex.search(line) is not None
+            if found == ("v" in flags):
+                continue
+            if "o" in flags and "v" not in flags:
+                parts = [m.group(0) for m in regex.finditer(line) if m.group(0)]
+            else:
+                parts = [line]
+            selected.extend(f"{number}:{part}" if "n" in flags else part for part in parts)
+        status = 0 if selected else 1
+        if "q" in flags:
+            return "", status
+        if "c" in flags:
+            return f"{len(selected)}\n", status
+        return _join(selected), status
+
+    return run
+
+
+def _wc(args: Sequence[str]) -> Filter:
+    counts, operands = parse_wc_args(args)
+    if operands:
+        raise UnsupportedOption("file operands")
+
+    def run(text: str) -> Tuple[str, int]:
+        values, _ = wc_counts([text], counts)
+        if len(values) == 1:
+            return f"{values[0]}\n", 0
+        return " ".join(f"{v:>{_WC_STDIN_WIDTH}}" for v in values) + "\n", 0
+
+    return run
+
+
+def _head_tail(cmd: str, args: Sequence[str]) -> Filter:
+    spec = parse_head_tail(cmd, args)
+    if spec.operands:
+        raise UnsupportedOption("file operands")
+    read = read_tail if cmd == "tail" else read_head
+    return lambda text: (read([text], spec), 0)
+
+
+def _cat(args: Sequence[str]) -> Filter:
+    if any(arg != "-" for arg in args):
+        raise UnsupportedOption("file operands")
+    return lambda text: (text, 0)
+
+
+def _numeric_key(line: str) -> float:
+    m = re.match(r"\s*([+-]?\d+(?:\.\d*)?)", line)
+    return float(m.group(1)) if m else 0.0
+
+
+def _sort(args: Sequence[str]) -> Filter:
+    flags = set()
+    for arg in args:
+        if not arg.startswith("-") or len(arg) < 2 or not set(arg[1:]) <= set("rnuf"):
+            raise UnsupportedOption(arg)
+        flags.update(arg[1:])
+
+    def key(line: str):
+        if "n" in flags:
+            return (_numeric_key(line), line)
+        return line.casefold() if "f" in flags else line
+
+    def run(text: str) -> Tuple[str, int]:
+        lines = sorted(_lines(text), key=key, reverse="r" in flags)
+        if "u" in flags:
+            # -u compares only the sort key, like GNU sort
+            same = (lambda line: key(line)[0]) if "n" in flags else key
+            unique: List[str] = []
+            for line in lines:
+                if not unique or same(unique[-1]) != same(line):
+                    unique.append(line)
+            lines = unique
+        return _join(lines), 0
+
+    return run
+
+
+def _uniq(args: Sequence[str]) -> Filter:
+    flags = set()
+    for arg in args:
+        if not arg.startswith("-") or len(arg) < 2 or not set(arg[1:]) <= set("cdui"):
+            raise UnsupportedOption(arg)
+        flags.update(arg[1:])
+
+    def run(text: str) -> Tuple[str, int]:
+        groups: List[List] = []
+        for line in _lines(text):
+            probe = line.casefold() if "i" in flags else line
+            if groups and groups[-1][0] == probe:
+                groups[-1][2] += 1
+            else:
+                groups.append([probe, line, 1])
+        out = []
+        for _, line, count in groups:
+            if "d" in flags and count < 2 or "u" in flags and count > 1:
+                continue
+            out.append(f"{count:>7} {line}" if "c" in flags else line)
+        return _join(out), 0
+
+    return run
+
+
+def _ranges(spec: str) -> List[Tuple[int, Optional[int]]]:
+    ranges = []
+    for part in spec.split(","):
+        m = re.fullmatch(r"(\d*)(-?)(\d*)", part)
+        if not m or not (m.group(1) or m.group(3)) or not m.group(2) and m.group(3):
+            raise UnsupportedOption(f"invalid list {spec!r}")
+        low = int(m.group(1)) if m.group(1) else 1
+        if m.group(2):
+            high = int(m.group(3)) if m.group(3) else None
+        else:
+            high = low
+        if low < 1:
+            raise UnsupportedOption(f"invalid list {spec!r}")
+        ranges.append((low, high))
+    return ranges
+
+
+def _selected(ranges: List[Tuple[int, Optional[int]]], count: int) -> List[int]:
+    return [
+        i
+        for i in range(1, count + 1)
+        if any(low <= i and (high is None or i <= high) for low, high in ranges)
+    ]
+
+
+def _cut(args: Sequence[str]) -> Filter:
+    delimiter = "\t"
+    fields: Optional[List[Tuple[int, Optional[int]]]] = None
+    chars: Optional[List[Tuple[int, Optional[int]]]] = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if arg[:2] not in ("-d", "-f", "-c", "-b"):
+            raise UnsupportedOption(arg)
+        value = arg[2:]
+        if not value:
+            if i >= len(args):
+                raise UnsupportedOption(f"option requires an argument -- '{arg[1]}'")
+            value, i = args[i], i + 1
+        if arg[1] == "d":
+            if len(value) != 1:
+                raise UnsupportedOption("the delimiter must be a single character")
+            delimiter = value
+        elif arg[1] == "f":
+            fields = _ranges(value)
+        else:
+            chars = _ranges(value)
+    if (fields is None) == (chars is None):
+        raise UnsupportedOption("you must specify a list of bytes, characters, or fields")
+
+    def run(text: str) -> Tuple[str, int]:
+        out = []
+        for line in _lines(text):
+            if chars is not None:
+                out.append("".join(line[i - 1] for i in _selected(chars, len(line))))
+            elif delimiter not in line:
+                out.append(line)
+            else:
+                parts = line.split(delimiter)
+                out.append(delimiter.join(parts[i - 1] for i in _selected(fields, len(parts))))
+        return _join(out), 0
+
+    return run
+
+
+def _tr_set(spec: str) -> str:
+    for name, chars in _TR_CLASSES.items():
+        spec = spec.replace(name, chars)
+    if "[:" in spec:
+        raise UnsupportedOption(f"unsupported class in {spec!r}")
+    spec = spec.replace("\\n", "\n").replace("\\t", "\t").replace("\\\\", "\\")
+    out: List[str] = []
+    i = 0
+    while i < len(spec):
+        if i + 2 < len(spec) and spec[i + 1] == "-" and spec[i] <= spec[i + 2]:
+            out.extend(chr(c) for c in range(ord(spec[i]), ord(spec[i + 2]) + 1))
+            i += 3
+        else:
+            out.append(spec[i])
+            i += 1
+    return "".join(out)
+
+
+def _tr(args: Sequence[str]) -> Filter:
+    if len(args) == 2 and args[0] == "-d":
+        table = str.maketrans("", "", _tr_set(args[1]))
+    elif len(args) == 2 and not args[0].startswith("-"):
+        source, target = _tr_set(args[0]), _tr_set(args[1])
+        if not target:
+            raise UnsupportedOption("when not truncating set1, string2 must be non-empty")
+        target = target + target[-1] * (len(source) - len(target))
+        table = str.maketrans(source, target[: len(source)])
+    else:
+        raise UnsupportedOption(" ".join(args))
+    return lambda text: (text.translate(table), 0)
+
+
+def parse_filter(argv: Sequence[str]) -> Filter:
+    """
+    The filter for a pipeline stage reading stdin. Raises UnsupportedOption
+    for other commands, file operands and options not implemented here.
+    """
+    cmd, args = argv[0], list(argv[1:])
+    if cmd in ("grep", "egrep", "fgrep"):
+        if cmd != "grep":
+            args.insert(0, "-E" if cmd == "egrep" else "-F")
+        return _grep(args)
+    if cmd == "wc":
+        return _wc(args)
+    if cmd in ("head", "tail"):
+        return _head_tail(cmd, args)
+    if cmd == "cat":
+        return _cat(args)
+    if cmd == "sort":
+        return _sort(args)
+    if cmd == "uniq":
+        return _uniq(args)
+    if cmd == "cut":
+        return _cut(args)
+    if cmd == "tr":
+        return _tr(args)
+    raise UnsupportedOption(f"{cmd}: not a native filter")
@@ -0,0 +1,136 @@
+# python
+"""
+autopot/ttyrec.py
+Buffered per-session terminal recorder writing asciicast v2
+(https://docs.asciinema.org/manual/asciicast/v2/) so sessions can be
+replayed at real speed, e.g. with `asciinema play`.
+"""
+import asyncio
+import json
+import logging
+import pathlib
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_BUFFER = 1 << 16
+
+_EVENT_CODES = {"in": "i", "out": "o"}
+
+
+class TtyRecorder:
+    """
+    Record terminal traffic for one session.
+
+    Events are buffered as `[seconds_since_start, "i"|"o", data]` lines and
+    written through a single handle opened on the first flush (which also
+    writes the header). The buffer is flushed once it holds max_buffer bytes,
+    flush_interval seconds after the first unflushed event, and on close().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        width: int = 80,
+        height: int = 24,
+        title: Optional[str] = None,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_buffer: int = DEFAULT_MAX_BUFFER,
+    ):
+        self.path = pathlib.Path(path)
+        self.width = width
+        self.height = height
+        self.title = title
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.started = time.time()
+        self._start = time.monotonic()
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._file: Optional[IO[str]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.closed = False
+
+    def header(self) -> Dict[str, Any]:
+        header: Dict[str, Any] = {
+            "version": 2,
+            "width": self.width,
+            "height": self.height,
+            "timestamp": int(self.started),
+            "env": {"SHELL": "/bin/sh", "TERM": "xterm"},
+        }
+        if self.title:
+            header["title"] = self.title
+        return header
+
+    def record(self, direction: str, data: str) -> None:
+        """Buffer one event; direction is "in" (client input) or "out"."""
+        if self.closed or not data:
+            return
+        elapsed = round(time.monotonic() - self._start, 6)
+        line = json.dumps([elapsed, _EVENT_CODES.get(direction, "o"), data], ensure_ascii=False)
+        self._buffer.append(line + "\n")
+        self._buffered += len(line) + 1
+        if self._buffered >= self.max_buffer:
+            self.flush()
+        elif self._timer is None:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        chunk = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8", errors="ignore")
+                if self._file.tell() == 0:
+                    self._file.write(json.dumps(self.header()) + "\n")
+            self._file.write(chunk)
+            self._file.flush()
+        except Exception:
+            logger.exception("Failed to write tty recording %s", self.path)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+
+def iter_events(path: str) -> Iterator[Tuple[float, str, str]]:
+    """
+    Yield (time, code, data) from an asciicast v2 file, skipping the header.
+    """
+    with open(path, encoding="utf-8") as f:
+        next(f, None)
+        for line in f:
+            line = line.strip()
+            if line:
+                t, code, data = json.loads(line)
+                yield (float(t), code, data)
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.loads(f.readline())
@@ -0,0 +1,128 @@
+# python
+"""
+autopot/txtcmd_catalog.py
+In-memory index of canned command outputs (scenarios/*/txtcmds/*.txt) with
+the default-scenario fallback resolved up front, so a lookup (hit or miss)
+is a dict access. The tree is re-checked by an mtime poll at most every
+poll_interval seconds.
+"""
+import os
+import pathlib
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_SCENARIO = "default"
+
+# (scenario, command, path, st_mtime_ns, st_size) for every txtcmd file
+_Signature = Tuple[Tuple[str, str, str, int, int], ...]
+
+
+class TxtCmd(NamedTuple):
+    path: pathlib.Path
+    text: str
+    # UTF-8 length of text, for truncation checks
+    nbytes: int
+
+
+class TxtcmdCatalog:
+    """
+    Canned outputs for every scenario under root. Files are read once and
+    again only when their mtime or size changes; added and removed files are
+    picked up by the same poll. Unreadable files are treated as missing.
+    """
+
+    def __init__(self, root: pathlib.Path, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.root = pathlib.Path(root)
+        self.poll_interval = poll_interval
+        self._files: Dict[str, Tuple[int, int, Optional[TxtCmd]]] = {}
+        self._resolved: Dict[str, Dict[str, TxtCmd]] = {}
+        self._default: Dict[str, TxtCmd] = {}
+        self._signature: Optional[_Signature] = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _scan(self) -> _Signature:
+        entries = []
+        try:
+            with os.scandir(self.root) as scenarios:
+                dirs = [entry for entry in scenarios if entry.is_dir()]
+        except OSError:
+            return ()
+        for scenario in dirs:
+            try:
+                with os.scandir(os.path.join(scenario.path, "txtcmds")) as files:
+                    for entry in files:
+                        if not entry.name.endswith(".txt") or not entry.is_file():
+                            continue
+                        st = entry.stat()
+                        entries.append(
+                            (scenario.name, entry.name[:-4], entry.path, st.st_mtime_ns, st.st_size)
+                        )
+            except OSError:
+                continue
+        return tuple(sorted(entries))
+
+    def _load(self, signature: _Signature) -> None:
+        files: Dict[str, Tuple[int, int, Optional[TxtCmd]]] = {}
+        by_scenario: Dict[str, Dict[str, TxtCmd]] = {}
+        for scenario, name, path, mtime_ns, size in signature:
+            previous = self._files.get(path)
+            if previous is not None and previous[:2] == (mtime_ns, size):
+                entry = previous[2]
+            else:
+                try:
+                    text = pathlib.Path(path).read_text(encoding="utf-8")
+                    entry = TxtCmd(pathlib.Path(path), text, len(text.encode("utf-8")))
+                except (OSError, UnicodeDecodeError):
+                    entry = None
+            files[path] = (mtime_ns, size, entry)
+            if entry is not None:
+                by_scenario.setdefault(scenario, {})[name] = entry
+        default = by_scenario.get(DEFAULT_SCENARIO, {})
+        self._files = files
+        self._default = default
+        self._resolved = {scenario: {**default, **own} for scenario, own in by_scenario.items()}
+        self._signature = signature
+        self.reloads += 1
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Re-index if the poll interval has passed (or force) and any file was
+        added, removed or modified.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < self.poll_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked < self.poll_interval:
+                return
+            self._checked = now
+            signature = self._scan()
+            if signature != self._signature:
+                self._load(signature)
+
+    def lookup(self, scenario_id: Optional[str], name: str) -> Optional[TxtCmd]:
+        """
+        The scenario's txtcmd for name, else the default scenario's.
+        """
+        self.refresh()
+        return self._resolved.get(scenario_id or DEFAULT_SCENARIO, self._default).get(name)
+
+
+_catalogs: Dict[pathlib.Path, TxtcmdCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def txtcmd_catalog(root: pathlib.Path) -> TxtcmdCatalog:
+    """
+    The process-wide catalog for a scenarios root, shared by every session.
+    """
+    root = pathlib.Path(root).resolve()
+    catalog = _catalogs.get(root)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.setdefault(root, TxtcmdCatalog(root))
+    return catalog
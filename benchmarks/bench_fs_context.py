@@ -0,0 +1,117 @@
+# python
+"""
+benchmarks/bench_fs_context.py
+Compare simulate prompt size and dispatch latency with the whole fs.json versus
+the relevance-pruned context from autopot.fs_context.
+
+Run from the repo root:
+    python -m benchmarks.bench_fs_context [--prefill-us-per-kb 0] [--llm]
+
+Without --llm a stub client is used; --prefill-us-per-kb models how long the
+provider takes to ingest each KB of prompt so the end-to-end effect of a
+smaller prompt is visible offline. With --llm the configured provider is used.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from autopot.llm import BaseLLMClient
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+from .synthetic import make_synthetic_tree
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+COMMANDS = ["cat config/camera.conf", "ls -la logs", "file bin/update.sh", "netstat -an"]
+
+
+class StubClient(BaseLLMClient):
+    def __init__(self, prefill_us_per_kb: float):
+        self.prefill_us_per_kb = prefill_us_per_kb
+        self.prompt_bytes: List[int] = []
+
+    def _raw_generate(self, prompt: str, model: Optional[str] = None, **kwargs) -> str:
+        size = len(prompt.encode("utf-8"))
+        self.prompt_bytes.append(size)
+        if self.prefill_us_per_kb:
+            time.sleep(size / 1024 * self.prefill_us_per_kb / 1e6)
+        return json.dumps({"stdout": "", "stderr": "", "exit_code": 0})
+
+
+def _make_scenarios(tmp: Path, synthetic_nodes: int) -> Path:
+    default_fs = (REPO_ROOT / "scenarios" / "default" / "fs.json").read_text()
+    (tmp / "default").mkdir(parents=True)
+    (tmp / "default" / "fs.json").write_text(default_fs)
+    (tmp / "synthetic").mkdir()
+    (tmp / "synthetic" / "fs.json").write_text(
+        json.dumps(make_synthetic_tree(synthetic_nodes))
+    )
+    return tmp
+
+
+async def _run(router: Router, scenario: str, client: Any, tmp: Path, rounds: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    for i in range(rounds):
+        session = Session(
+            session_id=f"bench-{i}",
+            remote_ip="127.0.0.1",
+            remote_port=0,
+            started_ts=iso_ts(),
+            tty_path=str(tmp / "tty" / "bench.log"),
+            _events_file=str(tmp / "events.jsonl"),
+        )
+        session.set_scenario(scenario)
+        for cmd in COMMANDS:
+            start = time.perf_counter()
+            await router.dispatch(session, cmd)
+            latencies.append(time.perf_counter() - start)
+    return {"p50_ms": statistics.median(latencies) * 1000, "mean_ms": statistics.fmean(latencies) * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--synthetic-nodes", type=int, default=10_000)
+    parser.add_argument("--budget", type=int, default=None, help="context budget in tokens")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--prefill-us-per-kb", type=float, default=0.0)
+    parser.add_argument("--llm", action="store_true", help="use the configured LLM provider")
+    args = parser.parse_args()
+    # simulate_command logs every response at WARNING
+    logging.getLogger("autopot.llm").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        scenarios = _make_scenarios(tmp / "scenarios", args.synthetic_nodes)
+        print(f"{'scenario':<10} {'mode':<7} {'prompt bytes':>13} {'p50 ms':>9} {'mean ms':>9}")
+        for scenario in ("default", "synthetic"):
+            prompt_bytes: Dict[str, int] = {}
+            for mode in ("full", "pruned"):
+                if args.llm:
+                    from autopot.server import LLM_CLIENT as client
+                else:
+                    client = StubClient(args.prefill_us_per_kb)
+                budget = None
+                if mode == "pruned":
+                    budget = args.budget or Router().fs_context_budget
+                router = Router(
+                    scenarios_root=scenarios, llm_client=client, fs_context_budget=budget
+                )
+                timing = asyncio.run(_run(router, scenario, client, tmp, args.rounds))
+                sizes = getattr(client, "prompt_bytes", None) or [0]
+                prompt_bytes[mode] = int(statistics.median(sizes))
+                print(
+                    f"{scenario:<10} {mode:<7} {prompt_bytes[mode]:>13} "
+                    f"{timing['p50_ms']:>9.2f} {timing['mean_ms']:>9.2f}"
+                )
+            # pruning must never cost prompt bytes, whatever the tree size
+            assert prompt_bytes["pruned"] <= prompt_bytes["full"], (scenario, prompt_bytes)
+
+
+if __name__ == "__main__":
+    main()
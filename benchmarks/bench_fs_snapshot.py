@@ -0,0 +1,104 @@
+# python
+"""
+benchmarks/bench_fs_snapshot.py
+Build time, index memory and lookup cost of FileSystemSnapshot versus the
+previous per-path dict-copy index, on synthetic trees.
+
+Run from the repo root:
+    python -m benchmarks.bench_fs_snapshot [--nodes 1000 100000]
+
+Memory is what tracemalloc attributes to building the index; the parsed tree
+itself is allocated beforehand and not counted.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+from autopot.fs_snapshot import FileSystemSnapshot
+
+from .synthetic import make_synthetic_tree
+
+
+def _legacy_index(root: Mapping[str, Any]) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+    """The index FileSystemSnapshot used to build: a dict copy per path."""
+    index: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def walk(node: Mapping[str, Any], rel: Tuple[str, ...]) -> None:
+        index[rel] = dict(node)
+        if node.get("type") == "dir":
+            for child in node.get("children", []):
+                name = child.get("name")
+                if name:
+                    walk(child, rel + (name,))
+
+    walk(root, ())
+    return index
+
+
+def _paths(root: Mapping[str, Any]) -> List[Tuple[str, ...]]:
+    out: List[Tuple[str, ...]] = []
+    stack = [(root, ())]
+    while stack:
+        node, rel = stack.pop()
+        out.append(rel)
+        for child in node.get("children") or ():
+            stack.append((child, rel + (child["name"],)))
+    return out
+
+
+def _measure(build: Callable[[], Any]) -> Tuple[Any, float, int]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, elapsed, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'nodes':>8} {'index':<8} {'json KB':>9} {'build ms':>9} "
+        f"{'index KB':>10} {'lookup us':>10}"
+    )
+    for nodes in args.nodes:
+        # round-trip so the tree looks like a freshly parsed fs.json
+        tree = json.loads(json.dumps(make_synthetic_tree(nodes)))
+        json_kb = len(json.dumps(tree)) / 1024
+        paths = _paths(tree)
+        probes = [paths[i % len(paths)] for i in range(0, args.lookups * 7, 7)]
+
+        legacy, legacy_s, legacy_mem = _measure(lambda: _legacy_index(tree))
+        start = time.perf_counter()
+        for rel in probes:
+            legacy.get(rel)
+        legacy_lookup = (time.perf_counter() - start) / len(probes)
+        del legacy
+
+        snapshot, build_s, mem = _measure(lambda: FileSystemSnapshot(tree))
+        start = time.perf_counter()
+        for rel in probes:
+            snapshot.get_node(rel)
+        lookup = (time.perf_counter() - start) / len(probes)
+
+        for label, secs, size, per in (
+            ("legacy", legacy_s, legacy_mem, legacy_lookup),
+            ("compact", build_s, mem, lookup),
+        ):
+            print(
+                f"{nodes:>8} {label:<8} {json_kb:>9.0f} {secs * 1000:>9.1f} "
+                f"{size / 1024:>10.0f} {per * 1e6:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
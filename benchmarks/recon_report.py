@@ -0,0 +1,140 @@
+# python
+"""
+benchmarks/recon_report.py
+Count the LLM calls recorded in an events.jsonl that the router now answers
+locally (native handlers such as uname, free or cat /proc/cpuinfo, builtins
+and txtcmds).
+
+Run from the repo root:
+    python -m benchmarks.recon_report logs/events.jsonl [--scenario default] [--json]
+
+Every llm.simulate_command or llm.ensemble event is one call. Its command is
+replayed against the local paths only: a simple command is eliminated when
+they answer it, a compound line (logged whole by older versions) when they
+answer every one of its segments.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Counter, Dict, Iterator, List, Optional
+
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+from autopot.shell_parse import UnsupportedSyntax, parse_line
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CALL_EVENTS = ("llm.simulate_command", "llm.ensemble")
+
+
+def iter_llm_commands(path: Path) -> Iterator[str]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("event") not in CALL_EVENTS:
+                continue
+            command = (record.get("payload") or {}).get("command")
+            if command:
+                yield command
+
+
+def _label(argv: List[str]) -> str:
+    # cat is only answered natively for /proc files, so keep the path
+    if argv[0] == "cat" and len(argv) > 1 and argv[1].startswith("/proc/"):
+        return f"cat {argv[1]}"
+    return argv[0]
+
+
+async def _is_local(router: Router, session: Session, words: List[str]) -> bool:
+    return await router._dispatch_local(session, " ".join(words), words) is not None
+
+
+async def analyze(
+    commands: List[str], scenarios_root: Path, scenario: str, tmp: Path
+) -> Dict[str, Any]:
+    router = Router(scenarios_root=scenarios_root)
+    calls: Counter[str] = collections.Counter()
+    eliminated: Counter[str] = collections.Counter()
+    segments = local_segments = 0
+    for command in commands:
+        # a fresh session per call, so cd and writes do not leak between them
+        session = Session(
+            session_id="report",
+            remote_ip="127.0.0.1",
+            remote_port=0,
+            started_ts=iso_ts(),
+            tty_path=str(tmp / "tty.log"),
+            _events_file=str(tmp / "events.jsonl"),
+        )
+        session.set_scenario(scenario)
+        try:
+            steps = parse_line(command)
+        except UnsupportedSyntax:
+            steps = []
+        argvs = [
+            [word.text for word in cmd.words] for step in steps for cmd in step.pipeline.commands
+        ]
+        if not argvs:
+            calls["(unparsed)"] += 1
+            continue
+        label = _label(argvs[0]) if len(argvs) == 1 else "(compound)"
+        calls[label] += 1
+        local = [await _is_local(router, session, argv) for argv in argvs]
+        if len(argvs) > 1:
+            segments += len(local)
+            local_segments += sum(local)
+        if all(local):
+            eliminated[label] += 1
+    total = sum(calls.values())
+    return {
+        "llm_calls": total,
+        "eliminated": sum(eliminated.values()),
+        "eliminated_pct": round(100 * sum(eliminated.values()) / total, 1) if total else 0.0,
+        "compound_segments": segments,
+        "compound_segments_local": local_segments,
+        "by_command": {
+            label: {"calls": count, "eliminated": eliminated[label]}
+            for label, count in calls.most_common()
+        },
+    }
+
+
+def _print(report: Dict[str, Any], top: Optional[int]) -> None:
+    print(f"LLM calls:  {report['llm_calls']}")
+    print(f"eliminated: {report['eliminated']} ({report['eliminated_pct']}%)")
+    if report["compound_segments"]:
+        print(
+            f"compound lines: {report['compound_segments_local']} of "
+            f"{report['compound_segments']} segments answered locally"
+        )
+    print(f"\n{'command':<24} {'calls':>7} {'eliminated':>11}")
+    rows = list(report["by_command"].items())[:top]
+    for label, row in rows:
+        print(f"{label[:24]:<24} {row['calls']:>7} {row['eliminated']:>11}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("events", type=Path, help="path to events.jsonl")
+    parser.add_argument("--scenarios", type=Path, default=REPO_ROOT / "scenarios")
+    parser.add_argument("--scenario", default="default")
+    parser.add_argument("--top", type=int, default=30, help="commands to list (0: all)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    commands = list(iter_llm_commands(args.events))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        report = asyncio.run(analyze(commands, args.scenarios, args.scenario, Path(tmpdir)))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print(report, args.top or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# python
+"""
+benchmarks/synthetic.py
+Deterministic synthetic fs.json trees for benchmarks.
+"""
+import random
+from typing import Any, Dict, List
+
+_EXTENSIONS = [".conf", ".log", ".sh", ".txt", ".json", ".bak", ".key", ""]
+
+
+def make_synthetic_tree(nodes: int, fanout: int = 12, seed: int = 1) -> Dict[str, Any]:
+    """
+    Build a tree rooted at "user" with roughly `nodes` entries, about a quarter
+    of them directories, breadth-first so depth grows like log(nodes).
+    """
+    rng = random.Random(seed)
+    root: Dict[str, Any] = {"type": "dir", "name": "user", "children": []}
+    frontier: List[Dict[str, Any]] = [root]
+    count = 1
+    while count < nodes and frontier:
+        parent = frontier.pop(0)
+        for i in range(fanout):
+            if count >= nodes:
+                break
+            if rng.random() < 0.25:
+                child: Dict[str, Any] = {"type": "dir", "name": f"dir{count}", "children": []}
+                frontier.append(child)
+            else:
+                ext = rng.choice(_EXTENSIONS)
+                child = {
+                    "type": "file",
+                    "name": f"file{count}{ext}",
+                    "size": rng.randint(0, 1 << 20),
+                    "content_summary": f"synthetic file {count} with some descriptive text",
+                }
+            parent["children"].append(child)
+            count += 1
+        if not frontier and count < nodes:
+            # keep growing even if no directory was rolled at this level
+            extra: Dict[str, Any] = {"type": "dir", "name": f"dir{count}", "children": []}
+            parent["children"].append(extra)
+            frontier.append(extra)
+            count += 1
+    return root
@@ -0,0 +1,114 @@
+# python
+"""
+benchmarks/template_hits.py
+Measure how many more simulate_command cache lookups recorded in an
+events.jsonl hit when commands are also keyed by their template (C2 URLs,
+IPs, hex payloads and random names replaced by placeholders, quoting and
+spacing canonical) instead of by their text alone.
+
+Run from the repo root:
+    python -m benchmarks.template_hits logs/events.jsonl [--top 20] [--json]
+
+The lookups are the llm.cache events, or the LLM calls when the log was
+written without a response cache. They are replayed in order against an
+unbounded cache. Events do not record cwd or filesystem state, so both
+keys ignore them; the rates are upper bounds, and the gain compares like
+with like.
+"""
+import argparse
+import collections
+import json
+from pathlib import Path
+from typing import Any, Counter, Dict, Iterable, List, Optional
+
+from autopot.llm.cache import normalize_command
+from autopot.llm.command_template import template_command
+from benchmarks.recon_report import CALL_EVENTS
+
+
+def load_lookups(path: Path) -> List[str]:
+    lookups: List[str] = []
+    calls: List[str] = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            command = (record.get("payload") or {}).get("command")
+            if not command:
+                continue
+            if record.get("event") == "llm.cache":
+                lookups.append(command)
+            elif record.get("event") in CALL_EVENTS:
+                calls.append(command)
+    return lookups or calls
+
+
+def _pct(part: int, total: int) -> float:
+    return round(100 * part / total, 1) if total else 0.0
+
+
+def replay(commands: Iterable[str]) -> Dict[str, Any]:
+    exact_seen = set()
+    template_seen = set()
+    lookups = exact_hits = template_hits = untemplated = 0
+    gained: Counter[str] = collections.Counter()
+    for command in commands:
+        lookups += 1
+        key = normalize_command(command)
+        template = template_command(command)
+        if template is not None and not template.bindings:
+            # the router keeps no template entry for these
+            template = None
+        if template is None:
+            untemplated += 1
+        if key in exact_seen:
+            exact_hits += 1
+        elif template is not None and template.text in template_seen:
+            template_hits += 1
+            gained[template.text] += 1
+        exact_seen.add(key)
+        if template is not None:
+            template_seen.add(template.text)
+    return {
+        "lookups": lookups,
+        "exact_hits": exact_hits,
+        "template_hits": template_hits,
+        "untemplated": untemplated,
+        "exact_hit_rate": _pct(exact_hits, lookups),
+        "hit_rate": _pct(exact_hits + template_hits, lookups),
+        "gain": _pct(template_hits, lookups),
+        "templates": dict(gained.most_common()),
+    }
+
+
+def _print(report: Dict[str, Any], top: Optional[int]) -> None:
+    print(f"lookups:         {report['lookups']}")
+    print(f"exact hits:      {report['exact_hits']} ({report['exact_hit_rate']}%)")
+    print(f"template hits:   {report['template_hits']} (+{report['gain']} points)")
+    print(f"hit rate:        {report['hit_rate']}%")
+    print(f"not templatable: {report['untemplated']}")
+    rows = list(report["templates"].items())[:top]
+    if rows:
+        print(f"\n{'extra hits':>10}  template")
+        for text, count in rows:
+            print(f"{count:>10}  {text[:100]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("events", type=Path, help="path to events.jsonl")
+    parser.add_argument("--top", type=int, default=20, help="templates to list (0: all)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = replay(load_lookups(args.events))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print(report, args.top or None)
+
+
+if __name__ == "__main__":
+    main()
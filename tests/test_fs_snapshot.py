@@ -0,0 +1,108 @@
+# python
+"""
+tests/test_fs_snapshot.py
+Unit tests for the process-wide FileSystemSnapshot registry.
+"""
+from pathlib import Path
+import json
+import os
+
+from autopot.fs_snapshot import FileSystemSnapshot, SnapshotRegistry
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+
+def _tree(*names):
+    return {
+        "type": "dir",
+        "name": "user",
+        "children": [{"type": "file", "name": n, "size": 1} for n in names],
+    }
+
+
+def _make_session(tmp_path: Path, session_id: str) -> Session:
+    return Session(
+        session_id=session_id,
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / f"{session_id}.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def test_registry_loads_each_file_once(tmp_path: Path) -> None:
+    path = tmp_path / "fs.json"
+    path.write_text(json.dumps(_tree("a")))
+    registry = SnapshotRegistry()
+    first = registry.get(path)
+    assert registry.get(path) is first
+    assert registry.loads == 1
+    assert first.get_node(("a",))["size"] == 1
+    assert registry.get(tmp_path / "missing.json") is None
+
+
+def test_registry_reloads_after_change(tmp_path: Path) -> None:
+    path = tmp_path / "fs.json"
+    path.write_text(json.dumps(_tree("a")))
+    registry = SnapshotRegistry()
+    first = registry.get(path)
+
+    # same contents with a new mtime keep the existing snapshot
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert registry.get(path) is first
+
+    path.write_text(json.dumps(_tree("a", "b")))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    second = registry.get(path)
+    assert second is not first
+    assert second.get_node(("b",)) is not None
+
+
+def test_sessions_share_one_snapshot(tmp_path: Path) -> None:
+    scenario = tmp_path / "scenarios" / "default"
+    scenario.mkdir(parents=True)
+    (scenario / "fs.json").write_text(json.dumps(_tree("a")))
+    routers = [Router(scenarios_root=tmp_path / "scenarios") for _ in range(2)]
+    sessions = [_make_session(tmp_path, f"s{i}") for i in range(2)]
+    snapshots = [r._get_fs_snapshot(s) for r, s in zip(routers, sessions)]
+    assert snapshots[0] is snapshots[1]
+    assert sessions[0].scenario_fs is snapshots[0].root
+
+
+def test_compact_index_matches_tree() -> None:
+    from benchmarks.synthetic import make_synthetic_tree
+
+    tree = make_synthetic_tree(500, fanout=7)
+    snapshot = FileSystemSnapshot(tree)
+    stack = [(tree, ())]
+    seen = 0
+    while stack:
+        node, rel = stack.pop()
+        assert snapshot.get_node(rel) is (snapshot.root if not rel else node)
+        seen += 1
+        for child in node.get("children") or ():
+            stack.append((child, rel + (child["name"],)))
+    assert len(snapshot) == seen
+    assert snapshot.get_node(("missing",)) is None
+    assert snapshot.get_node((tree["children"][0]["name"], "x", "y")) is None
+
+
+def test_unnamed_and_duplicate_children() -> None:
+    snapshot = FileSystemSnapshot(
+        {
+            "type": "dir",
+            "name": "user",
+            "children": [
+                {"type": "file", "size": 1},
+                {"type": "file", "name": "b", "size": 1},
+                {"type": "file", "name": "a", "size": 1},
+                {"type": "file", "name": "b", "size": 2},
+            ],
+        }
+    )
+    assert snapshot.get_node(("b",))["size"] == 2
+    assert snapshot.get_node(("a",))["size"] == 1
+    assert len(snapshot.list_dir(())) == 4
+    assert snapshot.list_dir(("a",)) is None
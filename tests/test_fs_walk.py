@@ -0,0 +1,124 @@
+# python
+"""
+tests/test_fs_walk.py
+Unit tests for the native find/tree/du/ls -R renderers.
+"""
+from pathlib import Path
+import asyncio
+
+from autopot.fs_snapshot import FileSystemSnapshot
+from autopot.fs_walk import human_size, iter_du, iter_find, iter_tree, parse_find
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+
+def _snapshot() -> FileSystemSnapshot:
+    return FileSystemSnapshot(
+        {
+            "type": "dir",
+            "name": "user",
+            "children": [
+                {"type": "file", "name": "run.sh", "size": 100},
+                {"type": "file", "name": ".hidden", "size": 1},
+                {
+                    "type": "dir",
+                    "name": "logs",
+                    "children": [
+                        {"type": "file", "name": "big.log", "size": 10000},
+                        {"type": "dir", "name": "old", "children": []},
+                    ],
+                },
+            ],
+        }
+    )
+
+
+def _find(*args):
+    starts, tests, max_depth, min_depth = parse_find(list(args))
+    return list(iter_find(_snapshot(), (), starts[0], tests, max_depth, min_depth))
+
+
+def _make_session(tmp_path: Path) -> Session:
+    return Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def test_find_predicates() -> None:
+    assert _find(".", "-name", "*.sh") == ["./run.sh"]
+    assert _find(".", "-type", "d") == [".", "./logs", "./logs/old"]
+    assert _find(".", "-maxdepth", "1", "-type", "f") == ["./run.sh", "./.hidden"]
+    assert _find("/home/user/", "-size", "+1k") == ["/home/user/logs/big.log"]
+    # sizes round up to 512-byte blocks, so a 1-byte file is not smaller than 1
+    assert _find(".", "-size", "-1") == []
+    assert _find(".", "-size", "1") == ["./run.sh", "./.hidden"]
+
+
+def test_find_rejects_unsupported_expressions() -> None:
+    try:
+        parse_find([".", "-exec", "rm", "{}", ";"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("-exec should not be handled natively")
+
+
+def test_tree_output() -> None:
+    lines = list(iter_tree(_snapshot(), (), "."))
+    assert lines == [
+        ".",
+        "├── logs",
+        "│   ├── big.log",
+        "│   └── old",
+        "└── run.sh",
+        "",
+        "2 directories, 2 files",
+    ]
+    assert list(iter_tree(_snapshot(), ("nope",), "nope"))[0] == "nope [error opening dir]"
+
+
+def test_du_rounds_to_blocks() -> None:
+    assert list(iter_du(_snapshot(), ("logs",), "logs")) == ["4\tlogs/old", "20\tlogs"]
+    assert list(iter_du(_snapshot(), (), ".", summarize=True, human=True)) == ["32K\t."]
+    assert human_size(4096) == "4.0K"
+    assert human_size(5 * 1024 * 1024 + 1) == "5.1M"
+
+
+def test_router_serves_traversal_commands_without_llm(tmp_path: Path) -> None:
+    class FailingClient:
+        def simulate_command(self, *args, **kwargs):
+            raise AssertionError("traversal commands must not reach the LLM")
+
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(scenarios_root=repo_root / "scenarios", llm_client=FailingClient())
+    session = _make_session(tmp_path)
+
+    def run(cmd):
+        return asyncio.run(router.dispatch(session, cmd))[0]
+
+    assert run("find . -name '*.sh'").splitlines() == [
+        "./scripts/monitor_camera.sh",
+        "./scripts/cleanup_logs.sh",
+    ]
+    assert run("tree .ssh").splitlines()[-1] == "0 directories, 4 files"
+    assert run("du -sh .ssh") == "20K\t.ssh"
+    listing = run("ls -R config")
+    assert listing.splitlines()[0] == "config:"
+    assert "camera.conf" in listing
+
+    # session changes are visible to traversal
+    run("mkdir -p new/dir")
+    assert run("find new") == "new\nnew/dir"
+
+
+def test_traversal_output_is_bounded(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(scenarios_root=repo_root / "scenarios", max_output=64)
+    out, truncated = asyncio.run(router.dispatch(_make_session(tmp_path), "find ."))
+    assert truncated
+    assert len(out) == 64
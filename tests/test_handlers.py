@@ -0,0 +1,109 @@
+# python
+"""
+tests/test_handlers.py
+Unit tests for handler discovery, per-scenario overrides and handler stats.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+import pytest
+
+from autopot.handlers import HandlerRegistry
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+
+def _make_session(tmp_path: Path, scenario_id: str = "default") -> Session:
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+    session.username = "alice"
+    session.scenario_id = scenario_id
+    return session
+
+
+def _discovered() -> HandlerRegistry:
+    registry = HandlerRegistry()
+    registry.discover(entry_points=False)
+    return registry
+
+
+def test_discovery_maps_commands_to_handlers() -> None:
+    registry = _discovered()
+    assert registry.resolve("id").name == "id"
+    assert registry.resolve("whoami").name == "whoami"
+    assert registry.resolve("history").name == "history"
+    assert registry.resolve("uname").name == "uname"
+    assert registry.resolve("cat").name == "proc"
+
+
+def test_aliases_and_replacement() -> None:
+    registry = HandlerRegistry()
+
+    async def first(session, argv):
+        return "first"
+
+    async def second(session, argv):
+        return "second"
+
+    registry.register("one", first, commands=("a", "b"))
+    registry.register("two", second, commands=("b",))
+    assert registry.resolve("a").name == "one"
+    assert registry.resolve("b").name == "two"
+    assert registry.resolve("c") is None
+
+
+def test_calls_are_counted(tmp_path: Path) -> None:
+    registry = _discovered()
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(scenarios_root=repo_root / "scenarios", handlers=registry)
+    session = _make_session(tmp_path)
+    for _ in range(3):
+        assert asyncio.run(router.dispatch(session, "whoami"))[0] == "alice"
+    stats = registry.stats()["whoami"]
+    assert stats["calls"] == 3 and stats["errors"] == 0
+    assert stats["avg_ms"] >= 0 and stats["max_ms"] >= stats["avg_ms"]
+
+
+def test_failing_handler_falls_through(tmp_path: Path) -> None:
+    registry = HandlerRegistry()
+
+    async def broken(session, argv):
+        raise RuntimeError("boom")
+
+    registry.register("whoami", broken)
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(scenarios_root=repo_root / "scenarios", handlers=registry)
+    out, _ = asyncio.run(router.dispatch(_make_session(tmp_path), "whoami"))
+    assert out == "sh: whoami: command not found"
+    assert registry.stats()["whoami"]["errors"] == 1
+
+
+@pytest.fixture
+def scenarios(tmp_path: Path) -> Path:
+    root = tmp_path / "scenarios"
+    (root / "default").mkdir(parents=True)
+    (root / "default" / "config.json").write_text("{}")
+    (root / "box").mkdir()
+    (root / "box" / "config.json").write_text(
+        json.dumps({"handlers": {"whoami": None, "me": "whoami", "uname": "uname"}})
+    )
+    return root
+
+
+def test_scenario_overrides(tmp_path: Path, scenarios: Path) -> None:
+    router = Router(scenarios_root=scenarios, handlers=_discovered())
+    box = _make_session(tmp_path, "box")
+    assert asyncio.run(router.dispatch(box, "whoami"))[0] == "sh: whoami: command not found"
+    assert asyncio.run(router.dispatch(box, "me"))[0] == "alice"
+    assert asyncio.run(router.dispatch(box, "uname -a"))[0].startswith("Linux ")
+
+    plain = _make_session(tmp_path, "default")
+    assert asyncio.run(router.dispatch(plain, "whoami"))[0] == "alice"
+    assert asyncio.run(router.dispatch(plain, "me"))[0] == "sh: me: command not found"
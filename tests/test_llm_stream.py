@@ -0,0 +1,135 @@
+# python
+"""
+tests/test_llm_stream.py
+Unit tests for streaming simulated output from the model to the client.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+from autopot.llm import BaseLLMClient
+from autopot.llm.scheduler import LLMScheduler
+from autopot.llm.stream import StdoutFieldParser
+from autopot.router import Router
+from autopot.server import _TerminalNormalizer, _normalize_for_terminal
+from autopot.session import Session, iso_ts
+
+RESPONSE = {
+    "explanation": 'mentions "stdout": "decoy"',
+    "stdout": "line one\nline é two\n",
+    "stderr": "warning: slow",
+    "exit_code": 0,
+}
+
+
+class ChunkedClient(BaseLLMClient):
+    def __init__(self, text: str, size: int):
+        self.text = text
+        self.size = size
+
+    def _raw_generate(self, prompt, model=None, **kwargs):
+        return self.text
+
+    async def _astream_messages(self, messages, model=None):
+        for i in range(0, len(self.text), self.size):
+            yield self.text[i : i + self.size]
+
+
+def _make_session(tmp_path: Path) -> Session:
+    return Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+async def _collect(router: Router, session: Session, line: str):
+    return [piece async for piece in router.dispatch_stream(session, line)]
+
+
+def test_parser_decodes_stdout_across_chunk_boundaries() -> None:
+    text = "```json\n" + json.dumps(RESPONSE) + "\n```"
+    for size in (1, 2, 5, 64):
+        parser = StdoutFieldParser()
+        decoded = "".join(parser.feed(text[i : i + size]) for i in range(0, len(text), size))
+        assert decoded == RESPONSE["stdout"]
+        assert parser.done
+
+
+def test_router_streams_stdout_then_stderr(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = ChunkedClient(json.dumps(RESPONSE), size=8)
+    router = Router(scenarios_root=repo_root / "scenarios", llm_client=client, stream_llm=True)
+    session = _make_session(tmp_path)
+
+    pieces = asyncio.run(_collect(router, session, "netstat"))
+
+    assert len(pieces) > 2
+    output = "".join(chunk for chunk, _ in pieces)
+    assert output == RESPONSE["stdout"] + "\n" + RESPONSE["stderr"]
+    # same text as the non-streaming path
+    assert output == router._format_simulated_output(RESPONSE)
+    event = json.loads((tmp_path / "events.jsonl").read_text().splitlines()[-1])
+    assert event["event"] == "llm.simulate_command"
+    assert event["payload"]["streamed"] is True
+
+
+def test_stream_frees_the_llm_slot_before_the_client_reads(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = ChunkedClient(json.dumps(RESPONSE), size=8)
+    scheduler = LLMScheduler(max_concurrency=1)
+    router = Router(
+        scenarios_root=repo_root / "scenarios",
+        llm_client=client,
+        stream_llm=True,
+        scheduler=scheduler,
+    )
+    session = _make_session(tmp_path)
+
+    async def run():
+        stream = router.dispatch_stream(session, "netstat")
+        pieces = [await stream.__anext__()]
+        # a slow client: generation finishes and the slot is free before it
+        # takes the next piece
+        await asyncio.sleep(0.05)
+        active = scheduler.active
+        pieces += [piece async for piece in stream]
+        return active, "".join(chunk for chunk, _ in pieces)
+
+    active, output = asyncio.run(run())
+    assert active == 0
+    assert output == RESPONSE["stdout"] + "\n" + RESPONSE["stderr"]
+
+
+def test_router_stream_respects_max_output(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = ChunkedClient(json.dumps({"stdout": "x" * 100, "exit_code": 0}), size=7)
+    router = Router(
+        scenarios_root=repo_root / "scenarios",
+        llm_client=client,
+        stream_llm=True,
+        max_output=10,
+    )
+    pieces = asyncio.run(_collect(router, _make_session(tmp_path), "yes"))
+    assert "".join(chunk for chunk, _ in pieces) == "x" * 10
+    assert pieces[-1][1] is True
+
+
+def test_local_commands_yield_once(tmp_path: Path) -> None:
+    router = Router(stream_llm=True)
+    pieces = asyncio.run(_collect(router, _make_session(tmp_path), "pwd"))
+    assert pieces == [("/home/user", False)]
+
+
+def test_terminal_normalizer_matches_whole_string() -> None:
+    text = "a\r\nb\rc\nd\r"
+    for size in (1, 2, 3):
+        normalizer = _TerminalNormalizer()
+        streamed = "".join(
+            normalizer.feed(text[i : i + size]) for i in range(0, len(text), size)
+        )
+        streamed += normalizer.flush()
+        assert streamed == _normalize_for_terminal(text)
@@ -0,0 +1,119 @@
+# python
+"""
+tests/test_recon_handlers.py
+Unit tests for the host profile, the native recon handlers built on it and
+the report of LLM calls they eliminate.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+import pytest
+
+from autopot.host_profile import build_profile, memory
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+UNAME = (REPO_ROOT / "scenarios" / "default" / "txtcmds" / "uname.txt").read_text()
+
+
+def _make_session(tmp_path: Path, scenario_id: str = "default") -> Session:
+    session = Session(
+        session_id="test-session",
+        remote_ip="203.0.113.5",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+    session.username = "admin"
+    session.set_scenario(scenario_id)
+    return session
+
+
+def _dispatch(router: Router, session: Session, cmd: str) -> str:
+    return asyncio.run(router.dispatch(session, cmd))[0]
+
+
+def test_profile_follows_uname_txt() -> None:
+    profile = build_profile("default", UNAME)
+    assert (profile.hostname, profile.kernel_release, profile.machine) == (
+        "cam01",
+        "3.10.14",
+        "armv7l",
+    )
+    assert profile.kernel_version == "#42 Thu Mar 17 11:22:41 CST 2022"
+    assert profile.embedded and "lscpu" not in profile.binaries
+    # seeded: the same scenario always gets the same machine
+    assert build_profile("default", UNAME)[:-1] == profile[:-1]
+    assert build_profile("other", UNAME).mac != profile.mac
+
+    gnu = build_profile("x", "Linux web1 5.4.0 #46-Ubuntu SMP x86_64 x86_64 x86_64 GNU/Linux")
+    assert (gnu.machine, gnu.kernel_version, gnu.embedded) == ("x86_64", "#46-Ubuntu SMP", False)
+
+
+def test_config_host_table_overrides(tmp_path: Path) -> None:
+    host = {
+        "cpu_cores": 4,
+        "ip": "10.0.0.9",
+        "crontab": "* * * * * /tmp/x",
+        "binaries": {"wget": None},
+    }
+    profile = build_profile("box", UNAME, {"host": host})
+    assert profile.cpu_cores == 4 and profile.ip == "10.0.0.9"
+    assert profile.crontab == ("* * * * * /tmp/x",)
+    assert "wget" not in profile.binaries
+    mem = memory(profile, now=0)
+    assert mem.used + mem.free + mem.buffers + mem.cached == mem.total
+    assert memory(profile, now=30) == mem
+
+
+def test_handlers_agree_with_the_scenario(tmp_path: Path) -> None:
+    router = Router(scenarios_root=REPO_ROOT / "scenarios")
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "uname -a") == UNAME.strip()
+    assert _dispatch(router, session, "uname -m") == "armv7l"
+    assert _dispatch(router, session, "uname -nr") == "cam01 3.10.14"
+    assert _dispatch(router, session, "nproc") == "1"
+    assert _dispatch(router, session, "cat /proc/cpuinfo | grep -c processor") == "1"
+    assert "ARMv7" in _dispatch(router, session, "cat /proc/cpuinfo")
+
+    total = _dispatch(router, session, "cat /proc/meminfo | head -n 1").split()[1]
+    assert _dispatch(router, session, "free").splitlines()[1].split()[1] == total
+
+    assert " up " in _dispatch(router, session, "uptime")
+    w = _dispatch(router, session, "w").splitlines()
+    assert w[1].startswith("USER") and w[2].split()[:3] == ["admin", "pts/0", "203.0.113.5"]
+    assert _dispatch(router, session, "crontab -l") == "no crontab for admin"
+    assert _dispatch(router, session, "which wget curl") == "/usr/bin/wget"
+    assert _dispatch(router, session, "lscpu") == "sh: lscpu: command not found"
+    ifconfig = _dispatch(router, session, "ifconfig")
+    assert ifconfig.startswith("eth0") and "inet addr:127.0.0.1" in ifconfig
+
+
+@pytest.mark.parametrize("line", ["cat /proc/net/tcp", "crontab -r", "free --wide", "uptime -x"])
+def test_other_forms_are_declined(tmp_path: Path, line: str) -> None:
+    router = Router(scenarios_root=REPO_ROOT / "scenarios")
+    assert _dispatch(router, _make_session(tmp_path), line).startswith("sh: ")
+
+
+def test_report_counts_eliminated_calls(tmp_path: Path) -> None:
+    from benchmarks.recon_report import analyze, iter_llm_commands
+
+    events = tmp_path / "events.jsonl"
+    commands = ["uname -a", "cat /proc/cpuinfo", "wget http://x/a", "nproc; ./a", "free -m && w"]
+    events.write_text(
+        "\n".join(
+            json.dumps({"event": event, "payload": {"command": command}})
+            for command in commands
+            for event in ("command.input", "llm.simulate_command")
+        )
+    )
+    found = list(iter_llm_commands(events))
+    assert found == commands
+    report = asyncio.run(analyze(found, REPO_ROOT / "scenarios", "default", tmp_path))
+    assert report["llm_calls"] == 5 and report["eliminated"] == 3
+    assert report["by_command"]["cat /proc/cpuinfo"] == {"calls": 1, "eliminated": 1}
+    assert report["by_command"]["(compound)"] == {"calls": 2, "eliminated": 1}
+    assert (report["compound_segments"], report["compound_segments_local"]) == (4, 3)
@@ -0,0 +1,103 @@
+# python
+"""
+tests/test_router_ensemble.py
+Unit tests for the hedged ("race") ensemble policy.
+"""
+from pathlib import Path
+import asyncio
+import json
+import time
+
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+GOOD = {"stdout": "plenty of output", "stderr": "", "exit_code": 0, "explanation": "ok"}
+POOR = {"stdout": "", "stderr": "error", "exit_code": 1}
+
+
+class SleepyClient:
+    def __init__(self, delay, response):
+        self.delay = delay
+        self.response = response
+        self.finished = False
+
+    async def asimulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        await asyncio.sleep(self.delay)
+        self.finished = True
+        return dict(self.response)
+
+
+def _make_session(tmp_path: Path) -> Session:
+    return Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def _make_router(primary, secondary, **kwargs) -> Router:
+    repo_root = Path(__file__).resolve().parents[1]
+    return Router(
+        scenarios_root=repo_root / "scenarios",
+        llm_client=primary,
+        llm_client_secondary=secondary,
+        ensemble_mode=True,
+        ensemble_policy="race",
+        **kwargs,
+    )
+
+
+def _events(tmp_path: Path):
+    return [json.loads(l) for l in (tmp_path / "events.jsonl").read_text().splitlines()]
+
+
+def test_race_returns_first_good_response(tmp_path: Path) -> None:
+    primary = SleepyClient(0.5, dict(GOOD, stdout="primary output"))
+    secondary = SleepyClient(0.01, dict(GOOD, stdout="secondary output"))
+    router = _make_router(primary, secondary)
+
+    async def run():
+        start = time.monotonic()
+        result = await router.dispatch(_make_session(tmp_path), "netstat")
+        return result, time.monotonic() - start
+
+    (output, _), elapsed = asyncio.run(run())
+    assert output == "secondary output"
+    assert elapsed < 0.4
+    assert not primary.finished  # the slow call was cancelled
+    assert router.ensemble_stats["secondary_wins"] == 1
+    assert router.ensemble_stats["secondary_calls"] == 1
+    assert router.ensemble_stats["secondary_latency_ms_total"] > 0
+
+
+def test_race_skips_fast_low_scoring_response(tmp_path: Path) -> None:
+    primary = SleepyClient(0.05, GOOD)
+    secondary = SleepyClient(0.0, POOR)
+    router = _make_router(primary, secondary)
+
+    output, _ = asyncio.run(router.dispatch(_make_session(tmp_path), "netstat"))
+
+    assert output == GOOD["stdout"]
+    ensemble = [e for e in _events(tmp_path) if e["event"] == "llm.ensemble"][-1]
+    assert ensemble["payload"]["winner"] == "primary"
+    assert ensemble["payload"]["policy"] == "race"
+
+
+def test_race_logs_late_response(tmp_path: Path) -> None:
+    primary = SleepyClient(0.0, GOOD)
+    secondary = SleepyClient(0.05, GOOD)
+    router = _make_router(primary, secondary, ensemble_log_late=True)
+
+    async def run():
+        result = await router.dispatch(_make_session(tmp_path), "netstat")
+        await asyncio.sleep(0.1)
+        return result
+
+    output, _ = asyncio.run(run())
+    assert output == GOOD["stdout"]
+    late = [e for e in _events(tmp_path) if e["event"] == "llm.ensemble.late"]
+    assert len(late) == 1
+    assert late[0]["payload"]["model"] == "secondary"
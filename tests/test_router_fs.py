@@ -21,6 +21,7 @@ def _make_session(tmp_path: Path) -> Session:
         remote_port=12345,
         started_ts=iso_ts(),
         tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
     )
 
 
@@ -44,12 +45,13 @@ def test_pwd_returns_home(tmp_path: Path) -> None:
 def test_ls_shows_directory_entries(tmp_path: Path) -> None:
     session = _make_session(tmp_path)
     router = _make_router()
-    output, truncated = _dispatch(router, session, "ls")
+    output, truncated = _dispatch(router, session, "ls -la")
     assert not truncated
     lines = output.splitlines()
     assert lines, "ls should emit at least the . and .. entries"
-    assert lines[0].split()[-1] == "."
-    assert lines[1].split()[-1] == ".."
+    assert lines[0].startswith("total ")
+    assert lines[1].split()[-1] == "."
+    assert lines[2].split()[-1] == ".."
     entry_names = {line.split()[-1] for line in lines}
     assert "bin" in entry_names
     assert "README.txt" in entry_names
@@ -72,27 +74,56 @@ def test_cd_changes_cwd(tmp_path: Path) -> None:
 def test_ls_with_path_argument(tmp_path: Path) -> None:
     session = _make_session(tmp_path)
     router = _make_router()
-    output, truncated = _dispatch(router, session, "ls /home/user/config")
+    output, truncated = _dispatch(router, session, "ls -1 /home/user/config")
     assert not truncated
     names = {line.split()[-1] for line in output.splitlines()}
     assert "camera.conf" in names
 
 
-def test_ls_flags_are_ignored(tmp_path: Path) -> None:
+def test_ls_plain_lists_names_in_columns(tmp_path: Path) -> None:
     session = _make_session(tmp_path)
     router = _make_router()
     plain, _ = _dispatch(router, session, "ls")
-    flagged, _ = _dispatch(router, session, "ls -la")
-    assert plain == flagged
-    assert "." in _entry_names(flagged)
+    names = set(plain.split())
+    assert {"bin", "logs", "README.txt"} <= names
+    assert ".ssh" not in names
+    assert all(len(line) <= 80 for line in plain.splitlines())
+    assert ".ssh" in _dispatch(router, session, "ls -a")[0].split()
+    assert ".ssh" in _dispatch(router, session, "ls -1A")[0].splitlines()
+
+
+def test_ls_long_human_sizes(tmp_path: Path) -> None:
+    session = _make_session(tmp_path)
+    router = _make_router()
+    output, _ = _dispatch(router, session, "ls -lh logs")
+    line = next(l for l in output.splitlines() if l.endswith(" system.log"))
+    assert line.split()[4] == "8.0K"
+
+
+def test_ls_multiple_targets_and_errors(tmp_path: Path) -> None:
+    session = _make_session(tmp_path)
+    router = _make_router()
+    output, _ = _dispatch(router, session, "ls -1 bin README.txt nope")
+    assert output.splitlines() == [
+        "ls: cannot access 'nope': No such file or directory",
+        "README.txt",
+        "",
+        "bin:",
+        "encrypt_tool",
+        "iot_scanner",
+        "netcat_static",
+        "syscheck",
+    ]
+    output, _ = _dispatch(router, session, "ls -y")
+    assert output.startswith("ls: invalid option -- 'y'")
 
 
 def test_ls_flag_with_path(tmp_path: Path) -> None:
     session = _make_session(tmp_path)
     router = _make_router()
     flagged, _ = _dispatch(router, session, "ls -la /home/user/logs")
-    direct, _ = _dispatch(router, session, "ls /home/user/logs")
-    assert flagged == direct
+    relative, _ = _dispatch(router, session, "ls -la logs")
+    assert flagged == relative
     assert "system.log" in _entry_names(flagged)
 
 
@@ -130,7 +161,7 @@ def test_ls_relative_parent_with_dots(tmp_path: Path) -> None:
     router = _make_router()
     _dispatch(router, session, "cd bin")
     base_cwd = session.cwd
-    output, _ = _dispatch(router, session, "ls ../logs")
+    output, _ = _dispatch(router, session, "ls -1 ../logs")
     assert session.cwd == base_cwd
     names = _entry_names(output)
     assert "system.log" in names
@@ -140,8 +171,37 @@ def test_ls_relative_parent_with_dots(tmp_path: Path) -> None:
 def test_ls_logs_dot_dot(tmp_path: Path) -> None:
     session = _make_session(tmp_path)
     router = _make_router()
-    output, _ = _dispatch(router, session, "ls logs/./..")
+    output, _ = _dispatch(router, session, "ls -1a logs/./..")
     names = _entry_names(output)
     assert "." in names
     assert ".." in names
     assert "bin" in names
+
+
+def test_ls_listing_is_memoized_across_sessions(tmp_path: Path) -> None:
+    from autopot.fs_ls import directory_lines, parse_ls_args
+
+    router = _make_router()
+    first = router._get_fs(_make_session(tmp_path))
+    second = router._get_fs(_make_session(tmp_path))
+    flags, _ = parse_ls_args(["-la"])
+    assert directory_lines(first, ("logs",), flags) is directory_lines(second, ("logs",), flags)
+
+
+class _RecordingLLMClient:
+    def __init__(self):
+        self.calls = []
+
+    def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls.append(command)
+        return {"stdout": "bin  etc  usr", "stderr": "", "exit_code": 0}
+
+
+def test_ls_outside_the_tree_is_simulated(tmp_path: Path) -> None:
+    session = _make_session(tmp_path)
+    client = _RecordingLLMClient()
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(scenarios_root=repo_root / "scenarios", llm_client=client)
+    output, _ = _dispatch(router, session, "ls /")
+    assert output == "bin  etc  usr"
+    assert client.calls == ["ls /"]
@@ -17,6 +17,7 @@ def _make_session(tmp_path: Path) -> Session:
         remote_port=12345,
         started_ts=iso_ts(),
         tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
     )
 
 
@@ -15,7 +15,7 @@ class DummyLLMClient:
     def __init__(self):
         self.calls = []
 
-    def simulate_command(self, command, fs, bash_history, *, model=None):
+    def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
         self.calls.append((command, fs, bash_history))
         return {
             "stdout": f"simulated stdout for {command}",
@@ -89,3 +89,27 @@ def test_router_falls_back_when_llm_errors(tmp_path: Path) -> None:
 
     assert not truncated
     assert output == "sh: broken: command not found"
+
+
+class AsyncOnlyLLMClient:
+    def __init__(self):
+        self.calls = []
+
+    def simulate_command(self, *args, **kwargs):
+        raise AssertionError("sync simulate_command should not be used")
+
+    async def asimulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls.append(command)
+        return {"stdout": f"async {command}", "stderr": "", "exit_code": 0}
+
+
+def test_router_awaits_native_async_client(tmp_path: Path) -> None:
+    session = _make_session(tmp_path)
+    client = AsyncOnlyLLMClient()
+    router = _make_router(client)
+
+    output, truncated = asyncio.run(router.dispatch(session, "netstat"))
+
+    assert not truncated
+    assert output == "async netstat"
+    assert client.calls == ["netstat"]
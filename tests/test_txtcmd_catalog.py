@@ -0,0 +1,92 @@
+# python
+"""
+tests/test_txtcmd_catalog.py
+Unit tests for the in-memory txtcmd catalog and its mtime-based refresh.
+"""
+from pathlib import Path
+import asyncio
+import os
+
+from autopot import txtcmd_catalog as catalog_module
+from autopot.router import Router
+from autopot.scenario import ScenarioManager
+from autopot.session import Session, iso_ts
+from autopot.txtcmd_catalog import TxtcmdCatalog
+
+
+def _write(root: Path, scenario: str, name: str, text: str) -> Path:
+    path = root / scenario / "txtcmds" / f"{name}.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _tree(tmp_path: Path) -> Path:
+    root = tmp_path / "scenarios"
+    _write(root, "default", "ps", "default ps")
+    _write(root, "default", "df", "default df")
+    _write(root, "box", "ps", "box ps")
+    return root
+
+
+def test_default_fallback_is_resolved(tmp_path: Path) -> None:
+    catalog = TxtcmdCatalog(_tree(tmp_path))
+    assert catalog.lookup("box", "ps").text == "box ps"
+    assert catalog.lookup("box", "df").text == "default df"
+    assert catalog.lookup("unknown", "ps").text == "default ps"
+    assert catalog.lookup(None, "ps").text == "default ps"
+    assert catalog.lookup("box", "netstat") is None
+    assert catalog.lookup("box", "ps").nbytes == len(b"box ps")
+
+
+def test_lookups_between_polls_do_not_touch_the_disk(tmp_path: Path, monkeypatch) -> None:
+    catalog = TxtcmdCatalog(_tree(tmp_path), poll_interval=3600)
+    catalog.lookup("box", "ps")
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(catalog_module.os, "scandir", lambda p: scans.append(p) or real_scandir(p))
+    for _ in range(100):
+        catalog.lookup("box", "ps")
+        catalog.lookup("box", "missing")
+    assert scans == []
+
+
+def test_changes_are_picked_up_by_the_poll(tmp_path: Path) -> None:
+    root = _tree(tmp_path)
+    catalog = TxtcmdCatalog(root, poll_interval=0)
+    assert catalog.lookup("box", "df").text == "default df"
+    reloads = catalog.reloads
+
+    catalog.lookup("box", "ps")
+    assert catalog.reloads == reloads  # nothing changed, nothing reloaded
+
+    path = _write(root, "box", "df", "box df")
+    assert catalog.lookup("box", "df").text == "box df"
+    path.write_text("box df, edited", encoding="utf-8")
+    os.utime(path, ns=(1, 10 ** 18))
+    assert catalog.lookup("box", "df").text == "box df, edited"
+    path.unlink()
+    assert catalog.lookup("box", "df").text == "default df"
+
+
+def test_router_serves_preloaded_output(tmp_path: Path) -> None:
+    root = _tree(tmp_path)
+    _write(root, "default", "big", "é" * 40)
+    router = Router(scenarios_root=root, max_output=50)
+    session = Session(
+        session_id="test-session",
+        remote_ip="127.0.0.1",
+        remote_port=12345,
+        started_ts=iso_ts(),
+        tty_path=str(tmp_path / "tty.log"),
+        _events_file=str(tmp_path / "events.jsonl"),
+    )
+    assert asyncio.run(router.dispatch(session, "ps")) == ("default ps", False)
+    assert asyncio.run(router.dispatch(session, "big")) == ("é" * 40, True)
+    session.scenario_id = "box"
+    assert asyncio.run(router.dispatch(session, "ps")) == ("box ps", False)
+
+
+def test_scenario_managers_share_a_catalog(tmp_path: Path) -> None:
+    root = _tree(tmp_path)
+    assert ScenarioManager(root).txtcmds is ScenarioManager(root).txtcmds